@@ -17,11 +17,15 @@ from src.database.engine import get_engine, get_session
 from src.database.models import (
     Account,
     AccountBalance,
+    ChainLotAttribution,
+    GroupAncestry,
     LotClosing,
+    OpenPositionSnapshot,
     OrderChain,
     OrderChainCache,
     OrderComment,
     PnlEvent,
+    PnlRollup,
     Position,
     PositionGroup,
     PositionGroupLot,
@@ -389,8 +393,12 @@ async def reset_sync(user_id: str):
 
 # Tables containing user trading data (order matters for FK constraints)
 _USER_DATA_TABLES = [
+    PnlRollup,
     PnlEvent,
     RollChainSummary,
+    OpenPositionSnapshot,
+    GroupAncestry,
+    ChainLotAttribution,
     LotClosing,
     PositionGroupLot,
     PositionGroupTag,
@@ -479,7 +487,7 @@ async def reprocess_chains(user_id: str):
         admin_db = DatabaseManager(db_url=os.getenv("DATABASE_URL"))
         admin_lot_manager = LotManager(admin_db)
 
-        raw_transactions = admin_db.get_raw_transactions()
+        raw_transactions = list(admin_db.iter_raw_transactions())
         loguru_logger.info(
             "Admin reprocess for user {}: {} raw transactions",
             user_id, len(raw_transactions),
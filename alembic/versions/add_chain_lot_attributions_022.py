@@ -0,0 +1,48 @@
+"""Add chain_lot_attributions table.
+
+Per-lot home chain (the leaf group of the roll chain whose totals
+include the lot), written alongside roll_chain_summaries so the roll
+chain modal reads only its own chain's lots.
+
+Revision ID: add_chain_lot_attributions_022
+Revises: add_group_ancestry_021
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "add_chain_lot_attributions_022"
+down_revision: str = "add_group_ancestry_021"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "chain_lot_attributions",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id"), nullable=True, index=True),
+        sa.Column("lot_id", sa.Integer(), nullable=False),
+        sa.Column("leaf_group_id", sa.String(), nullable=False),
+        sa.Column("account_number", sa.String(), nullable=False),
+        sa.Column("underlying", sa.String(), nullable=False),
+    )
+    op.create_unique_constraint(
+        "uq_chain_lot_attr_lot_user",
+        "chain_lot_attributions",
+        ["lot_id", "user_id"],
+    )
+    op.create_index(
+        "idx_chain_lot_attr_leaf",
+        "chain_lot_attributions",
+        ["leaf_group_id"],
+    )
+    op.create_index(
+        "idx_chain_lot_attr_account_underlying",
+        "chain_lot_attributions",
+        ["account_number", "underlying"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("chain_lot_attributions")
@@ -0,0 +1,65 @@
+"""Add typed day columns next to the ISO timestamp strings.
+
+raw_transactions.executed_day, position_lots.entry_day,
+lot_closings.closing_day and pnl_events.closing_day hold the calendar
+day of their string timestamp as a DATE, each with a (user_id, day)
+index, so day-range filters and same-day bucketing are index scans
+instead of substr()/LIKE over the strings. The ORM fills them on insert
+(models.derived_day_column); this migration backfills existing rows.
+
+pnl_rollups.close_day becomes a DATE as well.
+
+Revision ID: add_day_columns_025
+Revises: add_group_risk_reward_024
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "add_day_columns_025"
+down_revision: str = "add_group_risk_reward_024"
+branch_labels = None
+depends_on = None
+
+# (table, day column, source column, index name)
+DAY_COLUMNS = [
+    ("raw_transactions", "executed_day", "executed_at", "idx_raw_transactions_user_day"),
+    ("position_lots", "entry_day", "entry_date", "idx_lots_user_entry_day"),
+    ("lot_closings", "closing_day", "closing_date", "idx_lot_closings_user_day"),
+    ("pnl_events", "closing_day", "closing_date", "idx_pnl_events_user_day"),
+]
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    dialect = conn.dialect.name
+
+    for table, column, source, index in DAY_COLUMNS:
+        op.add_column(table, sa.Column(column, sa.Date(), nullable=True))
+        day = f"substr({source}, 1, 10)"
+        if dialect != "sqlite":
+            day = f"CAST({day} AS DATE)"
+        op.execute(
+            f"UPDATE {table} SET {column} = {day} "
+            f"WHERE {source} IS NOT NULL AND {source} <> ''"
+        )
+        op.create_index(index, table, ["user_id", column])
+
+    # SQLite already stores DATE as 'YYYY-MM-DD' text
+    if dialect != "sqlite":
+        op.alter_column(
+            "pnl_rollups", "close_day",
+            type_=sa.Date(), postgresql_using="close_day::date",
+        )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != "sqlite":
+        op.alter_column(
+            "pnl_rollups", "close_day",
+            type_=sa.String(), postgresql_using="close_day::text",
+        )
+    for table, column, _source, index in reversed(DAY_COLUMNS):
+        op.drop_index(index, table_name=table)
+        op.drop_column(table, column)
@@ -0,0 +1,55 @@
+"""Add group_ancestry table.
+
+Closure table over position_groups.rolled_from_group_id (one row per
+ancestor/descendant pair, plus a depth-0 row per group), maintained by
+the pipeline so roll-chain lookups are a single indexed read.
+
+Revision ID: add_group_ancestry_021
+Revises: add_open_position_snapshots_020
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "add_group_ancestry_021"
+down_revision: str = "add_open_position_snapshots_020"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "group_ancestry",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id"), nullable=True, index=True),
+        sa.Column("ancestor_group_id", sa.String(), nullable=False),
+        sa.Column("descendant_group_id", sa.String(), nullable=False),
+        sa.Column("depth", sa.Integer(), nullable=False),
+        sa.Column("root_group_id", sa.String(), nullable=False),
+        sa.Column("account_number", sa.String(), nullable=False),
+        sa.Column("underlying", sa.String(), nullable=False),
+    )
+    op.create_unique_constraint(
+        "uq_group_ancestry_pair_user",
+        "group_ancestry",
+        ["ancestor_group_id", "descendant_group_id", "user_id"],
+    )
+    op.create_index(
+        "idx_group_ancestry_descendant",
+        "group_ancestry",
+        ["descendant_group_id", "depth"],
+    )
+    op.create_index(
+        "idx_group_ancestry_ancestor",
+        "group_ancestry",
+        ["ancestor_group_id", "depth"],
+    )
+    op.create_index(
+        "idx_group_ancestry_account_underlying",
+        "group_ancestry",
+        ["account_number", "underlying"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("group_ancestry")
@@ -0,0 +1,28 @@
+"""Add max_risk / max_reward to position_groups.
+
+Computed by the pipeline when it labels a group (and on label overrides
+and lot moves) so the performance report reads them instead of running
+one lots query per group. NULL on existing rows until the next
+reprocess; the report computes those in a batch.
+
+Revision ID: add_group_risk_reward_024
+Revises: add_pnl_rollups_023
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "add_group_risk_reward_024"
+down_revision: str = "add_pnl_rollups_023"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("position_groups", sa.Column("max_risk", sa.Float(), nullable=True))
+    op.add_column("position_groups", sa.Column("max_reward", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("position_groups", "max_reward")
+    op.drop_column("position_groups", "max_risk")
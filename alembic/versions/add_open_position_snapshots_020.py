@@ -0,0 +1,45 @@
+"""Add open_position_snapshots table.
+
+Materialized per-group Positions page payload, rebuilt by the pipeline so
+/api/open-chains is a single indexed read.
+
+Revision ID: add_open_position_snapshots_020
+Revises: add_parent_lot_id_019
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "add_open_position_snapshots_020"
+down_revision: str = "add_parent_lot_id_019"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "open_position_snapshots",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id"), nullable=True, index=True),
+        sa.Column("group_id", sa.String(), nullable=False),
+        sa.Column("account_number", sa.String(), nullable=False),
+        sa.Column("underlying", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("opening_date", sa.String(), nullable=True),
+        sa.Column("snapshot", sa.Text(), nullable=False),
+        sa.Column("updated_at", sa.String(), server_default=sa.func.now()),
+    )
+    op.create_unique_constraint(
+        "uq_open_snapshots_group_user",
+        "open_position_snapshots",
+        ["group_id", "user_id"],
+    )
+    op.create_index(
+        "idx_open_snapshots_account_underlying",
+        "open_position_snapshots",
+        ["account_number", "underlying"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("open_position_snapshots")
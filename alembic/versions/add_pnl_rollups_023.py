@@ -0,0 +1,42 @@
+"""Add pnl_rollups table.
+
+pnl_events pre-aggregated per (account, underlying, close day, group)
+with the group's strategy label, rebuilt per partition alongside
+pnl_events so the report endpoints read index ranges instead of
+aggregating raw events.
+
+Revision ID: add_pnl_rollups_023
+Revises: add_chain_lot_attributions_022
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "add_pnl_rollups_023"
+down_revision: str = "add_chain_lot_attributions_022"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pnl_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id"), nullable=True, index=True),
+        sa.Column("account_number", sa.String(), nullable=False),
+        sa.Column("underlying", sa.String(), nullable=False),
+        sa.Column("close_day", sa.String(), nullable=False),
+        sa.Column("close_month", sa.String(), nullable=False),
+        sa.Column("group_id", sa.String(), nullable=True),
+        sa.Column("strategy_label", sa.String(), nullable=True),
+        sa.Column("realized_pnl", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("event_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index("idx_pnl_rollups_user_day", "pnl_rollups", ["user_id", "close_day"])
+    op.create_index("idx_pnl_rollups_account_day", "pnl_rollups", ["account_number", "close_day"])
+    op.create_index("idx_pnl_rollups_account_underlying", "pnl_rollups", ["account_number", "underlying"])
+    op.create_index("idx_pnl_rollups_group", "pnl_rollups", ["group_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("pnl_rollups")
@@ -0,0 +1,93 @@
+"""Lead the hot-table indexes with user_id.
+
+Every ORM query is scoped with WHERE user_id = ? (tenant.py), but most
+indexes started with account_number, underlying, group_id, etc., so on
+a shared database the planner walked other users' entries too. This
+replaces them with tenant-first composites covering the same lookups.
+
+Revision ID: add_tenant_indexes_026
+Revises: add_day_columns_025
+"""
+
+from alembic import op
+
+revision: str = "add_tenant_indexes_026"
+down_revision: str = "add_day_columns_025"
+branch_labels = None
+depends_on = None
+
+# (table, index, columns) dropped by this revision
+DROPPED = [
+    ("order_chains", "idx_order_chains_account", ["account_number"]),
+    ("order_chains", "idx_order_chains_underlying", ["underlying"]),
+    ("order_chains", "idx_order_chains_account_underlying", ["account_number", "underlying"]),
+    ("raw_transactions", "idx_raw_transactions_order", ["order_id"]),
+    ("raw_transactions", "idx_raw_transactions_account", ["account_number"]),
+    ("position_lots", "idx_lots_account_symbol", ["account_number", "symbol"]),
+    ("position_lots", "idx_lots_underlying", ["underlying"]),
+    ("position_lots", "idx_lots_chain", ["chain_id"]),
+    ("position_lots", "idx_lots_status", ["status"]),
+    ("position_groups", "idx_position_groups_account", ["account_number"]),
+    ("position_groups", "idx_position_groups_underlying", ["underlying"]),
+    ("position_groups", "idx_position_groups_status", ["status"]),
+    ("position_groups", "idx_position_groups_rolled_from", ["rolled_from_group_id"]),
+    ("position_group_lots", "idx_position_group_lots_txn", ["transaction_id"]),
+    ("roll_chain_summaries", "idx_roll_chain_underlying", ["underlying", "account_number"]),
+    ("roll_chain_summaries", "idx_roll_chain_root", ["root_group_id"]),
+    ("chain_lot_attributions", "idx_chain_lot_attr_leaf", ["leaf_group_id"]),
+    ("chain_lot_attributions", "idx_chain_lot_attr_account_underlying", ["account_number", "underlying"]),
+    ("open_position_snapshots", "idx_open_snapshots_account_underlying", ["account_number", "underlying"]),
+    ("group_ancestry", "idx_group_ancestry_descendant", ["descendant_group_id", "depth"]),
+    ("group_ancestry", "idx_group_ancestry_ancestor", ["ancestor_group_id", "depth"]),
+    ("group_ancestry", "idx_group_ancestry_account_underlying", ["account_number", "underlying"]),
+    ("pnl_events", "idx_pnl_events_closing_date", ["closing_date", "user_id"]),
+    ("pnl_events", "idx_pnl_events_account_date", ["account_number", "closing_date"]),
+    ("pnl_events", "idx_pnl_events_group", ["group_id"]),
+    ("pnl_events", "idx_pnl_events_underlying", ["underlying"]),
+    ("pnl_rollups", "idx_pnl_rollups_account_day", ["account_number", "close_day"]),
+    ("pnl_rollups", "idx_pnl_rollups_account_underlying", ["account_number", "underlying"]),
+    ("pnl_rollups", "idx_pnl_rollups_group", ["group_id"]),
+]
+
+# (table, index, columns) created by this revision
+CREATED = [
+    ("order_chains", "idx_order_chains_user_account_underlying", ["user_id", "account_number", "underlying"]),
+    ("raw_transactions", "idx_raw_transactions_user_order", ["user_id", "order_id"]),
+    ("raw_transactions", "idx_raw_transactions_user_account", ["user_id", "account_number", "underlying_symbol"]),
+    ("position_lots", "idx_lots_user_account_symbol", ["user_id", "account_number", "symbol"]),
+    ("position_lots", "idx_lots_user_account_underlying", ["user_id", "account_number", "underlying"]),
+    ("position_lots", "idx_lots_user_chain", ["user_id", "chain_id"]),
+    ("position_lots", "idx_lots_user_status", ["user_id", "status"]),
+    ("position_groups", "idx_position_groups_user_account_underlying", ["user_id", "account_number", "underlying"]),
+    ("position_groups", "idx_position_groups_user_status", ["user_id", "status"]),
+    ("position_groups", "idx_position_groups_user_rolled_from", ["user_id", "rolled_from_group_id"]),
+    ("position_group_lots", "idx_group_lots_user_txn", ["user_id", "transaction_id"]),
+    ("position_group_lots", "idx_group_lots_user_group", ["user_id", "group_id"]),
+    ("roll_chain_summaries", "idx_roll_chain_user_account_underlying", ["user_id", "account_number", "underlying"]),
+    ("roll_chain_summaries", "idx_roll_chain_user_root", ["user_id", "root_group_id"]),
+    ("chain_lot_attributions", "idx_chain_lot_attr_user_leaf", ["user_id", "leaf_group_id"]),
+    ("chain_lot_attributions", "idx_chain_lot_attr_user_account_underlying", ["user_id", "account_number", "underlying"]),
+    ("open_position_snapshots", "idx_open_snapshots_user_account_underlying", ["user_id", "account_number", "underlying"]),
+    ("group_ancestry", "idx_group_ancestry_user_descendant", ["user_id", "descendant_group_id", "depth"]),
+    ("group_ancestry", "idx_group_ancestry_user_ancestor", ["user_id", "ancestor_group_id", "depth"]),
+    ("group_ancestry", "idx_group_ancestry_user_account_underlying", ["user_id", "account_number", "underlying"]),
+    ("pnl_events", "idx_pnl_events_user_account_underlying", ["user_id", "account_number", "underlying"]),
+    ("pnl_events", "idx_pnl_events_user_group", ["user_id", "group_id"]),
+    ("pnl_rollups", "idx_pnl_rollups_user_account_day", ["user_id", "account_number", "close_day"]),
+    ("pnl_rollups", "idx_pnl_rollups_user_account_underlying", ["user_id", "account_number", "underlying"]),
+    ("pnl_rollups", "idx_pnl_rollups_user_group", ["user_id", "group_id"]),
+]
+
+
+def upgrade() -> None:
+    for table, index, columns in CREATED:
+        op.create_index(index, table, columns, if_not_exists=True)
+    for table, index, _columns in DROPPED:
+        op.drop_index(index, table_name=table, if_exists=True)
+
+
+def downgrade() -> None:
+    for table, index, columns in DROPPED:
+        op.create_index(index, table, columns, if_not_exists=True)
+    for table, index, _columns in CREATED:
+        op.drop_index(index, table_name=table, if_exists=True)
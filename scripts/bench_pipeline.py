@@ -0,0 +1,201 @@
+"""End-to-end pipeline and endpoint benchmark on synthetic portfolios.
+
+For each size (default 1k / 10k / 100k transactions) builds a fresh
+SQLite database from tests.fixtures.synthetic_portfolio, then times:
+
+  1. saving and reloading the raw transactions (as /api/sync/initial does);
+  2. every reprocess() stage (PipelineResult.stage_seconds);
+  3. /api/open-chains, /api/ledger and /api/reports/performance, called
+     directly on the router functions (best of --repeat runs).
+
+Results are written as JSON keyed by the current git commit, so two
+commits can be compared with --compare:
+
+  python scripts/bench_pipeline.py                       # writes bench_results/pipeline-<sha>.json
+  python scripts/bench_pipeline.py --compare bench_results/pipeline-<old sha>.json
+
+Run from project root:
+  python scripts/bench_pipeline.py [--sizes 1000 10000 100000] [--output PATH] [--compare PATH]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from loguru import logger
+
+from src.database import engine as sa_engine
+from src.database.db_manager import DatabaseManager
+from src.database.tenant import DEFAULT_USER_ID
+from src.models.lot_manager import LotManager
+from src.pipeline.orchestrator import reprocess
+from src.routers.ledger import get_ledger
+from src.routers.positions import get_open_chains
+from src.routers.reports import get_performance_report
+from tests.fixtures import synthetic_portfolio
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+ENDPOINTS = {
+    "/api/open-chains": lambda db, lm: get_open_chains(
+        account_number=None, db=db, lot_manager=lm, user_id=DEFAULT_USER_ID,
+    ),
+    "/api/ledger": lambda db, lm: get_ledger(
+        account_number="", underlying="", db=db, lot_manager=lm, user_id=DEFAULT_USER_ID,
+    ),
+    "/api/reports/performance": lambda db, lm: get_performance_report(
+        account_number=None, exit_from=None, exit_to=None, strategies="",
+        db=db, user_id=DEFAULT_USER_ID,
+    ),
+}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_size(count: int, generator_args: dict, workers: int, repeat: int) -> dict:
+    raws = synthetic_portfolio.transactions(count, **generator_args)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(db_url=f"sqlite:///{tmp}/bench.db")
+        db.initialize_database()
+        lot_manager = LotManager(db)
+
+        t0 = time.perf_counter()
+        db.save_raw_transactions(raws)
+        t1 = time.perf_counter()
+        loaded = list(db.iter_raw_transactions())
+        t2 = time.perf_counter()
+        result = reprocess(db, lot_manager, loaded, workers=workers)
+        t3 = time.perf_counter()
+
+        endpoints = {}
+        for name, call in ENDPOINTS.items():
+            runs = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                asyncio.run(call(db, lot_manager))
+                runs.append(time.perf_counter() - start)
+            endpoints[name] = min(runs)
+        sa_engine.get_engine().dispose()
+
+    return {
+        "transactions": len(raws),
+        "save_raw_seconds": t1 - t0,
+        "load_raw_seconds": t2 - t1,
+        "reprocess_seconds": t3 - t2,
+        "stages": result.stage_seconds,
+        "endpoints": endpoints,
+        "counts": {
+            "orders_assembled": result.orders_assembled,
+            "groups_processed": result.groups_processed,
+            "pnl_events": result.pnl_events_populated,
+            "roll_chain_summaries": result.roll_chain_summaries,
+            "open_snapshots": result.open_snapshots,
+        },
+    }
+
+
+def _timings(run: dict) -> dict:
+    """Flat {label: seconds} view of one size's results."""
+    flat = {
+        "save raw": run["save_raw_seconds"],
+        "load raw": run["load_raw_seconds"],
+        "reprocess": run["reprocess_seconds"],
+    }
+    flat.update((f"  {stage}", secs) for stage, secs in run["stages"].items())
+    flat.update(run["endpoints"])
+    return flat
+
+
+def report(results: dict, baseline: dict | None = None) -> None:
+    if baseline and baseline.get("generator") != results["generator"]:
+        print("note: baseline was generated with different settings")
+    for size, run in results["runs"].items():
+        base = (baseline or {}).get("runs", {}).get(size)
+        header = f"\n{int(size):,} transactions"
+        if base:
+            header += f"  (vs {baseline['commit']})"
+        print(header)
+        base_timings = _timings(base) if base else {}
+        for label, secs in _timings(run).items():
+            line = f"  {label:<28}{secs:>10.3f} s"
+            old = base_timings.get(label)
+            if old:
+                line += f"  {old:>10.3f} s  {secs / old - 1:>+7.1%}"
+            print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--years", type=float, default=2.0)
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--underlyings", type=int, default=25)
+    parser.add_argument("--roll-rate", type=float, default=0.3)
+    parser.add_argument("--assignment-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Stage 2–3 process pool size (0 = serial)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per endpoint; the best is kept")
+    parser.add_argument("--output", type=Path,
+                        help="Result file (default bench_results/pipeline-<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier result file to diff against")
+    args = parser.parse_args()
+
+    # Pipeline and router logging would swamp the report
+    logger.remove()
+    logging.getLogger("src").setLevel(logging.ERROR)
+
+    generator_args = {
+        "years": args.years,
+        "accounts": args.accounts,
+        "underlyings": args.underlyings,
+        "roll_rate": args.roll_rate,
+        "assignment_rate": args.assignment_rate,
+        "seed": args.seed,
+    }
+    commit = _git_commit()
+    results = {
+        "commit": commit,
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "workers": args.workers,
+        "generator": generator_args,
+        "runs": {},
+    }
+    for count in args.sizes:
+        print(f"running {count:,} transactions ...", flush=True)
+        results["runs"][str(count)] = run_size(count, generator_args, args.workers, args.repeat)
+
+    output = args.output or ROOT / "bench_results" / f"pipeline-{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + "\n")
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    report(results, baseline)
+    print(f"\nwrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Memory/throughput benchmark for the Stage 2–3 pipeline records.
+
+Builds a synthetic 100k-transaction history (short options opened and
+bought back across a few dozen underlyings), then:
+
+  1. runs order assembly + the in-memory lot pass (no database) and
+     reports wall time and peak traced memory (separate runs);
+  2. compares the footprint of the slotted Transaction / BookLot records
+     with equivalent non-slotted dataclasses holding the same values.
+
+Run from project root:
+  python scripts/bench_pipeline_records.py [--transactions N]
+"""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.models.order_processor import Transaction
+from src.pipeline.lot_book import BookLot
+from src.pipeline.order_assembler import assemble_orders
+from src.pipeline.position_ledger import book_lots
+
+UNDERLYINGS = [f"SYM{i:02d}" for i in range(40)]
+
+
+def synthetic_history(count: int):
+    """``count`` raw transactions: STO/BTC pairs, two weeks apart."""
+    start = datetime(2020, 1, 6, 15, 0)
+    raws = []
+    for n in range(count // 2):
+        underlying = UNDERLYINGS[n % len(UNDERLYINGS)]
+        opened = start + timedelta(minutes=n)
+        expiration = (opened + timedelta(days=45)).date()
+        strike = 100 + (n % 20) * 5
+        symbol = f"{underlying:<6}{expiration:%y%m%d}P{strike * 1000:08d}"
+        for leg, (action, when, price) in enumerate((
+            ("SELL_TO_OPEN", opened, 2.0),
+            ("BUY_TO_CLOSE", opened + timedelta(days=14), 0.8),
+        )):
+            raws.append({
+                "id": f"tx-{n}-{leg}", "account_number": f"ACCT{n % 3}",
+                "order_id": f"ORD-{n}-{leg}", "transaction_type": "TRADE",
+                "transaction_sub_type": action, "description": "",
+                "executed_at": when.isoformat() + "+00:00",
+                "action": action, "symbol": symbol,
+                "instrument_type": "EQUITY_OPTION", "underlying_symbol": underlying,
+                "quantity": 1, "price": price, "value": price * 100,
+                "regulatory_fees": 0.0, "clearing_fees": 0.0,
+                "commission": 0.0, "net_value": price * 100,
+            })
+    return raws
+
+
+def run_pipeline(raws) -> None:
+    # Timed and traced separately: tracemalloc slows allocation-heavy code
+    gc.collect()
+    t0 = time.perf_counter()
+    assembly = assemble_orders(raws)
+    t1 = time.perf_counter()
+    book = book_lots(assembly.orders, assembly.assignment_stock_transactions)
+    t2 = time.perf_counter()
+    del assembly, book
+
+    gc.collect()
+    tracemalloc.start()
+    assembly = assemble_orders(raws)
+    book = book_lots(assembly.orders, assembly.assignment_stock_transactions)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"orders assembled:  {len(assembly.orders):>10,}")
+    print(f"lots booked:       {len(book._new_lots):>10,}")
+    print(f"assembly:          {t1 - t0:>10.2f} s  ({len(raws) / (t1 - t0):,.0f} tx/s)")
+    print(f"lot pass:          {t2 - t1:>10.2f} s")
+    print(f"peak traced mem:   {peak / 2**20:>10.1f} MiB")
+
+
+def _unslotted(cls):
+    """A plain (non-slotted) dataclass with the same fields as ``cls``."""
+    return dataclasses.make_dataclass(
+        f"Plain{cls.__name__}",
+        [(f.name, f.type, dataclasses.field(default=None)) for f in dataclasses.fields(cls)],
+    )
+
+
+def _traced_size(build, count: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    records = [build(i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return size
+
+
+def compare_records(count: int) -> None:
+    executed = datetime(2024, 1, 2, 15, 0)
+    expiration = date(2024, 2, 16)
+    tx_values = dict(
+        account_number="ACCT1", order_id="ORD", symbol="SYM   240216P00100000",
+        underlying_symbol="SYM", action="SELL_TO_OPEN", quantity=1, price=2.0,
+        executed_at=executed, transaction_type="TRADE", transaction_sub_type="SELL_TO_OPEN",
+        description="", option_type="Put", strike=100.0, expiration=expiration,
+    )
+    lot_values = dict(
+        transaction_id="tx", account_number="ACCT1", symbol="SYM   240216P00100000",
+        underlying="SYM", instrument_type="EQUITY_OPTION", option_type="Put",
+        strike=100.0, expiration="2024-02-16", quantity=-1, entry_price=2.0,
+        entry_date="2024-01-02T15:00:00+00:00", remaining_quantity=-1,
+        original_quantity=1, chain_id="chain", leg_index=0, opening_order_id="ORD",
+    )
+
+    print(f"\nper-record footprint ({count:,} records, shared field values):")
+    for cls, values in ((Transaction, tx_values), (BookLot, lot_values)):
+        plain = _unslotted(cls)
+        slotted = _traced_size(lambda i: cls(id=i, **values), count)
+        unslotted = _traced_size(lambda i: plain(id=i, **values), count)
+        print(
+            f"  {cls.__name__:<12} slotted {slotted / count:>6.0f} B   "
+            f"non-slotted {unslotted / count:>6.0f} B   "
+            f"({1 - slotted / unslotted:.0%} smaller)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=100_000)
+    args = parser.parse_args()
+
+    raws = synthetic_history(args.transactions)
+    print(f"synthetic history: {len(raws):>10,} transactions")
+    run_pipeline(raws)
+    compare_records(args.transactions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Long-lived DXLink streaming hub for live quotes.
+
+One hub per TastytradeClient (so per user when auth is enabled) holds a
+single DXLink connection for every websocket using that client. Symbol
+subscriptions are reference-counted across sockets: the first socket to
+want a symbol subscribes it upstream, the last one to drop it
+unsubscribes. Events are coalesced for FLUSH_INTERVAL seconds and pushed
+to each socket as per-symbol deltas, and written through to the shared
+quote cache so REST callers and cache-only sockets see them too.
+"""
+
+import asyncio
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
+
+from loguru import logger
+
+from src.utils.quote_cache import QUOTE_RETENTION_SECONDS, get_quote_cache
+
+# Events are batched for this long before being pushed to sockets
+FLUSH_INTERVAL = 0.25
+# Reconnect backoff after the DXLink connection drops
+RECONNECT_MIN_SECONDS = 1
+RECONNECT_MAX_SECONDS = 30
+
+
+class StreamSubscription:
+    """One socket's view of the hub: its symbol set and pending deltas.
+
+    Deltas for the same symbol are merged until the socket reads them, so
+    a slow consumer gets the latest values rather than a growing backlog.
+    """
+
+    def __init__(self, hub: "QuoteStreamHub"):
+        self._hub = hub
+        self.symbols: Set[str] = set()
+        self._pending: Dict[str, Dict] = {}
+        self._ready = asyncio.Event()
+
+    async def set_symbols(self, symbols: Iterable[str]) -> None:
+        """Replace this socket's subscribed symbols."""
+        await self._hub._update(self, set(symbols))
+
+    async def next_batch(self, timeout: float) -> Optional[Dict[str, Dict]]:
+        """Quotes changed since the last call, or None if none arrived within timeout."""
+        if not self._pending:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        batch, self._pending = self._pending, {}
+        return batch
+
+    async def close(self) -> None:
+        await self._hub._update(self, set())
+        self._hub._subscribers.discard(self)
+        self._hub._stop_if_idle()
+
+    def _deliver(self, quotes: Dict[str, Dict]) -> None:
+        for symbol, quote in quotes.items():
+            if symbol in self.symbols:
+                self._pending[symbol] = quote
+        if self._pending:
+            self._ready.set()
+
+
+class QuoteStreamHub:
+    """Shares one DXLink connection across all sockets of a client."""
+
+    def __init__(self, client):
+        self._client = client
+        self._refcounts: Counter = Counter()
+        self._subscribers: Set[StreamSubscription] = set()
+        self._latest: Dict[str, Dict] = {}
+        # Symbols with at least one event on the current connection; the
+        # rest of _latest is only seeded from the cache
+        self._live: Set[str] = set()
+        self._changed: Dict[str, Dict] = {}
+        self._streamer = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def streaming(self) -> bool:
+        """True while a DXLink connection is open."""
+        return self._streamer is not None
+
+    def subscribe(self) -> StreamSubscription:
+        """Register a socket; call set_symbols() to start receiving quotes."""
+        sub = StreamSubscription(self)
+        self._subscribers.add(sub)
+        return sub
+
+    def latest(self, symbols: List[str]) -> Dict[str, Dict]:
+        """Most recent streamed quotes for symbols that have had an event on
+        the current connection."""
+        if not self.streaming:
+            return {}
+        return {s: dict(self._latest[s]) for s in symbols if s in self._live}
+
+    # ------------------------------------------------------------------
+    # Subscription bookkeeping
+    # ------------------------------------------------------------------
+
+    async def _update(self, sub: StreamSubscription, symbols: Set[str]) -> None:
+        added = symbols - sub.symbols
+        removed = sub.symbols - symbols
+        sub.symbols = symbols
+
+        new_upstream = []
+        for symbol in added:
+            self._refcounts[symbol] += 1
+            if self._refcounts[symbol] == 1:
+                new_upstream.append(symbol)
+        dropped_upstream = []
+        for symbol in removed:
+            self._refcounts[symbol] -= 1
+            if self._refcounts[symbol] <= 0:
+                del self._refcounts[symbol]
+                self._latest.pop(symbol, None)
+                self._live.discard(symbol)
+                self._changed.pop(symbol, None)
+                dropped_upstream.append(symbol)
+
+        if new_upstream:
+            # Seed with the last REST quote so fields DXLink doesn't stream
+            # (prev_close, change, IVR) survive the first delta
+            seeded = await get_quote_cache().get_async(new_upstream, max_age_seconds=QUOTE_RETENTION_SECONDS)
+            for symbol in new_upstream:
+                self._latest[symbol] = seeded.get(symbol, {'symbol': symbol})
+
+        streamer = self._streamer
+        if streamer is not None:
+            from tastytrade.dxfeed import Greeks, Quote
+            try:
+                if new_upstream:
+                    await streamer.subscribe(Quote, new_upstream)
+                    await streamer.subscribe(Greeks, new_upstream)
+                if dropped_upstream:
+                    await streamer.unsubscribe(Quote, dropped_upstream)
+                    await streamer.unsubscribe(Greeks, dropped_upstream)
+            except Exception as e:
+                # The run loop resubscribes everything on reconnect
+                logger.warning(f"DXLink subscription update failed: {e}")
+
+        if self._refcounts:
+            self._ensure_running()
+        else:
+            self._stop_if_idle()
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _stop_if_idle(self) -> None:
+        if not self._refcounts and self._task is not None and not self._task.done():
+            logger.info("No symbols subscribed, closing DXLink streamer")
+            self._task.cancel()
+            self._task = None
+
+    # ------------------------------------------------------------------
+    # Streaming loop
+    # ------------------------------------------------------------------
+
+    async def _run(self) -> None:
+        backoff = RECONNECT_MIN_SECONDS
+        while self._refcounts:
+            try:
+                from tastytrade import DXLinkStreamer
+                from tastytrade.dxfeed import Greeks, Quote
+
+                async with DXLinkStreamer(self._client.session) as streamer:
+                    # Set before snapshotting symbols so concurrent _update
+                    # calls subscribe anything added from here on
+                    self._streamer = streamer
+                    symbols = list(self._refcounts)
+                    logger.info(f"DXLink hub connected, subscribing {len(symbols)} symbols")
+                    await streamer.subscribe(Quote, symbols)
+                    await streamer.subscribe(Greeks, symbols)
+                    backoff = RECONNECT_MIN_SECONDS
+                    await asyncio.gather(
+                        self._consume(streamer, Quote, self._apply_quote),
+                        self._consume(streamer, Greeks, self._apply_greeks),
+                        self._flush_loop(),
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"DXLink hub disconnected: {e}; reconnecting in {backoff}s")
+            finally:
+                self._streamer = None
+                self._live.clear()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX_SECONDS)
+
+    async def _consume(self, streamer, event_class, apply) -> None:
+        async for event in streamer.listen(event_class):
+            symbol = getattr(event, 'event_symbol', None)
+            if symbol in self._refcounts:
+                apply(symbol, event)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            batch = self._flush()
+            if batch:
+                await get_quote_cache().put_async(batch)
+
+    def _flush(self) -> Dict[str, Dict]:
+        """Push changed quotes to local sockets; returns the batch for the shared cache."""
+        if not self._changed:
+            return {}
+        batch, self._changed = self._changed, {}
+        for sub in list(self._subscribers):
+            sub._deliver(batch)
+        return batch
+
+    def _record(self, symbol: str, fields: Dict) -> None:
+        self._live.add(symbol)
+        quote = self._latest.get(symbol, {'symbol': symbol})
+        if all(quote.get(k) == v for k, v in fields.items()):
+            return  # no change, nothing to push
+        quote = {**quote, **fields}
+        self._latest[symbol] = quote
+        self._changed[symbol] = quote
+
+    def _apply_quote(self, symbol: str, event) -> None:
+        bid = float(event.bid_price) if getattr(event, 'bid_price', None) else 0.0
+        ask = float(event.ask_price) if getattr(event, 'ask_price', None) else 0.0
+        if bid and ask:
+            mark = (bid + ask) / 2
+        else:
+            mark = bid or ask
+        fields = {'bid': bid, 'ask': ask, 'mark': mark, 'price': mark}
+
+        prev_close = self._latest.get(symbol, {}).get('prev_close')
+        if mark > 0 and prev_close:
+            change = mark - prev_close
+            fields['change'] = change
+            fields['change_percent'] = fields['changePercent'] = (change / prev_close) * 100
+        self._record(symbol, fields)
+
+    def _apply_greeks(self, symbol: str, event) -> None:
+        fields = {}
+        iv = getattr(event, 'volatility', None)
+        if iv:
+            fields['iv'] = float(iv) * 100
+        for name in ('delta', 'gamma', 'theta', 'vega', 'rho'):
+            value = getattr(event, name, None)
+            if value:
+                fields[name] = float(value)
+        if fields:
+            self._record(symbol, fields)
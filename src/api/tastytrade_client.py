@@ -1,6 +1,7 @@
+import asyncio
 import os
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import Any, AsyncIterator, Dict, List, Optional
 from dotenv import load_dotenv
 from tastytrade import Session, Account
 from tastytrade.order import OrderStatus
@@ -10,12 +11,55 @@ from loguru import logger
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
+from src.utils.quote_cache import QUOTE_FRESH_SECONDS, get_quote_cache
+from src.utils.option_symbols import is_option_symbol
+
 load_dotenv()
 
 # Instrument types we don't support — futures have product-specific multipliers,
 # different symbol formats, and ambiguous Buy/Sell actions.
 _UNSUPPORTED_INSTRUMENT_TYPES = {'Future', 'Future Option'}
 
+# Per-account fetches (history, positions, balances) run concurrently:
+# at most this many accounts at once, each bounded by the timeout.
+ACCOUNT_FETCH_CONCURRENCY = int(os.getenv('TASTYTRADE_ACCOUNT_CONCURRENCY', '4'))
+ACCOUNT_FETCH_TIMEOUT = float(os.getenv('TASTYTRADE_ACCOUNT_TIMEOUT', '120'))
+
+
+def _transactions_to_dicts(transactions, account_number: str) -> List[Dict[str, Any]]:
+    """Convert SDK transactions to raw transaction dicts, skipping
+    unsupported instrument types (futures, futures options)."""
+    tx_dicts = []
+    for tx in transactions:
+        inst_type = str(tx.instrument_type) if tx.instrument_type else ''
+        if inst_type in _UNSUPPORTED_INSTRUMENT_TYPES:
+            continue
+
+        # Convert to dict, handling optional fields
+        tx_dicts.append({
+            'id': tx.id,
+            'account_number': account_number,  # Add account info
+            'transaction_type': tx.transaction_type,
+            'transaction_sub_type': tx.transaction_sub_type,
+            'description': tx.description,
+            'executed_at': tx.executed_at.isoformat() if tx.executed_at else None,
+            'transaction_date': tx.transaction_date.isoformat() if tx.transaction_date else None,
+            'action': str(tx.action) if tx.action else None,
+            'symbol': tx.symbol,
+            'instrument_type': str(tx.instrument_type) if tx.instrument_type else None,
+            'underlying_symbol': tx.underlying_symbol,
+            'quantity': float(tx.quantity) if tx.quantity else None,
+            'price': float(tx.price) if tx.price else None,
+            'value': float(tx.value) if tx.value else 0,
+            'regulatory_fees': float(tx.regulatory_fees) if tx.regulatory_fees else 0,
+            'clearing_fees': float(tx.clearing_fees) if tx.clearing_fees else 0,
+            'commission': float(tx.commission) if tx.commission else 0,
+            'net_value': float(tx.net_value) if tx.net_value else 0,
+            'order_id': tx.order_id,
+            'is_estimated_fee': tx.is_estimated_fee,
+        })
+    return tx_dicts
+
 
 class TastytradeClient:
     def __init__(self, provider_secret: str = None, refresh_token: str = None):
@@ -33,16 +77,22 @@ class TastytradeClient:
         self.accounts = []
         self.current_account = None
 
-        # Quote caching
-        self._quote_cache = {}
-        self._quote_cache_time = {}
-        self._quote_cache_duration = 30  # Cache quotes for 30 seconds
+        # Quote caching (shared across clients, workers and websockets)
+        self._quote_cache = get_quote_cache()
+        self._quote_cache_duration = QUOTE_FRESH_SECONDS
+
+        # Live DXLink streaming shared by every websocket on this client
+        self._stream_hub = None
+
+        # Accounts whose last fetch failed, by operation: {op: {account: error}}
+        self.account_errors: Dict[str, Dict[str, str]] = {}
 
-    def clear_quote_cache(self):
-        """Clear the quote cache to force fresh data"""
-        self._quote_cache.clear()
-        self._quote_cache_time.clear()
-        logger.info("Quote cache cleared")
+    def get_stream_hub(self):
+        """Get (or create) the QuoteStreamHub for this client's session."""
+        if self._stream_hub is None:
+            from src.api.quote_stream import QuoteStreamHub
+            self._stream_hub = QuoteStreamHub(self)
+        return self._stream_hub
 
     async def authenticate(self) -> bool:
         """Authenticate with Tastytrade API using OAuth2"""
@@ -93,6 +143,48 @@ class TastytradeClient:
 
         return account_list
 
+    async def _for_each_account(self, operation: str, accounts, fetch) -> List[tuple]:
+        """Run ``fetch(account)`` for every account concurrently.
+
+        At most ACCOUNT_FETCH_CONCURRENCY accounts are in flight at once and
+        each is bounded by ACCOUNT_FETCH_TIMEOUT, so wall time tracks the
+        slowest account rather than the sum.  Returns (account, result)
+        pairs, in account order, for the accounts that succeeded; failures
+        are logged and recorded in ``self.account_errors[operation]``.
+        """
+        semaphore = asyncio.Semaphore(ACCOUNT_FETCH_CONCURRENCY)
+
+        async def run(account):
+            async with semaphore:
+                return await asyncio.wait_for(fetch(account), ACCOUNT_FETCH_TIMEOUT)
+
+        results = await asyncio.gather(*(run(a) for a in accounts), return_exceptions=True)
+
+        succeeded = []
+        errors = {}
+        for account, result in zip(accounts, results):
+            if isinstance(result, asyncio.TimeoutError):
+                errors[account.account_number] = f"timed out after {ACCOUNT_FETCH_TIMEOUT:g}s"
+            elif isinstance(result, Exception):
+                errors[account.account_number] = str(result)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                succeeded.append((account, result))
+                continue
+            logger.error(f"Failed to get {operation} from account {account.account_number}: {errors[account.account_number]}")
+
+        self.account_errors[operation] = errors
+        return succeeded
+
+    def failed_accounts(self) -> Dict[str, Dict[str, str]]:
+        """Errors from the latest per-account fetches: {account: {operation: error}}."""
+        failed: Dict[str, Dict[str, str]] = {}
+        for operation, errors in self.account_errors.items():
+            for account_number, error in errors.items():
+                failed.setdefault(account_number, {})[operation] = error
+        return failed
+
     async def get_transactions(self, days_back: int = 30, account_number: str = None, start_date: datetime = None) -> List[Dict[str, Any]]:
         """Get transactions from all accounts or a specific account.
 
@@ -122,61 +214,67 @@ class TastytradeClient:
         end_date = datetime.now()
         effective_start = start_date if start_date is not None else end_date - timedelta(days=days_back)
 
-        for account in accounts_to_process:
-            try:
-                # Get transaction history - page_offset=None fetches all pages automatically
-                transactions = await account.get_history(
-                    self.session,
-                    start_date=effective_start,
-                    end_date=end_date,
-                    per_page=250,
-                    page_offset=None
-                )
+        async def fetch(account):
+            # Get transaction history - page_offset=None fetches all pages automatically
+            transactions = await account.get_history(
+                self.session,
+                start_date=effective_start,
+                end_date=end_date,
+                per_page=250,
+                page_offset=None
+            )
 
-                # Convert to list of dicts
-                skipped_futures = 0
-                for tx in transactions:
-                    # Skip unsupported instrument types (futures, futures options)
-                    inst_type = str(tx.instrument_type) if tx.instrument_type else ''
-                    if inst_type in _UNSUPPORTED_INSTRUMENT_TYPES:
-                        skipped_futures += 1
-                        continue
-
-                    # Convert to dict, handling optional fields
-                    tx_dict = {
-                        'id': tx.id,
-                        'account_number': account.account_number,  # Add account info
-                        'transaction_type': tx.transaction_type,
-                        'transaction_sub_type': tx.transaction_sub_type,
-                        'description': tx.description,
-                        'executed_at': tx.executed_at.isoformat() if tx.executed_at else None,
-                        'transaction_date': tx.transaction_date.isoformat() if tx.transaction_date else None,
-                        'action': str(tx.action) if tx.action else None,
-                        'symbol': tx.symbol,
-                        'instrument_type': str(tx.instrument_type) if tx.instrument_type else None,
-                        'underlying_symbol': tx.underlying_symbol,
-                        'quantity': float(tx.quantity) if tx.quantity else None,
-                        'price': float(tx.price) if tx.price else None,
-                        'value': float(tx.value) if tx.value else 0,
-                        'regulatory_fees': float(tx.regulatory_fees) if tx.regulatory_fees else 0,
-                        'clearing_fees': float(tx.clearing_fees) if tx.clearing_fees else 0,
-                        'commission': float(tx.commission) if tx.commission else 0,
-                        'net_value': float(tx.net_value) if tx.net_value else 0,
-                        'order_id': tx.order_id,
-                        'is_estimated_fee': tx.is_estimated_fee,
-                    }
-                    all_transactions.append(tx_dict)
+            # Convert to list of dicts
+            tx_dicts = _transactions_to_dicts(transactions, account.account_number)
+            skipped_futures = len(transactions) - len(tx_dicts)
 
-                logger.info(f"Retrieved {len(transactions)} transactions from account {account.account_number}"
-                            + (f" (skipped {skipped_futures} futures)" if skipped_futures else ""))
+            logger.info(f"Retrieved {len(transactions)} transactions from account {account.account_number}"
+                        + (f" (skipped {skipped_futures} futures)" if skipped_futures else ""))
+            return tx_dicts
 
-            except Exception as e:
-                logger.error(f"Failed to get transactions from account {account.account_number}: {str(e)}")
-                continue
+        for _, tx_dicts in await self._for_each_account('transactions', accounts_to_process, fetch):
+            all_transactions.extend(tx_dicts)
 
         logger.info(f"Retrieved {len(all_transactions)} total transactions from {len(accounts_to_process)} accounts")
         return all_transactions
 
+    async def iter_transaction_pages(
+        self,
+        account_number: str,
+        start_at: datetime,
+        end_at: datetime = None,
+        per_page: int = 250,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield one account's transaction history a page at a time, oldest first.
+
+        Unlike get_transactions nothing is buffered beyond the current page,
+        and the ascending order means every yielded page is complete up to
+        its newest executed_at (callers checkpoint on that).  Each page
+        request is bounded by ACCOUNT_FETCH_TIMEOUT.
+        """
+        account = next((a for a in self.accounts if a.account_number == account_number), None)
+        if account is None:
+            raise ValueError(f"Account {account_number} not found")
+
+        page_offset = 0
+        while True:
+            page = await asyncio.wait_for(
+                account.get_history(
+                    self.session,
+                    per_page=per_page,
+                    page_offset=page_offset,
+                    sort='Asc',
+                    start_at=start_at,
+                    end_at=end_at,
+                ),
+                ACCOUNT_FETCH_TIMEOUT,
+            )
+            if page:
+                yield _transactions_to_dicts(page, account_number)
+            if len(page) < per_page:
+                return
+            page_offset += 1
+
     async def get_positions(self, account_number: str = None) -> Dict[str, List[Dict[str, Any]]]:
         """Get current positions from all accounts or specific account"""
         if not self.accounts:
@@ -198,121 +296,118 @@ class TastytradeClient:
             # Process all accounts
             accounts_to_process = self.accounts
 
-        all_positions = {}
-
-        for account in accounts_to_process:
-            try:
-                # Get positions with marks for current values
-                positions = await account.get_positions(self.session, include_marks=True)
-
-                position_list = []
-                skipped_futures = 0
-                for pos in positions:
-                    # Skip unsupported instrument types (futures, futures options)
-                    inst_type = str(pos.instrument_type) if pos.instrument_type else ''
-                    if inst_type in _UNSUPPORTED_INSTRUMENT_TYPES:
-                        skipped_futures += 1
-                        continue
-
-                    # Calculate market value
-                    quantity = float(pos.quantity) if pos.quantity else 0
-                    close_price = float(pos.close_price) if pos.close_price else 0
-
-                    # For options, multiplier is typically 100, for stocks it's 1
-                    # But Tastytrade API might already include the multiplier in the price
-                    multiplier = float(pos.multiplier) if pos.multiplier else 100 if pos.instrument_type and 'option' in str(pos.instrument_type).lower() else 1
-
-                    # Get mark value - pos.mark is the total position value, pos.mark_price is per-share
-                    mark_value = float(pos.mark) if hasattr(pos, 'mark') and pos.mark else 0
-                    mark_price_per_share = float(pos.mark_price) if hasattr(pos, 'mark_price') and pos.mark_price else 0
-
-                    # Get average open price (cost basis per unit)
-                    average_open_price = float(pos.average_open_price) if pos.average_open_price else 0
-
-                    # Tastytrade API returns prices in cents for options, so no additional multiplier needed
-                    # Check if this is a short position
-                    is_short = (quantity < 0) or (pos.quantity_direction == 'Short')
-
-                    if pos.instrument_type and 'option' in str(pos.instrument_type).lower():
-                        # Option cost basis = abs(quantity) * average_open_price * 100
-                        # Sign matters: negative for long (cost), positive for short (credit)
-                        cost_basis_abs = abs(quantity) * average_open_price * 100
-                        cost_basis = -cost_basis_abs if not is_short else cost_basis_abs
-
-                        if is_short:
-                            # For short positions: use negative of the total mark value
-                            market_value = -abs(mark_value)
-                        else:
-                            # For long positions: use the total mark value directly
-                            market_value = mark_value
+        async def fetch(account):
+            # Get positions with marks for current values
+            positions = await account.get_positions(self.session, include_marks=True)
+
+            position_list = []
+            skipped_futures = 0
+            for pos in positions:
+                # Skip unsupported instrument types (futures, futures options)
+                inst_type = str(pos.instrument_type) if pos.instrument_type else ''
+                if inst_type in _UNSUPPORTED_INSTRUMENT_TYPES:
+                    skipped_futures += 1
+                    continue
+
+                # Calculate market value
+                quantity = float(pos.quantity) if pos.quantity else 0
+                close_price = float(pos.close_price) if pos.close_price else 0
+
+                # For options, multiplier is typically 100, for stocks it's 1
+                # But Tastytrade API might already include the multiplier in the price
+                multiplier = float(pos.multiplier) if pos.multiplier else 100 if pos.instrument_type and 'option' in str(pos.instrument_type).lower() else 1
+
+                # Get mark value - pos.mark is the total position value, pos.mark_price is per-share
+                mark_value = float(pos.mark) if hasattr(pos, 'mark') and pos.mark else 0
+                mark_price_per_share = float(pos.mark_price) if hasattr(pos, 'mark_price') and pos.mark_price else 0
+
+                # Get average open price (cost basis per unit)
+                average_open_price = float(pos.average_open_price) if pos.average_open_price else 0
+
+                # Tastytrade API returns prices in cents for options, so no additional multiplier needed
+                # Check if this is a short position
+                is_short = (quantity < 0) or (pos.quantity_direction == 'Short')
+
+                if pos.instrument_type and 'option' in str(pos.instrument_type).lower():
+                    # Option cost basis = abs(quantity) * average_open_price * 100
+                    # Sign matters: negative for long (cost), positive for short (credit)
+                    cost_basis_abs = abs(quantity) * average_open_price * 100
+                    cost_basis = -cost_basis_abs if not is_short else cost_basis_abs
+
+                    if is_short:
+                        # For short positions: use negative of the total mark value
+                        market_value = -abs(mark_value)
                     else:
-                        # Stock cost basis = abs(quantity) * average_open_price
-                        # Sign matters: negative for long (cost), positive for short (credit)
-                        cost_basis_abs = abs(quantity) * average_open_price
-                        cost_basis = -cost_basis_abs if not is_short else cost_basis_abs
-
-                        if is_short:
-                            # For short positions: market value is negative
-                            market_value = -abs(mark_value)
-                        else:
-                            # For long positions: market value is positive
-                            market_value = mark_value
-
-                    # Calculate unrealized P&L
-                    unrealized_pnl = market_value - cost_basis
-
-                    # Calculate P&L percentage
-                    pnl_percent = (unrealized_pnl / abs(cost_basis) * 100) if cost_basis != 0 else 0
-
-                    # Extract option-specific fields if available
-                    strike_price = None
-                    option_type = None
-
-                    if pos.instrument_type and 'option' in str(pos.instrument_type).lower():
-                        # Try to get strike price from various possible fields
-                        if hasattr(pos, 'strike_price'):
-                            strike_price = float(pos.strike_price)
-                        elif hasattr(pos, 'strike'):
-                            strike_price = float(pos.strike)
-
-                        # Try to get option type from various possible fields
-                        if hasattr(pos, 'option_type'):
-                            option_type = str(pos.option_type)
-                        elif hasattr(pos, 'right'):
-                            option_type = 'C' if str(pos.right).upper() in ['CALL', 'C'] else 'P'
-                        elif hasattr(pos, 'call_or_put'):
-                            option_type = 'C' if str(pos.call_or_put).upper() in ['CALL', 'C'] else 'P'
-
-                    position_list.append({
-                        'symbol': pos.symbol,
-                        'instrument_type': str(pos.instrument_type) if pos.instrument_type else None,
-                        'underlying_symbol': pos.underlying_symbol,
-                        'quantity': quantity,
-                        'quantity_direction': pos.quantity_direction,
-                        'close_price': close_price,
-                        'mark_price': mark_price_per_share * 100,  # Convert to cents for consistency
-                        'mark_value_total': mark_value,  # Total position mark value
-                        'average_open_price': average_open_price,
-                        'market_value': market_value,
-                        'cost_basis': cost_basis,
-                        'realized_day_gain': float(pos.realized_day_gain) if pos.realized_day_gain else 0,
-                        'realized_today': float(pos.realized_today) if pos.realized_today else 0,
-                        'unrealized_pnl': unrealized_pnl,
-                        'pnl_percent': pnl_percent,
-                        'multiplier': multiplier,
-                        'expires_at': pos.expires_at.isoformat() if pos.expires_at else None,
-                        'strike_price': strike_price,
-                        'option_type': option_type,
-                    })
-
-                all_positions[account.account_number] = position_list
-                logger.info(f"Retrieved {len(position_list)} positions from account {account.account_number}"
-                            + (f" (skipped {skipped_futures} futures)" if skipped_futures else ""))
-
-            except Exception as e:
-                logger.error(f"Failed to get positions from account {account.account_number}: {str(e)}")
-                all_positions[account.account_number] = []
-                continue
+                        # For long positions: use the total mark value directly
+                        market_value = mark_value
+                else:
+                    # Stock cost basis = abs(quantity) * average_open_price
+                    # Sign matters: negative for long (cost), positive for short (credit)
+                    cost_basis_abs = abs(quantity) * average_open_price
+                    cost_basis = -cost_basis_abs if not is_short else cost_basis_abs
+
+                    if is_short:
+                        # For short positions: market value is negative
+                        market_value = -abs(mark_value)
+                    else:
+                        # For long positions: market value is positive
+                        market_value = mark_value
+
+                # Calculate unrealized P&L
+                unrealized_pnl = market_value - cost_basis
+
+                # Calculate P&L percentage
+                pnl_percent = (unrealized_pnl / abs(cost_basis) * 100) if cost_basis != 0 else 0
+
+                # Extract option-specific fields if available
+                strike_price = None
+                option_type = None
+
+                if pos.instrument_type and 'option' in str(pos.instrument_type).lower():
+                    # Try to get strike price from various possible fields
+                    if hasattr(pos, 'strike_price'):
+                        strike_price = float(pos.strike_price)
+                    elif hasattr(pos, 'strike'):
+                        strike_price = float(pos.strike)
+
+                    # Try to get option type from various possible fields
+                    if hasattr(pos, 'option_type'):
+                        option_type = str(pos.option_type)
+                    elif hasattr(pos, 'right'):
+                        option_type = 'C' if str(pos.right).upper() in ['CALL', 'C'] else 'P'
+                    elif hasattr(pos, 'call_or_put'):
+                        option_type = 'C' if str(pos.call_or_put).upper() in ['CALL', 'C'] else 'P'
+
+                position_list.append({
+                    'symbol': pos.symbol,
+                    'instrument_type': str(pos.instrument_type) if pos.instrument_type else None,
+                    'underlying_symbol': pos.underlying_symbol,
+                    'quantity': quantity,
+                    'quantity_direction': pos.quantity_direction,
+                    'close_price': close_price,
+                    'mark_price': mark_price_per_share * 100,  # Convert to cents for consistency
+                    'mark_value_total': mark_value,  # Total position mark value
+                    'average_open_price': average_open_price,
+                    'market_value': market_value,
+                    'cost_basis': cost_basis,
+                    'realized_day_gain': float(pos.realized_day_gain) if pos.realized_day_gain else 0,
+                    'realized_today': float(pos.realized_today) if pos.realized_today else 0,
+                    'unrealized_pnl': unrealized_pnl,
+                    'pnl_percent': pnl_percent,
+                    'multiplier': multiplier,
+                    'expires_at': pos.expires_at.isoformat() if pos.expires_at else None,
+                    'strike_price': strike_price,
+                    'option_type': option_type,
+                })
+
+            logger.info(f"Retrieved {len(position_list)} positions from account {account.account_number}"
+                        + (f" (skipped {skipped_futures} futures)" if skipped_futures else ""))
+            return position_list
+
+        # Failed accounts keep an empty list
+        all_positions = {account.account_number: [] for account in accounts_to_process}
+        for account, position_list in await self._for_each_account('positions', accounts_to_process, fetch):
+            all_positions[account.account_number] = position_list
 
         return all_positions
 
@@ -401,47 +496,32 @@ class TastytradeClient:
                 logger.debug(f"Skipping futures symbol in quote classification: {symbol}")
                 continue
 
-            # Option symbols have double spaces and end with C/P followed by strike
-            # Format: "MSTR  250613C00400000" (underlying + double space + YYMMDDC/P + strike)
-            if len(symbol) > 10 and '  ' in symbol:
-                # Check if it looks like an option symbol
-                parts = symbol.split('  ')
-                if len(parts) == 2 and len(parts[1]) >= 9:
-                    # Check for C or P in the expected position (7th character after space)
-                    option_part = parts[1]
-                    if len(option_part) >= 7 and option_part[6] in ['C', 'P']:
-                        options.append(symbol)
-                        continue
+            if is_option_symbol(symbol):
+                options.append(symbol)
+                continue
 
             # Default to equity
             equities.append(symbol)
 
         return {'equities': equities, 'options': options}
 
-    async def get_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
-        """Get current market quotes using Tastytrade market data API - NO MOCK DATA"""
+    async def get_quotes(self, symbols: List[str], force_refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Get current market quotes using Tastytrade market data API - NO MOCK DATA
+
+        Quotes fetched within the last QUOTE_FRESH_SECONDS by any client are
+        served from the shared quote cache unless force_refresh is set.
+        """
         if not self.session:
             logger.error("Not authenticated")
             raise Exception("Not authenticated with Tastytrade")
 
-        import time
         from tastytrade.market_data import get_market_data_by_type
 
-        quotes = {}
-        current_time = time.time()
-
         # Check cache first
-        cached_symbols = []
-        missing_symbols = []
-
-        for symbol in symbols:
-            if (symbol in self._quote_cache and
-                symbol in self._quote_cache_time and
-                current_time - self._quote_cache_time[symbol] < self._quote_cache_duration):
-                quotes[symbol] = self._quote_cache[symbol]
-                cached_symbols.append(symbol)
-            else:
-                missing_symbols.append(symbol)
+        quotes = {} if force_refresh else await self._quote_cache.get_async(symbols, self._quote_cache_duration)
+        cached_symbols = list(quotes)
+        missing_symbols = [s for s in symbols if s not in quotes]
+        fetched = {}
 
         if cached_symbols:
             logger.info(f"Using {len(cached_symbols)} cached quotes, {len(missing_symbols)} to fetch")
@@ -559,9 +639,7 @@ class TastytradeClient:
                     if iv_percentile is not None:
                         quote_data['iv_percentile'] = iv_percentile
 
-                    # Update cache
-                    self._quote_cache[symbol] = quote_data
-                    self._quote_cache_time[symbol] = current_time
+                    fetched[symbol] = quote_data
                     quotes[symbol] = quote_data
 
                     logger.debug(f"Market data for {symbol}: price=${current_price:.2f}, change={change:+.2f} ({change_percent:+.2f}%), IVR={ivr}, IV={iv}")
@@ -582,12 +660,21 @@ class TastytradeClient:
                 logger.error(f"Failed to get market data: {str(e)}")
                 # Fall back to streaming quotes if market data API fails
                 logger.info("Falling back to streaming quotes...")
-                streaming_quotes = await self._async_fetch_quotes(missing_symbols)
+                # The live hub writes its own events through to the cache, so
+                # quotes it serves are returned but not re-stamped as fetched
+                streamed = self._stream_hub.latest(missing_symbols) if self._stream_hub is not None else {}
+                if len(streamed) == len(missing_symbols):
+                    logger.info(f"Using {len(streamed)} quotes from the live stream hub")
+                    quotes.update(streamed)
+                else:
+                    streaming_quotes = await self._async_fetch_quotes(missing_symbols)
 
-                for symbol, quote_data in streaming_quotes.items():
-                    self._quote_cache[symbol] = quote_data
-                    self._quote_cache_time[symbol] = current_time
-                    quotes[symbol] = quote_data
+                    for symbol, quote_data in streaming_quotes.items():
+                        fetched[symbol] = quote_data
+                        quotes[symbol] = quote_data
+
+            # Update cache (after metrics are merged in) and notify subscribers
+            await self._quote_cache.put_async(fetched)
 
         # Return only successfully retrieved quotes (real data only)
         logger.info(f"Returning {len(quotes)} quotes for {len(symbols)} requested symbols")
@@ -850,44 +937,42 @@ class TastytradeClient:
             logger.error("Not authenticated")
             return []
 
-        all_balances = []
-        for account in self.accounts:
-            try:
-                balance = await account.get_balances(self.session)
-
-                logger.info(f"Balance for {account.account_number}:")
-                logger.info(f"  net_liquidating_value: {balance.net_liquidating_value}")
-                logger.info(f"  margin_equity: {balance.margin_equity}")
-                logger.info(f"  cash_balance: {balance.cash_balance}")
-                logger.info(f"  cash_available_to_withdraw: {balance.cash_available_to_withdraw}")
-                logger.info(f"  available_trading_funds: {balance.available_trading_funds}")
-                logger.info(f"  long_equity_value: {balance.long_equity_value}")
-                logger.info(f"  short_equity_value: {balance.short_equity_value}")
-                logger.info(f"  long_derivative_value: {balance.long_derivative_value}")
-                logger.info(f"  short_derivative_value: {balance.short_derivative_value}")
-                logger.info(f"  pending_cash: {balance.pending_cash}")
-
-                account_balance = {
-                    'account_number': account.account_number,
-                    'cash_balance': float(balance.cash_balance) if balance.cash_balance else 0,
-                    'net_liquidating_value': float(balance.net_liquidating_value) if balance.net_liquidating_value else 0,
-                    'equity_buying_power': float(balance.equity_buying_power) if balance.equity_buying_power else 0,
-                    'derivative_buying_power': float(balance.derivative_buying_power) if balance.derivative_buying_power else 0,
-                    'day_trading_buying_power': float(balance.day_trading_buying_power) if balance.day_trading_buying_power else 0,
-                    'cash_available_to_withdraw': float(balance.cash_available_to_withdraw) if balance.cash_available_to_withdraw else 0,
-                    'maintenance_requirement': float(balance.maintenance_requirement) if balance.maintenance_requirement else 0,
-                    'pending_cash': float(balance.pending_cash) if balance.pending_cash else 0,
-                    'long_equity_value': float(balance.long_equity_value) if balance.long_equity_value else 0,
-                    'short_equity_value': float(balance.short_equity_value) if balance.short_equity_value else 0,
-                    'margin_equity': float(balance.margin_equity) if balance.margin_equity else 0,
-                    'updated_at': datetime.now().isoformat(),
-                }
-
-                all_balances.append(account_balance)
-                logger.info(f"Fetched balance for account {account.account_number}")
-
-            except Exception as e:
-                logger.error(f"Failed to get balance for account {account.account_number}: {str(e)}")
-                continue
+        async def fetch(account):
+            balance = await account.get_balances(self.session)
+
+            logger.info(f"Balance for {account.account_number}:")
+            logger.info(f"  net_liquidating_value: {balance.net_liquidating_value}")
+            logger.info(f"  margin_equity: {balance.margin_equity}")
+            logger.info(f"  cash_balance: {balance.cash_balance}")
+            logger.info(f"  cash_available_to_withdraw: {balance.cash_available_to_withdraw}")
+            logger.info(f"  available_trading_funds: {balance.available_trading_funds}")
+            logger.info(f"  long_equity_value: {balance.long_equity_value}")
+            logger.info(f"  short_equity_value: {balance.short_equity_value}")
+            logger.info(f"  long_derivative_value: {balance.long_derivative_value}")
+            logger.info(f"  short_derivative_value: {balance.short_derivative_value}")
+            logger.info(f"  pending_cash: {balance.pending_cash}")
+
+            account_balance = {
+                'account_number': account.account_number,
+                'cash_balance': float(balance.cash_balance) if balance.cash_balance else 0,
+                'net_liquidating_value': float(balance.net_liquidating_value) if balance.net_liquidating_value else 0,
+                'equity_buying_power': float(balance.equity_buying_power) if balance.equity_buying_power else 0,
+                'derivative_buying_power': float(balance.derivative_buying_power) if balance.derivative_buying_power else 0,
+                'day_trading_buying_power': float(balance.day_trading_buying_power) if balance.day_trading_buying_power else 0,
+                'cash_available_to_withdraw': float(balance.cash_available_to_withdraw) if balance.cash_available_to_withdraw else 0,
+                'maintenance_requirement': float(balance.maintenance_requirement) if balance.maintenance_requirement else 0,
+                'pending_cash': float(balance.pending_cash) if balance.pending_cash else 0,
+                'long_equity_value': float(balance.long_equity_value) if balance.long_equity_value else 0,
+                'short_equity_value': float(balance.short_equity_value) if balance.short_equity_value else 0,
+                'margin_equity': float(balance.margin_equity) if balance.margin_equity else 0,
+                'updated_at': datetime.now().isoformat(),
+            }
+
+            logger.info(f"Fetched balance for account {account.account_number}")
+            return account_balance
+
+        all_balances = [
+            balance for _, balance in await self._for_each_account('balances', self.accounts, fetch)
+        ]
 
         return all_balances
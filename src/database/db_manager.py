@@ -3,14 +3,18 @@ Database Manager for Trade Journal
 Handles all database operations via SQLAlchemy ORM.
 """
 
+from collections import namedtuple
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+from contextlib import nullcontext
+from typing import List, Dict, Any, Iterator, Optional, Set, Tuple
 from pathlib import Path
 import json
 import time
 import logging
 
 from src.database import engine as sa_engine
+from src.database.models import RawTransaction
+from src.utils.enum_strings import normalize_enum
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +23,88 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 
+# SQLite's limit on bind parameters in one statement
+SQLITE_MAX_VARIABLES = 32766
+
+# Rows per multi-row INSERT in save_raw_transactions: at most one bind
+# param per raw_transactions column, so a chunk stays under the limit
+RAW_TXN_CHUNK_SIZE = SQLITE_MAX_VARIABLES // len(RawTransaction.__table__.columns)
+
+# Rows per round trip when streaming raw_transactions to the pipeline
+RAW_TXN_FETCH_SIZE = 2000
+
+# raw_transactions columns the pipeline reads (all but row_id, user_id, created_at)
+RAW_TXN_FIELDS = (
+    'id', 'account_number', 'order_id', 'transaction_type', 'transaction_sub_type',
+    'description', 'executed_at', 'transaction_date', 'action', 'symbol',
+    'instrument_type', 'underlying_symbol', 'quantity', 'price', 'value',
+    'regulatory_fees', 'clearing_fees', 'commission', 'net_value', 'is_estimated_fee',
+)
+_RAW_TXN_INDEX = {name: i for i, name in enumerate(RAW_TXN_FIELDS)}
+
+
+class RawTransactionRow(namedtuple('RawTransactionRow', RAW_TXN_FIELDS)):
+    """A raw transaction as a plain tuple, readable like its to_dict() dict.
+
+    The pipeline only reads transactions (``tx.get(...)``, ``tx[...]``), so
+    rows from iter_raw_transactions stand in for dicts at a fraction of the
+    memory and pickle cheaply to pipeline worker processes.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                key = _RAW_TXN_INDEX[key]
+            except KeyError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def __contains__(self, key) -> bool:
+        return key in _RAW_TXN_INDEX
+
+    def get(self, key: str, default=None):
+        i = _RAW_TXN_INDEX.get(key)
+        return default if i is None else tuple.__getitem__(self, i)
+
+    def keys(self):
+        return RAW_TXN_FIELDS
+
+
+_EXPECTED_ACTIONS = {'BUY_TO_OPEN', 'SELL_TO_OPEN', 'BUY_TO_CLOSE', 'SELL_TO_CLOSE', ''}
+
+
+def _normalize_raw_transactions(transactions: List[Dict], user_id: str) -> List[Dict]:
+    """Build raw_transactions insert rows, de-duplicated by id.
+
+    transaction_type/sub_type are normalized too (OPT-265: TT SDK returns
+    Title Case with spaces; downstream consumers expect uppercase
+    underscore form for dispatch matching).
+    """
+    rows: Dict[Any, Dict] = {}
+    for txn in transactions:
+        action = normalize_enum(str(txn.get('action') or ''))
+        if action not in _EXPECTED_ACTIONS:
+            logger.warning(f"Unexpected action format after normalization: '{action}' (original: '{txn.get('action')}') for txn {txn.get('id')}")
+        rows.setdefault(txn.get('id'), {
+            'id': txn.get('id'), 'account_number': txn.get('account_number'),
+            'order_id': txn.get('order_id'),
+            'transaction_type': normalize_enum(str(txn.get('transaction_type') or '')),
+            'transaction_sub_type': normalize_enum(str(txn.get('transaction_sub_type') or '')),
+            'description': txn.get('description'), 'executed_at': txn.get('executed_at'),
+            'transaction_date': txn.get('transaction_date'), 'action': action,
+            'symbol': txn.get('symbol'),
+            'instrument_type': normalize_enum(str(txn.get('instrument_type') or '')),
+            'underlying_symbol': txn.get('underlying_symbol'),
+            'quantity': txn.get('quantity'), 'price': txn.get('price'),
+            'value': txn.get('value'), 'regulatory_fees': txn.get('regulatory_fees'),
+            'clearing_fees': txn.get('clearing_fees'), 'commission': txn.get('commission'),
+            'net_value': txn.get('net_value'), 'is_estimated_fee': txn.get('is_estimated_fee'),
+            'user_id': user_id,
+        })
+    return list(rows.values())
+
+
 class DatabaseManager:
     def __init__(self, db_url: str = None):
         self.db_url = db_url  # None → engine.py reads DATABASE_URL or defaults to SQLite
@@ -147,11 +233,14 @@ class DatabaseManager:
     def save_raw_transactions(self, transactions: List[Dict]) -> tuple[int, set[str]]:
         """Save raw transactions to database for order-based grouping.
 
+        Rows go in as multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING
+        statements of RAW_TXN_CHUNK_SIZE rows each.  A chunk that fails is
+        bisected inside savepoints, so a bad row is skipped (and logged)
+        without the rest of its chunk going row by row.
+
         Returns (saved_count, new_symbols) where new_symbols is the set of
         underlying symbols from transactions that were actually inserted.
         """
-        from src.database.engine import dialect_insert
-        from src.database.models import RawTransaction
         from src.database.tenant import DEFAULT_USER_ID
         self.ensure_initialized()
         saved_count = 0
@@ -159,82 +248,142 @@ class DatabaseManager:
 
         with self.get_session() as session:
             user_id = session.info.get("user_id", DEFAULT_USER_ID)
-            for txn in transactions:
-                try:
-                    # Normalize action to uppercase underscore format
-                    # Handles TT SDK variants: "OrderAction.SELL_TO_OPEN", "Sell to Open", "SELL_TO_OPEN"
-                    raw_action = txn.get('action') or ''
-                    if raw_action.startswith('OrderAction.'):
-                        raw_action = raw_action[len('OrderAction.'):]
-                    raw_action = raw_action.upper().replace(' ', '_')
-
-                    _EXPECTED_ACTIONS = {'BUY_TO_OPEN', 'SELL_TO_OPEN', 'BUY_TO_CLOSE', 'SELL_TO_CLOSE', ''}
-                    if raw_action and raw_action not in _EXPECTED_ACTIONS:
-                        logger.warning(f"Unexpected action format after normalization: '{raw_action}' (original: '{txn.get('action')}') for txn {txn.get('id')}")
-
-                    # Normalize instrument_type to uppercase underscore format
-                    # Handles TT SDK variants: "Equity", "Equity Option", "EQUITY", "EQUITY_OPTION"
-                    raw_instrument_type = str(txn.get('instrument_type') or '').upper().replace(' ', '_')
-
-                    # Normalize transaction_type and transaction_sub_type the same way
-                    # (OPT-265: TT SDK returns Title Case with spaces; downstream consumers
-                    # expect uppercase underscore form for dispatch matching)
-                    raw_txn_type = str(txn.get('transaction_type') or '').upper().replace(' ', '_')
-                    raw_sub_type = str(txn.get('transaction_sub_type') or '').upper().replace(' ', '_')
-
-                    stmt = dialect_insert(RawTransaction).values(
-                        id=txn.get('id'), account_number=txn.get('account_number'),
-                        order_id=txn.get('order_id'), transaction_type=raw_txn_type,
-                        transaction_sub_type=raw_sub_type,
-                        description=txn.get('description'), executed_at=txn.get('executed_at'),
-                        transaction_date=txn.get('transaction_date'), action=raw_action,
-                        symbol=txn.get('symbol'), instrument_type=raw_instrument_type,
-                        underlying_symbol=txn.get('underlying_symbol'),
-                        quantity=txn.get('quantity'), price=txn.get('price'),
-                        value=txn.get('value'), regulatory_fees=txn.get('regulatory_fees'),
-                        clearing_fees=txn.get('clearing_fees'), commission=txn.get('commission'),
-                        net_value=txn.get('net_value'), is_estimated_fee=txn.get('is_estimated_fee'),
-                        user_id=user_id,
-                    )
-                    # Skip duplicates (on conflict do nothing)
-                    result = session.execute(stmt.on_conflict_do_nothing(index_elements=['id', 'user_id']))
-                    if result.rowcount > 0:
-                        saved_count += 1
-                        underlying = txn.get('underlying_symbol', '')
-                        if underlying:
-                            underlying = underlying.split()[0] if ' ' in underlying else underlying
-                            new_symbols.add(underlying)
-                except Exception as e:
-                    logger.error(f"Failed to save transaction {txn.get('id')}: {e}")
-                    continue
+            rows = _normalize_raw_transactions(transactions, user_id)
+            for i in range(0, len(rows), RAW_TXN_CHUNK_SIZE):
+                for _, underlying in self._upsert_raw_chunk(session, rows[i:i + RAW_TXN_CHUNK_SIZE]):
+                    saved_count += 1
+                    if underlying:
+                        new_symbols.add(underlying.split()[0])
 
             logger.info(f"Saved {saved_count} raw transactions to database")
 
         return saved_count, new_symbols
-    
+
+    def _upsert_raw_chunk(self, session, rows: List[Dict]) -> List[Tuple[str, Optional[str]]]:
+        """Insert one chunk, returning (id, underlying_symbol) of the new rows."""
+        from src.database.engine import dialect_insert
+        from src.database.models import fill_derived_days
+
+        if not rows:
+            return []
+        # Multi-row VALUES can't evaluate per-row column defaults
+        rows = fill_derived_days(RawTransaction.__table__, rows)
+        stmt = (
+            dialect_insert(RawTransaction).values(rows)
+            # Skip duplicates (on conflict do nothing)
+            .on_conflict_do_nothing(index_elements=['id', 'user_id'])
+            .returning(RawTransaction.id, RawTransaction.underlying_symbol)
+        )
+        # A failed statement aborts the whole PostgreSQL transaction, so each
+        # chunk gets a savepoint there; SQLite only rolls back the statement
+        nested = session.begin_nested() if sa_engine.get_dialect() == "postgresql" else nullcontext()
+        try:
+            with nested:
+                return [tuple(r) for r in session.execute(stmt).all()]
+        except Exception as e:
+            if len(rows) == 1:
+                logger.error(f"Failed to save transaction {rows[0]['id']}: {e}")
+                return []
+            mid = len(rows) // 2
+            return self._upsert_raw_chunk(session, rows[:mid]) + self._upsert_raw_chunk(session, rows[mid:])
+
+    @staticmethod
+    def _raw_transaction_filters(
+        account_number: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        underlying: Optional[str] = None,
+        underlyings: Optional[Set[str]] = None,
+        accounts: Optional[Set[str]] = None,
+    ) -> list:
+        from sqlalchemy import or_
+        from src.database.models import iso_day
+
+        filters = []
+        if account_number:
+            filters.append(RawTransaction.account_number == account_number)
+        if accounts:
+            filters.append(RawTransaction.account_number.in_(sorted(accounts)))
+        # Whole days, inclusive at both ends
+        if start_date:
+            filters.append(RawTransaction.executed_day >= iso_day(start_date))
+        if end_date:
+            filters.append(RawTransaction.executed_day <= iso_day(end_date))
+        if underlying:
+            filters.append(RawTransaction.underlying_symbol == underlying)
+        if underlyings:
+            names = sorted(underlyings)
+            filters.append(or_(
+                RawTransaction.underlying_symbol.in_(names),
+                RawTransaction.symbol.in_(names),
+                *(RawTransaction.symbol.like(f"{name} %") for name in names),
+            ))
+        return filters
+
     def get_raw_transactions(
         self,
         account_number: Optional[str] = None,
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
-        underlying: Optional[str] = None
+        underlying: Optional[str] = None,
+        underlyings: Optional[Set[str]] = None,
     ) -> List[Dict]:
-        """Get raw transactions with optional filters"""
-        from src.database.models import RawTransaction
+        """Get raw transactions with optional filters.
+
+        ``underlyings`` keeps every row that can belong to one of those
+        underlyings: by underlying_symbol, by equity symbol, or by option
+        root (symbol-change open legs carry the old underlying_symbol).
+        Callers narrow the result to exact partitions afterwards.
+        """
 
         with self.get_session() as session:
-            q = session.query(RawTransaction)
-            if account_number:
-                q = q.filter(RawTransaction.account_number == account_number)
-            if start_date:
-                q = q.filter(RawTransaction.executed_at >= start_date)
-            if end_date:
-                q = q.filter(RawTransaction.executed_at <= end_date)
-            if underlying:
-                q = q.filter(RawTransaction.underlying_symbol == underlying)
+            q = session.query(RawTransaction).filter(*self._raw_transaction_filters(
+                account_number, start_date, end_date, underlying, underlyings,
+            ))
             q = q.order_by(RawTransaction.executed_at.desc())
             return [row.to_dict() for row in q.all()]
-    
+
+    def iter_raw_transactions(
+        self,
+        account_number: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        underlyings: Optional[Set[str]] = None,
+        partitions: Optional[Set[Tuple[str, str]]] = None,
+    ) -> Iterator[RawTransactionRow]:
+        """Stream raw transactions as RawTransactionRow tuples, newest first.
+
+        The pipeline's source: only RAW_TXN_FIELDS are selected, no ORM
+        objects are built, and rows arrive RAW_TXN_FETCH_SIZE at a time
+        from a server-side cursor.  ``partitions`` pushes the account and
+        underlying filters into SQL and then keeps exactly the rows that
+        belong to those (account_number, underlying) pairs.
+        """
+        from sqlalchemy import select
+        from src.pipeline.partitions import partition_of
+
+        accounts = None
+        if partitions is not None:
+            if not partitions:
+                return
+            accounts = {account for account, _ in partitions}
+            underlyings = (underlyings or set()) | {underlying for _, underlying in partitions}
+
+        stmt = (
+            select(*(getattr(RawTransaction, name) for name in RAW_TXN_FIELDS))
+            .where(*self._raw_transaction_filters(
+                account_number, start_date, end_date,
+                underlyings=underlyings, accounts=accounts,
+            ))
+            .order_by(RawTransaction.executed_at.desc())
+            .execution_options(yield_per=RAW_TXN_FETCH_SIZE)
+        )
+        with self.get_session() as session:
+            for row in session.execute(stmt):
+                row = RawTransactionRow._make(row)
+                if partitions is None or partition_of(row) in partitions:
+                    yield row
+
     def get_open_positions(self) -> List[Dict[str, Any]]:
         """Get current open positions"""
         from src.database.models import Position as PositionModel
@@ -333,6 +482,17 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Error setting sync metadata: {str(e)}")
             return False
+
+    def delete_sync_metadata(self, key: str) -> bool:
+        """Delete a sync metadata value"""
+        from src.database.models import SyncMetadata
+        try:
+            with self.get_session() as session:
+                session.query(SyncMetadata).filter(SyncMetadata.key == key).delete()
+                return True
+        except Exception as e:
+            logger.error(f"Error deleting sync metadata: {str(e)}")
+            return False
     
     def get_last_sync_timestamp(self) -> Optional[datetime]:
         """Get the last sync timestamp"""
@@ -372,34 +532,17 @@ class DatabaseManager:
             return False
     
     def cache_quote(self, symbol: str, quote_data: Dict[str, Any]) -> bool:
-        """Cache a quote in the database"""
-        from src.database.engine import dialect_insert
-        from src.database.models import QuoteCache
-        try:
-            with self.get_session() as session:
-                vals = dict(
-                    symbol=symbol, mark=quote_data.get('mark'),
-                    bid=quote_data.get('bid'), ask=quote_data.get('ask'),
-                    last=quote_data.get('last'), change=quote_data.get('change'),
-                    change_percent=quote_data.get('change_percent'),
-                    volume=quote_data.get('volume'), prev_close=quote_data.get('prev_close'),
-                    day_high=quote_data.get('day_high'), day_low=quote_data.get('day_low'),
-                    iv=quote_data.get('iv'), ivr=quote_data.get('ivr'),
-                    iv_percentile=quote_data.get('iv_percentile'),
-                    updated_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                )
-                stmt = dialect_insert(QuoteCache).values(**vals)
-                update_vals = {k: v for k, v in vals.items() if k != 'symbol'}
-                session.execute(stmt.on_conflict_do_update(
-                    index_elements=['symbol'], set_=update_vals,
-                ))
-                return True
-        except Exception as e:
-            logger.error(f"Error caching quote for {symbol}: {str(e)}")
-            return False
+        """Cache a quote in the shared quote cache"""
+        from src.utils.quote_cache import get_quote_cache
+        get_quote_cache().put({symbol: quote_data})
+        return True
     
     def get_cached_quotes(self, symbols: List[str] = None, max_age_seconds: int = 300) -> Dict[str, Dict[str, Any]]:
-        """Get cached quotes from database, filtering out stale entries.
+        """Get cached quotes, filtering out stale entries.
+
+        Reads the shared quote cache first. The quote_cache table is no
+        longer written on the live path; it is only consulted for symbols
+        the shared cache doesn't have (e.g. seeded design data).
 
         Args:
             symbols: List of symbols to fetch. None for all.
@@ -407,21 +550,24 @@ class DatabaseManager:
                 considered stale. Defaults to 300 (5 minutes).
         """
         from src.database.models import QuoteCache
+        from src.utils.quote_cache import get_quote_cache
+        quotes = get_quote_cache().get(symbols, max_age_seconds)
+        if symbols and all(sym in quotes for sym in symbols):
+            return quotes
         try:
             cutoff = (datetime.now() - timedelta(seconds=max_age_seconds)).strftime('%Y-%m-%d %H:%M:%S')
             with self.get_session() as session:
                 q = session.query(QuoteCache).filter(QuoteCache.updated_at >= cutoff)
                 if symbols:
-                    q = q.filter(QuoteCache.symbol.in_(symbols))
-                quotes = {}
+                    q = q.filter(QuoteCache.symbol.in_([s for s in symbols if s not in quotes]))
                 for row in q.all():
                     d = row.to_dict()
                     sym = d.pop('symbol')
-                    quotes[sym] = d
+                    quotes.setdefault(sym, d)
                 return quotes
         except Exception as e:
             logger.error(f"Error getting cached quotes: {str(e)}")
-            return {}
+            return quotes
     
     def get_strategy_targets(self) -> List[Dict[str, Any]]:
         """Get all strategy P&L targets"""
@@ -6,16 +6,17 @@ commits on success and rolls back on exception.  Supports both SQLite and
 PostgreSQL — the dialect is selected at init time based on the URL prefix.
 """
 
+import io
 import logging
 import os
 from contextlib import contextmanager
-from typing import Optional
+from typing import Dict, List, Optional, Sequence
 
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, func, select, text
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, sessionmaker
 
-from src.database.models import Base
+from src.database.models import Base, fill_derived_days
 
 logger = logging.getLogger(__name__)
 
@@ -105,6 +106,107 @@ def dialect_insert(model):
     return _insert_func(model)
 
 
+# Below this many rows a PostgreSQL COPY costs more to set up than a
+# multi-row INSERT; callers can always use bulk_insert() regardless.
+BULK_COPY_THRESHOLD = 500
+
+
+def _sqlite_write_lock(session: Session) -> None:
+    """Hold SQLite's write lock for the rest of the session's transaction.
+
+    pysqlite runs SELECTs outside a transaction and only issues BEGIN before
+    the first write, so a read-then-insert could interleave with another
+    writer.  BEGIN IMMEDIATE takes the lock up front; a transaction pysqlite
+    has already opened has written, and so holds the lock already.
+    """
+    conn = session.connection()
+    if not conn.connection.dbapi_connection.in_transaction:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def reserve_ids(session: Session, model, count: int) -> List[int]:
+    """Reserve ``count`` primary-key values for ``model`` ahead of a bulk insert.
+
+    PostgreSQL draws them from the column's serial sequence, so they never
+    collide with concurrent inserts.  SQLite has no sequences — ids continue
+    from MAX(id), read under the database write lock (see
+    _sqlite_write_lock), so no other writer can insert until the caller's
+    transaction commits.
+
+    Lets callers wire up references between new rows (derived/parent lot
+    ids) before anything is written.
+    """
+    if count <= 0:
+        return []
+    table = model.__table__
+    pk = list(table.primary_key.columns)[0]
+
+    if get_dialect() == "postgresql":
+        return list(session.execute(
+            text("SELECT nextval(pg_get_serial_sequence(:table, :column)) "
+                 "FROM generate_series(1, :n)"),
+            {"table": table.name, "column": pk.name, "n": count},
+        ).scalars())
+
+    _sqlite_write_lock(session)
+    # Core select on the Table — bypasses tenant scoping; ids are global
+    start = session.execute(select(func.coalesce(func.max(pk), 0))).scalar()
+    return list(range(start + 1, start + 1 + count))
+
+
+def _copy_field(value) -> str:
+    if value is None:
+        return ""  # unquoted empty field → NULL
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+
+def _copy_buffer(rows: Sequence[Dict], columns: Sequence[str]) -> io.StringIO:
+    """Encode rows as CSV for COPY FROM STDIN.
+
+    Strings are always quoted so an empty string stays distinct from NULL
+    (an unquoted empty field).
+    """
+    buf = io.StringIO()
+    for row in rows:
+        buf.write(",".join(_copy_field(row.get(c)) for c in columns))
+        buf.write("\n")
+    buf.seek(0)
+    return buf
+
+
+def bulk_insert(session: Session, model, rows: Sequence[Dict]) -> int:
+    """Insert many rows in as few round-trips as the dialect allows.
+
+    PostgreSQL uses COPY FROM STDIN for large batches; smaller batches and
+    SQLite go through a single executemany.  Rows must share the same keys.
+
+    Like dialect_insert(), this bypasses ORM events — rows must carry
+    user_id explicitly.  Derived day columns (models.derived_day_column)
+    are filled from their source column.  Returns the number of rows written.
+    """
+    if not rows:
+        return 0
+    table = model.__table__
+    rows = fill_derived_days(table, rows)
+    columns = list(rows[0].keys())
+
+    if get_dialect() == "postgresql" and len(rows) >= BULK_COPY_THRESHOLD:
+        column_list = ", ".join(f'"{c}"' for c in columns)
+        dbapi_conn = session.connection().connection.dbapi_connection
+        with dbapi_conn.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY "{table.name}" ({column_list}) FROM STDIN WITH (FORMAT csv)',
+                _copy_buffer(rows, columns),
+            )
+    else:
+        session.execute(table.insert(), list(rows))
+    return len(rows)
+
+
 @contextmanager
 def get_session(user_id: str = None, unscoped: bool = False):
     """Context manager yielding a SQLAlchemy Session.
@@ -22,9 +22,12 @@ from sqlalchemy import (
     String,
     Text,
     UniqueConstraint,
+    cast,
+    event,
     func,
 )
-from sqlalchemy.orm import DeclarativeBase, relationship
+from sqlalchemy.orm import DeclarativeBase, Session, relationship
+from sqlalchemy.sql.elements import BindParameter, ColumnElement
 
 
 # ---------------------------------------------------------------------------
@@ -45,6 +48,62 @@ class Base(DeclarativeBase):
         return result
 
 
+# ---------------------------------------------------------------------------
+# Typed day columns derived from ISO timestamp strings
+# ---------------------------------------------------------------------------
+#
+# Timestamps are stored as the broker's ISO strings (full precision, used
+# for ordering).  Day-level filters and bucketing read a typed DATE column
+# next to them instead of slicing the string, so they can use an index.
+
+def iso_day(value) -> Optional[date_type]:
+    """Calendar day of an ISO date/timestamp string, date or datetime."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date_type):
+        return value
+    try:
+        return date_type.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def derived_day_column(source: str) -> Column:
+    """DATE column holding iso_day() of the string column ``source``.
+
+    Filled by the column default on ORM and single-row Core inserts.
+    COPY and multi-row VALUES skip per-row defaults, so bulk_insert and
+    the raw transaction upsert call fill_derived_days() first. Updates
+    to the source are followed by the listeners at the end of this
+    module (ORM attribute sets and UPDATE statements run on a Session).
+    """
+    def default(context):
+        return iso_day(context.get_current_parameters().get(source))
+
+    return Column(Date, nullable=True, default=default, info={"day_of": source})
+
+
+def _derived_days(table) -> List[tuple]:
+    """(day column key, source column key) for each derived day column of ``table``."""
+    return [
+        (col.key, col.info["day_of"]) for col in getattr(table, "columns", ())
+        if "day_of" in col.info
+    ]
+
+
+def fill_derived_days(table, rows: List[Dict]) -> List[Dict]:
+    """Rows with each derived day column of ``table`` set from its source."""
+    derived = [(key, source) for key, source in _derived_days(table) if key not in rows[0]]
+    if not derived:
+        return rows
+    return [
+        {**row, **{key: iso_day(row.get(source)) for key, source in derived}}
+        for row in rows
+    ]
+
+
 # ---------------------------------------------------------------------------
 # User table (multi-tenant)
 # ---------------------------------------------------------------------------
@@ -182,11 +241,9 @@ class OrderChain(Base):
 
     __table_args__ = (
         UniqueConstraint("chain_id", "user_id", name="uq_order_chains_chain_user"),
-        Index("idx_order_chains_account", "account_number"),
-        Index("idx_order_chains_underlying", "underlying"),
         Index("idx_order_chains_status", "chain_status"),
         Index("idx_order_chains_opening_date", "opening_date"),
-        Index("idx_order_chains_account_underlying", "account_number", "underlying"),
+        Index("idx_order_chains_user_account_underlying", "user_id", "account_number", "underlying"),
     )
 
 
@@ -221,6 +278,7 @@ class RawTransaction(Base):
     transaction_sub_type = Column(String)
     description = Column(String)
     executed_at = Column(String)
+    executed_day = derived_day_column("executed_at")
     transaction_date = Column(String)
     action = Column(String)
     symbol = Column(String)
@@ -238,10 +296,11 @@ class RawTransaction(Base):
 
     __table_args__ = (
         UniqueConstraint("id", "user_id", name="uq_raw_transactions_id_user"),
-        Index("idx_raw_transactions_order", "order_id"),
-        Index("idx_raw_transactions_account", "account_number"),
+        Index("idx_raw_transactions_user_order", "user_id", "order_id"),
+        Index("idx_raw_transactions_user_account", "user_id", "account_number", "underlying_symbol"),
         Index("idx_raw_transactions_symbol", "symbol"),
         Index("idx_raw_transactions_executed_at", "executed_at"),
+        Index("idx_raw_transactions_user_day", "user_id", "executed_day"),
         Index("idx_raw_transactions_action", "action"),
     )
 
@@ -332,6 +391,7 @@ class PositionLot(Base):
     quantity = Column(Integer, nullable=False)
     entry_price = Column(Float, nullable=False)
     entry_date = Column(String, nullable=False)
+    entry_day = derived_day_column("entry_date")
     remaining_quantity = Column(Integer, nullable=False)
     original_quantity = Column(Integer)
     chain_id = Column(String)
@@ -356,13 +416,14 @@ class PositionLot(Base):
 
     __table_args__ = (
         UniqueConstraint("transaction_id", "user_id", name="uq_position_lots_txn_user"),
-        Index("idx_lots_account_symbol", "account_number", "symbol"),
+        Index("idx_lots_user_account_symbol", "user_id", "account_number", "symbol"),
+        Index("idx_lots_user_account_underlying", "user_id", "account_number", "underlying"),
         Index("idx_lots_entry_date", "entry_date"),
-        Index("idx_lots_chain", "chain_id"),
-        Index("idx_lots_status", "status"),
+        Index("idx_lots_user_entry_day", "user_id", "entry_day"),
+        Index("idx_lots_user_chain", "user_id", "chain_id"),
+        Index("idx_lots_user_status", "user_id", "status"),
         Index("idx_lots_derived", "derived_from_lot_id"),
         Index("idx_lots_parent", "parent_lot_id"),
-        Index("idx_lots_underlying", "underlying"),
     )
 
 
@@ -381,6 +442,7 @@ class LotClosing(Base):
     quantity_closed = Column(Integer, nullable=False)
     closing_price = Column(Float, nullable=False)
     closing_date = Column(String, nullable=False)
+    closing_day = derived_day_column("closing_date")
     closing_type = Column(String, nullable=False)
     realized_pnl = Column(Float, nullable=False)
     resulting_lot_id = Column(Integer, ForeignKey("position_lots.id"))
@@ -394,6 +456,7 @@ class LotClosing(Base):
         Index("idx_lot_closings_lot", "lot_id"),
         Index("idx_lot_closings_order", "closing_order_id"),
         Index("idx_lot_closings_date", "closing_date"),
+        Index("idx_lot_closings_user_day", "user_id", "closing_day"),
     )
 
 
@@ -416,15 +479,16 @@ class PositionGroup(Base):
     closing_date = Column(String)
     last_activity_date = Column(String)
     rolled_from_group_id = Column(String, nullable=True)  # Soft reference to position_groups.group_id
+    max_risk = Column(Float, nullable=True)    # Derived from lots + strategy_label
+    max_reward = Column(Float, nullable=True)
     created_at = Column(String, server_default=func.now())
     updated_at = Column(String, server_default=func.now())
 
     __table_args__ = (
         UniqueConstraint("group_id", "user_id", name="uq_position_groups_group_user"),
-        Index("idx_position_groups_account", "account_number"),
-        Index("idx_position_groups_underlying", "underlying"),
-        Index("idx_position_groups_status", "status"),
-        Index("idx_position_groups_rolled_from", "rolled_from_group_id"),
+        Index("idx_position_groups_user_account_underlying", "user_id", "account_number", "underlying"),
+        Index("idx_position_groups_user_status", "user_id", "status"),
+        Index("idx_position_groups_user_rolled_from", "user_id", "rolled_from_group_id"),
     )
 
 
@@ -439,7 +503,8 @@ class PositionGroupLot(Base):
 
     __table_args__ = (
         UniqueConstraint("group_id", "transaction_id", "user_id", name="uq_group_lots_group_txn_user"),
-        Index("idx_position_group_lots_txn", "transaction_id"),
+        Index("idx_group_lots_user_txn", "user_id", "transaction_id"),
+        Index("idx_group_lots_user_group", "user_id", "group_id"),
     )
 
 
@@ -565,8 +630,72 @@ class RollChainSummary(Base):
 
     __table_args__ = (
         UniqueConstraint("current_group_id", "user_id", name="uq_roll_chain_current_group_user"),
-        Index("idx_roll_chain_underlying", "underlying", "account_number"),
-        Index("idx_roll_chain_root", "root_group_id"),
+        Index("idx_roll_chain_user_account_underlying", "user_id", "account_number", "underlying"),
+        Index("idx_roll_chain_user_root", "user_id", "root_group_id"),
+    )
+
+
+class ChainLotAttribution(Base):
+    __tablename__ = "chain_lot_attributions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=True, index=True)
+    lot_id = Column(Integer, nullable=False)
+    leaf_group_id = Column(String, nullable=False)  # current_group_id of the lot's home chain
+    account_number = Column(String, nullable=False)
+    underlying = Column(String, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("lot_id", "user_id", name="uq_chain_lot_attr_lot_user"),
+        Index("idx_chain_lot_attr_user_leaf", "user_id", "leaf_group_id"),
+        Index("idx_chain_lot_attr_user_account_underlying", "user_id", "account_number", "underlying"),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Open position snapshots (materialized Positions page payload)
+# ---------------------------------------------------------------------------
+
+class OpenPositionSnapshot(Base):
+    __tablename__ = "open_position_snapshots"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=True, index=True)
+    group_id = Column(String, nullable=False)
+    account_number = Column(String, nullable=False)
+    underlying = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    opening_date = Column(String)
+    snapshot = Column(Text, nullable=False)  # JSON blob
+    updated_at = Column(String, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("group_id", "user_id", name="uq_open_snapshots_group_user"),
+        Index("idx_open_snapshots_user_account_underlying", "user_id", "account_number", "underlying"),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Group ancestry (closure table over rolled_from_group_id)
+# ---------------------------------------------------------------------------
+
+class GroupAncestry(Base):
+    __tablename__ = "group_ancestry"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=True, index=True)
+    ancestor_group_id = Column(String, nullable=False)
+    descendant_group_id = Column(String, nullable=False)
+    depth = Column(Integer, nullable=False)  # 0 = the group itself, 1 = rolled_from, ...
+    root_group_id = Column(String, nullable=False)
+    account_number = Column(String, nullable=False)
+    underlying = Column(String, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("ancestor_group_id", "descendant_group_id", "user_id", name="uq_group_ancestry_pair_user"),
+        Index("idx_group_ancestry_user_descendant", "user_id", "descendant_group_id", "depth"),
+        Index("idx_group_ancestry_user_ancestor", "user_id", "ancestor_group_id", "depth"),
+        Index("idx_group_ancestry_user_account_underlying", "user_id", "account_number", "underlying"),
     )
 
 
@@ -588,6 +717,7 @@ class PnlEvent(Base):
     entry_date = Column(String, nullable=False)
     entry_price = Column(Float, nullable=False)
     closing_date = Column(String, nullable=False)
+    closing_day = derived_day_column("closing_date")
     closing_price = Column(Float, nullable=False)
     closing_type = Column(String, nullable=False)
     quantity_closed = Column(Integer, nullable=False)
@@ -596,10 +726,31 @@ class PnlEvent(Base):
 
     __table_args__ = (
         UniqueConstraint("closing_id", "user_id", name="uq_pnl_events_closing_user"),
-        Index("idx_pnl_events_closing_date", "closing_date", "user_id"),
-        Index("idx_pnl_events_account_date", "account_number", "closing_date"),
-        Index("idx_pnl_events_group", "group_id"),
-        Index("idx_pnl_events_underlying", "underlying"),
+        Index("idx_pnl_events_user_day", "user_id", "closing_day"),
+        Index("idx_pnl_events_user_account_underlying", "user_id", "account_number", "underlying"),
+        Index("idx_pnl_events_user_group", "user_id", "group_id"),
+    )
+
+
+class PnlRollup(Base):
+    __tablename__ = "pnl_rollups"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(36), ForeignKey("users.id"), nullable=True, index=True)
+    account_number = Column(String, nullable=False)
+    underlying = Column(String, nullable=False)
+    close_day = Column(Date, nullable=False)
+    close_month = Column(String, nullable=False)  # YYYY-MM
+    group_id = Column(String)                     # NULL for closings of ungrouped lots
+    strategy_label = Column(String)
+    realized_pnl = Column(Float, nullable=False, default=0.0)
+    event_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_pnl_rollups_user_day", "user_id", "close_day"),
+        Index("idx_pnl_rollups_user_account_day", "user_id", "account_number", "close_day"),
+        Index("idx_pnl_rollups_user_account_underlying", "user_id", "account_number", "underlying"),
+        Index("idx_pnl_rollups_user_group", "user_id", "group_id"),
     )
 
 
@@ -644,3 +795,68 @@ class SymbolVolatilityMetric(Base):
         UniqueConstraint("symbol", "date", name="uq_volatility_metric_symbol_date"),
         Index("idx_volatility_metrics_symbol_date", "symbol", "date"),
     )
+
+
+# ---------------------------------------------------------------------------
+# Keep derived day columns in step with their source on update
+# ---------------------------------------------------------------------------
+
+def _track_source(day_key: str):
+    def on_set(target, value, oldvalue, initiator):
+        setattr(target, day_key, iso_day(value))
+    return on_set
+
+
+for _mapper in Base.registry.mappers:
+    for _day_key, _source in _derived_days(_mapper.local_table):
+        event.listen(getattr(_mapper.class_, _source), "set", _track_source(_day_key))
+
+
+def _day_value(value, dialect: str):
+    """The day for an UPDATE's new source value: computed here for a
+    literal, in SQL (its first ten characters) for an expression."""
+    if isinstance(value, BindParameter):
+        value = value.value
+    if not isinstance(value, ColumnElement):
+        return iso_day(value)
+    day = func.substr(value, 1, 10)
+    # SQLite keeps dates as ISO text; CAST(... AS DATE) there yields a number
+    return day if dialect == "sqlite" else cast(day, Date)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _sync_days_on_update(orm_execute_state):
+    """Add the derived day to UPDATEs that set its source but not the day.
+
+    Covers query(...).update({...}), update(Model).values(...) and
+    update(...) executed with a parameter dict or list.
+    """
+    if not orm_execute_state.is_update:
+        return
+    statement = orm_execute_state.statement
+    derived = _derived_days(statement.table)
+    if not derived:
+        return
+
+    values = {
+        (key if isinstance(key, str) else key.key): value
+        for key, value in (statement._values or {}).items()
+    }
+    dialect = orm_execute_state.session.get_bind().dialect.name
+    extra = {
+        day_key: _day_value(values[source], dialect) for day_key, source in derived
+        if source in values and day_key not in values
+    }
+    if extra:
+        orm_execute_state.statement = statement.values(extra)
+
+    params = orm_execute_state.parameters
+    if isinstance(params, dict):
+        params = [params]
+    if params and any(source in p and day_key not in p for p in params for day_key, source in derived):
+        filled = [
+            {**p, **{day_key: iso_day(p[source]) for day_key, source in derived
+                     if source in p and day_key not in p}}
+            for p in params
+        ]
+        orm_execute_state.parameters = filled if isinstance(orm_execute_state.parameters, list) else filled[0]
@@ -52,6 +52,19 @@ def _is_tenant_scoped(mapper):
     )
 
 
+def _from_mappers(statement):
+    """Mappers of the ORM entities a SELECT names in its FROM clause.
+
+    For a join this is its left-most entity.
+    """
+    mappers = []
+    for from_ in statement.get_final_froms():
+        mapper = getattr(from_, "_annotations", {}).get("parententity")
+        if mapper is not None:
+            mappers.append(mapper)
+    return mappers
+
+
 def register_tenant_events():
     """Attach do_orm_execute and before_flush listeners to the Session class."""
 
@@ -67,12 +80,15 @@ def register_tenant_events():
 
         # Build filter options for each mapped entity in the statement
         # Using the "with_loader_criteria" approach for tenant filtering
-        for mapper in orm_execute_state.all_mappers:
-            if _is_tenant_scoped(mapper):
-                entity = mapper.entity
-                orm_execute_state.statement = orm_execute_state.statement.where(
-                    entity.user_id == user_id
-                )
+        mappers = [m for m in orm_execute_state.all_mappers if _is_tenant_scoped(m)]
+        if not mappers and orm_execute_state.is_select:
+            # query(func.count()).select_from(Model) selects no entity,
+            # so scope the entity it selects from instead
+            mappers = [m for m in _from_mappers(orm_execute_state.statement) if _is_tenant_scoped(m)]
+        for mapper in mappers:
+            orm_execute_state.statement = orm_execute_state.statement.where(
+                mapper.entity.user_id == user_id
+            )
 
     @event.listens_for(Session, "before_flush")
     def _auto_set_user_id(session, flush_context, instances):
@@ -14,11 +14,12 @@ from src.database.models import (
     LotClosing as LotClosingModel,
     PositionGroupLot,
 )
+from src.utils.option_symbols import parse_option_symbol
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class Lot:
     """Represents a position lot"""
     id: int
@@ -60,7 +61,7 @@ class Lot:
         return self.option_type is not None
 
 
-@dataclass
+@dataclass(slots=True)
 class LotClosing:
     """Represents a closing record for a lot"""
     closing_id: int
@@ -140,22 +141,12 @@ class LotManager:
             resulting_lot_id=row.resulting_lot_id,
         )
 
-    # -------------------------------------------------------------------
-    # Create
-    # -------------------------------------------------------------------
-
-    def create_lot(
-        self,
-        transaction: Dict,
-        chain_id: str,
-        leg_index: int = 0,
-        opening_order_id: Optional[str] = None
-    ) -> int:
-        """
-        Create a new lot from an opening transaction.
+    @staticmethod
+    def lot_fields_from_transaction(transaction: Dict) -> Dict:
+        """Build the position_lots column values for an opening transaction.
 
-        Returns:
-            The ID of the created lot
+        Shared by create_lot() and the in-memory LotBook so both paths derive
+        direction, underlying and option details identically.
         """
         symbol = transaction.get('symbol', '')
         underlying = transaction.get('underlying_symbol', '')
@@ -179,38 +170,70 @@ class LotManager:
         instrument_type = transaction.get('instrument_type', '')
 
         if 'OPTION' in instrument_type.upper() and ' ' in symbol:
-            parts = symbol.split()
-            if len(parts) >= 2:
-                option_part = parts[1]
-                if len(option_part) >= 8:
-                    date_str = option_part[:6]
-                    try:
-                        expiration = datetime.strptime('20' + date_str, '%Y%m%d').date()
-                    except:
-                        pass
-                    if len(option_part) > 6:
-                        option_type = 'Call' if option_part[6] == 'C' else 'Put'
-                    if len(option_part) > 7:
-                        try:
-                            strike = float(option_part[7:]) / 1000
-                        except:
-                            pass
+            contract = parse_option_symbol(symbol)
+            if contract is not None:
+                option_type = contract.option_type
+                strike = contract.strike
+                expiration = contract.expiration
+
+        return {
+            'transaction_id': transaction.get('id', ''),
+            'account_number': transaction.get('account_number', ''),
+            'symbol': symbol,
+            'underlying': underlying,
+            'instrument_type': instrument_type,
+            'option_type': option_type,
+            'strike': strike,
+            'expiration': expiration.isoformat() if expiration else None,
+            'quantity': quantity,
+            'entry_price': float(transaction.get('price', 0)),
+            'entry_date': transaction.get('executed_at', ''),
+            'remaining_quantity': quantity,
+            'original_quantity': abs(quantity),
+        }
+
+    @staticmethod
+    def closing_pnl(
+        lot_quantity: int,
+        entry_price: float,
+        closing_price: float,
+        close_amount: int,
+        option_type: Optional[str],
+    ) -> float:
+        """Realized P&L for closing close_amount units of a lot."""
+        multiplier = 100 if option_type else 1
+        if lot_quantity > 0:
+            return round((closing_price - entry_price) * close_amount * multiplier, 2)
+        return round((entry_price - closing_price) * close_amount * multiplier, 2)
+
+    @staticmethod
+    def closing_date_str(closing_date) -> str:
+        """Serialize a closing date the way lot_closings.closing_date stores it."""
+        return (closing_date.isoformat()
+                if isinstance(closing_date, datetime) else str(closing_date))
+
+    # -------------------------------------------------------------------
+    # Create
+    # -------------------------------------------------------------------
+
+    def create_lot(
+        self,
+        transaction: Dict,
+        chain_id: str,
+        leg_index: int = 0,
+        opening_order_id: Optional[str] = None
+    ) -> int:
+        """
+        Create a new lot from an opening transaction.
+
+        Returns:
+            The ID of the created lot
+        """
+        fields = self.lot_fields_from_transaction(transaction)
 
         with self.db.get_session() as session:
             new_lot = PositionLotModel(
-                transaction_id=transaction.get('id', ''),
-                account_number=transaction.get('account_number', ''),
-                symbol=symbol,
-                underlying=underlying,
-                instrument_type=instrument_type,
-                option_type=option_type,
-                strike=strike,
-                expiration=expiration.isoformat() if expiration else None,
-                quantity=quantity,
-                entry_price=float(transaction.get('price', 0)),
-                entry_date=transaction.get('executed_at', ''),
-                remaining_quantity=quantity,
-                original_quantity=abs(quantity),
+                **fields,
                 chain_id=chain_id,
                 leg_index=leg_index,
                 opening_order_id=opening_order_id,
@@ -219,7 +242,7 @@ class LotManager:
             session.add(new_lot)
             session.flush()
             lot_id = new_lot.id
-            logger.debug(f"Created lot {lot_id}: {symbol} qty={quantity} chain={chain_id}")
+            logger.debug(f"Created lot {lot_id}: {fields['symbol']} qty={fields['quantity']} chain={chain_id}")
             return lot_id
 
     def close_lot_fifo(
@@ -270,12 +293,8 @@ class LotManager:
                 lot_available = abs(lot.remaining_quantity)
                 close_amount = min(remaining_to_close, lot_available)
 
-                multiplier = 100 if lot.option_type else 1
-
-                if lot.quantity > 0:
-                    pnl = round((closing_price - lot.entry_price) * close_amount * multiplier, 2)
-                else:
-                    pnl = round((lot.entry_price - closing_price) * close_amount * multiplier, 2)
+                pnl = self.closing_pnl(lot.quantity, lot.entry_price, closing_price,
+                                       close_amount, lot.option_type)
 
                 total_pnl += pnl
 
@@ -294,8 +313,7 @@ class LotManager:
                     closing_transaction_id=closing_transaction_id,
                     quantity_closed=close_amount,
                     closing_price=closing_price,
-                    closing_date=(closing_date.isoformat()
-                                  if isinstance(closing_date, datetime) else str(closing_date)),
+                    closing_date=self.closing_date_str(closing_date),
                     closing_type=closing_type,
                     realized_pnl=pnl,
                 )
@@ -518,12 +536,31 @@ class LotManager:
             if lot:
                 lot.chain_id = chain_id
 
-    def clear_all_lots(self, underlyings: set = None, account_number: str = None):
-        """Clear lots and their closings. Optionally filter by underlyings and/or account_number."""
+    def clear_all_lots(self, underlyings: set = None, account_number: str = None,
+                       partitions: set = None):
+        """Clear lots and their closings. Optionally filter by underlyings and/or account_number,
+        or by a set of (account_number, underlying) partitions."""
         from src.database.tenant import DEFAULT_USER_ID
         with self.db.get_session() as session:
             user_id = session.info.get("user_id", DEFAULT_USER_ID)
 
+            # Partition-scoped clearing (incremental reprocess)
+            if partitions is not None:
+                from src.pipeline.partitions import partition_clause
+                lot_filter = [
+                    partition_clause(PositionLotModel.account_number,
+                                     PositionLotModel.underlying, partitions),
+                    PositionLotModel.user_id == user_id,
+                ]
+                lot_ids_sub = session.query(PositionLotModel.id).filter(*lot_filter).scalar_subquery()
+                session.query(LotClosingModel).filter(
+                    LotClosingModel.lot_id.in_(lot_ids_sub),
+                    LotClosingModel.user_id == user_id,
+                ).delete(synchronize_session=False)
+                deleted = session.query(PositionLotModel).filter(*lot_filter).delete(synchronize_session=False)
+                logger.info(f"Cleared {deleted} lots and closings for {len(partitions)} partitions")
+                return
+
             # Account-scoped clearing
             if account_number:
                 lot_filter = [
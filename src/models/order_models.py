@@ -9,6 +9,8 @@ from typing import List, Dict, Optional, Any
 from enum import Enum
 from loguru import logger
 
+from src.utils.option_symbols import parse_option_symbol
+
 
 class OrderType(Enum):
     OPENING = "OPENING"
@@ -902,28 +904,11 @@ class OrderManager:
             expiration = None
             
             if 'OPTION' in instrument_type and ' ' in symbol:
-                # Parse option symbol format: "AAPL  241220C00150000"
-                parts = symbol.split()
-                if len(parts) >= 2:
-                    option_part = parts[1]
-                    if len(option_part) >= 8:
-                        # Extract date (first 6 chars: YYMMDD)
-                        date_str = option_part[:6]
-                        try:
-                            expiration = datetime.strptime('20' + date_str, '%Y%m%d').date()
-                        except:
-                            pass
-                        
-                        # Extract option type (7th char: C or P)
-                        if len(option_part) > 6:
-                            option_type = 'Call' if option_part[6] == 'C' else 'Put'
-                        
-                        # Extract strike (remaining digits / 1000)
-                        if len(option_part) > 7:
-                            try:
-                                strike = float(option_part[7:]) / 1000
-                            except:
-                                pass
+                contract = parse_option_symbol(symbol)
+                if contract is not None:
+                    option_type = contract.option_type
+                    strike = contract.strike
+                    expiration = contract.expiration
             
             # Get transaction details with safe type conversion
             try:
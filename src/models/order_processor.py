@@ -13,6 +13,8 @@ from enum import Enum
 import logging
 from collections import defaultdict
 
+from src.utils.enum_strings import normalize_enum
+
 if TYPE_CHECKING:
     from src.models.lot_manager import LotManager
 
@@ -25,7 +27,7 @@ class OrderType(Enum):
     CLOSING = "CLOSING"
 
 
-@dataclass
+@dataclass(slots=True)
 class Transaction:
     """Represents a single transaction/fill"""
     id: str
@@ -50,13 +52,8 @@ class Transaction:
     net_value: float = 0.0
 
     def __post_init__(self):
-        # Normalize action to uppercase underscore format
-        # Handles: "Sell to Open" -> "SELL_TO_OPEN", "OrderAction.SELL_TO_OPEN" -> "SELL_TO_OPEN"
         if self.action:
-            a = self.action
-            if a.startswith('OrderAction.'):
-                a = a[len('OrderAction.'):]
-            self.action = a.upper().replace(' ', '_')
+            self.action = normalize_enum(self.action)
 
     @property
     def is_opening(self) -> bool:
@@ -100,7 +97,7 @@ class Transaction:
 
 
 
-@dataclass
+@dataclass(slots=True)
 class Order:
     """Represents an order (group of transactions)"""
     order_id: str
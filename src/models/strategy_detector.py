@@ -234,7 +234,7 @@ class StrategyDetector:
                     RawTransaction.account_number == account_number,
                     RawTransaction.instrument_type.like('%EQUITY'),
                     ~RawTransaction.instrument_type.like('%OPTION%'),
-                    func.date(RawTransaction.executed_at) <= option_date.isoformat(),
+                    RawTransaction.executed_day <= option_date,
                 ).scalar()
 
                 net_stock_position = result if result else 0
@@ -0,0 +1,226 @@
+"""
+Group Ancestry — closure table over position_groups.rolled_from_group_id.
+
+One row per (ancestor, descendant) pair on a roll chain plus a depth-0
+row for every group, each carrying the root of the chain:
+
+    G1 <- G2 <- G3          (G2 rolled from G1, G3 rolled from G2)
+
+    ancestor  descendant  depth  root
+    G1        G1          0      G1
+    G2        G2          0      G1
+    G1        G2          1      G1
+    G3        G3          0      G1
+    G2        G3          1      G1
+    G1        G3          2      G1
+
+A group's chain back to its root, everything rolled out of it, and its
+root are each one indexed read instead of one query per hop.
+
+100% derived data. sync_group_ancestry recomputes the closure of the
+current links per partition and writes only the rows that differ, so
+re-deriving an unchanged partition costs two reads. Roll chains never
+leave their (account, underlying) partition.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.database.engine import bulk_insert
+from src.database.models import GroupAncestry, PositionGroup
+from src.database.tenant import DEFAULT_USER_ID
+from src.pipeline.partitions import Partition, partition_clause
+
+if TYPE_CHECKING:
+    from src.database.db_manager import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Stale row ids deleted per statement
+ANCESTRY_DELETE_CHUNK = 1000
+
+# (ancestor_group_id, descendant_group_id) -> (depth, root_group_id)
+Closure = Dict[Tuple[str, str], Tuple[int, str]]
+
+
+def build_closure(parent_of: Dict[str, Optional[str]]) -> Closure:
+    """Closure rows for the groups in ``parent_of`` (group_id -> rolled_from).
+
+    A link to a group outside ``parent_of`` (deleted since) ends the
+    chain there, as does a cycle.
+    """
+    closure: Closure = {}
+    for gid in parent_of:
+        path = [gid]
+        seen = {gid}
+        parent = parent_of[gid]
+        while parent in parent_of and parent not in seen:
+            seen.add(parent)
+            path.append(parent)
+            parent = parent_of[parent]
+        root = path[-1]
+        for depth, ancestor in enumerate(path):
+            closure[(ancestor, gid)] = (depth, root)
+    return closure
+
+
+def sync_group_ancestry(
+    session,
+    user_id: str,
+    partitions: Optional[Set[Partition]] = None,
+) -> int:
+    """Bring group_ancestry in line with rolled_from_group_id.
+
+    With ``partitions`` set only those (account, underlying) pairs are
+    recomputed, unless the user has no ancestry rows yet (a database that
+    predates the table), in which case everything is built.
+
+    Returns the number of rows inserted or deleted.
+    """
+    if partitions is not None and session.query(GroupAncestry.id).filter(
+        GroupAncestry.user_id == user_id,
+    ).first() is None:
+        partitions = None
+
+    group_q = session.query(
+        PositionGroup.group_id,
+        PositionGroup.rolled_from_group_id,
+        PositionGroup.account_number,
+        PositionGroup.underlying,
+    ).filter(PositionGroup.user_id == user_id)
+    existing_q = session.query(
+        GroupAncestry.id,
+        GroupAncestry.ancestor_group_id,
+        GroupAncestry.descendant_group_id,
+        GroupAncestry.depth,
+        GroupAncestry.root_group_id,
+    ).filter(GroupAncestry.user_id == user_id)
+    if partitions is not None:
+        group_q = group_q.filter(partition_clause(
+            PositionGroup.account_number, PositionGroup.underlying, partitions,
+        ))
+        existing_q = existing_q.filter(partition_clause(
+            GroupAncestry.account_number, GroupAncestry.underlying, partitions,
+        ))
+
+    parent_of: Dict[str, Optional[str]] = {}
+    partition_by_group: Dict[str, Partition] = {}
+    for gid, parent, account_number, underlying in group_q.all():
+        parent_of[gid] = parent
+        partition_by_group[gid] = (account_number, underlying)
+    missing = build_closure(parent_of)
+
+    stale: List[int] = []
+    for row_id, ancestor, descendant, depth, root in existing_q.all():
+        if missing.get((ancestor, descendant)) == (depth, root):
+            del missing[(ancestor, descendant)]
+        else:
+            stale.append(row_id)
+
+    # Stale rows go first: a changed pair is deleted and re-inserted
+    for i in range(0, len(stale), ANCESTRY_DELETE_CHUNK):
+        session.query(GroupAncestry).filter(
+            GroupAncestry.id.in_(stale[i:i + ANCESTRY_DELETE_CHUNK]),
+        ).delete(synchronize_session=False)
+    inserted = bulk_insert(session, GroupAncestry, [
+        {
+            "user_id": user_id,
+            "ancestor_group_id": ancestor,
+            "descendant_group_id": descendant,
+            "depth": depth,
+            "root_group_id": root,
+            "account_number": partition_by_group[descendant][0],
+            "underlying": partition_by_group[descendant][1],
+        }
+        for (ancestor, descendant), (depth, root) in missing.items()
+    ])
+    session.flush()
+
+    if stale or inserted:
+        logger.info("Group ancestry: %d rows inserted, %d removed", inserted, len(stale))
+    return inserted + len(stale)
+
+
+def refresh_group_ancestry(db_manager: "DatabaseManager", group_ids: Iterable[str]) -> int:
+    """Re-sync the partitions holding ``group_ids``.
+
+    For edits made outside the pipeline (deleted groups, moved lots).
+    Partitions are resolved from both the groups and their existing
+    ancestry rows, so a deleted group's rows are dropped too.
+    """
+    group_ids = list(group_ids)
+    if not group_ids:
+        return 0
+    with db_manager.get_session() as session:
+        user_id = session.info.get("user_id", DEFAULT_USER_ID)
+        partitions: Set[Partition] = set()
+        for model, column in (
+            (PositionGroup, PositionGroup.group_id),
+            (GroupAncestry, GroupAncestry.descendant_group_id),
+        ):
+            rows = session.query(model.account_number, model.underlying).filter(
+                column.in_(group_ids),
+            ).distinct().all()
+            partitions.update((acct, undl) for acct, undl in rows)
+        if not partitions:
+            return 0
+        return sync_group_ancestry(session, user_id, partitions=partitions)
+
+
+def ensure_group_ancestry(db_manager: "DatabaseManager") -> int:
+    """Build group_ancestry if it is empty while roll links exist.
+
+    Covers databases that predate the table and haven't been reprocessed
+    since; afterwards the pipeline keeps it current.
+    """
+    with db_manager.get_session() as session:
+        if session.query(GroupAncestry.id).first() is not None:
+            return 0
+        if session.query(PositionGroup.id).filter(
+            PositionGroup.rolled_from_group_id.isnot(None),
+        ).first() is None:
+            return 0
+        user_id = session.info.get("user_id", DEFAULT_USER_ID)
+        return sync_group_ancestry(session, user_id)
+
+
+# ---------------------------------------------------------------------------
+# Lookups (one indexed read each)
+# ---------------------------------------------------------------------------
+
+def chain_roots(session, group_ids: Iterable[str]) -> Dict[str, str]:
+    """Root of each group's roll chain; a group without rows is its own root."""
+    group_ids = list(group_ids)
+    roots = dict(session.query(
+        GroupAncestry.descendant_group_id, GroupAncestry.root_group_id,
+    ).filter(
+        GroupAncestry.descendant_group_id.in_(group_ids),
+        GroupAncestry.depth == 0,
+    ).all())
+    return {gid: roots.get(gid, gid) for gid in group_ids}
+
+
+def chain_ancestors(session, group_ids: Iterable[str]) -> Dict[str, List[str]]:
+    """Each group's chain from itself back to its root (the group first)."""
+    group_ids = list(group_ids)
+    chains: Dict[str, List[str]] = {gid: [] for gid in group_ids}
+    rows = session.query(
+        GroupAncestry.descendant_group_id, GroupAncestry.ancestor_group_id,
+    ).filter(
+        GroupAncestry.descendant_group_id.in_(group_ids),
+    ).order_by(GroupAncestry.descendant_group_id, GroupAncestry.depth).all()
+    for descendant, ancestor in rows:
+        chains[descendant].append(ancestor)
+    return {gid: chain or [gid] for gid, chain in chains.items()}
+
+
+def roll_sources(session, group_ids: Iterable[str]) -> Set[str]:
+    """The subset of ``group_ids`` that some other group rolled from."""
+    return {
+        gid for (gid,) in session.query(GroupAncestry.ancestor_group_id).filter(
+            GroupAncestry.ancestor_group_id.in_(list(group_ids)),
+            GroupAncestry.depth == 1,
+        ).distinct().all()
+    }
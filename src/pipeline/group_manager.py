@@ -3,7 +3,7 @@ Group Manager — position group creation by expiration (options) or underlying
 
 Public API:
     assign_lots_to_groups(lots) -> List[GroupSpec]          (pure, no DB)
-    GroupPersister.process_groups(account_number)            (DB persistence)
+    GroupPersister.process_groups(account_number, partitions) (DB persistence)
 
 Part of OPT-121 Stage 6.
 """
@@ -18,10 +18,13 @@ from datetime import datetime, date
 from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Set, Tuple
 
 from src.models.lot_manager import Lot
+from src.pipeline.partitions import Partition, partition_clause
 from src.pipeline.strategy_engine import recognize, lots_to_legs
+from src.services.report_service import risk_reward_from_lots
 
 if TYPE_CHECKING:
     from src.database.db_manager import DatabaseManager
+    from src.database.models import PositionGroup
     from src.models.lot_manager import LotManager
 
 logger = logging.getLogger(__name__)
@@ -472,20 +475,13 @@ def _legs_from_all_lots(lot_list: List[Lot]) -> list:
 # Roll-link detection
 # ---------------------------------------------------------------------------
 
-def _upgrade_covered_calls(
-    session, all_group_ids: Set[str], group_lots: Dict[str, List[Lot]],
-) -> None:
+def _upgrade_covered_calls(groups: List["PositionGroup"]) -> None:
     """Upgrade 'Short Call' groups to 'Covered Call' when shares exist.
 
     A Short Call group whose account+underlying has a Shares group that
-    overlaps in time is really a Covered Call.
+    overlaps in time is really a Covered Call.  ``groups`` are the
+    already-loaded rows Phase 4 refreshed.
     """
-    from src.database.models import PositionGroup
-
-    groups = session.query(PositionGroup).filter(
-        PositionGroup.group_id.in_(all_group_ids),
-    ).all()
-
     # Index: (account, underlying) -> list of Shares groups with date ranges
     shares_index: Dict[Tuple[str, str], List] = defaultdict(list)
     for g in groups:
@@ -513,6 +509,57 @@ def _upgrade_covered_calls(
                 break
 
 
+def _lot_dates_by_txn(
+    session, lot_rows, lot_filters,
+) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    """transaction_id -> (MAX(entry_date), MAX(closing_date)) for lots in scope.
+
+    Entry dates come from the lot rows Phase 1 already loaded; closing
+    dates from a single grouped query.  Together they replace the
+    per-group lot-id / MAX lookups.  (An outer join would be dropped to
+    an inner one by the tenant WHERE on lot_closings, hence two parts.)
+    """
+    from sqlalchemy import func
+    from src.database.models import (
+        PositionLot as PositionLotModel, LotClosing as LotClosingModel,
+    )
+
+    max_entry: Dict[str, str] = {}
+    for row in lot_rows:
+        if row.entry_date and (row.transaction_id not in max_entry
+                               or row.entry_date > max_entry[row.transaction_id]):
+            max_entry[row.transaction_id] = row.entry_date
+
+    max_closing = dict(
+        session.query(
+            PositionLotModel.transaction_id,
+            func.max(LotClosingModel.closing_date),
+        ).join(
+            LotClosingModel, LotClosingModel.lot_id == PositionLotModel.id,
+        ).filter(*lot_filters).group_by(PositionLotModel.transaction_id).all()
+    )
+    return {
+        txn_id: (max_entry.get(txn_id), max_closing.get(txn_id))
+        for txn_id in set(max_entry) | set(max_closing)
+    }
+
+
+def _max_dates(
+    lots: List[Lot],
+    dates_by_txn: Dict[str, Tuple[Optional[str], Optional[str]]],
+) -> Tuple[Optional[str], Optional[str]]:
+    """(latest closing date, latest entry date) across a group's lots."""
+    max_closing = None
+    max_entry = None
+    for txn_id in {lot.transaction_id for lot in lots}:
+        entry, closing = dates_by_txn.get(txn_id, (None, None))
+        if entry is not None and (max_entry is None or entry > max_entry):
+            max_entry = entry
+        if closing is not None and (max_closing is None or closing > max_closing):
+            max_closing = closing
+    return max_closing, max_entry
+
+
 def _persist_group_split(
     session, group, original_gid: str,
     sub_groups: List[Tuple[str, List[Lot]]],
@@ -520,6 +567,8 @@ def _persist_group_split(
     user_id: str, now_str: str,
     all_group_ids: Set[str],
     group_lots: Dict[str, List[Lot]],
+    group_rows: Dict[str, "PositionGroup"],
+    dates_by_txn: Dict[str, Tuple[Optional[str], Optional[str]]],
 ) -> None:
     """Split an existing group into multiple sub-groups based on recognizer partition.
 
@@ -528,11 +577,7 @@ def _persist_group_split(
     - Reassigns PositionGroupLot links accordingly
     - Computes closing_date and last_activity_date for each sub-group
     """
-    from sqlalchemy import func
-    from src.database.models import (
-        PositionGroup, PositionGroupLot,
-        PositionLot as PositionLotModel, LotClosing as LotClosingModel,
-    )
+    from src.database.models import PositionGroup, PositionGroupLot
 
     first = True
     for label, sub_lots in sub_groups:
@@ -542,21 +587,8 @@ def _persist_group_split(
         opening = min(l.entry_date for l in sub_lots).isoformat() if sub_lots else None
 
         # Compute closing_date and last_activity_date from lot_closings
-        lot_ids = [
-            r[0] for r in session.query(PositionLotModel.id).filter(
-                PositionLotModel.transaction_id.in_(txn_ids),
-            ).all()
-        ]
-        max_closing_date = None
-        if lot_ids:
-            max_closing_date = session.query(
-                func.max(LotClosingModel.closing_date),
-            ).filter(LotClosingModel.lot_id.in_(lot_ids)).scalar()
-
+        max_closing_date, max_entry = _max_dates(sub_lots, dates_by_txn)
         closing_date = max_closing_date if status == "CLOSED" else None
-        max_entry = session.query(
-            func.max(PositionLotModel.entry_date),
-        ).filter(PositionLotModel.transaction_id.in_(txn_ids)).scalar()
         activity_candidates = [d for d in [max_closing_date, max_entry] if d]
         last_activity = max(activity_candidates) if activity_candidates else None
 
@@ -581,7 +613,7 @@ def _persist_group_split(
         else:
             # Create a new group for this sub-strategy
             new_gid = str(_uuid.uuid4())
-            session.add(PositionGroup(
+            group_rows[new_gid] = PositionGroup(
                 group_id=new_gid,
                 account_number=sub_lots[0].account_number,
                 underlying=sub_lots[0].underlying,
@@ -591,7 +623,8 @@ def _persist_group_split(
                 closing_date=closing_date,
                 last_activity_date=last_activity,
                 updated_at=now_str,
-            ))
+            )
+            session.add(group_rows[new_gid])
             for txn_id in txn_ids:
                 session.add(PositionGroupLot(
                     group_id=new_gid,
@@ -618,6 +651,7 @@ class GroupPersister:
     def process_groups(
         self,
         account_number: Optional[str] = None,
+        partitions: Optional[Set[Partition]] = None,
     ) -> int:
         """Incremental group processing that preserves user merges.
 
@@ -627,9 +661,14 @@ class GroupPersister:
         Phase 4: Refresh metadata for ALL groups (status, strategy, dates)
         Phase 5: Cleanup stale links and empty groups
 
+        With ``partitions`` set every phase only sees the groups, links and
+        lots of those (account, underlying) pairs. Groups never span
+        partitions (merges require the same account and underlying), so
+        the result matches a full pass over the same partitions.
+
         Returns number of groups created or updated.
         """
-        from sqlalchemy import func
+        from sqlalchemy import func, or_, select
         from src.database.models import (
             PositionGroup,
             PositionGroupLot,
@@ -646,24 +685,43 @@ class GroupPersister:
             # =================================================================
             # Phase 1: Load state
             # =================================================================
-            q = session.query(PositionLotModel)
+            lot_filters = []
             if account_number:
-                q = q.filter(PositionLotModel.account_number == account_number)
+                lot_filters.append(PositionLotModel.account_number == account_number)
+            if partitions is not None:
+                lot_filters.append(partition_clause(
+                    PositionLotModel.account_number, PositionLotModel.underlying, partitions,
+                ))
+            q = session.query(PositionLotModel).filter(*lot_filters)
             q = q.order_by(PositionLotModel.entry_date.asc())
             all_lot_rows = q.all()
             all_lots = [self.lot_mgr._orm_to_lot(row) for row in all_lot_rows]
 
-            if not all_lots:
+            # A rebuilt partition can lose all of its lots; its groups
+            # still need the Phase 5 cleanup below.
+            if not all_lots and partitions is None:
                 return 0
 
             # Build transaction_id -> Lot lookup
             txn_to_lot: Dict[str, Lot] = {lot.transaction_id: lot for lot in all_lots}
 
             # Load existing group-lot links: transaction_id -> group_id
-            existing_links = session.query(
+            links_q = session.query(
                 PositionGroupLot.transaction_id,
                 PositionGroupLot.group_id,
-            ).filter(PositionGroupLot.user_id == user_id).all()
+            ).filter(PositionGroupLot.user_id == user_id)
+            if partitions is not None:
+                partition_group_ids = select(PositionGroup.group_id).where(
+                    PositionGroup.user_id == user_id,
+                    partition_clause(
+                        PositionGroup.account_number, PositionGroup.underlying, partitions,
+                    ),
+                )
+                links_q = links_q.filter(or_(
+                    PositionGroupLot.group_id.in_(partition_group_ids),
+                    PositionGroupLot.transaction_id.in_(list(txn_to_lot)),
+                ))
+            existing_links = links_q.all()
             txn_to_group: Dict[str, str] = {row[0]: row[1] for row in existing_links}
 
             # =================================================================
@@ -742,11 +800,19 @@ class GroupPersister:
             # group_id -> set of Lot objects (for open-check)
             group_lots: Dict[str, List[Lot]] = defaultdict(list)
 
-            # Collect existing group_ids from DB (for Phase 4)
-            gid_q = session.query(PositionGroup.group_id)
+            # Load existing groups in one query (for Phase 4)
+            group_filters = [PositionGroup.user_id == user_id]
             if account_number:
-                gid_q = gid_q.filter(PositionGroup.account_number == account_number)
-            all_group_ids: Set[str] = {row[0] for row in gid_q.all()}
+                group_filters.append(PositionGroup.account_number == account_number)
+            if partitions is not None:
+                group_filters.append(partition_clause(
+                    PositionGroup.account_number, PositionGroup.underlying, partitions,
+                ))
+            group_rows: Dict[str, PositionGroup] = {
+                g.group_id: g
+                for g in session.query(PositionGroup).filter(*group_filters).all()
+            }
+            all_group_ids: Set[str] = set(group_rows)
 
             # Seed indexes from existing group-lot links
             for txn_id, group_id in txn_to_group.items():
@@ -811,7 +877,7 @@ class GroupPersister:
             for gid, lots_in_group in group_lots.items():
                 if gid not in all_group_ids and lots_in_group:
                     first_lot = lots_in_group[0]
-                    session.add(PositionGroup(
+                    group_rows[gid] = PositionGroup(
                         group_id=gid,
                         account_number=first_lot.account_number,
                         underlying=first_lot.underlying,
@@ -820,7 +886,8 @@ class GroupPersister:
                         opening_date=None,
                         rolled_from_group_id=new_group_rolled_from.get(gid),
                         updated_at=now_str,
-                    ))
+                    )
+                    session.add(group_rows[gid])
                     all_group_ids.add(gid)
 
             # Flush so Phase 4 can see all new rows
@@ -829,15 +896,17 @@ class GroupPersister:
             # =================================================================
             # Phase 4: Refresh metadata for ALL groups
             # =================================================================
+            # Latest entry/closing date per transaction, loaded once;
+            # per-group maxima are folded in memory below.
+            dates_by_txn = _lot_dates_by_txn(session, all_lot_rows, lot_filters)
+
             count = 0
             for gid in list(all_group_ids):
                 lots_in_group = group_lots.get(gid, [])
                 if not lots_in_group:
                     continue  # empty group, cleaned up in Phase 5
 
-                group = session.query(PositionGroup).filter(
-                    PositionGroup.group_id == gid,
-                ).first()
+                group = group_rows.get(gid)
                 if not group:
                     continue
 
@@ -850,37 +919,14 @@ class GroupPersister:
                     l.entry_date for l in lots_in_group
                 ).isoformat() if lots_in_group else None
 
-                # Closing date and last_activity_date
-                lot_ids = [
-                    r[0] for r in session.query(PositionLotModel.id).filter(
-                        PositionLotModel.transaction_id.in_(
-                            [l.transaction_id for l in lots_in_group]
-                        ),
-                    ).all()
-                ]
-                max_closing_date = None
-                if lot_ids:
-                    max_closing_date = session.query(
-                        func.max(LotClosingModel.closing_date),
-                    ).filter(
-                        LotClosingModel.lot_id.in_(lot_ids),
-                    ).scalar()
+                # Closing date and last_activity_date = MAX(closing dates, entry dates)
+                max_closing_date, max_entry = _max_dates(lots_in_group, dates_by_txn)
 
                 if group.status == "CLOSED":
                     group.closing_date = max_closing_date
                 else:
                     group.closing_date = None
 
-                # last_activity_date = MAX(closing dates, entry dates)
-                max_entry = None
-                if lots_in_group:
-                    max_entry = session.query(
-                        func.max(PositionLotModel.entry_date),
-                    ).filter(
-                        PositionLotModel.transaction_id.in_(
-                            [l.transaction_id for l in lots_in_group]
-                        ),
-                    ).scalar()
                 candidates = [d for d in [max_closing_date, max_entry] if d]
                 group.last_activity_date = max(candidates) if candidates else None
 
@@ -919,6 +965,7 @@ class GroupPersister:
                                     session, group, gid, sub_groups,
                                     lots_in_group, user_id, now_str,
                                     all_group_ids, group_lots,
+                                    group_rows, dates_by_txn,
                                 )
                                 count += len(sub_groups)
                                 continue
@@ -933,7 +980,23 @@ class GroupPersister:
             # =================================================================
             # Short Call groups that overlap with a Shares group for the same
             # account+underlying are really Covered Calls.
-            _upgrade_covered_calls(session, all_group_ids, group_lots)
+            _upgrade_covered_calls(
+                [group_rows[gid] for gid in all_group_ids if gid in group_rows],
+            )
+
+            # =================================================================
+            # Phase 4d: Max risk / max reward under the final label
+            # =================================================================
+            # Lots are already in memory, so the performance report reads
+            # these columns instead of querying lots per group.
+            for gid in all_group_ids:
+                group = group_rows.get(gid)
+                lots_in_group = group_lots.get(gid)
+                if group is None or not lots_in_group:
+                    continue
+                group.max_risk, group.max_reward = risk_reward_from_lots(
+                    lots_in_group, group.strategy_label, group_id=gid,
+                )
 
             # =================================================================
             # Phase 4c: Roll links are derived from lot-level lineage in a
@@ -946,48 +1009,49 @@ class GroupPersister:
             # Phase 5: Cleanup
             # =================================================================
             # Delete stale PositionGroupLot links (transaction_id no longer in position_lots)
-            # When account-scoped, only clean up links for groups we processed
+            # When account- or partition-scoped, only clean up links for groups we processed
             valid_txn_ids = set(txn_to_lot.keys())
-            if valid_txn_ids:
+            if valid_txn_ids or partitions is not None:
                 stale_q = session.query(PositionGroupLot).filter(
                     PositionGroupLot.user_id == user_id,
                     ~PositionGroupLot.transaction_id.in_(valid_txn_ids),
                 )
-                if account_number:
+                if account_number or partitions is not None:
                     # Only clean links belonging to groups we touched
                     stale_q = stale_q.filter(
                         PositionGroupLot.group_id.in_(all_group_ids),
                     )
-                stale_links = stale_q.all()
-                if stale_links:
-                    stale_count = len(stale_links)
-                    for link in stale_links:
-                        session.delete(link)
+                stale_count = stale_q.delete(synchronize_session=False)
+                if stale_count:
                     logger.info(f"Cleaned up {stale_count} stale group-lot links")
 
-            # Delete empty groups (no lot links) and their orphaned tags/notes
-            for gid in list(all_group_ids):
-                link_count = session.query(func.count()).select_from(
-                    PositionGroupLot
+            # Delete empty groups (no lot links) and their orphaned tags/notes.
+            # Link counts come from one grouped query over the groups in scope.
+            link_counts = dict(
+                session.query(
+                    PositionGroupLot.group_id, func.count(),
                 ).filter(
-                    PositionGroupLot.group_id == gid,
                     PositionGroupLot.user_id == user_id,
-                ).scalar()
-
-                if link_count == 0:
-                    session.query(PositionGroupTag).filter(
-                        PositionGroupTag.group_id == gid,
-                        PositionGroupTag.user_id == user_id,
-                    ).delete(synchronize_session=False)
-                    session.query(PositionNote).filter(
-                        PositionNote.note_key == f"group_{gid}",
-                        PositionNote.user_id == user_id,
-                    ).delete(synchronize_session=False)
-                    session.query(PositionGroup).filter(
-                        PositionGroup.group_id == gid,
-                        PositionGroup.user_id == user_id,
-                    ).delete(synchronize_session=False)
-                    logger.debug(f"Deleted empty group {gid} (with orphaned tags/notes)")
+                    PositionGroupLot.group_id.in_(
+                        select(PositionGroup.group_id).where(*group_filters)
+                    ),
+                ).group_by(PositionGroupLot.group_id).all()
+            )
+            empty_gids = sorted(gid for gid in all_group_ids if not link_counts.get(gid))
+            if empty_gids:
+                session.query(PositionGroupTag).filter(
+                    PositionGroupTag.group_id.in_(empty_gids),
+                    PositionGroupTag.user_id == user_id,
+                ).delete(synchronize_session=False)
+                session.query(PositionNote).filter(
+                    PositionNote.note_key.in_([f"group_{gid}" for gid in empty_gids]),
+                    PositionNote.user_id == user_id,
+                ).delete(synchronize_session=False)
+                session.query(PositionGroup).filter(
+                    PositionGroup.group_id.in_(empty_gids),
+                    PositionGroup.user_id == user_id,
+                ).delete(synchronize_session=False)
+                logger.debug(f"Deleted {len(empty_gids)} empty groups (with orphaned tags/notes)")
 
         logger.info(f"GroupPersister: processed {count} groups ({new_groups_created} new, {len(new_lots)} new lots) from {len(all_lots)} total lots")
         return count
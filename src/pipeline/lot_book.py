@@ -0,0 +1,623 @@
+"""
+Lot Book — in-memory lot state for Stage 3 (position_ledger).
+
+process_lots() used to call LotManager.create_lot / close_lot_fifo /
+get_open_lots for every transaction, and each call opened its own session
+with its own SELECT + flush.  On a full reprocess of a multi-year account
+that is tens of thousands of round-trips.
+
+The LotBook runs the whole chronological pass in memory instead: open lots
+are kept in FIFO queues per (account_number, symbol), closings are appended
+to a list, and everything is written in one bulk insert by flush() (see
+engine.bulk_insert).
+
+Semantics mirror the DB-backed LotManager exactly:
+  - FIFO order is ``entry_date ASC`` on the stored ISO string, ties broken
+    by insertion order (what ``ORDER BY entry_date`` returns on the lots
+    index).
+  - Lot fields and realized P&L come from the same LotManager helpers.
+  - Assignment/exercise lookups pick the latest unlinked closing by
+    ``closing_date DESC`` (ties → most recently created), matching the
+    ``ORDER BY closing_date DESC LIMIT 1`` queries they replace.
+
+Lots are given provisional negative ids while in the book; flush() swaps
+them for the real primary keys when rows are inserted.
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from src.models.lot_manager import LotManager
+
+if TYPE_CHECKING:
+    from src.database.db_manager import DatabaseManager
+    from src.models.order_processor import Transaction
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["BookLot", "BookClosing", "LotBook"]
+
+
+@dataclass(slots=True)
+class BookLot:
+    """A position lot held in the book — column values as they will be stored."""
+    id: int
+    transaction_id: str
+    account_number: str
+    symbol: str
+    underlying: str
+    instrument_type: str
+    option_type: Optional[str]
+    strike: Optional[float]
+    expiration: Optional[str]
+    quantity: int
+    entry_price: float
+    entry_date: str
+    remaining_quantity: int
+    original_quantity: int
+    chain_id: Optional[str]
+    leg_index: int
+    opening_order_id: Optional[str]
+    derived_from_lot_id: Optional[int] = None
+    derivation_type: Optional[str] = None
+    status: str = "OPEN"
+    persisted: bool = False  # True for lots seeded from existing rows
+    dirty: bool = False  # persisted lot whose remaining_quantity changed
+
+    def column_values(self) -> Dict:
+        return {
+            "transaction_id": self.transaction_id,
+            "account_number": self.account_number,
+            "symbol": self.symbol,
+            "underlying": self.underlying,
+            "instrument_type": self.instrument_type,
+            "option_type": self.option_type,
+            "strike": self.strike,
+            "expiration": self.expiration,
+            "quantity": self.quantity,
+            "entry_price": self.entry_price,
+            "entry_date": self.entry_date,
+            "remaining_quantity": self.remaining_quantity,
+            "original_quantity": self.original_quantity,
+            "chain_id": self.chain_id,
+            "leg_index": self.leg_index,
+            "opening_order_id": self.opening_order_id,
+            "derived_from_lot_id": self.derived_from_lot_id,
+            "derivation_type": self.derivation_type,
+            "status": self.status,
+        }
+
+
+@dataclass(slots=True)
+class BookClosing:
+    """A lot_closings row held in the book."""
+    closing_id: int
+    lot_id: int
+    closing_order_id: str
+    closing_transaction_id: Optional[str]
+    quantity_closed: int
+    closing_price: float
+    closing_date: str
+    closing_type: str
+    realized_pnl: float
+    resulting_lot_id: Optional[int] = None
+
+
+class LotBook:
+    """In-memory FIFO lot book with the LotManager write API used by Stage 3."""
+
+    def __init__(self):
+        self._new_lots: List[BookLot] = []
+        self._lots_by_id: Dict[int, BookLot] = {}
+        # (account_number, symbol) -> open lots, sorted by (entry_date, rank)
+        self._open: Dict[Tuple[str, str], List[BookLot]] = {}
+        self._open_keys: Dict[Tuple[str, str], List[tuple]] = {}
+        self._closings: List[BookClosing] = []
+        self._closings_by_lot: Dict[int, List[BookClosing]] = {}
+        # (account_number, symbol, closing_type) -> closings, creation order
+        self._closings_by_symbol: Dict[Tuple[str, str, str], List[BookClosing]] = {}
+        self._next_id = -1
+        self._next_closing_id = -1
+
+    # -------------------------------------------------------------------
+    # Seeding
+    # -------------------------------------------------------------------
+
+    def seed_open_lots(
+        self,
+        db_manager: "DatabaseManager",
+        keys: Iterable[Tuple[str, str]],
+    ) -> int:
+        """Load already-persisted open lots for the given (account, symbol) keys.
+
+        The orchestrator clears lots before Stage 3 so this normally finds
+        nothing; it keeps direct callers that process on top of existing
+        lots consistent with the DB-backed path.  Returns the count loaded.
+        """
+        from src.database.models import PositionLot as PL
+
+        keys = set(keys)
+        if not keys:
+            return 0
+        symbols = sorted({symbol for _, symbol in keys})
+
+        with db_manager.get_session() as session:
+            rows = (
+                session.query(PL)
+                .filter(
+                    PL.symbol.in_(symbols),
+                    PL.remaining_quantity != 0,
+                    PL.status != "CLOSED",
+                )
+                .order_by(PL.entry_date.asc(), PL.id.asc())
+                .all()
+            )
+            loaded = 0
+            for row in rows:
+                if (row.account_number, row.symbol) not in keys:
+                    continue
+                lot = BookLot(
+                    id=row.id,
+                    transaction_id=row.transaction_id,
+                    account_number=row.account_number,
+                    symbol=row.symbol,
+                    underlying=row.underlying or "",
+                    instrument_type=row.instrument_type or "",
+                    option_type=row.option_type,
+                    strike=row.strike,
+                    expiration=row.expiration,
+                    quantity=row.quantity,
+                    entry_price=row.entry_price,
+                    entry_date=row.entry_date,
+                    remaining_quantity=row.remaining_quantity,
+                    original_quantity=row.original_quantity or abs(row.quantity),
+                    chain_id=row.chain_id,
+                    leg_index=row.leg_index or 0,
+                    opening_order_id=row.opening_order_id,
+                    derived_from_lot_id=row.derived_from_lot_id,
+                    derivation_type=row.derivation_type,
+                    status=row.status or "OPEN",
+                    persisted=True,
+                )
+                self._lots_by_id[lot.id] = lot
+                self._insert_open(lot, (0, lot.id))
+                loaded += 1
+        return loaded
+
+    # -------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------
+
+    def _insert_open(self, lot: BookLot, rank: tuple) -> None:
+        key = (lot.account_number, lot.symbol)
+        sort_key = (lot.entry_date, rank)
+        keys = self._open_keys.setdefault(key, [])
+        idx = bisect.bisect_right(keys, sort_key)
+        keys.insert(idx, sort_key)
+        self._open.setdefault(key, []).insert(idx, lot)
+
+    def _add_lot(self, lot: BookLot) -> int:
+        self._new_lots.append(lot)
+        self._lots_by_id[lot.id] = lot
+        self._insert_open(lot, (1, -lot.id))
+        return lot.id
+
+    def _reserve_id(self) -> int:
+        lot_id = self._next_id
+        self._next_id -= 1
+        return lot_id
+
+    # -------------------------------------------------------------------
+    # LotManager-compatible write API
+    # -------------------------------------------------------------------
+
+    def create_lot(
+        self,
+        transaction: Dict,
+        chain_id: str,
+        leg_index: int = 0,
+        opening_order_id: Optional[str] = None,
+    ) -> int:
+        """Create a new lot from an opening transaction. Returns its book id."""
+        fields = LotManager.lot_fields_from_transaction(transaction)
+        lot = BookLot(
+            id=self._reserve_id(),
+            chain_id=chain_id,
+            leg_index=leg_index,
+            opening_order_id=opening_order_id,
+            **fields,
+        )
+        logger.debug(
+            "Booked lot %s: %s qty=%s chain=%s",
+            lot.id, lot.symbol, lot.quantity, chain_id,
+        )
+        return self._add_lot(lot)
+
+    def open_lot(
+        self,
+        tx: "Transaction",
+        chain_id: str,
+        leg_index: int = 0,
+        opening_order_id: Optional[str] = None,
+    ) -> int:
+        """create_lot() for an assembled Transaction, without a dict round-trip.
+
+        The assembler has already parsed the option fields from the symbol,
+        so they are used as-is; the stored values are the same as
+        lot_fields_from_transaction() derives.
+        """
+        symbol = tx.symbol or ""
+        underlying = tx.underlying_symbol or (symbol.split()[0] if " " in symbol else symbol)
+        quantity = abs(int(tx.quantity))
+        if "SELL_TO_OPEN" in (tx.action or "").upper():
+            quantity = -quantity
+        lot = BookLot(
+            id=self._reserve_id(),
+            transaction_id=tx.id,
+            account_number=tx.account_number,
+            symbol=symbol,
+            underlying=underlying,
+            instrument_type="EQUITY_OPTION" if tx.option_type else "EQUITY",
+            option_type=tx.option_type,
+            strike=tx.strike,
+            expiration=tx.expiration.isoformat() if tx.expiration else None,
+            quantity=quantity,
+            entry_price=float(tx.price),
+            entry_date=tx.executed_at.isoformat() if tx.executed_at else "",
+            remaining_quantity=quantity,
+            original_quantity=abs(quantity),
+            chain_id=chain_id,
+            leg_index=leg_index,
+            opening_order_id=opening_order_id,
+        )
+        logger.debug(
+            "Booked lot %s: %s qty=%s chain=%s",
+            lot.id, lot.symbol, lot.quantity, chain_id,
+        )
+        return self._add_lot(lot)
+
+    def close_lot_fifo(
+        self,
+        account_number: str,
+        symbol: str,
+        quantity_to_close: int,
+        closing_price: float,
+        closing_order_id: str,
+        closing_transaction_id: Optional[str],
+        closing_date: datetime,
+        closing_type: str = "MANUAL",
+        chain_id: Optional[str] = None,
+        close_long: Optional[bool] = None,
+    ) -> Tuple[float, List[int]]:
+        """Close lots using FIFO matching.
+
+        Returns:
+            Tuple of (total realized P&L, list of affected lot IDs)
+        """
+        total_pnl = 0.0
+        affected_lots: List[int] = []
+        remaining_to_close = abs(quantity_to_close)
+
+        key = (account_number, symbol)
+        queue = self._open.get(key)
+        if not queue:
+            return total_pnl, affected_lots
+        queue_keys = self._open_keys[key]
+        closing_date_str = LotManager.closing_date_str(closing_date)
+
+        idx = 0
+        while idx < len(queue) and remaining_to_close > 0:
+            lot = queue[idx]
+            if (
+                (close_long is True and lot.quantity <= 0)
+                or (close_long is False and lot.quantity >= 0)
+                or (chain_id and lot.chain_id != chain_id)
+            ):
+                idx += 1
+                continue
+
+            lot_available = abs(lot.remaining_quantity)
+            close_amount = min(remaining_to_close, lot_available)
+            pnl = LotManager.closing_pnl(
+                lot.quantity, lot.entry_price, closing_price,
+                close_amount, lot.option_type,
+            )
+            total_pnl += pnl
+
+            new_remaining = lot_available - close_amount
+            if lot.quantity < 0:
+                new_remaining = -new_remaining
+            lot.remaining_quantity = new_remaining
+            lot.status = "CLOSED" if new_remaining == 0 else "PARTIAL"
+            lot.dirty = lot.persisted
+
+            closing = BookClosing(
+                closing_id=self._next_closing_id,
+                lot_id=lot.id,
+                closing_order_id=closing_order_id,
+                closing_transaction_id=closing_transaction_id,
+                quantity_closed=close_amount,
+                closing_price=closing_price,
+                closing_date=closing_date_str,
+                closing_type=closing_type,
+                realized_pnl=pnl,
+            )
+            self._next_closing_id -= 1
+            self._closings.append(closing)
+            self._closings_by_lot.setdefault(lot.id, []).append(closing)
+            self._closings_by_symbol.setdefault(
+                (account_number, symbol, closing_type), [],
+            ).append(closing)
+
+            affected_lots.append(lot.id)
+            remaining_to_close -= close_amount
+            logger.debug("Closed %s from lot %s, P&L: $%.2f", close_amount, lot.id, pnl)
+
+            if new_remaining == 0:
+                del queue[idx]
+                del queue_keys[idx]
+            else:
+                idx += 1
+
+        return total_pnl, affected_lots
+
+    def create_derived_lot(
+        self,
+        source_lot_id: int,
+        stock_transaction: Dict,
+        derivation_type: str,
+        chain_id: str,
+        override_quantity: Optional[int] = None,
+    ) -> int:
+        """Create a derived stock lot (assignment/exercise). Returns its book id."""
+        symbol = stock_transaction.get("symbol", "")
+        underlying = stock_transaction.get("underlying_symbol", symbol)
+        raw_quantity = abs(int(stock_transaction.get("quantity", 0)))
+
+        source_lot = self._lots_by_id.get(source_lot_id)
+        entry_price = (float(source_lot.strike)
+                       if source_lot and source_lot.strike
+                       else float(stock_transaction.get("price", 0)))
+
+        if override_quantity is not None:
+            quantity = override_quantity
+        else:
+            source_option_type = source_lot.option_type if source_lot else None
+            if source_option_type and source_option_type.upper() == "CALL":
+                quantity = -raw_quantity
+            else:
+                quantity = raw_quantity
+
+        lot = BookLot(
+            id=self._reserve_id(),
+            transaction_id=stock_transaction.get("id", ""),
+            account_number=stock_transaction.get("account_number", ""),
+            symbol=symbol,
+            underlying=underlying,
+            instrument_type="EQUITY",
+            option_type=None,
+            strike=None,
+            expiration=None,
+            quantity=quantity,
+            entry_price=entry_price,
+            entry_date=stock_transaction.get("executed_at", ""),
+            remaining_quantity=quantity,
+            original_quantity=abs(quantity),
+            chain_id=chain_id,
+            leg_index=0,
+            opening_order_id=None,
+            derived_from_lot_id=source_lot_id,
+            derivation_type=derivation_type,
+        )
+        lot_id = self._add_lot(lot)
+
+        # Point the source's latest closing of this type at the new lot
+        matching = [
+            c for c in self._closings_by_lot.get(source_lot_id, ())
+            if c.closing_type == derivation_type
+        ]
+        if matching:
+            matching[-1].resulting_lot_id = lot_id
+
+        logger.info(
+            "Created derived lot %s from lot %s via %s",
+            lot_id, source_lot_id, derivation_type,
+        )
+        return lot_id
+
+    # -------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------
+
+    def get_open_lots(
+        self,
+        account_number: str,
+        symbol: Optional[str] = None,
+        chain_id: Optional[str] = None,
+        underlying: Optional[str] = None,
+    ) -> List[BookLot]:
+        """Open lots matching the criteria in FIFO order.
+
+        Same contract as LotManager.get_open_lots: without ``symbol``
+        every symbol in the account is included, merged by entry date.
+        """
+        if symbol:
+            lots = list(self._open.get((account_number, symbol), ()))
+        else:
+            ranked = [
+                (sort_key, lot)
+                for key, queue in self._open.items() if key[0] == account_number
+                for sort_key, lot in zip(self._open_keys[key], queue)
+            ]
+            ranked.sort(key=lambda pair: pair[0])
+            lots = [lot for _, lot in ranked]
+        if chain_id:
+            lots = [lot for lot in lots if lot.chain_id == chain_id]
+        if underlying:
+            lots = [lot for lot in lots if lot.underlying == underlying]
+        return lots
+
+    def find_unlinked_closing(
+        self,
+        account_number: str,
+        symbol: str,
+        closing_type: str,
+    ) -> Optional[Tuple[BookLot, BookClosing]]:
+        """Latest closing of ``closing_type`` on this option with no resulting lot.
+
+        Replaces the ``PositionLot JOIN LotClosing ... ORDER BY closing_date
+        DESC`` lookup the assignment/exercise handlers used to run.
+        """
+        best: Optional[BookClosing] = None
+        for closing in self._closings_by_symbol.get((account_number, symbol, closing_type), ()):
+            if closing.resulting_lot_id is not None:
+                continue
+            if best is None or closing.closing_date >= best.closing_date:
+                best = closing
+        if best is None:
+            return None
+        return self._lots_by_id[best.lot_id], best
+
+    def link_resulting_lot(
+        self,
+        source_lot_id: int,
+        closing_type: str,
+        resulting_lot_id: int,
+    ) -> bool:
+        """Set resulting_lot_id on the source lot's newest unlinked closing."""
+        for closing in reversed(self._closings_by_lot.get(source_lot_id, ())):
+            if closing.closing_type == closing_type and closing.resulting_lot_id is None:
+                closing.resulting_lot_id = resulting_lot_id
+                return True
+        return False
+
+    # -------------------------------------------------------------------
+    # Merging
+    # -------------------------------------------------------------------
+
+    def absorb(self, other: "LotBook") -> None:
+        """Move another book's unflushed lots and closings into this one.
+
+        Used by the parallel pipeline (see pipeline.parallel): each worker
+        books one partition, and the single writer merges the books before
+        one flush.  The other book's provisional ids are shifted past this
+        book's, which keeps their relative order — and so FIFO ranks and
+        insertion order — intact.  Books must cover disjoint
+        (account, symbol) keys.
+        """
+        lot_offset = self._next_id + 1
+        closing_offset = self._next_closing_id + 1
+
+        def shift(lot_id: Optional[int]) -> Optional[int]:
+            if lot_id is None or lot_id >= 0:
+                return lot_id  # persisted lot — real id
+            return lot_id + lot_offset
+
+        for lot in other._new_lots:
+            lot.id = shift(lot.id)
+            lot.derived_from_lot_id = shift(lot.derived_from_lot_id)
+            self._new_lots.append(lot)
+        for lot in other._lots_by_id.values():
+            self._lots_by_id[lot.id] = lot
+
+        for key, lots in other._open.items():
+            for lot in lots:
+                rank = (1, -lot.id) if lot.id < 0 else (0, lot.id)
+                self._insert_open(lot, rank)
+
+        for closing in other._closings:
+            closing.closing_id += closing_offset
+            closing.lot_id = shift(closing.lot_id)
+            closing.resulting_lot_id = shift(closing.resulting_lot_id)
+            self._closings.append(closing)
+        for lot_id, closings in other._closings_by_lot.items():
+            self._closings_by_lot[shift(lot_id)] = closings
+        for key, closings in other._closings_by_symbol.items():
+            self._closings_by_symbol.setdefault(key, []).extend(closings)
+
+        self._next_id += other._next_id + 1
+        self._next_closing_id += other._next_closing_id + 1
+
+    # -------------------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------------------
+
+    def flush(self, db_manager: "DatabaseManager") -> Tuple[int, int]:
+        """Write booked lots and closings in one session.
+
+        Primary keys for new lots are reserved up front so derived_from_lot_id
+        and resulting_lot_id can be written in the same bulk insert.
+
+        Returns (lots_written, closings_written).
+        """
+        from src.database.engine import bulk_insert, reserve_ids
+        from src.database.models import (
+            PositionLot as PositionLotModel,
+            LotClosing as LotClosingModel,
+        )
+
+        with db_manager.get_session() as session:
+            user_id = session.info.get("user_id")
+
+            for lot in self._lots_by_id.values():
+                if lot.persisted and lot.dirty:
+                    session.query(PositionLotModel).filter(
+                        PositionLotModel.id == lot.id,
+                    ).update(
+                        {"remaining_quantity": lot.remaining_quantity, "status": lot.status},
+                        synchronize_session=False,
+                    )
+
+            real_ids = reserve_ids(session, PositionLotModel, len(self._new_lots))
+            id_map = {lot.id: real_id for lot, real_id in zip(self._new_lots, real_ids)}
+
+            def resolve(lot_id: Optional[int]) -> Optional[int]:
+                if lot_id is None:
+                    return None
+                return id_map.get(lot_id, lot_id)
+
+            lot_rows = []
+            for lot in self._new_lots:
+                values = lot.column_values()
+                values["id"] = id_map[lot.id]
+                values["user_id"] = user_id
+                values["derived_from_lot_id"] = resolve(lot.derived_from_lot_id)
+                lot_rows.append(values)
+            bulk_insert(session, PositionLotModel, lot_rows)
+
+            bulk_insert(session, LotClosingModel, [
+                {
+                    "user_id": user_id,
+                    "lot_id": resolve(c.lot_id),
+                    "closing_order_id": c.closing_order_id,
+                    "closing_transaction_id": c.closing_transaction_id,
+                    "quantity_closed": c.quantity_closed,
+                    "closing_price": c.closing_price,
+                    "closing_date": c.closing_date,
+                    "closing_type": c.closing_type,
+                    "realized_pnl": c.realized_pnl,
+                    "resulting_lot_id": resolve(c.resulting_lot_id),
+                }
+                for c in self._closings
+            ])
+
+        # Swap provisional ids for real ones so callers can keep using the book
+        for lot in self._new_lots:
+            real_id = id_map[lot.id]
+            del self._lots_by_id[lot.id]
+            lot.id = real_id
+            lot.persisted = True
+            lot.dirty = False
+            self._lots_by_id[real_id] = lot
+
+        written = (len(self._new_lots), len(self._closings))
+        self._new_lots = []
+        self._closings = []
+        self._closings_by_lot = {}
+        self._closings_by_symbol = {}
+        return written
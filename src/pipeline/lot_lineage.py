@@ -21,9 +21,13 @@ of lot-level facts rather than its own stored truth.
 
 from __future__ import annotations
 
+import bisect
+import heapq
 import logging
-from collections import defaultdict
-from typing import TYPE_CHECKING, Dict, List, Tuple
+from collections import defaultdict, deque
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, select
 
 from src.database.models import (
     LotClosing as LotClosingModel,
@@ -32,6 +36,8 @@ from src.database.models import (
     PositionLot as PositionLotModel,
 )
 from src.database.tenant import DEFAULT_USER_ID
+from src.pipeline.group_ancestry import sync_group_ancestry
+from src.pipeline.partitions import Partition, partition_clause
 
 if TYPE_CHECKING:
     from src.database.db_manager import DatabaseManager
@@ -39,137 +45,247 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
-def _direction(lot) -> str:
-    return "long" if lot.quantity > 0 else "short"
+def _direction(quantity) -> str:
+    return "long" if quantity > 0 else "short"
+
 
+class _FreeSlots:
+    """Unpaired opens of one bucket, grouped by distinct strike.
 
-def detect_lot_lineage(db_manager: "DatabaseManager") -> int:
+    Empty strike slots are skipped with path-compressed "next live slot"
+    pointers in each direction, so finding a close's nearest strikes
+    stays near O(log n) however many opens have been paired off.
+    """
+
+    def __init__(self, opens: List[Tuple[float, int]]):
+        self.strikes = sorted({strike for strike, _ in opens})
+        slot_of = {strike: i for i, strike in enumerate(self.strikes)}
+        # Per slot: (open_index, lot_id) ascending; paired ones dropped lazily
+        self.queues: List[deque] = [deque() for _ in self.strikes]
+        for oi, (strike, oid) in enumerate(opens):
+            self.queues[slot_of[strike]].append((oi, oid))
+        n = len(self.strikes)
+        self._right = list(range(n + 1))     # live slot >= i (n: none)
+        self._left = list(range(n + 1))      # live slot <= i - 1, shifted by one (0: none)
+        self.used: Set[int] = set()
+
+    def _find(self, links: List[int], i: int) -> int:
+        root = i
+        while links[root] != root:
+            root = links[root]
+        while links[i] != root:
+            links[i], i = root, links[i]
+        return root
+
+    def right_of(self, i: int) -> Optional[int]:
+        j = self._find(self._right, i)
+        return j if j < len(self.strikes) else None
+
+    def left_of(self, i: int) -> Optional[int]:
+        j = self._find(self._left, i + 1)
+        return j - 1 if j > 0 else None
+
+    def first_free(self, slot: int, exclude_lot: int) -> Optional[int]:
+        """Lowest unpaired open index in ``slot`` other than ``exclude_lot``."""
+        queue = self.queues[slot]
+        while queue and queue[0][0] in self.used:
+            queue.popleft()
+        for oi, oid in queue:
+            if oi in self.used:
+                continue
+            if oid != exclude_lot:
+                return oi
+        return None
+
+    def take(self, slot: int, oi: int) -> None:
+        self.used.add(oi)
+        queue = self.queues[slot]
+        while queue and queue[0][0] in self.used:
+            queue.popleft()
+        if not queue:
+            self._right[slot] = slot + 1
+            self._left[slot + 1] = slot
+
+
+def _pair_bucket(
+    closes: List[Tuple[float, int]],
+    opens: List[Tuple[float, int]],
+) -> List[Tuple[int, int]]:
+    """Greedy closest-strike pairing of one bucket; returns (close_lot, open_lot) pairs.
+
+    Same result as sorting every (strike distance, close index, open
+    index) candidate and taking pairs whose sides are both still free,
+    but without building the closes x opens cross product: each close
+    keeps only its best free open (nearest strike slot on either side,
+    lowest open index on ties) in a heap, refreshed when that open is
+    taken. A lot never pairs with itself.
+    """
+    slots = _FreeSlots(opens)
+
+    def best(ci: int):
+        cstrike, cid = closes[ci]
+        pos = bisect.bisect_left(slots.strikes, cstrike)
+        found = None
+        for step, start, direction in ((slots.right_of, pos, 1), (slots.left_of, pos - 1, -1)):
+            slot = step(start)
+            while slot is not None:
+                oi = slots.first_free(slot, cid)
+                if oi is not None:
+                    key = (abs(cstrike - slots.strikes[slot]), oi)
+                    if found is None or key < found[:2]:
+                        found = (*key, slot)
+                    break
+                # Only the close's own lot is left here; look one slot further
+                slot = step(slot + direction)
+        return found
+
+    heap = []
+    for ci in range(len(closes)):
+        found = best(ci)
+        if found is not None:
+            distance, oi, slot = found
+            heap.append((distance, ci, oi, slot))
+    heapq.heapify(heap)
+
+    pairs: List[Tuple[int, int]] = []
+    while heap:
+        distance, ci, oi, slot = heapq.heappop(heap)
+        if oi in slots.used:
+            # Its best open went to a closer (or earlier) close; find the next
+            found = best(ci)
+            if found is not None:
+                heapq.heappush(heap, (found[0], ci, found[1], found[2]))
+            continue
+        slots.take(slot, oi)
+        pairs.append((closes[ci][1], opens[oi][1]))
+    return pairs
+
+
+def detect_lot_lineage(
+    db_manager: "DatabaseManager",
+    partitions: Optional[Set[Partition]] = None,
+) -> int:
     """Pair same-day compatible closes and opens at the lot level.
 
     For every (account, underlying, day, option_type, direction) bucket:
       - "closes" = lots with a MANUAL closing on `day` matching those attrs
-      - "opens"  = lots with `entry_date` on `day` matching those attrs
+      - "opens"  = lots with `entry_day` == `day` matching those attrs
       - Greedy closest-strike pairing; each lot pairs at most once
       - Excess on either side is unpaired (new business or simple close)
 
-    Sets ``position_lots.parent_lot_id`` on the open side. Resets
-    existing values first so re-detection is clean (idempotent within a
-    single pipeline run).
+    Sets ``position_lots.parent_lot_id`` on the open side. The pairing
+    is recomputed from scratch every run, but only lots whose parent
+    actually changed are written.
+
+    With ``partitions`` set only lots of those (account, underlying)
+    pairs are re-paired — buckets never cross partitions.
 
     Returns the number of pair links created.
     """
-    paired = 0
-
     with db_manager.get_session() as session:
         user_id = session.info.get("user_id", DEFAULT_USER_ID)
 
-        # Reset — lot-level detection is the source of truth, so any
-        # previously-set parent_lot_id is recomputed from raw events.
-        session.query(PositionLotModel).filter(
-            PositionLotModel.user_id == user_id,
-        ).update({PositionLotModel.parent_lot_id: None})
-        session.flush()
+        lot_filters = [PositionLotModel.user_id == user_id]
+        if partitions is not None:
+            lot_filters.append(partition_clause(
+                PositionLotModel.account_number, PositionLotModel.underlying, partitions,
+            ))
 
         # Build closes bucket. Only MANUAL closings count as roll
         # candidates per spec §2 (expiration / assignment / exercise
         # are mutually exclusive with rolls).
         closing_rows = (
-            session.query(LotClosingModel, PositionLotModel)
+            session.query(
+                LotClosingModel.closing_day,
+                PositionLotModel.id,
+                PositionLotModel.account_number,
+                PositionLotModel.underlying,
+                PositionLotModel.option_type,
+                PositionLotModel.quantity,
+                PositionLotModel.strike,
+            )
             .join(PositionLotModel, LotClosingModel.lot_id == PositionLotModel.id)
             .filter(
-                PositionLotModel.user_id == user_id,
+                *lot_filters,
                 LotClosingModel.closing_type == "MANUAL",
             )
+            .order_by(LotClosingModel.closing_id)
             .all()
         )
 
         # closes[(acct, undl, day, opt, dir)] = [(strike, lot_id), ...]
         closes_bucket: Dict[Tuple, List[Tuple[float, int]]] = defaultdict(list)
-        for closing, lot in closing_rows:
-            day = str(closing.closing_date)[:10]
-            key = (
-                lot.account_number, lot.underlying, day,
-                lot.option_type or "", _direction(lot),
-            )
-            closes_bucket[key].append((lot.strike or 0.0, lot.id))
-
-        if not closes_bucket:
-            return 0
-
-        # Build opens bucket — only fetch lots whose entry_date matches a
-        # bucketed day, by filtering on the days that actually appear as
-        # closing days.
-        days_of_interest = {key[2] for key in closes_bucket.keys()}
-        if not days_of_interest:
-            return 0
-
-        # SQLite/Postgres compat: use a per-day LIKE clause via OR.
-        # The set is small (one day per close event group) so a single
-        # IN-style filter on prefixes works via an OR of LIKEs. Simplest
-        # approach: pull all user lots and filter in Python — typical
-        # production volume is small enough not to matter.
-        all_lots = (
-            session.query(PositionLotModel)
-            .filter(PositionLotModel.user_id == user_id)
-            .all()
-        )
-        # Index by lot_id for back-reference during pairing.
-        lot_by_id: Dict[int, PositionLotModel] = {l.id: l for l in all_lots}
+        for day, lot_id, account, underlying, option_type, quantity, strike in closing_rows:
+            key = (account, underlying, day, option_type or "", _direction(quantity))
+            closes_bucket[key].append((strike or 0.0, lot_id))
 
+        # Opens bucket — only lots opened on a day that has a close, read
+        # through the (user_id, entry_day) index.
         opens_bucket: Dict[Tuple, List[Tuple[float, int]]] = defaultdict(list)
-        for lot in all_lots:
-            if not lot.entry_date:
-                continue
-            day = str(lot.entry_date)[:10]
-            if day not in days_of_interest:
-                continue
-            key = (
-                lot.account_number, lot.underlying, day,
-                lot.option_type or "", _direction(lot),
+        days_of_interest = sorted({key[2] for key in closes_bucket})
+        if days_of_interest:
+            open_rows = (
+                session.query(
+                    PositionLotModel.id,
+                    PositionLotModel.account_number,
+                    PositionLotModel.underlying,
+                    PositionLotModel.entry_day,
+                    PositionLotModel.option_type,
+                    PositionLotModel.quantity,
+                    PositionLotModel.strike,
+                )
+                .filter(
+                    *lot_filters,
+                    PositionLotModel.entry_day.in_(days_of_interest),
+                )
+                .order_by(PositionLotModel.id)
+                .all()
             )
-            opens_bucket[key].append((lot.strike or 0.0, lot.id))
+            for lot_id, account, underlying, entry_day, option_type, quantity, strike in open_rows:
+                key = (account, underlying, entry_day, option_type or "", _direction(quantity))
+                if key in closes_bucket:
+                    opens_bucket[key].append((strike or 0.0, lot_id))
 
-        # Pair per bucket.
+        parents: Dict[int, int] = {}
         for key, closes in closes_bucket.items():
-            opens = opens_bucket.get(key, [])
-            if not opens:
-                continue
-
-            # All (close_idx, open_idx, strike_distance) triples, sorted
-            # so the closest-strike pair is processed first. Ties broken
-            # deterministically by lot_id.
-            candidates = []
-            for ci, (cstrike, cid) in enumerate(closes):
-                for oi, (ostrike, oid) in enumerate(opens):
-                    if cid == oid:
-                        # Same lot opened-and-closed same-day — never
-                        # self-pair.
-                        continue
-                    distance = abs(cstrike - ostrike)
-                    candidates.append((distance, ci, oi, cid, oid))
-            candidates.sort()
-
-            close_used: set = set()
-            open_used: set = set()
-            for _dist, ci, oi, cid, oid in candidates:
-                if ci in close_used or oi in open_used:
-                    continue
-                open_lot = lot_by_id.get(oid)
-                if open_lot is None:
-                    continue
-                open_lot.parent_lot_id = cid
-                close_used.add(ci)
-                open_used.add(oi)
-                paired += 1
-
-        session.flush()
+            opens = opens_bucket.get(key)
+            if opens:
+                for close_id, open_id in _pair_bucket(closes, opens):
+                    parents[open_id] = close_id
+
+        # Lineage is recomputed from raw events every run; write only the
+        # lots whose parent differs from what's stored.
+        current = dict(
+            session.query(PositionLotModel.id, PositionLotModel.parent_lot_id)
+            .filter(*lot_filters, PositionLotModel.parent_lot_id.isnot(None))
+            .all()
+        )
+        changes = [
+            {"lot_id": lot_id, "parent": parents.get(lot_id)}
+            for lot_id in current.keys() | parents.keys()
+            if current.get(lot_id) != parents.get(lot_id)
+        ]
+        if changes:
+            table = PositionLotModel.__table__
+            session.execute(
+                table.update()
+                .where(table.c.id == bindparam("lot_id"))
+                .values(parent_lot_id=bindparam("parent")),
+                changes,
+            )
 
-    if paired:
-        logger.info("Lot lineage: paired %d open lots to predecessors", paired)
-    return paired
+    if parents:
+        logger.info(
+            "Lot lineage: paired %d open lots to predecessors (%d changed)",
+            len(parents), len(changes),
+        )
+    return len(parents)
 
 
-def derive_rolled_from_group_id(db_manager: "DatabaseManager") -> int:
+def derive_rolled_from_group_id(
+    db_manager: "DatabaseManager",
+    partitions: Optional[Set[Partition]] = None,
+) -> int:
     """Set position_groups.rolled_from_group_id from lot-level lineage.
 
     A target group has rolled_from = source iff:
@@ -180,6 +296,10 @@ def derive_rolled_from_group_id(db_manager: "DatabaseManager") -> int:
     Otherwise rolled_from is cleared. The lot-level lineage is the
     single source of truth.
 
+    With ``partitions`` set only groups of those (account, underlying)
+    pairs are re-derived; parent lots always sit in the same partition.
+    The group_ancestry closure table is re-synced for the same scope.
+
     Returns the number of groups whose rolled_from_group_id was changed.
     """
     changes = 0
@@ -187,24 +307,34 @@ def derive_rolled_from_group_id(db_manager: "DatabaseManager") -> int:
     with db_manager.get_session() as session:
         user_id = session.info.get("user_id", DEFAULT_USER_ID)
 
+        group_filters = [PositionGroup.user_id == user_id]
+        if partitions is not None:
+            group_filters.append(partition_clause(
+                PositionGroup.account_number, PositionGroup.underlying, partitions,
+            ))
+
         all_groups = (
             session.query(PositionGroup)
-            .filter(PositionGroup.user_id == user_id)
+            .filter(*group_filters)
             .all()
         )
         group_by_id: Dict[str, PositionGroup] = {g.group_id: g for g in all_groups}
 
         # transaction_id → group_id  (for finding parent lot's group)
-        gl_rows = (
+        gl_query = (
             session.query(PositionGroupLot.group_id, PositionGroupLot.transaction_id)
             .filter(PositionGroupLot.user_id == user_id)
-            .all()
         )
+        if partitions is not None:
+            gl_query = gl_query.filter(PositionGroupLot.group_id.in_(
+                select(PositionGroup.group_id).where(*group_filters)
+            ))
+        gl_rows = gl_query.all()
         group_by_txn: Dict[str, str] = {txn: gid for gid, txn in gl_rows}
 
         # group_id → list of PositionLot
         group_lots: Dict[str, List[PositionLotModel]] = defaultdict(list)
-        all_lot_rows = (
+        lot_query = (
             session.query(PositionGroupLot.group_id, PositionLotModel)
             .join(
                 PositionGroupLot,
@@ -212,8 +342,12 @@ def derive_rolled_from_group_id(db_manager: "DatabaseManager") -> int:
                 & (PositionGroupLot.user_id == PositionLotModel.user_id),
             )
             .filter(PositionLotModel.user_id == user_id)
-            .all()
         )
+        if partitions is not None:
+            lot_query = lot_query.filter(PositionGroupLot.group_id.in_(
+                select(PositionGroup.group_id).where(*group_filters)
+            ))
+        all_lot_rows = lot_query.all()
         for gid, lot in all_lot_rows:
             group_lots[gid].append(lot)
 
@@ -237,6 +371,8 @@ def derive_rolled_from_group_id(db_manager: "DatabaseManager") -> int:
                 changes += 1
 
         session.flush()
+        # Also picks up links set at group creation and deleted groups
+        sync_group_ancestry(session, user_id, partitions=partitions)
 
     if changes:
         logger.info("Derived rolled_from_group_id for %d groups", changes)
@@ -334,11 +470,11 @@ def build_chain_attribution(
         chain: List[str] = []
         cur = gid
         seen: set = set()
-        while cur and cur not in seen:
+        # A link to a group that no longer exists ends the chain there
+        while cur in group_map and cur not in seen:
             seen.add(cur)
             chain.append(cur)
-            parent_g = group_map.get(cur)
-            cur = parent_g.rolled_from_group_id if parent_g else None
+            cur = group_map[cur].rolled_from_group_id
         chain.reverse()
         if len(chain) >= 2:
             chains_by_leaf[gid] = chain
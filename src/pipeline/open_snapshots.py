@@ -0,0 +1,372 @@
+"""
+Open Position Snapshots — materialized Positions-page payload per open group.
+
+Rebuilds open_position_snapshots from position_groups, position_lots,
+lot_closings and roll_chain_summaries. Each row carries everything
+/api/open-chains used to derive per request: consolidated open legs,
+cost basis, realized P&L, the roll timeline and the roll chain summary.
+100% derived data, safe to delete-and-rebuild per partition.
+
+Two things stay request-time concerns and are applied by the reader
+(see visible_chain): option legs that expired since the snapshot was
+built are hidden, and tags are loaded live because they are edited
+outside the pipeline.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from collections import defaultdict
+from datetime import date
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set
+
+from src.database.models import (
+    LotClosing as LotClosingModel,
+    OpenPositionSnapshot,
+    PositionGroup,
+    PositionGroupLot,
+    PositionLot as PositionLotModel,
+    RollChainSummary,
+)
+from src.database.tenant import DEFAULT_USER_ID
+from src.pipeline.group_ancestry import chain_ancestors
+from src.pipeline.partitions import Partition, partition_clause
+from src.services.roll_timeline import compute_roll_timeline
+
+if TYPE_CHECKING:
+    from src.database.db_manager import DatabaseManager
+    from src.models.lot_manager import Lot, LotClosing, LotManager
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ('OPEN', 'ASSIGNED')
+
+
+def populate_open_snapshots(
+    db_manager: "DatabaseManager",
+    lot_manager: "LotManager",
+    partitions: Optional[Set[Partition]] = None,
+) -> int:
+    """Rebuild open_position_snapshots for open and assigned groups.
+
+    With ``partitions`` set only snapshots of those (account, underlying)
+    pairs are replaced. Must run after roll chain summaries, whose rows
+    are embedded in the snapshot.
+
+    Returns the number of snapshot rows created.
+    """
+    with db_manager.get_session() as session:
+        user_id = session.info.get("user_id", DEFAULT_USER_ID)
+
+        delete_q = session.query(OpenPositionSnapshot).filter(
+            OpenPositionSnapshot.user_id == user_id,
+        )
+        group_q = session.query(PositionGroup).filter(
+            PositionGroup.status.in_(OPEN_STATUSES),
+        )
+        if partitions is not None:
+            delete_q = delete_q.filter(partition_clause(
+                OpenPositionSnapshot.account_number, OpenPositionSnapshot.underlying, partitions,
+            ))
+            group_q = group_q.filter(partition_clause(
+                PositionGroup.account_number, PositionGroup.underlying, partitions,
+            ))
+        delete_q.delete(synchronize_session=False)
+        session.flush()
+
+        groups = [g.to_dict() for g in group_q.all()]
+        if not groups:
+            return 0
+        group_ids = [g['group_id'] for g in groups]
+
+        roll_chain_by_group = _load_roll_chains(session, user_id, groups)
+
+    lots_by_group = lot_manager.get_lots_for_groups_batch(group_ids)
+    all_lot_ids = [lot.id for lots in lots_by_group.values() for lot in lots]
+    closings_by_lot = lot_manager.get_lot_closings_batch(all_lot_ids) if all_lot_ids else {}
+
+    with db_manager.get_session() as session:
+        for g in groups:
+            payload = build_group_snapshot(
+                g, lots_by_group.get(g['group_id'], []), closings_by_lot,
+                roll_chain_by_group.get(g['group_id']),
+            )
+            session.add(OpenPositionSnapshot(
+                user_id=user_id,
+                group_id=g['group_id'],
+                account_number=g['account_number'],
+                underlying=g['underlying'],
+                status=g['status'],
+                opening_date=g['opening_date'],
+                snapshot=json.dumps(payload),
+            ))
+        session.flush()
+
+    return len(groups)
+
+
+def refresh_open_snapshots(
+    db_manager: "DatabaseManager",
+    lot_manager: "LotManager",
+    group_ids: Iterable[str],
+) -> int:
+    """Rebuild snapshots for the partitions holding ``group_ids``.
+
+    For edits made outside the pipeline (label overrides, moved lots,
+    deleted groups). Partitions are resolved from both the groups and
+    their existing snapshots, so a deleted group's row is dropped too.
+    """
+    group_ids = list(group_ids)
+    if not group_ids:
+        return 0
+    with db_manager.get_session() as session:
+        partitions: Set[Partition] = set()
+        for model in (PositionGroup, OpenPositionSnapshot):
+            rows = session.query(model.account_number, model.underlying).filter(
+                model.group_id.in_(group_ids),
+            ).distinct().all()
+            partitions.update((acct, undl) for acct, undl in rows)
+    if not partitions:
+        return 0
+    return populate_open_snapshots(db_manager, lot_manager, partitions=partitions)
+
+
+def _load_roll_chains(session, user_id: str, groups: List[Dict]) -> Dict[str, Dict]:
+    """Roll chain summaries for the given open groups, keyed by group id.
+
+    OPT-296: cumulative_realized_pnl is re-summed leg-by-leg over every
+    group in the chain so the payload matches the Roll Chain modal.
+    Every open group's ancestors come from one group_ancestry read.
+    """
+    group_ids = [g['group_id'] for g in groups]
+    roll_chain_by_group: Dict[str, Dict] = {}
+    rc_rows = session.query(RollChainSummary).filter(
+        RollChainSummary.current_group_id.in_(group_ids),
+    ).all()
+    for rc in rc_rows:
+        roll_chain_by_group[rc.current_group_id] = {
+            "root_group_id": rc.root_group_id,
+            "chain_length": rc.chain_length,
+            "roll_count": rc.roll_count,
+            "first_opened": rc.first_opened,
+            "last_rolled": rc.last_rolled,
+            "cumulative_premium": rc.cumulative_premium,
+            "cumulative_realized_pnl": rc.cumulative_realized_pnl,
+        }
+    if not roll_chain_by_group:
+        return roll_chain_by_group
+
+    chain_groups_by_open = chain_ancestors(session, roll_chain_by_group)
+    all_chain_gids: Set[str] = {gid for chain in chain_groups_by_open.values() for gid in chain}
+
+    realized_per_group: Dict[str, float] = defaultdict(float)
+    rows = session.query(
+        PositionGroupLot.group_id,
+        LotClosingModel.realized_pnl,
+    ).join(
+        PositionLotModel,
+        (PositionLotModel.transaction_id == PositionGroupLot.transaction_id)
+        & (PositionLotModel.user_id == user_id),
+    ).join(
+        LotClosingModel,
+        LotClosingModel.lot_id == PositionLotModel.id,
+    ).filter(
+        PositionGroupLot.group_id.in_(list(all_chain_gids)),
+    ).all()
+    for gid, realized in rows:
+        realized_per_group[gid] += realized or 0.0
+
+    for open_gid, chain in chain_groups_by_open.items():
+        roll_chain_by_group[open_gid]["cumulative_realized_pnl"] = sum(
+            realized_per_group.get(g, 0.0) for g in chain
+        )
+    return roll_chain_by_group
+
+
+def build_group_snapshot(
+    group: Dict,
+    lots: List["Lot"],
+    closings_by_lot: Dict[int, List["LotClosing"]],
+    roll_chain: Optional[Dict],
+) -> Dict:
+    """Derive the Positions-page view of one group from its lots.
+
+    Open option legs are consolidated by symbol/strike/expiration/direction
+    (OPT-142) but not filtered by expiration; the reader does that.
+    """
+    open_option_legs = []
+    open_equity_legs = []
+    cost_basis_total = 0.0
+    realized_pnl = 0.0
+    has_assignment = False
+
+    for lot in lots:
+        lot_closings = closings_by_lot.get(lot.id, [])
+        realized_pnl += sum(c.realized_pnl for c in lot_closings)
+
+        for c in lot_closings:
+            if c.closing_type in ('ASSIGNMENT', 'EXERCISE'):
+                has_assignment = True
+
+        if lot.derivation_type in ('ASSIGNMENT', 'EXERCISE'):
+            has_assignment = True
+
+        multiplier = 100 if lot.instrument_type == 'EQUITY_OPTION' else 1
+
+        if lot.entry_price and lot.original_quantity:
+            amount = abs(lot.entry_price) * abs(lot.original_quantity) * multiplier
+            if lot.quantity < 0:
+                cost_basis_total += amount
+            else:
+                cost_basis_total -= amount
+
+        for c in lot_closings:
+            if c.closing_price and c.quantity_closed:
+                c_amount = abs(c.closing_price) * abs(c.quantity_closed) * multiplier
+                if lot.quantity < 0:
+                    cost_basis_total -= c_amount
+                else:
+                    cost_basis_total += c_amount
+
+        if lot.remaining_quantity != 0 and lot.status != 'CLOSED':
+            qty = abs(lot.remaining_quantity)
+            qty_direction = 'Short' if lot.quantity < 0 else 'Long'
+            price = abs(lot.entry_price) if lot.entry_price else 0
+
+            if lot.instrument_type == 'EQUITY_OPTION':
+                leg_amount = price * qty * 100 if price else 0
+                leg_cost = leg_amount if qty_direction == 'Short' else -leg_amount
+                open_option_legs.append({
+                    "symbol": lot.symbol,
+                    "underlying": lot.underlying or group['underlying'],
+                    "instrument_type": lot.instrument_type,
+                    "option_type": lot.option_type,
+                    "strike": lot.strike,
+                    "expiration": str(lot.expiration) if lot.expiration else None,
+                    "quantity": qty,
+                    "quantity_direction": qty_direction,
+                    "opening_price": price,
+                    "cost_basis": leg_cost,
+                    "lot_id": lot.id,
+                })
+            elif lot.instrument_type == 'EQUITY':
+                leg_cost = (price * qty) if qty_direction == 'Short' else -(price * qty)
+                open_equity_legs.append({
+                    "symbol": lot.symbol,
+                    "underlying": lot.underlying or group['underlying'],
+                    "instrument_type": "EQUITY",
+                    "quantity": qty,
+                    "quantity_direction": qty_direction,
+                    "entry_price": price,
+                    "cost_basis": leg_cost,
+                    "lot_id": lot.id,
+                    "derivation_type": lot.derivation_type,
+                    # isoformat() matches how FastAPI encoded the datetime
+                    "entry_date": lot.entry_date.isoformat() if lot.entry_date else None,
+                })
+
+    # Consolidate legs with same symbol/strike/exp/direction (OPT-142)
+    consolidated = {}
+    for leg in open_option_legs:
+        key = (leg['symbol'], leg['strike'], leg['expiration'], leg['quantity_direction'])
+        if key in consolidated:
+            c = consolidated[key]
+            c['quantity'] += leg['quantity']
+            c['cost_basis'] += leg['cost_basis']
+        else:
+            consolidated[key] = {**leg}
+    for c in consolidated.values():
+        if c['quantity'] > 0:
+            c['opening_price'] = abs(c['cost_basis']) / c['quantity'] / 100
+        c['lot_id'] = c['symbol']
+    open_option_legs = list(consolidated.values())
+
+    # OPT-263/OPT-268: walk-and-balance same-expiration roll detection.
+    # Build a lots_data list in the shape compute_roll_timeline expects.
+    lots_data = []
+    for lot in lots:
+        lots_data.append({
+            'lot_id': lot.id,
+            'option_type': lot.option_type,
+            'strike': lot.strike,
+            'expiration': str(lot.expiration) if lot.expiration else None,
+            'quantity': lot.quantity,
+            'original_quantity': lot.original_quantity,
+            'remaining_quantity': lot.remaining_quantity,
+            'status': lot.status,
+            'entry_date': str(lot.entry_date) if lot.entry_date else None,
+            'entry_price': lot.entry_price,
+            'opening_fees': 0,
+            'leg_index': lot.leg_index,
+            'closings': [{
+                'closing_id': c.closing_id,
+                'closing_date': str(c.closing_date) if c.closing_date else None,
+                'closing_price': c.closing_price,
+                'quantity_closed': c.quantity_closed,
+                'closing_type': c.closing_type,
+                'fees': 0,
+            } for c in closings_by_lot.get(lot.id, [])],
+        })
+    roll_timeline = compute_roll_timeline(lots_data)
+
+    equity_summary = None
+    if open_equity_legs:
+        total_eq_qty = sum(
+            l['quantity'] * (1 if l['quantity_direction'] == 'Long' else -1)
+            for l in open_equity_legs
+        )
+        total_eq_cost = sum(abs(l['cost_basis']) for l in open_equity_legs)
+        equity_summary = {
+            "quantity": total_eq_qty,
+            "average_price": total_eq_cost / abs(total_eq_qty) if total_eq_qty != 0 else 0,
+            "cost_basis": total_eq_cost,
+        }
+
+    return {
+        "chain_id": group['group_id'],
+        "group_id": group['group_id'],
+        "underlying": group['underlying'],
+        "account_number": group['account_number'],
+        "strategy_type": group['strategy_label'] or 'Unknown',
+        "opening_date": group['opening_date'],
+        "chain_status": group['status'],
+        "realized_pnl": realized_pnl,
+        "cost_basis_total": cost_basis_total,
+        "roll_count": roll_timeline['roll_count'],
+        "current_strike_label": roll_timeline['current_strike_label'],
+        "roll_timeline": roll_timeline,
+        "has_assignment": has_assignment,
+        "open_legs": open_option_legs,
+        "equity_legs": open_equity_legs,
+        "equity_summary": equity_summary,
+        "roll_chain": roll_chain,
+    }
+
+
+def visible_chain(snapshot: Dict, today: Optional[date] = None) -> Optional[Dict]:
+    """Apply request-time rules to a stored snapshot.
+
+    Hides option legs that have expired since the snapshot was built
+    (they'll vanish on next sync) and relabels groups left holding only
+    shares. Returns None when nothing open remains.
+    """
+    today = today or date.today()
+    open_legs = []
+    for leg in snapshot['open_legs']:
+        if leg['expiration']:
+            try:
+                exp_date = date.fromisoformat(leg['expiration'][:10])
+            except (ValueError, TypeError):
+                exp_date = None
+            if exp_date and exp_date < today:
+                continue
+        open_legs.append(leg)
+
+    if not open_legs and not snapshot['equity_legs']:
+        return None
+
+    chain = {**snapshot, "open_legs": open_legs}
+    if not open_legs:
+        chain["strategy_type"] = "Shares"
+    return chain
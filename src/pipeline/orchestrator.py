@@ -10,16 +10,27 @@ Part of OPT-121.
 from __future__ import annotations
 
 import logging
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Dict, List, Optional, Set
 
+from src.pipeline.open_snapshots import populate_open_snapshots
 from src.pipeline.order_assembler import assemble_orders
+from src.pipeline.parallel import PIPELINE_WORKERS, build_lot_book, use_parallel
 from src.pipeline.position_ledger import process_lots
+from src.pipeline.roll_splitter import split_rolling_orders
 from src.pipeline.group_manager import GroupPersister
 from src.pipeline.lot_lineage import (
     derive_rolled_from_group_id,
     detect_lot_lineage,
 )
+from src.pipeline.partitions import (
+    Partition,
+    existing_partitions,
+    filter_transactions,
+    partition_of,
+    partitions_for,
+)
 from src.pipeline.pnl_events import populate_pnl_events
 from src.pipeline.roll_chain_summary import populate_roll_chain_summaries
 from src.services.ledger_service import net_opposing_equity_lots
@@ -34,8 +45,8 @@ logger = logging.getLogger(__name__)
 def _clear_groups(db_manager: "DatabaseManager") -> None:
     """Clear all position groups, group-lot links, tags, and notes for the current user."""
     from src.database.models import (
-        PositionGroup, PositionGroupLot, PositionGroupTag, PositionNote,
-        RollChainSummary,
+        ChainLotAttribution, GroupAncestry, OpenPositionSnapshot, PositionGroup,
+        PositionGroupLot, PositionGroupTag, PositionNote, RollChainSummary,
     )
     from src.database.tenant import DEFAULT_USER_ID
 
@@ -48,8 +59,11 @@ def _clear_groups(db_manager: "DatabaseManager") -> None:
             PositionNote.user_id == user_id,
         ).delete(synchronize_session=False)
         session.query(RollChainSummary).filter(RollChainSummary.user_id == user_id).delete()
+        session.query(ChainLotAttribution).filter(ChainLotAttribution.user_id == user_id).delete()
+        session.query(OpenPositionSnapshot).filter(OpenPositionSnapshot.user_id == user_id).delete()
+        session.query(GroupAncestry).filter(GroupAncestry.user_id == user_id).delete()
         session.query(PositionGroup).filter(PositionGroup.user_id == user_id).delete()
-        logger.info("Cleared all groups, group-lot links, tags, roll chain summaries, and group notes (user-scoped)")
+        logger.info("Cleared all groups, group-lot links, tags, roll chain summaries and attributions, open snapshots, group ancestry, and group notes (user-scoped)")
 
 
 @dataclass
@@ -60,6 +74,81 @@ class PipelineResult:
     equity_lots_netted: int
     pnl_events_populated: int = 0
     roll_chain_summaries: int = 0
+    open_snapshots: int = 0
+    # Wall time per stage in run order; left out of equality so runs compare by counts
+    stage_seconds: Dict[str, float] = field(default_factory=dict, compare=False)
+
+
+class _StageClock:
+    """Wall time per pipeline stage, recorded as each one finishes."""
+
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.seconds[stage] = now - self._last
+        self._last = now
+
+
+def _resolve_partitions(
+    db_manager: "DatabaseManager",
+    raw_transactions: List[Dict],
+    affected_underlyings: Optional[Set[str]],
+    account_number: Optional[str],
+) -> Optional[Set[Partition]]:
+    """Dirty partitions implied by the legacy scoping arguments.
+
+    Partitions that already hold lots are included too, so a partition
+    whose transactions are gone still gets its stale lots cleared.
+    Returns None for a full rebuild.
+    """
+    if account_number:
+        account_txs = [t for t in raw_transactions if t.get('account_number') == account_number]
+        return partitions_for(account_txs) | existing_partitions(
+            db_manager, account_number=account_number,
+        )
+    if affected_underlyings:
+        return partitions_for(raw_transactions, affected_underlyings) | existing_partitions(
+            db_manager, underlyings=affected_underlyings,
+        )
+    return None
+
+
+def _assemble_and_process_lots(
+    db_manager: "DatabaseManager",
+    lot_manager: "LotManager",
+    raw_transactions: List[Dict],
+    partitions: Optional[Set[Partition]],
+) -> int:
+    """Serial Stages 2–3. Returns the number of orders assembled."""
+    # ── Step 2: Order Assembly (stateless) ─────────────────────────────
+    assembly = assemble_orders(raw_transactions)
+    orders_assembled = len(assembly.orders)
+    logger.info("Stage 2: assembled %d orders", orders_assembled)
+
+    # ── Step 2.5: Split compound rolling orders ──────────────────────
+    assembly.orders = split_rolling_orders(assembly.orders)
+    if len(assembly.orders) != orders_assembled:
+        logger.info("Stage 2.5: split rolling orders → %d orders", len(assembly.orders))
+
+    # ── Step 3: Lot operations (position_ledger) ──────────────────────
+    # Transactions were already narrowed to the dirty partitions.
+    process_lots(
+        assembly.orders,
+        assembly.assignment_stock_transactions,
+        lot_manager,
+        db_manager,
+    )
+    if partitions is not None:
+        logger.info(
+            "Stage 3: incremental lot processing for %d partitions (%d orders)",
+            len(partitions), len(assembly.orders),
+        )
+    else:
+        logger.info("Stage 3: full lot processing for %d orders", len(assembly.orders))
+    return orders_assembled
 
 
 def reprocess(
@@ -68,26 +157,41 @@ def reprocess(
     raw_transactions: List[Dict],
     affected_underlyings: Optional[Set[str]] = None,
     account_number: Optional[str] = None,
+    partitions: Optional[Set[Partition]] = None,
+    workers: Optional[int] = None,
 ) -> PipelineResult:
     """Run the full processing pipeline on raw transactions.
 
     Stages:
-      1. Clear lots (full or incremental)
+      1. Clear lots (full, or only the dirty partitions)
       2. OrderAssembler.assemble_orders() — produces typed Order objects
       3. position_ledger.process_lots() — creates lots, closings
+         (2–3 run per partition in a process pool when workers > 1)
       4. Equity netting (before groups, so groups see final lot states)
       5. GroupPersister.process_groups() — expiration-based grouping with strategy labels
       6. P&L Events (denormalized fact table)
+      7. Roll chain summaries
+      8. Open position snapshots (Positions page payload)
+
+    In incremental mode every stage is handed the set of dirty
+    (account_number, underlying) partitions and recomputes only those
+    (see pipeline.partitions); everything else is left untouched. Groups,
+    tags and notes in dirty partitions are kept and re-routed, as before.
 
     Parameters:
         db_manager: Database manager instance
         lot_manager: LotManager instance
-        raw_transactions: Raw transaction dicts from DB
+        raw_transactions: Raw transactions from DB (dicts or
+            DatabaseManager.iter_raw_transactions rows)
         affected_underlyings: If set, only reprocess these underlyings (incremental)
         account_number: If set, only reprocess this account (account-scoped import)
+        partitions: If set, only reprocess these (account_number, underlying)
+            pairs. Takes precedence over affected_underlyings/account_number.
+        workers: Process-pool size for Stages 2–3 (see pipeline.parallel).
+            Defaults to PIPELINE_WORKERS; 0 or 1 runs serially.
 
     Returns:
-        PipelineResult with counts for each stage
+        PipelineResult with counts and wall time for each stage
     """
     if not raw_transactions:
         logger.info("No transactions to process — returning empty result")
@@ -97,17 +201,20 @@ def reprocess(
             equity_lots_netted=0,
         )
 
+    clock = _StageClock()
+    if partitions is None:
+        partitions = _resolve_partitions(
+            db_manager, raw_transactions, affected_underlyings, account_number,
+        )
+    clock.lap("partitions")
+
     # ── Step 1: Clear existing state ──────────────────────────────────
-    if account_number:
-        # Account-scoped: filter transactions and clear only that account's lots
-        raw_transactions = [t for t in raw_transactions if t.get('account_number') == account_number]
-        lot_manager.clear_all_lots(account_number=account_number)
-        logger.info("Cleared lots for account %s (%d transactions)", account_number, len(raw_transactions))
-    elif affected_underlyings:
-        lot_manager.clear_all_lots(underlyings=affected_underlyings)
+    if partitions is not None:
+        raw_transactions = filter_transactions(raw_transactions, partitions)
+        lot_manager.clear_all_lots(partitions=partitions)
         logger.info(
-            "Cleared lots for %d affected underlyings",
-            len(affected_underlyings),
+            "Cleared lots for %d dirty partitions (%d transactions)",
+            len(partitions), len(raw_transactions),
         )
     else:
         lot_manager.clear_all_lots()
@@ -115,51 +222,34 @@ def reprocess(
         # (prevents stale group-lot links from old grouping logic)
         _clear_groups(db_manager)
         logger.info("Cleared lots and groups for full reprocessing")
+    clock.lap("clear")
 
-    # ── Step 2: Order Assembly (stateless) ─────────────────────────────
-    assembly = assemble_orders(raw_transactions)
-    orders_assembled = len(assembly.orders)
-    logger.info("Stage 2: assembled %d orders", orders_assembled)
-
-    # ── Step 2.5: Split compound rolling orders ──────────────────────
-    from src.pipeline.roll_splitter import split_rolling_orders
-    assembly.orders = split_rolling_orders(assembly.orders)
-    if len(assembly.orders) != orders_assembled:
-        logger.info("Stage 2.5: split rolling orders → %d orders", len(assembly.orders))
-
-    # ── Step 3: Lot operations (position_ledger) ──────────────────────
-    if affected_underlyings:
-        filtered_orders = [
-            o for o in assembly.orders
-            if o.underlying in affected_underlyings
-        ]
-        filtered_stock_txs = [
-            tx for tx in assembly.assignment_stock_transactions
-            if tx.get("underlying_symbol", tx.get("symbol", "")) in affected_underlyings
-        ]
-        process_lots(
-            filtered_orders,
-            filtered_stock_txs,
-            lot_manager,
-            db_manager,
-        )
+    # ── Steps 2–3: Order assembly, roll splitting, lot operations ─────
+    if workers is None:
+        workers = PIPELINE_WORKERS
+    partition_count = len({partition_of(t) for t in raw_transactions})
+    if use_parallel(workers, partition_count):
+        # Pure per-partition work in a process pool; this process is the
+        # single writer for the merged lot book.
+        orders_assembled, book = build_lot_book(raw_transactions, workers)
+        lots_written, closings_written = book.flush(db_manager)
         logger.info(
-            "Stage 3: incremental lot processing for %d underlyings (%d orders)",
-            len(affected_underlyings), len(filtered_orders),
+            "Stage 3: wrote %d lots and %d closings from %d partitions",
+            lots_written, closings_written, partition_count,
         )
     else:
-        process_lots(
-            assembly.orders,
-            assembly.assignment_stock_transactions,
-            lot_manager,
-            db_manager,
+        orders_assembled = _assemble_and_process_lots(
+            db_manager, lot_manager, raw_transactions, partitions,
         )
-        logger.info("Stage 3: full lot processing for %d orders", len(assembly.orders))
+    clock.lap("lots")
 
     # ── Step 4: Equity netting (before groups, so groups see final lot states)
-    equity_lots_netted = net_opposing_equity_lots(db=db_manager, lot_manager=lot_manager)
+    equity_lots_netted = net_opposing_equity_lots(
+        db=db_manager, lot_manager=lot_manager, partitions=partitions,
+    )
     if equity_lots_netted:
         logger.info("Stage 4: equity netting closed %d lot sides", equity_lots_netted)
+    clock.lap("equity_netting")
 
     # ── Step 4b: Lot-level roll lineage (OPT-284 Phase 2) ─────────────
     # Pairs same-day, structurally compatible closes/opens at the lot
@@ -167,27 +257,39 @@ def reprocess(
     # truth for chain lineage. Must run BEFORE group routing (OPT-287)
     # so the router can consult parent_lot_id and refuse to merge rolled
     # opens into unrelated same-expiration sibling groups.
-    lots_paired = detect_lot_lineage(db_manager)
+    lots_paired = detect_lot_lineage(db_manager, partitions=partitions)
     logger.info("Stage 4b: paired %d lots into lineage", lots_paired)
+    clock.lap("lot_lineage")
 
     # ── Step 5: Group Manager (strategy + persistence) ────────────────
     persister = GroupPersister(db_manager, lot_manager)
-    groups_processed = persister.process_groups(account_number=account_number)
+    groups_processed = persister.process_groups(partitions=partitions)
     logger.info("Stage 5: processed %d groups", groups_processed)
+    clock.lap("groups")
 
     # ── Step 5c: Derive rolled_from_group_id from lot lineage ─────────
     # position_groups.rolled_from_group_id is a derived view of
-    # position_lots.parent_lot_id, computed once groups exist.
-    rolled_from_changes = derive_rolled_from_group_id(db_manager)
+    # position_lots.parent_lot_id, computed once groups exist. The
+    # group_ancestry closure table is re-synced alongside.
+    rolled_from_changes = derive_rolled_from_group_id(db_manager, partitions=partitions)
     logger.info("Stage 5c: updated rolled_from_group_id on %d groups", rolled_from_changes)
+    clock.lap("rolled_from")
 
     # ── Step 6: P&L Events (denormalized fact table) ──────────────────
-    pnl_events_count = populate_pnl_events(db_manager)
+    pnl_events_count = populate_pnl_events(db_manager, partitions=partitions)
     logger.info("Stage 6: populated %d pnl_events", pnl_events_count)
+    clock.lap("pnl_events")
 
     # ── Step 7: Roll Chain Summaries ───────────────────────────────────
-    roll_chain_count = populate_roll_chain_summaries(db_manager)
+    roll_chain_count = populate_roll_chain_summaries(db_manager, partitions=partitions)
     logger.info("Stage 7: populated %d roll_chain_summaries", roll_chain_count)
+    clock.lap("roll_chain_summaries")
+
+    # ── Step 8: Open Position Snapshots ───────────────────────────────
+    # Embeds roll chain summaries, so must run after Step 7.
+    open_snapshot_count = populate_open_snapshots(db_manager, lot_manager, partitions=partitions)
+    logger.info("Stage 8: populated %d open_position_snapshots", open_snapshot_count)
+    clock.lap("open_snapshots")
 
     return PipelineResult(
         orders_assembled=orders_assembled,
@@ -195,4 +297,6 @@ def reprocess(
         equity_lots_netted=equity_lots_netted,
         pnl_events_populated=pnl_events_count,
         roll_chain_summaries=roll_chain_count,
+        open_snapshots=open_snapshot_count,
+        stage_seconds=clock.seconds,
     )
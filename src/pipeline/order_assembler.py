@@ -16,6 +16,7 @@ import logging
 
 # Re-export dataclasses from order_processor (no duplication during migration)
 from src.models.order_processor import Transaction, Order, OrderType
+from src.utils.option_symbols import parse_option_symbol
 
 logger = logging.getLogger(__name__)
 
@@ -161,31 +162,11 @@ def preprocess_transactions(
         if (
             "OPTION" in instrument_type_str.upper() or "option" in instrument_type_str
         ) and " " in symbol:
-            parts = symbol.split()
-            if len(parts) >= 2:
-                option_part = parts[1]
-                if len(option_part) >= 8:
-                    # Extract date
-                    date_str = option_part[:6]
-                    try:
-                        expiration = datetime.strptime(
-                            "20" + date_str, "%Y%m%d"
-                        ).date()
-                    except Exception:
-                        pass
-
-                    # Extract type
-                    if len(option_part) > 6:
-                        option_type = (
-                            "Call" if option_part[6] == "C" else "Put"
-                        )
-
-                    # Extract strike
-                    if len(option_part) > 7:
-                        try:
-                            strike = float(option_part[7:]) / 1000
-                        except Exception:
-                            pass
+            contract = parse_option_symbol(symbol)
+            if contract is not None:
+                option_type = contract.option_type
+                strike = contract.strike
+                expiration = contract.expiration
 
         # Create Transaction object
         tx = Transaction(
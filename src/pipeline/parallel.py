@@ -0,0 +1,103 @@
+"""
+Parallel Stage 2–3 — per-partition order assembly and lot booking in a
+process pool.
+
+Order assembly, roll splitting and the Stage 3 lot pass never look
+outside one (account_number, underlying) partition (see partitions.py),
+and none of them needs the database once the orchestrator has cleared
+the partitions being rebuilt.  So the raw transactions are bucketed by
+partition and each bucket is assembled and booked into its own LotBook
+in a worker process.
+
+The workers never touch the database.  The parent is the single writer:
+it merges the returned books (LotBook.absorb) and flushes them in one
+bulk insert.  Equity netting, lineage and group routing read and write
+the database and stay in the parent, scoped to the same partitions.
+
+Enabled with ``PIPELINE_WORKERS`` (or ``reprocess(workers=...)``);
+small runs stay serial since forking workers costs more than it saves.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from src.pipeline.lot_book import LotBook
+from src.pipeline.order_assembler import assemble_orders
+from src.pipeline.partitions import Partition, partition_of
+from src.pipeline.position_ledger import book_lots
+from src.pipeline.roll_splitter import split_rolling_orders
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "PIPELINE_WORKERS",
+    "PARALLEL_MIN_PARTITIONS",
+    "use_parallel",
+    "build_lot_book",
+]
+
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "0"))
+# Below this many partitions the serial path is faster than the pool.
+PARALLEL_MIN_PARTITIONS = 8
+
+
+def use_parallel(workers: Optional[int], partition_count: int) -> bool:
+    """Whether a run over ``partition_count`` partitions should use the pool."""
+    return bool(workers and workers > 1 and partition_count >= PARALLEL_MIN_PARTITIONS)
+
+
+def _book_partition(raw_transactions: List[Dict]) -> Tuple[int, LotBook]:
+    """Worker: Stages 2, 2.5 and 3 for one partition. Returns
+    (orders assembled, booked lots)."""
+    assembly = assemble_orders(raw_transactions)
+    orders_assembled = len(assembly.orders)
+    orders = split_rolling_orders(assembly.orders)
+    book = book_lots(orders, assembly.assignment_stock_transactions)
+    return orders_assembled, book
+
+
+def _bucket_by_partition(raw_transactions: List[Dict]) -> Dict[Partition, List[Dict]]:
+    buckets: Dict[Partition, List[Dict]] = defaultdict(list)
+    for tx in raw_transactions:
+        buckets[partition_of(tx)].append(tx)
+    return buckets
+
+
+def build_lot_book(
+    raw_transactions: List[Dict],
+    workers: int,
+) -> Tuple[int, LotBook]:
+    """Assemble and book every partition in a process pool.
+
+    Returns (total orders assembled, merged LotBook ready to flush).
+    Buckets keep the input order of their transactions, so each worker
+    sees exactly the subsequence the serial pass would process for it.
+    """
+    buckets = _bucket_by_partition(raw_transactions)
+    # Largest buckets first so one big underlying doesn't finish last.
+    ordered = sorted(buckets.items(), key=lambda item: (-len(item[1]), item[0]))
+    chunksize = max(1, len(ordered) // (workers * 4))
+
+    merged = LotBook()
+    orders_assembled = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(
+            _book_partition, [txs for _, txs in ordered], chunksize=chunksize,
+        )
+        # Merge in partition order so provisional ids are deterministic
+        by_partition = dict(zip((key for key, _ in ordered), results))
+    for key in sorted(by_partition):
+        count, book = by_partition[key]
+        orders_assembled += count
+        merged.absorb(book)
+
+    logger.info(
+        "Parallel Stage 2-3: %d partitions across %d workers, %d orders",
+        len(ordered), workers, orders_assembled,
+    )
+    return orders_assembled, merged
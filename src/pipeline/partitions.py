@@ -0,0 +1,133 @@
+"""
+Dirty partitions — the unit of incremental reprocessing.
+
+Every artifact the pipeline derives is local to one (account_number,
+underlying) pair:
+
+  - orders are assembled per (account, underlying, order_id)
+  - lots, closings and pnl_events carry their account + underlying
+  - groups never span underlyings, and routing only consults groups of
+    the same account + underlying
+  - lineage buckets are keyed by (account, underlying, day, ...), so
+    rolled_from links and roll chains stay inside one partition
+
+So a sync only has to recompute the partitions its new transactions
+touch; the rest of the user's history is left as-is.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import tuple_
+
+if TYPE_CHECKING:
+    from src.database.db_manager import DatabaseManager
+
+__all__ = [
+    "Partition",
+    "underlying_of",
+    "partition_of",
+    "partitions_for",
+    "saved_partitions",
+    "filter_transactions",
+    "partition_clause",
+    "existing_partitions",
+]
+
+Partition = Tuple[str, str]  # (account_number, underlying)
+
+
+def underlying_of(raw_tx: Dict) -> str:
+    """Underlying a raw transaction's lots will be filed under.
+
+    Mirrors order_assembler and LotManager.lot_fields_from_transaction:
+    symbol-change open legs move to the new ticker (taken from their own
+    symbol); everything else uses underlying_symbol, falling back to the
+    symbol root.
+    """
+    symbol = raw_tx.get("symbol") or ""
+    sub_type = str(raw_tx.get("transaction_sub_type") or "").upper()
+    action = str(raw_tx.get("action") or "").upper().replace(" ", "_")
+    if sub_type == "SYMBOL_CHANGE" and "TO_OPEN" in action and symbol:
+        return symbol.split()[0]
+
+    underlying = raw_tx.get("underlying_symbol")
+    if underlying:
+        return underlying
+    return symbol.split()[0] if symbol else ""
+
+
+def partition_of(raw_tx: Dict) -> Partition:
+    return (raw_tx.get("account_number") or "", underlying_of(raw_tx))
+
+
+def partitions_for(
+    raw_transactions: Iterable[Dict],
+    underlyings: Optional[Set[str]] = None,
+) -> Set[Partition]:
+    """Partitions touched by the given transactions, optionally limited to
+    a set of underlyings."""
+    result: Set[Partition] = set()
+    for tx in raw_transactions:
+        part = partition_of(tx)
+        if not part[1]:
+            continue
+        if underlyings is not None and part[1] not in underlyings:
+            continue
+        result.add(part)
+    return result
+
+
+def saved_partitions(
+    transactions: Iterable[Dict],
+    saved_underlyings: Set[str],
+) -> Set[Partition]:
+    """Dirty partitions after a sync.
+
+    ``saved_underlyings`` is what DatabaseManager.save_raw_transactions
+    reports for newly inserted rows (underlying_symbol roots). Matching on
+    the same key and then mapping through partition_of also catches
+    symbol-change open legs, which land in the new ticker's partition.
+    """
+    touched = []
+    for tx in transactions:
+        underlying = tx.get("underlying_symbol") or ""
+        if underlying and underlying.split()[0] in saved_underlyings:
+            touched.append(tx)
+    return partitions_for(touched)
+
+
+def filter_transactions(
+    raw_transactions: Iterable[Dict],
+    partitions: Set[Partition],
+) -> List[Dict]:
+    """Keep only the raw transactions that belong to ``partitions``."""
+    return [tx for tx in raw_transactions if partition_of(tx) in partitions]
+
+
+def partition_clause(account_column, underlying_column, partitions: Set[Partition]):
+    """SQL filter ``(account, underlying) IN (...)`` for a partition set."""
+    return tuple_(account_column, underlying_column).in_(sorted(partitions))
+
+
+def existing_partitions(
+    db_manager: "DatabaseManager",
+    *,
+    underlyings: Optional[Set[str]] = None,
+    account_number: Optional[str] = None,
+) -> Set[Partition]:
+    """Partitions that currently hold lots, filtered by underlying or account.
+
+    Lets the orchestrator also rebuild partitions whose transactions have
+    disappeared, so their stale lots and groups get cleared.
+    """
+    from src.database.models import PositionLot
+
+    with db_manager.get_session() as session:
+        q = session.query(PositionLot.account_number, PositionLot.underlying).distinct()
+        if underlyings:
+            q = q.filter(PositionLot.underlying.in_(list(underlyings)))
+        if account_number:
+            q = q.filter(PositionLot.account_number == account_number)
+        return {(acct, undl or "") for acct, undl in q.all()}
@@ -4,23 +4,32 @@ P&L Events — denormalized fact table population.
 Rebuilds pnl_events from lot_closings + position_lots + position_group_lots.
 100% derived data, safe to delete-and-rebuild on every pipeline run.
 
+pnl_rollups is rebuilt from the same partitions right after: events
+summed per (account, underlying, close day, group) with the group's
+strategy label, so the report endpoints read date ranges on an index
+instead of grouping raw events per request.
+
 Part of OPT-176.
 """
 
 from __future__ import annotations
 
 import logging
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional, Set
 
 from sqlalchemy import func
 
+from src.database.engine import bulk_insert
 from src.database.models import (
     LotClosing as LotClosingModel,
     PnlEvent,
+    PnlRollup,
+    PositionGroup,
     PositionGroupLot,
     PositionLot as PositionLotModel,
 )
 from src.database.tenant import DEFAULT_USER_ID
+from src.pipeline.partitions import Partition, partition_clause
 
 if TYPE_CHECKING:
     from src.database.db_manager import DatabaseManager
@@ -28,11 +37,16 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
-def populate_pnl_events(db_manager: "DatabaseManager") -> int:
+def populate_pnl_events(
+    db_manager: "DatabaseManager",
+    partitions: Optional[Set[Partition]] = None,
+) -> int:
     """Delete and rebuild all pnl_events for the current user.
 
     Joins LotClosing -> PositionLot for immutable facts, and
     LEFT JOINs PositionGroupLot for group_id (nullable for orphans).
+    With ``partitions`` set only events of those (account, underlying)
+    pairs are rebuilt.
 
     Returns the number of events inserted.
     """
@@ -40,14 +54,17 @@ def populate_pnl_events(db_manager: "DatabaseManager") -> int:
         user_id = session.info.get("user_id", DEFAULT_USER_ID)
 
         # Delete all existing events for this user
-        deleted = session.query(PnlEvent).filter(
-            PnlEvent.user_id == user_id,
-        ).delete(synchronize_session=False)
+        delete_q = session.query(PnlEvent).filter(PnlEvent.user_id == user_id)
+        if partitions is not None:
+            delete_q = delete_q.filter(partition_clause(
+                PnlEvent.account_number, PnlEvent.underlying, partitions,
+            ))
+        deleted = delete_q.delete(synchronize_session=False)
         if deleted:
             logger.debug("Deleted %d existing pnl_events", deleted)
 
         # Query all closings with lot data and optional group_id
-        rows = (
+        query = (
             session.query(
                 LotClosingModel.closing_id,
                 LotClosingModel.lot_id,
@@ -69,11 +86,16 @@ def populate_pnl_events(db_manager: "DatabaseManager") -> int:
                 PositionLotModel.transaction_id,
             )
             .join(PositionLotModel, LotClosingModel.lot_id == PositionLotModel.id)
-            .all()
         )
+        if partitions is not None:
+            query = query.filter(partition_clause(
+                PositionLotModel.account_number, PositionLotModel.underlying, partitions,
+            ))
+        rows = query.all()
 
         if not rows:
             logger.info("No lot closings found — pnl_events empty")
+            _rebuild_rollups(session, user_id, partitions)
             return 0
 
         # Build transaction_id -> group_id lookup
@@ -87,31 +109,98 @@ def populate_pnl_events(db_manager: "DatabaseManager") -> int:
         ).all()
         txn_to_group = {txn_id: group_id for txn_id, group_id in group_links}
 
-        # Bulk insert
-        events = []
-        for r in rows:
-            events.append(PnlEvent(
-                user_id=user_id,
-                closing_id=r.closing_id,
-                lot_id=r.lot_id,
-                group_id=txn_to_group.get(r.transaction_id),
-                account_number=r.account_number,
-                underlying=r.underlying,
-                symbol=r.symbol,
-                instrument_type=r.instrument_type,
-                option_type=r.option_type,
-                strike=r.strike,
-                expiration=r.expiration,
-                entry_date=r.entry_date,
-                entry_price=r.entry_price,
-                closing_date=r.closing_date,
-                closing_price=r.closing_price,
-                closing_type=r.closing_type,
-                quantity_closed=r.quantity_closed,
-                realized_pnl=r.realized_pnl,
-                is_roll=r.resulting_lot_id is not None,
-            ))
-
-        session.add_all(events)
-        logger.info("Populated %d pnl_events", len(events))
-        return len(events)
+        # Bulk insert (COPY on PostgreSQL, executemany on SQLite)
+        events = [
+            {
+                "user_id": user_id,
+                "closing_id": r.closing_id,
+                "lot_id": r.lot_id,
+                "group_id": txn_to_group.get(r.transaction_id),
+                "account_number": r.account_number,
+                "underlying": r.underlying,
+                "symbol": r.symbol,
+                "instrument_type": r.instrument_type,
+                "option_type": r.option_type,
+                "strike": r.strike,
+                "expiration": r.expiration,
+                "entry_date": r.entry_date,
+                "entry_price": r.entry_price,
+                "closing_date": r.closing_date,
+                "closing_price": r.closing_price,
+                "closing_type": r.closing_type,
+                "quantity_closed": r.quantity_closed,
+                "realized_pnl": r.realized_pnl,
+                "is_roll": r.resulting_lot_id is not None,
+            }
+            for r in rows
+        ]
+
+        written = bulk_insert(session, PnlEvent, events)
+        logger.info("Populated %d pnl_events", written)
+        _rebuild_rollups(session, user_id, partitions)
+        return written
+
+
+def refresh_pnl_rollups(
+    db_manager: "DatabaseManager",
+    partitions: Optional[Set[Partition]] = None,
+) -> int:
+    """Rebuild pnl_rollups from the existing pnl_events.
+
+    For edits made outside the pipeline that change an event's group or
+    a group's strategy label (moved lots, label overrides, deletes).
+    """
+    with db_manager.get_session() as session:
+        user_id = session.info.get("user_id", DEFAULT_USER_ID)
+        return _rebuild_rollups(session, user_id, partitions)
+
+
+def _rebuild_rollups(session, user_id: str, partitions: Optional[Set[Partition]]) -> int:
+    delete_q = session.query(PnlRollup).filter(PnlRollup.user_id == user_id)
+    if partitions is not None:
+        delete_q = delete_q.filter(partition_clause(
+            PnlRollup.account_number, PnlRollup.underlying, partitions,
+        ))
+    delete_q.delete(synchronize_session=False)
+
+    query = session.query(
+        PnlEvent.account_number,
+        PnlEvent.underlying,
+        PnlEvent.closing_day,
+        PnlEvent.group_id,
+        func.sum(PnlEvent.realized_pnl),
+        func.count(PnlEvent.id),
+    ).filter(
+        PnlEvent.user_id == user_id,
+    ).group_by(
+        PnlEvent.account_number, PnlEvent.underlying, PnlEvent.closing_day,
+        PnlEvent.group_id,
+    )
+    if partitions is not None:
+        query = query.filter(partition_clause(
+            PnlEvent.account_number, PnlEvent.underlying, partitions,
+        ))
+    rows = query.all()
+
+    group_ids = list({r[3] for r in rows if r[3] is not None})
+    labels = dict(session.query(PositionGroup.group_id, PositionGroup.strategy_label).filter(
+        PositionGroup.group_id.in_(group_ids),
+        PositionGroup.user_id == user_id,
+    ).all()) if group_ids else {}
+
+    written = bulk_insert(session, PnlRollup, [
+        {
+            "user_id": user_id,
+            "account_number": account_number,
+            "underlying": underlying,
+            "close_day": day,
+            "close_month": day.strftime("%Y-%m"),
+            "group_id": group_id,
+            "strategy_label": labels.get(group_id),
+            "realized_pnl": pnl or 0.0,
+            "event_count": count,
+        }
+        for account_number, underlying, day, group_id, pnl, count in rows
+    ])
+    logger.debug("Rebuilt %d pnl_rollups", written)
+    return written
@@ -4,6 +4,9 @@ Position Ledger — Stage 3 of the OPT-121 pipeline redesign.
 Creates and closes lots from assembled Order objects.  Assignment and exercise
 handling creates derived stock lots linked to the originating option chain.
 
+The pass runs against an in-memory LotBook (see lot_book.py) and writes
+position_lots / lot_closings in one bulk flush at the end.
+
 Extracted from OrderProcessor._update_positions() and _process_assignments().
 
 Part of OPT-121.
@@ -16,6 +19,7 @@ from datetime import datetime
 from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 
 from src.models.order_processor import Order, OrderType
+from src.pipeline.lot_book import LotBook
 
 if TYPE_CHECKING:
     from src.database.db_manager import DatabaseManager
@@ -23,7 +27,7 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
-__all__ = ["process_lots"]
+__all__ = ["process_lots", "book_lots"]
 
 
 # ---------------------------------------------------------------------------
@@ -40,8 +44,8 @@ def _build_chain_queue(closing_transactions, get_open_lots):
 
     Returns (chain_queue, affected_chains).
 
-    `get_open_lots` is the LotManager method, passed as a callable so this
-    helper has no DB dependency and can be unit-tested with a stub.
+    `get_open_lots` is the LotBook method, passed as a callable so this
+    helper has no state dependency and can be unit-tested with a stub.
     """
     chain_queue = []
     claimed_lot_ids = set()
@@ -150,10 +154,40 @@ def process_lots(
         Raw stock transaction dicts that were separated during preprocessing
         (stock transactions resulting from assignment/exercise, no order_id).
     lot_manager : LotManager
-        Manages position_lots and lot_closings tables.
+        Kept for signature compatibility; lot state lives in a LotBook.
     db_manager : DatabaseManager
-        Database access for assignment/exercise lot lookups.
+        Session source for seeding open lots and the final bulk flush.
     """
+    book = LotBook()
+    book.seed_open_lots(db_manager, {
+        (tx.account_number, tx.symbol)
+        for order in orders for tx in order.transactions
+    } | {
+        (stx.get("account_number", ""), stx.get("symbol", ""))
+        for stx in assignment_stock_transactions
+    })
+
+    book_lots(orders, assignment_stock_transactions, book)
+
+    lots_written, closings_written = book.flush(db_manager)
+    logger.info(
+        "Stage 3: wrote %d lots and %d closings", lots_written, closings_written,
+    )
+
+
+def book_lots(
+    orders: List[Order],
+    assignment_stock_transactions: List[Dict],
+    book: Optional[LotBook] = None,
+) -> LotBook:
+    """The chronological Stage 3 pass, against a LotBook only — no DB access.
+
+    process_lots() wraps this with seeding and the flush; the parallel
+    pipeline calls it directly inside worker processes.
+    """
+    if book is None:
+        book = LotBook()
+
     # Mutable copy — items removed as they are matched to assignments/exercises
     remaining_stock_txs = list(assignment_stock_transactions)
 
@@ -195,7 +229,7 @@ def process_lots(
         # For closing/rolling orders, capture affected chains BEFORE closing
         if order.order_type in (OrderType.CLOSING, OrderType.ROLLING):
             chain_queue, affected_chains = _build_chain_queue(
-                order.closing_transactions, lot_manager.get_open_lots,
+                order.closing_transactions, book.get_open_lots,
             )
 
             if affected_chains:
@@ -222,27 +256,10 @@ def process_lots(
 
         # Process each transaction in the order
         for idx, tx in enumerate(order.transactions):
-            tx_dict = {
-                "id": tx.id,
-                "account_number": tx.account_number,
-                "symbol": tx.symbol,
-                "underlying_symbol": tx.underlying_symbol,
-                "action": tx.action,
-                "quantity": tx.quantity,
-                "price": tx.price,
-                "executed_at": (
-                    tx.executed_at.isoformat() if tx.executed_at else ""
-                ),
-                "instrument_type": (
-                    "EQUITY_OPTION" if tx.option_type else "EQUITY"
-                ),
-                "transaction_sub_type": tx.transaction_sub_type,
-            }
-
             if tx.is_opening:
                 chain_for_lot = opening_chain_for_tx.get(tx.id, temp_chain_id)
-                lot_manager.create_lot(
-                    transaction=tx_dict,
+                book.open_lot(
+                    tx,
                     chain_id=chain_for_lot or "",
                     leg_index=idx,
                     opening_order_id=order.order_id,
@@ -274,7 +291,7 @@ def process_lots(
                 ):
                     closing_price = cash_settlement_prices[tx.symbol]
 
-                lot_manager.close_lot_fifo(
+                book.close_lot_fifo(
                     account_number=tx.account_number,
                     symbol=tx.symbol,
                     quantity_to_close=abs(tx.quantity),
@@ -292,18 +309,18 @@ def process_lots(
                 # in this same pass can close those shares normally.
                 if tx.option_type and tx.is_assignment:
                     _create_assignment_derived_lot(
-                        tx, remaining_stock_txs, lot_manager, db_manager,
-                        deferred_closings,
+                        tx, remaining_stock_txs, book, deferred_closings,
                     )
                 elif tx.option_type and tx.is_exercise:
                     _handle_exercise_inline(
-                        tx, remaining_stock_txs, lot_manager, db_manager,
-                        deferred_closings,
+                        tx, remaining_stock_txs, book, deferred_closings,
                     )
 
     # Retry deferred TO_CLOSE events (spread settlement ordering)
     for deferred in deferred_closings:
-        _process_deferred_closing(deferred, lot_manager, db_manager)
+        _process_deferred_closing(deferred, book)
+
+    return book
 
 
 # ---------------------------------------------------------------------------
@@ -313,8 +330,7 @@ def process_lots(
 def _create_assignment_derived_lot(
     assignment_tx,
     remaining_stock_txs: List[Dict],
-    lot_manager: "LotManager",
-    db_manager: "DatabaseManager",
+    book: LotBook,
     deferred_closings: List[Dict],
 ) -> None:
     """Create (or close) a derived stock lot after an option assignment closes.
@@ -325,8 +341,6 @@ def _create_assignment_derived_lot(
     - TO_OPEN: create a new derived lot (the common case)
     - Fallback: infer direction from option_type (legacy data without action)
     """
-    from src.database.models import PositionLot as PL, LotClosing as LC
-
     underlying = assignment_tx.underlying_symbol
 
     if _skip_stock_delivery(underlying):
@@ -336,23 +350,10 @@ def _create_assignment_derived_lot(
         )
         return
 
-    # Query the option lot FIRST so we can pass strike to _find_matching_stock
-    with db_manager.get_session() as session:
-        result = (
-            session.query(
-                PL.id, PL.chain_id, PL.option_type, PL.strike,
-                LC.closing_order_id,
-            )
-            .join(LC, PL.id == LC.lot_id)
-            .filter(
-                PL.account_number == assignment_tx.account_number,
-                PL.symbol == assignment_tx.symbol,
-                LC.closing_type == "ASSIGNMENT",
-                LC.resulting_lot_id.is_(None),
-            )
-            .order_by(LC.closing_date.desc())
-            .first()
-        )
+    # Find the option lot FIRST so we can pass strike to _find_matching_stock
+    result = book.find_unlinked_closing(
+        assignment_tx.account_number, assignment_tx.symbol, "ASSIGNMENT",
+    )
 
     if not result:
         logger.warning(
@@ -361,7 +362,11 @@ def _create_assignment_derived_lot(
         )
         return
 
-    option_lot_id, chain_id, option_type, strike, closing_order_id = result
+    option_lot, option_closing = result
+    option_lot_id = option_lot.id
+    chain_id = option_lot.chain_id
+    strike = option_lot.strike
+    closing_order_id = option_closing.closing_order_id
 
     matching_stock = _find_matching_stock(
         assignment_tx, remaining_stock_txs, underlying, strike=strike,
@@ -394,7 +399,7 @@ def _create_assignment_derived_lot(
         except Exception:
             stock_executed_dt = assignment_tx.executed_at
 
-        pnl, affected_lots = lot_manager.close_lot_fifo(
+        pnl, affected_lots = book.close_lot_fifo(
             account_number=matching_stock.get(
                 "account_number", assignment_tx.account_number
             ),
@@ -436,19 +441,7 @@ def _create_assignment_derived_lot(
         )
 
         # Link the assignment LotClosing to the affected stock lot
-        with db_manager.get_session() as session:
-            lc = (
-                session.query(LC)
-                .filter(
-                    LC.lot_id == option_lot_id,
-                    LC.closing_type == "ASSIGNMENT",
-                    LC.resulting_lot_id.is_(None),
-                )
-                .order_by(LC.closing_id.desc())
-                .first()
-            )
-            if lc:
-                lc.resulting_lot_id = affected_lots[0]
+        book.link_resulting_lot(option_lot_id, "ASSIGNMENT", affected_lots[0])
 
     elif "TO_OPEN" in stock_action:
         # Assignment opens new position (the common case)
@@ -460,7 +453,7 @@ def _create_assignment_derived_lot(
         else:
             override_qty = raw_qty
 
-        derived_lot_id = lot_manager.create_derived_lot(
+        derived_lot_id = book.create_derived_lot(
             source_lot_id=option_lot_id,
             stock_transaction=stock_tx_dict,
             derivation_type="ASSIGNMENT",
@@ -476,7 +469,7 @@ def _create_assignment_derived_lot(
         # Fallback: infer direction from option_type (legacy data)
         stock_tx_dict = _stock_raw_to_dict(matching_stock)
 
-        derived_lot_id = lot_manager.create_derived_lot(
+        derived_lot_id = book.create_derived_lot(
             source_lot_id=option_lot_id,
             stock_transaction=stock_tx_dict,
             derivation_type="ASSIGNMENT",
@@ -494,13 +487,10 @@ def _create_assignment_derived_lot(
 def _handle_exercise_inline(
     exercise_tx,
     remaining_stock_txs: List[Dict],
-    lot_manager: "LotManager",
-    db_manager: "DatabaseManager",
+    book: LotBook,
     deferred_closings: List[Dict],
 ) -> None:
     """Handle an exercise-derived stock lot immediately after the option closes."""
-    from src.database.models import PositionLot as PL, LotClosing as LC
-
     underlying = exercise_tx.underlying_symbol
 
     if _skip_stock_delivery(underlying):
@@ -510,23 +500,10 @@ def _handle_exercise_inline(
         )
         return
 
-    # Query the option lot FIRST so we can pass strike to _find_matching_stock
-    with db_manager.get_session() as session:
-        result = (
-            session.query(
-                PL.id, PL.chain_id, PL.option_type, PL.strike,
-                LC.closing_order_id,
-            )
-            .join(LC, PL.id == LC.lot_id)
-            .filter(
-                PL.account_number == exercise_tx.account_number,
-                PL.symbol == exercise_tx.symbol,
-                LC.closing_type == "EXERCISE",
-                LC.resulting_lot_id.is_(None),
-            )
-            .order_by(LC.closing_date.desc())
-            .first()
-        )
+    # Find the option lot FIRST so we can pass strike to _find_matching_stock
+    result = book.find_unlinked_closing(
+        exercise_tx.account_number, exercise_tx.symbol, "EXERCISE",
+    )
 
     if not result:
         logger.warning(
@@ -535,7 +512,11 @@ def _handle_exercise_inline(
         )
         return
 
-    option_lot_id, chain_id, option_type, strike, closing_order_id = result
+    option_lot, option_closing = result
+    option_lot_id = option_lot.id
+    chain_id = option_lot.chain_id
+    strike = option_lot.strike
+    closing_order_id = option_closing.closing_order_id
 
     matching_stock = _find_matching_stock(
         exercise_tx, remaining_stock_txs, underlying, strike=strike,
@@ -560,7 +541,7 @@ def _handle_exercise_inline(
         except Exception:
             stock_executed_dt = exercise_tx.executed_at
 
-        pnl, affected_lots = lot_manager.close_lot_fifo(
+        pnl, affected_lots = book.close_lot_fifo(
             account_number=matching_stock.get(
                 "account_number", exercise_tx.account_number
             ),
@@ -602,19 +583,7 @@ def _handle_exercise_inline(
         )
 
         # Link the exercise LotClosing to the affected stock lot
-        with db_manager.get_session() as session:
-            lc = (
-                session.query(LC)
-                .filter(
-                    LC.lot_id == option_lot_id,
-                    LC.closing_type == "EXERCISE",
-                    LC.resulting_lot_id.is_(None),
-                )
-                .order_by(LC.closing_id.desc())
-                .first()
-            )
-            if lc:
-                lc.resulting_lot_id = affected_lots[0]
+        book.link_resulting_lot(option_lot_id, "EXERCISE", affected_lots[0])
 
     elif "TO_OPEN" in stock_action:
         # Exercise opens new position (e.g. long call -> BTO shares)
@@ -626,7 +595,7 @@ def _handle_exercise_inline(
         else:
             override_qty = raw_qty
 
-        derived_lot_id = lot_manager.create_derived_lot(
+        derived_lot_id = book.create_derived_lot(
             source_lot_id=option_lot_id,
             stock_transaction=stock_tx_dict,
             derivation_type="EXERCISE",
@@ -653,16 +622,13 @@ def _handle_exercise_inline(
 
 def _process_deferred_closing(
     deferred: Dict,
-    lot_manager: "LotManager",
-    db_manager: "DatabaseManager",
+    book: LotBook,
 ) -> None:
     """Retry a TO_CLOSE that was deferred because shares didn't exist yet.
 
     This handles spread settlement where TO_OPEN hadn't been processed when
     the TO_CLOSE first ran.
     """
-    from src.database.models import LotClosing as LC
-
     matching_stock = deferred["matching_stock"]
     option_lot_id = deferred["option_lot_id"]
     closing_type = deferred["closing_type"]
@@ -677,7 +643,7 @@ def _process_deferred_closing(
     except Exception:
         stock_executed_dt = datetime.now()
 
-    pnl, affected_lots = lot_manager.close_lot_fifo(
+    pnl, affected_lots = book.close_lot_fifo(
         account_number=matching_stock.get("account_number", ""),
         symbol=matching_stock.get("symbol", ""),
         quantity_to_close=abs(int(matching_stock.get("quantity", 0))),
@@ -696,19 +662,7 @@ def _process_deferred_closing(
         )
 
         # Link the option LotClosing to the affected stock lot
-        with db_manager.get_session() as session:
-            lc = (
-                session.query(LC)
-                .filter(
-                    LC.lot_id == option_lot_id,
-                    LC.closing_type == closing_type,
-                    LC.resulting_lot_id.is_(None),
-                )
-                .order_by(LC.closing_id.desc())
-                .first()
-            )
-            if lc:
-                lc.resulting_lot_id = affected_lots[0]
+        book.link_resulting_lot(option_lot_id, closing_type, affected_lots[0])
     else:
         logger.warning(
             "Deferred %s retry still found no shares to close for stock tx %s",
@@ -17,11 +17,15 @@ from __future__ import annotations
 
 import logging
 from collections import defaultdict
-from typing import TYPE_CHECKING, Dict, List, Set
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+
+from sqlalchemy import select
 
 from src.utils.premium import lot_premium
 
+from src.database.engine import bulk_insert
 from src.database.models import (
+    ChainLotAttribution,
     LotClosing as LotClosingModel,
     PositionGroup,
     PositionGroupLot,
@@ -30,6 +34,7 @@ from src.database.models import (
 )
 from src.database.tenant import DEFAULT_USER_ID
 from src.pipeline.lot_lineage import build_chain_attribution
+from src.pipeline.partitions import Partition, partition_clause
 
 if TYPE_CHECKING:
     from src.database.db_manager import DatabaseManager
@@ -37,11 +42,17 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
-def populate_roll_chain_summaries(db_manager: "DatabaseManager") -> int:
+def populate_roll_chain_summaries(
+    db_manager: "DatabaseManager",
+    partitions: Optional[Set[Partition]] = None,
+) -> int:
     """Rebuild roll_chain_summaries from position_groups.
 
     Walks rolled_from_group_id links to build chains, then computes
     cumulative premium and realized P&L across all lots in each chain.
+    Each attributed lot's home chain is stored in chain_lot_attributions.
+    With ``partitions`` set only chains of those (account, underlying)
+    pairs are rebuilt — roll chains never leave their partition.
 
     Returns the number of summary rows created.
     """
@@ -49,13 +60,31 @@ def populate_roll_chain_summaries(db_manager: "DatabaseManager") -> int:
         user_id = session.info.get("user_id", DEFAULT_USER_ID)
 
         # Clear existing summaries
-        session.query(RollChainSummary).filter(
+        delete_q = session.query(RollChainSummary).filter(
             RollChainSummary.user_id == user_id,
-        ).delete()
+        )
+        if partitions is not None:
+            delete_q = delete_q.filter(partition_clause(
+                RollChainSummary.account_number, RollChainSummary.underlying, partitions,
+            ))
+        delete_q.delete(synchronize_session=False)
+        attr_delete_q = session.query(ChainLotAttribution).filter(
+            ChainLotAttribution.user_id == user_id,
+        )
+        if partitions is not None:
+            attr_delete_q = attr_delete_q.filter(partition_clause(
+                ChainLotAttribution.account_number, ChainLotAttribution.underlying, partitions,
+            ))
+        attr_delete_q.delete(synchronize_session=False)
         session.flush()
 
         # Load all groups with roll links
-        groups = session.query(PositionGroup).all()
+        group_q = session.query(PositionGroup)
+        if partitions is not None:
+            group_q = group_q.filter(partition_clause(
+                PositionGroup.account_number, PositionGroup.underlying, partitions,
+            ))
+        groups = group_q.all()
         if not groups:
             return 0
 
@@ -69,17 +98,28 @@ def populate_roll_chain_summaries(db_manager: "DatabaseManager") -> int:
 
         # Load all lots and group-lot links so the attribution helper has
         # the full graph to walk.
-        all_lots = session.query(PositionLotModel).filter(
+        lot_q = session.query(PositionLotModel).filter(
             PositionLotModel.user_id == user_id,
-        ).all()
-        lots_by_id: Dict[int, PositionLotModel] = {l.id: l for l in all_lots}
-
-        gl_rows = session.query(
+        )
+        gl_q = session.query(
             PositionGroupLot.group_id,
             PositionGroupLot.transaction_id,
         ).filter(
             PositionGroupLot.user_id == user_id,
-        ).all()
+        )
+        if partitions is not None:
+            lot_q = lot_q.filter(partition_clause(
+                PositionLotModel.account_number, PositionLotModel.underlying, partitions,
+            ))
+            gl_q = gl_q.filter(PositionGroupLot.group_id.in_(
+                select(PositionGroup.group_id).where(partition_clause(
+                    PositionGroup.account_number, PositionGroup.underlying, partitions,
+                ))
+            ))
+        all_lots = lot_q.all()
+        lots_by_id: Dict[int, PositionLotModel] = {l.id: l for l in all_lots}
+
+        gl_rows = gl_q.all()
         txn_to_group: Dict[str, str] = {txn: gid for gid, txn in gl_rows}
 
         chains_by_leaf, lot_to_leaf = build_chain_attribution(
@@ -101,10 +141,21 @@ def populate_roll_chain_summaries(db_manager: "DatabaseManager") -> int:
             for c in closings:
                 closings_by_lot[c.lot_id].append(c)
 
-        # Group lots by their attributed chain (leaf id).
+        # Group lots by their attributed chain (leaf id), and persist the
+        # attribution so the chain modal can read one chain's lots.
         attributed_lot_ids_by_leaf: Dict[str, set] = defaultdict(set)
         for lid, leaf_id in lot_to_leaf.items():
             attributed_lot_ids_by_leaf[leaf_id].add(lid)
+        bulk_insert(session, ChainLotAttribution, [
+            {
+                "user_id": user_id,
+                "lot_id": lid,
+                "leaf_group_id": leaf_id,
+                "account_number": lots_by_id[lid].account_number,
+                "underlying": lots_by_id[lid].underlying or '',
+            }
+            for lid, leaf_id in lot_to_leaf.items()
+        ])
 
         # Build summaries — one row per leaf, with cumulative metrics
         # over the lots attributed to that chain.
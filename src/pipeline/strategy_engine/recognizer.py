@@ -9,10 +9,18 @@ Uses a scoring/partition approach (OPT-206):
 This replaces the old ordered-dispatch approach which could misclassify
 when the same legs belonged to multiple valid strategies (e.g., Jade Lizard
 vs Bear Call Spread + Short Put).
+
+Results are memoized on a canonical leg signature (see _canonicalize), so
+groups with the same shape — same relative strikes, expiration order,
+types, directions and quantity ratios — are recognized once per process.
 """
 
+from collections import OrderedDict
+from datetime import date, timedelta
+from functools import reduce
 from itertools import combinations
-from typing import FrozenSet, List, Optional, Tuple
+from math import gcd
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
 from .types import Leg, StrategyResult
 from .constants import STRATEGIES
@@ -25,6 +33,20 @@ from .patterns_combo import match_combo
 # (leg_indices, strategy_name, score)
 Candidate = Tuple[FrozenSet[int], str, int]
 
+# Maximum number of canonical shapes kept in the recognition cache.
+CACHE_MAX_ENTRIES = 4096
+
+# Groups with more legs than this use the budgeted partition search.
+EXHAUSTIVE_MAX_LEGS = 8
+
+# Search-node budget for the partition solver on large groups.
+PARTITION_NODE_BUDGET = 50_000
+
+# Anchor for canonical expirations (only their order matters to matchers).
+_CANONICAL_EPOCH = date(2000, 1, 1)
+
+_cache: "OrderedDict[Tuple[Leg, ...], StrategyResult]" = OrderedDict()
+
 
 def recognize(legs: List[Leg]) -> StrategyResult:
     """Recognize the strategy formed by a set of legs.
@@ -34,10 +56,88 @@ def recognize(legs: List[Leg]) -> StrategyResult:
     2. Score each candidate (larger strategies score higher)
     3. Find the non-overlapping partition with highest total score
     4. Return the result (single strategy or combined name)
+
+    The legs are canonicalized first and the result is cached on that
+    signature; sub_strategies indices always refer to the caller's legs.
     """
     if not legs:
         return _custom_result(0)
 
+    key, order = _canonicalize(legs)
+    result = _cache.get(key)
+    if result is None:
+        result = _recognize_canonical(list(key))
+        _cache[key] = result
+        if len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    else:
+        _cache.move_to_end(key)
+
+    if result.sub_strategies is None:
+        return result
+    # Map canonical leg positions back to the caller's ordering
+    subs = tuple(
+        (name, frozenset(order[i] for i in indices))
+        for name, indices in result.sub_strategies
+    )
+    return StrategyResult(
+        name=result.name, direction=result.direction,
+        credit_debit=result.credit_debit, leg_count=result.leg_count,
+        confidence=result.confidence, sub_strategies=subs,
+    )
+
+
+def clear_cache() -> None:
+    """Drop all memoized recognition results."""
+    _cache.clear()
+
+
+def _canonicalize(legs: List[Leg]) -> Tuple[Tuple[Leg, ...], List[int]]:
+    """Build an order-independent signature for a set of legs.
+
+    Matchers only look at strike order, equality and spacing, expiration
+    order and equality, types, directions and quantity ratios. So strikes
+    become offsets from the lowest strike, expirations become their rank,
+    and quantities are divided by their common divisor. Legs are then
+    sorted; the returned order maps canonical position -> original index.
+    """
+    strikes = [l.strike for l in legs if l.strike is not None]
+    base = min(strikes) if strikes else 0.0
+    exp_rank = {
+        exp: rank for rank, exp in
+        enumerate(sorted({l.expiration for l in legs if l.expiration is not None}))
+    }
+    divisor = reduce(gcd, (l.quantity for l in legs)) or 1
+
+    canonical = [
+        Leg(
+            instrument_type=l.instrument_type,
+            option_type=l.option_type,
+            strike=round(l.strike - base, 6) if l.strike is not None else None,
+            expiration=(_CANONICAL_EPOCH + timedelta(days=exp_rank[l.expiration])
+                        if l.expiration is not None else None),
+            direction=l.direction,
+            quantity=l.quantity // divisor,
+        )
+        for l in legs
+    ]
+    order = sorted(range(len(legs)), key=lambda i: _sort_key(canonical[i]))
+    return tuple(canonical[i] for i in order), order
+
+
+def _sort_key(leg: Leg) -> tuple:
+    return (
+        leg.instrument_type,
+        leg.option_type or "",
+        leg.strike if leg.strike is not None else -1.0,
+        leg.expiration or _CANONICAL_EPOCH,
+        leg.direction,
+        leg.quantity,
+    )
+
+
+def _recognize_canonical(legs: List[Leg]) -> StrategyResult:
+    """Run candidate generation and partitioning on canonical legs."""
     n = len(legs)
 
     # Generate all candidate matches
@@ -146,17 +246,35 @@ def _solve_partition(candidates: List[Candidate], n: int) -> Optional[List[Candi
     """Find the best non-overlapping set of candidates.
 
     Prioritizes: (1) maximum leg coverage, (2) highest total score.
-    With typical retail positions (2–6 legs), this is trivially fast.
+    Branch-and-bound: a branch is cut when even a perfect cover of its
+    remaining legs could not beat the best partition found so far, which
+    returns the same answer as the exhaustive search. Groups larger than
+    EXHAUSTIVE_MAX_LEGS try the largest candidates first and stop after
+    PARTITION_NODE_BUDGET nodes, keeping the best partition found.
     """
     all_indices = frozenset(range(n))
+    budgeted = n > EXHAUSTIVE_MAX_LEGS
+    if budgeted:
+        candidates = sorted(candidates, key=lambda c: (-len(c[0]), -c[2]))
+
+    # Best achievable score per leg, used to bound what remaining legs can add
+    density: Dict[int, float] = {}
+    for indices, _, s in candidates:
+        per_leg = s / len(indices)
+        for i in indices:
+            if per_leg > density.get(i, 0.0):
+                density[i] = per_leg
+
     best: List[Candidate] = []
     best_score = -1
     best_coverage = 0
+    nodes = 0
 
     def search(remaining: FrozenSet[int], chosen: List[Candidate],
                score: int, coverage: int, start: int):
-        nonlocal best, best_score, best_coverage
+        nonlocal best, best_score, best_coverage, nodes
 
+        nodes += 1
         # Update best if better coverage, or same coverage with higher score
         if coverage > best_coverage or (coverage == best_coverage and score > best_score):
             best_coverage = coverage
@@ -166,7 +284,16 @@ def _solve_partition(candidates: List[Candidate], n: int) -> Optional[List[Candi
         if not remaining:
             return
 
+        coverable = [i for i in remaining if i in density]
+        max_coverage = coverage + len(coverable)
+        if max_coverage < best_coverage or (
+                max_coverage == best_coverage
+                and score + sum(density[i] for i in coverable) <= best_score):
+            return
+
         for i in range(start, len(candidates)):
+            if budgeted and nodes >= PARTITION_NODE_BUDGET:
+                return
             indices, name, s = candidates[i]
             if indices.issubset(remaining):
                 search(remaining - indices, chosen + [(indices, name, s)],
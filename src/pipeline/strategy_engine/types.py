@@ -5,7 +5,7 @@ from datetime import date
 from typing import FrozenSet, List, Optional, Tuple
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Leg:
     """A single leg of a strategy, normalized from lot data."""
     instrument_type: str        # "Equity" or "Option"
@@ -9,6 +9,7 @@ from sqlalchemy import func
 from src.database.models import Account, AccountBalance
 from src.database.db_manager import DatabaseManager
 from src.dependencies import get_db, get_current_user_id
+from src.services.ingest_service import clear_sync_state
 
 router = APIRouter()
 
@@ -75,7 +76,8 @@ async def delete_account_data(
     from src.database.models import (
         RawTransaction, PositionLot, LotClosing, PositionGroup,
         PositionGroupLot, PositionGroupTag, PositionNote,
-        Position, PnlEvent, RollChainSummary,
+        Position, PnlEvent, RollChainSummary, OpenPositionSnapshot, GroupAncestry,
+        ChainLotAttribution, PnlRollup,
     )
 
     with db.get_session() as session:
@@ -98,7 +100,11 @@ async def delete_account_data(
             session.query(LotClosing).filter(LotClosing.lot_id.in_(lot_ids)).delete(synchronize_session=False)
         if group_ids:
             session.query(PnlEvent).filter(PnlEvent.group_id.in_(group_ids)).delete(synchronize_session=False)
+            session.query(PnlRollup).filter(PnlRollup.account_number == account_number).delete(synchronize_session=False)
             session.query(RollChainSummary).filter(RollChainSummary.current_group_id.in_(group_ids)).delete(synchronize_session=False)
+            session.query(OpenPositionSnapshot).filter(OpenPositionSnapshot.group_id.in_(group_ids)).delete(synchronize_session=False)
+            session.query(GroupAncestry).filter(GroupAncestry.account_number == account_number).delete(synchronize_session=False)
+            session.query(ChainLotAttribution).filter(ChainLotAttribution.account_number == account_number).delete(synchronize_session=False)
             session.query(PositionGroupTag).filter(PositionGroupTag.group_id.in_(group_ids)).delete(synchronize_session=False)
             session.query(PositionNote).filter(
                 PositionNote.note_key.in_([f"group_{gid}" for gid in group_ids]),
@@ -113,8 +119,11 @@ async def delete_account_data(
         deleted_txns = session.query(RawTransaction).filter(RawTransaction.account_number == account_number).count()
         session.commit()
 
-        logger.info(f"Deleted all data for account {account_number}: {len(lot_ids)} lots, {len(group_ids)} groups")
-        return {"message": f"Data deleted for account {account_number}"}
+    # Next sync must refetch this account's history, not resume from its cursor
+    clear_sync_state(db, account_number)
+
+    logger.info(f"Deleted all data for account {account_number}: {len(lot_ids)} lots, {len(group_ids)} groups")
+    return {"message": f"Data deleted for account {account_number}"}
 
 
 @router.get("/api/account-balances")
@@ -1,6 +1,8 @@
 """Ledger routes — position groups CRUD and lot management."""
 
+import asyncio
 import uuid as _uuid
+from collections import defaultdict
 from datetime import datetime
 from typing import Dict, List
 
@@ -8,13 +10,24 @@ from fastapi import APIRouter, Depends, HTTPException
 from loguru import logger
 from sqlalchemy import func
 
-from src.database.models import PnlEvent, PositionGroup, PositionGroupLot, PositionGroupTag, PositionLot as PositionLotModel, RawTransaction, RollChainSummary, Tag
+from src.database.models import ChainLotAttribution, GroupAncestry, PnlEvent, PositionGroup, PositionGroupLot, PositionGroupTag, PositionLot as PositionLotModel, RawTransaction, RollChainSummary, Tag
 from src.database.db_manager import DatabaseManager
 from src.models.lot_manager import LotManager
 from src.utils.premium import group_premium_from_lots
 from src.dependencies import get_db, get_lot_manager, get_current_user_id
+from src.pipeline.group_ancestry import (
+    chain_ancestors,
+    chain_roots,
+    ensure_group_ancestry,
+    refresh_group_ancestry,
+    roll_sources,
+)
+from src.pipeline.open_snapshots import populate_open_snapshots, refresh_open_snapshots
+from src.pipeline.pnl_events import refresh_pnl_rollups
+from src.pipeline.roll_chain_summary import populate_roll_chain_summaries
 from src.schemas import LedgerGroupUpdate, LedgerMoveLots, LedgerCreateGroup, GroupTagAdd
 from src.services.ledger_service import seed_position_groups, _refresh_group_status
+from src.services.report_service import refresh_group_risk_reward
 from src.services.roll_timeline import compute_roll_timeline
 
 router = APIRouter()
@@ -89,29 +102,13 @@ async def get_ledger(account_number: str = '', underlying: str = '', db: Databas
 
     group_ids = [g['group_id'] for g in groups_raw]
 
-    # Batch-load roll source IDs (groups that have something rolled FROM them)
-    # and parent pointers so we can walk each chain back to its root.
+    # Roll sources (groups something rolled FROM) and each group's chain
+    # root, so the chain summary (keyed by root_group_id) can be found
+    # wherever in the chain the group sits.
+    ensure_group_ancestry(db)
     with db.get_session() as session:
-        parent_rows = session.query(
-            PositionGroup.group_id,
-            PositionGroup.rolled_from_group_id,
-        ).filter(
-            PositionGroup.rolled_from_group_id.isnot(None),
-        ).all()
-        parent_of: Dict[str, str] = {gid: parent for gid, parent in parent_rows}
-        roll_source_ids = set(parent_of.values())
-
-    # Walk each group back to its chain root so we can look up the
-    # chain summary (keyed by root_group_id) regardless of where in the
-    # chain this particular group sits.
-    def _chain_root(gid: str) -> str:
-        seen = set()
-        while gid in parent_of and gid not in seen:
-            seen.add(gid)
-            gid = parent_of[gid]
-        return gid
-
-    group_root = {gid: _chain_root(gid) for gid in group_ids}
+        roll_source_ids = roll_sources(session, group_ids)
+        group_root = chain_roots(session, group_ids)
     root_ids = list({r for r in group_root.values() if r})
 
     roll_chain_by_group: Dict[str, dict] = {}
@@ -315,6 +312,7 @@ async def get_group_roll_chain(
 ):
     """Walk the roll chain for a group, returning all linked groups in order."""
 
+    ensure_group_ancestry(db)
     with db.get_session() as session:
         # Verify the starting group exists
         start = session.query(PositionGroup).filter(
@@ -322,44 +320,45 @@ async def get_group_roll_chain(
         ).first()
         if not start:
             raise HTTPException(status_code=404, detail="Group not found")
-
-        # The chain runs root → ... → clicked group → ... → leaf. We walk
-        # backward to root via rolled_from_group_id (linear by schema —
-        # each group has at most one parent), then forward from the
-        # clicked group to a leaf via children. At a forward branch
-        # (clicked group has multiple children, e.g., a partition into
-        # two same-shape positions), we pick the child whose own chain
-        # leaf opened most recently — the trader's most active
-        # continuation. The frontend can highlight the requested group
-        # within the result; the modal isn't truncated at midpoint
-        # clicks.
-        chain_back: List[str] = [start.group_id]
-        current = start
-        visited = {current.group_id}
-        while current.rolled_from_group_id:
-            parent = session.query(PositionGroup).filter(
-                PositionGroup.group_id == current.rolled_from_group_id,
-            ).first()
-            if not parent or parent.group_id in visited:
-                break
-            visited.add(parent.group_id)
-            chain_back.append(parent.group_id)
-            current = parent
+        start_account, start_underlying = start.account_number, start.underlying or ''
+
+        # The chain runs root → ... → clicked group → ... → leaf. Both
+        # halves come from group_ancestry in one indexed read each: the
+        # clicked group's ancestors (linear by schema — each group has at
+        # most one parent), then everything rolled out of it, walked
+        # forward to a leaf. At a forward branch (clicked group has
+        # multiple children, e.g., a partition into two same-shape
+        # positions), we pick the child that opened most recently — the
+        # trader's most active continuation. The frontend can highlight
+        # the requested group within the result; the modal isn't
+        # truncated at midpoint clicks.
+        chain_back = chain_ancestors(session, [start.group_id])[start.group_id]
+        visited = set(chain_back)
+
+        children_of: Dict[str, List] = defaultdict(list)
+        for gid, parent, opening_date in session.query(
+            PositionGroup.group_id,
+            PositionGroup.rolled_from_group_id,
+            PositionGroup.opening_date,
+        ).join(
+            GroupAncestry, GroupAncestry.descendant_group_id == PositionGroup.group_id,
+        ).filter(
+            GroupAncestry.ancestor_group_id == start.group_id,
+            GroupAncestry.depth > 0,
+        ).all():
+            children_of[parent].append((opening_date or '', gid))
 
         chain_forward: List[str] = []
         cur_id = start.group_id
         while True:
-            children = session.query(PositionGroup).filter(
-                PositionGroup.rolled_from_group_id == cur_id,
-            ).all()
-            children = [c for c in children if c.group_id not in visited]
+            children = [c for c in children_of.get(cur_id, []) if c[1] not in visited]
             if not children:
                 break
-            children.sort(key=lambda c: c.opening_date or '', reverse=True)
-            picked = children[0]
-            visited.add(picked.group_id)
-            chain_forward.append(picked.group_id)
-            cur_id = picked.group_id
+            children.sort(key=lambda c: c[0], reverse=True)
+            picked = children[0][1]
+            visited.add(picked)
+            chain_forward.append(picked)
+            cur_id = picked
 
         chain_ids = list(reversed(chain_back)) + chain_forward
 
@@ -386,49 +385,39 @@ async def get_group_roll_chain(
             all_lot_ids.append(lot.id)
     closings_by_lot = lot_manager.get_lot_closings_batch(all_lot_ids) if all_lot_ids else {}
 
-    # Compute lot-to-chain attribution so per-row realized/premium reflect
-    # only the lots attributed to THIS chain (OPT-284 Phase 3c). Matters
-    # at branching source groups — without this, both children's modals
-    # would over-credit the shared trunk.
-    from collections import defaultdict
-    from src.pipeline.lot_lineage import build_chain_attribution
+    # Lot-to-chain attribution so per-row realized/premium reflect only
+    # the lots attributed to THIS chain (OPT-284 Phase 3c). Matters at
+    # branching source groups — without this, both children's modals
+    # would over-credit the shared trunk. The pipeline persists it with
+    # the roll chain summaries; only this chain's rows are read.
     leaf_id = chain_ids[-1] if chain_ids else None
     use_attribution = False
     attributed_lot_ids: set = set()
     if leaf_id:
+        partition = (start_account, start_underlying)
         with db.get_session() as session:
-            all_groups = session.query(PositionGroup).all()
-            grp_map = {g.group_id: g for g in all_groups}
-            children_map_full: Dict[str, List[str]] = defaultdict(list)
-            for g in all_groups:
-                if g.rolled_from_group_id:
-                    children_map_full[g.rolled_from_group_id].append(g.group_id)
-            all_lots = session.query(PositionLotModel).all()
-            lots_by_id = {l.id: l for l in all_lots}
-            txn_to_group: Dict[str, str] = {}
-            for gid, txn in session.query(
-                PositionGroupLot.group_id, PositionGroupLot.transaction_id,
-            ).all():
-                txn_to_group[txn] = gid
-            # Run attribution INSIDE the session — it lazy-loads ORM
-            # attributes (rolled_from_group_id, parent_lot_id, etc.) and
-            # would raise DetachedInstanceError if invoked after the
-            # session closes.
-            chains_by_leaf, lot_to_leaf = build_chain_attribution(
-                group_map=grp_map, children_map=children_map_full,
-                lots_by_id=lots_by_id, txn_to_group=txn_to_group,
-            )
-        # Attribution only applies when the requested group is the leaf
-        # of an actual chain. When the user opens the modal from a
-        # mid-chain CLOSED group, leaf_id is that midpoint, not a real
-        # chain leaf — there are no lots attributed to that key, and
-        # filtering would zero out every per-row total. Fall back to the
-        # legacy per-group sum in that case.
-        if leaf_id in chains_by_leaf:
-            use_attribution = True
-            attributed_lot_ids = {
-                lid for lid, lf in lot_to_leaf.items() if lf == leaf_id
-            }
+            # Attribution only applies when the requested chain ends in
+            # the leaf of an actual chain (one with a summary row).
+            # Otherwise there are no lots attributed to that key, and
+            # filtering would zero out every per-row total. Fall back to
+            # the legacy per-group sum in that case.
+            use_attribution = session.query(RollChainSummary.id).filter(
+                RollChainSummary.current_group_id == leaf_id,
+            ).first() is not None
+            backfill = use_attribution and session.query(ChainLotAttribution.id).filter(
+                ChainLotAttribution.account_number == partition[0],
+                ChainLotAttribution.underlying == partition[1],
+            ).first() is None
+        if backfill:
+            # Summaries built before attributions were stored
+            populate_roll_chain_summaries(db, partitions={partition})
+        if use_attribution:
+            with db.get_session() as session:
+                attributed_lot_ids = {
+                    lid for (lid,) in session.query(ChainLotAttribution.lot_id).filter(
+                        ChainLotAttribution.leaf_group_id == leaf_id,
+                    ).all()
+                }
 
     # Build ordered response
     chain_result = []
@@ -478,7 +467,7 @@ async def get_group_roll_chain(
         open_lots = [l for l in current_lots if l.remaining_quantity != 0 and l.status != 'CLOSED']
         if open_lots:
             symbols = list({l.symbol for l in open_lots})
-            quotes = db.get_cached_quotes(symbols)
+            quotes = await asyncio.to_thread(db.get_cached_quotes, symbols)
             if quotes:
                 unrealized_pnl = 0.0
                 for lot in open_lots:
@@ -508,11 +497,12 @@ async def get_group_roll_chain(
 async def seed_ledger(db: DatabaseManager = Depends(get_db), lot_manager: LotManager = Depends(get_lot_manager), user_id: str = Depends(get_current_user_id)):
     """Explicitly seed position groups from existing chains."""
     count = seed_position_groups(db=db, lot_manager=lot_manager)
+    populate_open_snapshots(db, lot_manager)
     return {"message": f"Seeded {count} position groups", "groups_created": count}
 
 
 @router.put("/api/ledger/groups/{group_id}")
-async def update_ledger_group(group_id: str, body: LedgerGroupUpdate, db: DatabaseManager = Depends(get_db), user_id: str = Depends(get_current_user_id)):
+async def update_ledger_group(group_id: str, body: LedgerGroupUpdate, db: DatabaseManager = Depends(get_db), lot_manager: LotManager = Depends(get_lot_manager), user_id: str = Depends(get_current_user_id)):
     """Update group metadata (strategy label)."""
     with db.get_session() as session:
         row = session.query(PositionGroup).filter(
@@ -525,12 +515,17 @@ async def update_ledger_group(group_id: str, body: LedgerGroupUpdate, db: Databa
             row.strategy_label = body.strategy_label
             row.strategy_label_user_override = True
             row.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            refresh_group_risk_reward(session, [group_id])
+        partition = (row.account_number, row.underlying or '')
 
+    if body.strategy_label is not None:
+        refresh_pnl_rollups(db, partitions={partition})
+    refresh_open_snapshots(db, lot_manager, [group_id])
     return {"message": "Group updated"}
 
 
 @router.post("/api/ledger/move-lots")
-async def move_lots(body: LedgerMoveLots, db: DatabaseManager = Depends(get_db), user_id: str = Depends(get_current_user_id)):
+async def move_lots(body: LedgerMoveLots, db: DatabaseManager = Depends(get_db), lot_manager: LotManager = Depends(get_lot_manager), user_id: str = Depends(get_current_user_id)):
     """Move lots between position groups. All lots and target must share underlying + account."""
     if not body.transaction_ids:
         raise HTTPException(status_code=400, detail="No transaction_ids provided")
@@ -607,6 +602,15 @@ async def move_lots(body: LedgerMoveLots, db: DatabaseManager = Depends(get_db),
             else:
                 _refresh_group_status(gid, session=session, db=db)
 
+        # Deleted source groups simply drop out of the refresh
+        refresh_group_risk_reward(session, [body.target_group_id, *source_groups])
+
+    # Moved lots change chain attribution and the groups their P&L rolls up to
+    refresh_group_ancestry(db, source_groups)
+    partition = (target_account, target_underlying or '')
+    populate_roll_chain_summaries(db, partitions={partition})
+    refresh_pnl_rollups(db, partitions={partition})
+    refresh_open_snapshots(db, lot_manager, [body.target_group_id, *source_groups])
     return {"message": f"Moved {len(body.transaction_ids)} lots"}
 
 
@@ -628,7 +632,7 @@ async def create_ledger_group(body: LedgerCreateGroup, db: DatabaseManager = Dep
 
 
 @router.delete("/api/ledger/groups/{group_id}")
-async def delete_ledger_group(group_id: str, db: DatabaseManager = Depends(get_db), user_id: str = Depends(get_current_user_id)):
+async def delete_ledger_group(group_id: str, db: DatabaseManager = Depends(get_db), lot_manager: LotManager = Depends(get_lot_manager), user_id: str = Depends(get_current_user_id)):
     """Delete a group. Orphaned lots become unassigned (picked up by next seed)."""
     with db.get_session() as session:
         row = session.query(PositionGroup).filter(
@@ -637,8 +641,13 @@ async def delete_ledger_group(group_id: str, db: DatabaseManager = Depends(get_d
         if not row:
             raise HTTPException(status_code=404, detail="Group not found")
 
+        partition = (row.account_number, row.underlying or '')
         session.delete(row)
 
+    refresh_group_ancestry(db, [group_id])
+    populate_roll_chain_summaries(db, partitions={partition})
+    refresh_pnl_rollups(db, partitions={partition})
+    refresh_open_snapshots(db, lot_manager, [group_id])
     return {"message": "Group deleted"}
 
 
@@ -1,21 +1,22 @@
 """Position routes — current positions and open chains."""
 
+import asyncio
 import json as _json
-from collections import defaultdict
 from datetime import date, datetime
-from typing import Dict, List, Optional, Set
+from typing import Dict, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from loguru import logger
 
 from sqlalchemy import func
 
-from src.database.models import LotClosing as LotClosingModel, OrderChainCache, PositionGroup, PositionGroupLot, PositionGroupTag, PositionLot as PositionLotModel, RollChainSummary, Tag
+from src.database.models import OpenPositionSnapshot, PositionGroup, PositionGroupTag, PositionLot as PositionLotModel, Tag
 from src.database.db_manager import DatabaseManager
 from src.models.lot_manager import LotManager
 from src.dependencies import get_db, get_lot_manager, get_current_user_id
+from src.pipeline.group_ancestry import ensure_group_ancestry
+from src.pipeline.open_snapshots import OPEN_STATUSES, populate_open_snapshots, visible_chain
 from src.services.ledger_service import seed_position_groups
-from src.services.roll_timeline import compute_roll_timeline
 
 router = APIRouter()
 
@@ -41,7 +42,7 @@ async def get_cached_positions(account_number: Optional[str] = None, db: Databas
                 positions_by_account[account] = []
             positions_by_account[account].append(position)
 
-        cached_quotes = db.get_cached_quotes()
+        cached_quotes = await asyncio.to_thread(db.get_cached_quotes)
 
         return {
             "positions": positions_by_account,
@@ -84,7 +85,7 @@ async def get_positions(account_number: Optional[str] = None, db: DatabaseManage
 
 @router.get("/api/open-chains")
 async def get_open_chains(account_number: Optional[str] = None, db: DatabaseManager = Depends(get_db), lot_manager: LotManager = Depends(get_lot_manager), user_id: str = Depends(get_current_user_id)):
-    """Get open position groups for the Positions page — position_groups as single source of truth."""
+    """Get open position groups for the Positions page — read from open_position_snapshots."""
 
     try:
         # Auto-seed position_groups if empty
@@ -95,22 +96,29 @@ async def get_open_chains(account_number: Optional[str] = None, db: DatabaseMana
                 if lot_count > 0:
                     seed_position_groups(db=db, lot_manager=lot_manager)
 
-        # Query open position groups
+        # Snapshots are built by the pipeline; build them here only for
+        # open groups that predate the table or were just seeded.
         with db.get_session() as session:
-            q = session.query(PositionGroup).filter(
-                PositionGroup.status.in_(['OPEN', 'ASSIGNED']),
-            )
+            open_count = session.query(func.count()).select_from(PositionGroup).filter(
+                PositionGroup.status.in_(OPEN_STATUSES),
+            ).scalar()
+            snapshot_count = session.query(func.count()).select_from(OpenPositionSnapshot).scalar()
+        if open_count and not snapshot_count:
+            ensure_group_ancestry(db)
+            populate_open_snapshots(db, lot_manager)
+
+        with db.get_session() as session:
+            q = session.query(OpenPositionSnapshot.group_id, OpenPositionSnapshot.snapshot)
             if account_number and account_number != '':
-                q = q.filter(PositionGroup.account_number == account_number)
-            q = q.order_by(PositionGroup.underlying.asc(), PositionGroup.opening_date.desc())
-            groups_raw = [row.to_dict() for row in q.all()]
+                q = q.filter(OpenPositionSnapshot.account_number == account_number)
+            q = q.order_by(OpenPositionSnapshot.underlying.asc(), OpenPositionSnapshot.opening_date.desc())
+            snapshot_rows = q.all()
 
-        if not groups_raw:
-            result = {}
-        else:
-            group_ids = [g['group_id'] for g in groups_raw]
+        result = {}
+        if snapshot_rows:
+            group_ids = [gid for gid, _ in snapshot_rows]
 
-            # Batch-load tags for all groups
+            # Tags are edited outside the pipeline, so they are read live
             tags_by_group: Dict[str, list] = {gid: [] for gid in group_ids}
             with db.get_session() as session:
                 tag_rows = session.query(
@@ -121,287 +129,17 @@ async def get_open_chains(account_number: Optional[str] = None, db: DatabaseMana
                 for gid, tid, tname, tcolor in tag_rows:
                     tags_by_group[gid].append({"id": tid, "name": tname, "color": tcolor or "#3B82F6"})
 
-            # Batch-load lots for all groups
-            lots_by_group = lot_manager.get_lots_for_groups_batch(group_ids)
-
-            # Batch-load closings for all lots
-            all_lot_ids = []
-            for lots in lots_by_group.values():
-                for lot in lots:
-                    all_lot_ids.append(lot.id)
-            closings_by_lot = lot_manager.get_lot_closings_batch(all_lot_ids) if all_lot_ids else {}
-
-            # Batch-load order data from cache (order_data used for richer group context elsewhere)
-            all_order_ids = set()
-            for gid, lots in lots_by_group.items():
-                for lot in lots:
-                    if lot.opening_order_id:
-                        all_order_ids.add(lot.opening_order_id)
-                    for closing in closings_by_lot.get(lot.id, []):
-                        if closing.closing_order_id:
-                            all_order_ids.add(closing.closing_order_id)
-
-            order_cache: Dict[str, Dict] = {}
-            if all_order_ids:
-                with db.get_session() as session:
-                    rows = session.query(
-                        OrderChainCache.order_id, OrderChainCache.order_data,
-                    ).filter(
-                        OrderChainCache.order_id.in_(list(all_order_ids)),
-                    ).all()
-                    for row in rows:
-                        try:
-                            order_cache[row[0]] = _json.loads(row[1])
-                        except Exception:
-                            pass
-
-            # Batch-load roll chain summaries for all open groups
-            roll_chain_by_group: Dict[str, Dict] = {}
-            with db.get_session() as session:
-                rc_rows = session.query(RollChainSummary).filter(
-                    RollChainSummary.current_group_id.in_(group_ids),
-                ).all()
-                for rc in rc_rows:
-                    roll_chain_by_group[rc.current_group_id] = {
-                        "root_group_id": rc.root_group_id,
-                        "chain_length": rc.chain_length,
-                        "roll_count": rc.roll_count,
-                        "first_opened": rc.first_opened,
-                        "last_rolled": rc.last_rolled,
-                        "cumulative_premium": rc.cumulative_premium,
-                        "cumulative_realized_pnl": rc.cumulative_realized_pnl,
-                    }
-
-            # OPT-296: cumulative_realized_pnl from the cached row can lag the
-            # actual leg-by-leg sum if populate_roll_chain_summaries hasn't
-            # re-run since the most recent affecting close. The Analysis-panel
-            # Chain B/E derives directly from this number and OPT-295 surfaced
-            # a 6¢-per-share / $440 discrepancy on a live chain because of it.
-            # Recompute it on-the-fly here so the wire-payload always matches
-            # what the Roll Chain modal already shows (it sums leg-by-leg).
-            if roll_chain_by_group:
-                with db.get_session() as session:
-                    chain_groups_by_open: Dict[str, List[str]] = {}
-                    all_chain_gids: Set[str] = set()
-                    for open_gid in roll_chain_by_group.keys():
-                        chain = [open_gid]
-                        cursor = open_gid
-                        visited = {open_gid}
-                        # Walk ancestors via rolled_from_group_id; visited set
-                        # protects against any pathological cycle.
-                        while True:
-                            parent = session.query(
-                                PositionGroup.rolled_from_group_id,
-                            ).filter(
-                                PositionGroup.group_id == cursor,
-                            ).scalar()
-                            if not parent or parent in visited:
-                                break
-                            visited.add(parent)
-                            chain.append(parent)
-                            cursor = parent
-                        chain_groups_by_open[open_gid] = chain
-                        all_chain_gids.update(chain)
-
-                    realized_per_group: Dict[str, float] = defaultdict(float)
-                    if all_chain_gids:
-                        rows = session.query(
-                            PositionGroupLot.group_id,
-                            LotClosingModel.realized_pnl,
-                        ).join(
-                            PositionLotModel,
-                            PositionLotModel.transaction_id == PositionGroupLot.transaction_id,
-                        ).join(
-                            LotClosingModel,
-                            LotClosingModel.lot_id == PositionLotModel.id,
-                        ).filter(
-                            PositionGroupLot.group_id.in_(list(all_chain_gids)),
-                        ).all()
-                        for gid, realized in rows:
-                            realized_per_group[gid] += realized or 0.0
-
-                    for open_gid, chain in chain_groups_by_open.items():
-                        roll_chain_by_group[open_gid]["cumulative_realized_pnl"] = sum(
-                            realized_per_group.get(g, 0.0) for g in chain
-                        )
-
-            result = {}
-
-            for g in groups_raw:
-                gid = g['group_id']
-                acct = g['account_number']
-
+            today = date.today()
+            for gid, payload in snapshot_rows:
+                snapshot = _json.loads(payload)
+                acct = snapshot['account_number']
                 if acct not in result:
                     result[acct] = {"chains": []}
 
-                lots = lots_by_group.get(gid, [])
-
-                open_option_legs = []
-                open_equity_legs = []
-                cost_basis_total = 0.0
-                realized_pnl = 0.0
-                has_assignment = False
-
-                for lot in lots:
-                    lot_closings = closings_by_lot.get(lot.id, [])
-                    lot_realized = sum(c.realized_pnl for c in lot_closings)
-                    realized_pnl += lot_realized
-
-                    for c in lot_closings:
-                        if c.closing_type in ('ASSIGNMENT', 'EXERCISE'):
-                            has_assignment = True
-
-                    if lot.derivation_type in ('ASSIGNMENT', 'EXERCISE'):
-                        has_assignment = True
-
-                    multiplier = 100 if lot.instrument_type == 'EQUITY_OPTION' else 1
-
-                    if lot.entry_price and lot.original_quantity:
-                        amount = abs(lot.entry_price) * abs(lot.original_quantity) * multiplier
-                        if lot.quantity < 0:
-                            cost_basis_total += amount
-                        else:
-                            cost_basis_total -= amount
-
-                    for c in lot_closings:
-                        if c.closing_price and c.quantity_closed:
-                            c_amount = abs(c.closing_price) * abs(c.quantity_closed) * multiplier
-                            if lot.quantity < 0:
-                                cost_basis_total -= c_amount
-                            else:
-                                cost_basis_total += c_amount
-
-                    if lot.remaining_quantity != 0 and lot.status != 'CLOSED':
-                        qty = abs(lot.remaining_quantity)
-                        qty_direction = 'Short' if lot.quantity < 0 else 'Long'
-                        price = abs(lot.entry_price) if lot.entry_price else 0
-
-                        if lot.instrument_type == 'EQUITY_OPTION':
-                            # Skip expired option legs (they'll vanish on next sync)
-                            if lot.expiration:
-                                try:
-                                    exp_date = date.fromisoformat(str(lot.expiration)[:10])
-                                except (ValueError, TypeError):
-                                    exp_date = None
-                                if exp_date and exp_date < date.today():
-                                    continue
-                            leg_amount = price * qty * 100 if price else 0
-                            leg_cost = leg_amount if qty_direction == 'Short' else -leg_amount
-                            open_option_legs.append({
-                                "symbol": lot.symbol,
-                                "underlying": lot.underlying or g['underlying'],
-                                "instrument_type": lot.instrument_type,
-                                "option_type": lot.option_type,
-                                "strike": lot.strike,
-                                "expiration": str(lot.expiration) if lot.expiration else None,
-                                "quantity": qty,
-                                "quantity_direction": qty_direction,
-                                "opening_price": price,
-                                "cost_basis": leg_cost,
-                                "lot_id": lot.id,
-                            })
-                        elif lot.instrument_type == 'EQUITY':
-                            leg_cost = (price * qty) if qty_direction == 'Short' else -(price * qty)
-                            open_equity_legs.append({
-                                "symbol": lot.symbol,
-                                "underlying": lot.underlying or g['underlying'],
-                                "instrument_type": "EQUITY",
-                                "quantity": qty,
-                                "quantity_direction": qty_direction,
-                                "entry_price": price,
-                                "cost_basis": leg_cost,
-                                "lot_id": lot.id,
-                                "derivation_type": lot.derivation_type,
-                                "entry_date": lot.entry_date,
-                            })
-
-                # Consolidate legs with same symbol/strike/exp/direction (OPT-142)
-                consolidated = {}
-                for leg in open_option_legs:
-                    key = (leg['symbol'], leg['strike'], leg['expiration'], leg['quantity_direction'])
-                    if key in consolidated:
-                        c = consolidated[key]
-                        c['quantity'] += leg['quantity']
-                        c['cost_basis'] += leg['cost_basis']
-                    else:
-                        consolidated[key] = {**leg}
-                for c in consolidated.values():
-                    if c['quantity'] > 0:
-                        c['opening_price'] = abs(c['cost_basis']) / c['quantity'] / 100
-                    c['lot_id'] = c['symbol']
-                open_option_legs = list(consolidated.values())
-
-                # Roll chain summary (different-expiration roll chain from materialized table)
-                rc = roll_chain_by_group.get(gid)
-
-                # OPT-263/OPT-268: walk-and-balance same-expiration roll detection.
-                # Build a lots_data list in the shape compute_roll_timeline expects.
-                lots_data = []
-                for lot in lots:
-                    lot_closings_local = closings_by_lot.get(lot.id, [])
-                    lots_data.append({
-                        'lot_id': lot.id,
-                        'option_type': lot.option_type,
-                        'strike': lot.strike,
-                        'expiration': str(lot.expiration) if lot.expiration else None,
-                        'quantity': lot.quantity,
-                        'original_quantity': lot.original_quantity,
-                        'remaining_quantity': lot.remaining_quantity,
-                        'status': lot.status,
-                        'entry_date': str(lot.entry_date) if lot.entry_date else None,
-                        'entry_price': lot.entry_price,
-                        'opening_fees': 0,
-                        'leg_index': lot.leg_index,
-                        'closings': [{
-                            'closing_id': c.closing_id,
-                            'closing_date': str(c.closing_date) if c.closing_date else None,
-                            'closing_price': c.closing_price,
-                            'quantity_closed': c.quantity_closed,
-                            'closing_type': c.closing_type,
-                            'fees': 0,
-                        } for c in lot_closings_local],
-                    })
-                roll_timeline = compute_roll_timeline(lots_data)
-
-                equity_summary = None
-                if open_equity_legs:
-                    total_eq_qty = sum(
-                        l['quantity'] * (1 if l['quantity_direction'] == 'Long' else -1)
-                        for l in open_equity_legs
-                    )
-                    total_eq_cost = sum(abs(l['cost_basis']) for l in open_equity_legs)
-                    equity_summary = {
-                        "quantity": total_eq_qty,
-                        "average_price": total_eq_cost / abs(total_eq_qty) if total_eq_qty != 0 else 0,
-                        "cost_basis": total_eq_cost,
-                    }
-
-                strategy_type = g['strategy_label'] or 'Unknown'
-                if not open_option_legs and open_equity_legs:
-                    strategy_type = "Shares"
-
-                group_obj = {
-                    "chain_id": gid,
-                    "group_id": gid,
-                    "underlying": g['underlying'],
-                    "account_number": acct,
-                    "strategy_type": strategy_type,
-                    "opening_date": g['opening_date'],
-                    "chain_status": g['status'],
-                    "realized_pnl": realized_pnl,
-                    "cost_basis_total": cost_basis_total,
-                    "roll_count": roll_timeline['roll_count'],
-                    "current_strike_label": roll_timeline['current_strike_label'],
-                    "roll_timeline": roll_timeline,
-                    "has_assignment": has_assignment,
-                    "open_legs": open_option_legs,
-                    "equity_legs": open_equity_legs,
-                    "equity_summary": equity_summary,
-                    "tags": tags_by_group.get(gid, []),
-                    "roll_chain": rc,
-                }
-                if open_option_legs or open_equity_legs:
-                    result[acct]["chains"].append(group_obj)
+                chain = visible_chain(snapshot, today)
+                if chain is not None:
+                    chain["tags"] = tags_by_group.get(gid, [])
+                    result[acct]["chains"].append(chain)
 
         logger.info(f"/api/open-chains: Returning {sum(len(a['chains']) for a in result.values())} groups across {len(result)} accounts")
         return result
@@ -411,5 +149,3 @@ async def get_open_chains(account_number: Optional[str] = None, db: DatabaseMana
         import traceback
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
-
-
@@ -1,7 +1,6 @@
 """Quote and WebSocket routes."""
 
 import asyncio
-from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from loguru import logger
@@ -9,6 +8,8 @@ from loguru import logger
 from src.database.db_manager import DatabaseManager
 from src.utils.auth_manager import ConnectionManager
 from src.dependencies import get_db, get_connection_manager, get_current_user_id, AUTH_ENABLED
+from src.utils.quote_cache import get_quote_cache
+from src.utils.quote_frames import QuoteFrameEncoder
 
 router = APIRouter()
 
@@ -26,7 +27,7 @@ async def get_market_quotes(symbols: str, refresh: bool = False, request: Reques
         # If not forcing refresh, try cached quotes first (no auth needed)
         if not refresh:
             logger.info(f"Attempting to get cached quotes for: {symbol_list}")
-            cached_quotes = db.get_cached_quotes(symbol_list)
+            cached_quotes = await asyncio.to_thread(db.get_cached_quotes, symbol_list)
             if cached_quotes:
                 for symbol, quote_data in cached_quotes.items():
                     if 'mark' in quote_data and quote_data['mark'] is not None:
@@ -45,7 +46,7 @@ async def get_market_quotes(symbols: str, refresh: bool = False, request: Reques
         else:
             client = connection_manager.get_client()
         if not client:
-            cached_quotes = db.get_cached_quotes(symbol_list)
+            cached_quotes = await asyncio.to_thread(db.get_cached_quotes, symbol_list)
             if cached_quotes:
                 logger.info(f"Not connected, returning fallback cached quotes: {list(cached_quotes.keys())}")
                 for symbol, quote_data in cached_quotes.items():
@@ -59,10 +60,9 @@ async def get_market_quotes(symbols: str, refresh: bool = False, request: Reques
             raise HTTPException(status_code=503, detail="Not connected to Tastytrade")
 
         if refresh:
-            client.clear_quote_cache()
-            logger.info("Cache cleared due to refresh parameter")
+            logger.info("Bypassing quote cache due to refresh parameter")
 
-        quotes = await client.get_quotes(symbol_list)
+        quotes = await client.get_quotes(symbol_list, force_refresh=refresh)
 
         logger.info(f"API endpoint returning quotes for {len(quotes)} symbols")
 
@@ -102,6 +102,9 @@ async def websocket_quotes(websocket: WebSocket, token: str = Query(default=None
     logger.info("WebSocket connection accepted")
 
     subscribed_symbols = []
+    subscription = None
+    # Full-quote JSON frames unless the client opts in on subscribe
+    encoder = QuoteFrameEncoder()
 
     try:
         await websocket.send_json({"type": "connected", "message": "WebSocket connected"})
@@ -116,11 +119,16 @@ async def websocket_quotes(websocket: WebSocket, token: str = Query(default=None
         cache_only = client is None
         if cache_only:
             logger.info("WebSocket running in cache-only mode (no Tastytrade connection)")
+            # Cache-only sockets can't fetch, but still receive quotes that
+            # any connected client or worker publishes to the shared cache.
+            subscription = get_quote_cache().subscribe()
         else:
             logger.info("WebSocket client connected using shared Tastytrade session")
+            # One DXLink connection per client, shared by all of its sockets
+            subscription = client.get_stream_hub().subscribe()
 
         async def receive_messages():
-            nonlocal subscribed_symbols
+            nonlocal subscribed_symbols, encoder
             try:
                 while True:
                     data = await websocket.receive_json()
@@ -131,26 +139,36 @@ async def websocket_quotes(websocket: WebSocket, token: str = Query(default=None
                             subscribed_symbols = symbols
                             logger.info(f"WebSocket subscribing to quotes for: {symbols}")
 
+                            encoder = QuoteFrameEncoder.from_subscribe(data)
+                            ack = encoder.set_symbols(subscribed_symbols)
+                            if ack:
+                                await websocket.send_json(ack)
+
                             if subscribed_symbols:
                                 if cache_only:
-                                    cached = db.get_cached_quotes(subscribed_symbols)
+                                    cached = await asyncio.to_thread(db.get_cached_quotes, subscribed_symbols)
                                     if cached:
                                         for sym, qd in cached.items():
                                             if 'mark' in qd and qd['mark'] is not None:
                                                 qd['price'] = qd['mark']
                                             if 'change_percent' in qd:
                                                 qd['changePercent'] = qd['change_percent']
-                                        await websocket.send_json({"type": "quotes", "data": cached})
+                                        frame = encoder.quotes_frame(cached, timestamp=False)
+                                        if frame:
+                                            await encoder.send(websocket, frame)
                                 else:
-                                    client.clear_quote_cache()
+                                    # Full snapshot first; the hub then pushes deltas
                                     quotes = await client.get_quotes(subscribed_symbols)
-                                    await websocket.send_json({
-                                        "type": "quotes",
-                                        "data": quotes
-                                    })
+                                    frame = encoder.quotes_frame(quotes, timestamp=False)
+                                    if frame:
+                                        await encoder.send(websocket, frame)
+                            if not cache_only:
+                                await subscription.set_symbols(subscribed_symbols)
 
                     elif "unsubscribe" in data:
                         subscribed_symbols = []
+                        if not cache_only:
+                            await subscription.set_symbols([])
                         logger.info("WebSocket unsubscribed from all quotes")
 
                     elif "ping" in data:
@@ -163,33 +181,29 @@ async def websocket_quotes(websocket: WebSocket, token: str = Query(default=None
         async def send_updates():
             try:
                 while True:
-                    await asyncio.sleep(5)
+                    batch = await subscription.next_batch(timeout=5)
 
                     if websocket.client_state.value != 1:  # 1 = OPEN
                         logger.info("WebSocket closed, stopping quote updates")
                         break
 
                     if subscribed_symbols:
-                        if cache_only:
-                            # In cache-only mode, just keep the connection alive
-                            await websocket.send_json({"pong": True})
-                        else:
+                        quotes = {s: batch[s] for s in subscribed_symbols if s in batch} if batch else {}
+                        if not quotes and not cache_only and not client.get_stream_hub().streaming:
+                            # Hub is (re)connecting; poll so the socket doesn't go stale
                             quotes = await client.get_quotes(subscribed_symbols)
+                        frame = encoder.quotes_frame(quotes) if quotes else None
+                        if not frame:
+                            # Nothing new for this socket, just keep the connection alive
+                            await websocket.send_json({"pong": True})
+                            continue
 
-                            for symbol, quote_data in quotes.items():
-                                if quote_data:
-                                    db.cache_quote(symbol, quote_data)
-
-                            try:
-                                await websocket.send_json({
-                                    "type": "quotes",
-                                    "data": quotes,
-                                    "timestamp": datetime.now().isoformat()
-                                })
-                                logger.debug(f"Sent quote update for {len(quotes)} symbols, cached to database")
-                            except Exception as send_error:
-                                logger.info(f"WebSocket send failed (connection likely closed): {send_error}")
-                                break
+                        try:
+                            await encoder.send(websocket, frame)
+                            logger.debug(f"Sent quote update for {len(quotes)} symbols")
+                        except Exception as send_error:
+                            logger.info(f"WebSocket send failed (connection likely closed): {send_error}")
+                            break
 
             except asyncio.CancelledError:
                 logger.info("Quote update task cancelled")
@@ -216,4 +230,6 @@ async def websocket_quotes(websocket: WebSocket, token: str = Query(default=None
         except:
             pass
     finally:
+        if subscription is not None:
+            await subscription.close()
         logger.info("WebSocket connection closed")
@@ -8,22 +8,26 @@ from loguru import logger
 from sqlalchemy import func
 
 from src.database.models import (
-    PnlEvent, PositionGroup, PositionGroupLot,
-    PositionLot as PositionLotModel, LotClosing as LotClosingModel,
+    PnlEvent, PnlRollup, PositionGroup, PositionGroupLot,
+    PositionLot as PositionLotModel, LotClosing as LotClosingModel, iso_day,
 )
 from src.database.db_manager import DatabaseManager
 from src.dependencies import get_db, get_current_user_id
-from src.pipeline.pnl_events import populate_pnl_events
-from src.services.report_service import calculate_max_risk_reward
+from src.pipeline.pnl_events import populate_pnl_events, refresh_pnl_rollups
+from src.services.report_service import RISK_REWARD_GROUP_CHUNK, calculate_max_risk_reward_batch
 
 router = APIRouter()
 
 
 def _ensure_pnl_events(db: DatabaseManager) -> None:
-    """Auto-populate pnl_events if the table is empty but lot_closings exist."""
+    """Auto-populate pnl_events if the table is empty but lot_closings exist,
+    and pnl_rollups if only the rollups are missing."""
     with db.get_session() as session:
         event_count = session.query(func.count()).select_from(PnlEvent).scalar()
         if event_count > 0:
+            if session.query(PnlRollup.id).first() is None:
+                logger.info("pnl_rollups empty with %d pnl_events — rebuilding", event_count)
+                refresh_pnl_rollups(db)
             return
         closing_count = session.query(func.count()).select_from(LotClosingModel).scalar()
         if closing_count == 0:
@@ -38,34 +42,44 @@ async def get_dashboard_data(
     db: DatabaseManager = Depends(get_db),
     user_id: str = Depends(get_current_user_id),
 ):
-    """Get dashboard summary data using pnl_events."""
+    """Get dashboard summary data using pnl_rollups."""
     try:
         _ensure_pnl_events(db)
         with db.get_session() as session:
-            # Count groups by status
-            q = session.query(PositionGroup)
+            # Group counts per strategy and status
+            count_q = session.query(
+                PositionGroup.strategy_label,
+                PositionGroup.status,
+                func.count(PositionGroup.id),
+            )
             if account_number:
-                q = q.filter(PositionGroup.account_number == account_number)
-            groups = [
-                {'group_id': g.group_id, 'status': g.status,
-                 'strategy_label': g.strategy_label}
-                for g in q.all()
-            ]
-
-            # Realized P&L from pnl_events
+                count_q = count_q.filter(PositionGroup.account_number == account_number)
+            group_counts = count_q.group_by(
+                PositionGroup.strategy_label, PositionGroup.status,
+            ).all()
+
+            # Realized P&L per group from pnl_rollups, with the group's
+            # current status and label
             pnl_q = session.query(
-                PnlEvent.group_id,
-                func.sum(PnlEvent.realized_pnl).label('pnl'),
+                PositionGroup.strategy_label,
+                PositionGroup.status,
+                func.sum(PnlRollup.realized_pnl),
+            ).join(
+                PositionGroup,
+                (PositionGroup.group_id == PnlRollup.group_id)
+                & (PositionGroup.user_id == PnlRollup.user_id),
             )
             if account_number:
-                pnl_q = pnl_q.filter(PnlEvent.account_number == account_number)
-            pnl_q = pnl_q.group_by(PnlEvent.group_id)
-            pnl_map = {gid: float(pnl) for gid, pnl in pnl_q.all()}
+                pnl_q = pnl_q.filter(PnlRollup.account_number == account_number)
+            group_pnls = pnl_q.group_by(
+                PnlRollup.group_id, PositionGroup.strategy_label, PositionGroup.status,
+            ).all()
 
-        open_groups = [g for g in groups if g['status'] == 'OPEN']
-        closed_groups = [g for g in groups if g['status'] == 'CLOSED']
+        total_trades = sum(n for _, _, n in group_counts)
+        open_trades = sum(n for _, status, n in group_counts if status == 'OPEN')
+        closed_trades = sum(n for _, status, n in group_counts if status == 'CLOSED')
 
-        realized_pnl = sum(pnl_map.get(g['group_id'], 0) for g in groups)
+        realized_pnl = sum(float(pnl) for _, _, pnl in group_pnls)
 
         unrealized_pnl = 0
         position_data_source = "none"
@@ -81,25 +95,28 @@ async def get_dashboard_data(
 
         total_pnl = realized_pnl + unrealized_pnl
 
-        profitable_closed = [
-            g for g in closed_groups if pnl_map.get(g['group_id'], 0) > 0
-        ]
-        win_rate = len(profitable_closed) / len(closed_groups) * 100 if closed_groups else 0
+        profitable_closed = sum(
+            1 for _, status, pnl in group_pnls if status == 'CLOSED' and pnl > 0
+        )
+        win_rate = profitable_closed / closed_trades * 100 if closed_trades else 0
 
         strategy_breakdown = {}
-        for g in groups:
-            strategy = g['strategy_label'] or 'Unknown'
-            if strategy not in strategy_breakdown:
-                strategy_breakdown[strategy] = {
-                    'count': 0, 'total_pnl': 0, 'closed_count': 0, 'wins': 0,
-                }
-            pnl = pnl_map.get(g['group_id'], 0)
-            strategy_breakdown[strategy]['count'] += 1
-            strategy_breakdown[strategy]['total_pnl'] += pnl
-            if g['status'] == 'CLOSED':
-                strategy_breakdown[strategy]['closed_count'] += 1
-                if pnl > 0:
-                    strategy_breakdown[strategy]['wins'] += 1
+
+        def _strategy(label):
+            return strategy_breakdown.setdefault(label or 'Unknown', {
+                'count': 0, 'total_pnl': 0, 'closed_count': 0, 'wins': 0,
+            })
+
+        for label, status, n in group_counts:
+            stats = _strategy(label)
+            stats['count'] += n
+            if status == 'CLOSED':
+                stats['closed_count'] += n
+        for label, status, pnl in group_pnls:
+            stats = _strategy(label)
+            stats['total_pnl'] += float(pnl)
+            if status == 'CLOSED' and pnl > 0:
+                stats['wins'] += 1
 
         strategy_stats = []
         for strategy, stats in strategy_breakdown.items():
@@ -115,9 +132,9 @@ async def get_dashboard_data(
 
         return {
             "summary": {
-                "total_trades": len(groups),
-                "open_trades": len(open_groups),
-                "closed_trades": len(closed_groups),
+                "total_trades": total_trades,
+                "open_trades": open_trades,
+                "closed_trades": closed_trades,
                 "total_pnl": total_pnl,
                 "realized_pnl": realized_pnl,
                 "unrealized_pnl": unrealized_pnl,
@@ -139,45 +156,37 @@ async def get_monthly_performance(
     db: DatabaseManager = Depends(get_db),
     user_id: str = Depends(get_current_user_id),
 ):
-    """Get monthly performance data from pnl_events."""
+    """Get monthly performance data from pnl_rollups."""
     try:
         _ensure_pnl_events(db)
         if year is None:
             year = date.today().year
 
-        year_prefix = str(year)
-
         with db.get_session() as session:
             q = session.query(
-                func.substr(PnlEvent.closing_date, 1, 7).label('month'),
-                func.sum(PnlEvent.realized_pnl).label('pnl'),
-                func.count(PnlEvent.id).label('trade_count'),
+                PnlRollup.close_month,
+                func.sum(PnlRollup.realized_pnl),
+                func.sum(PnlRollup.event_count),
             ).filter(
-                PnlEvent.closing_date.like(f"{year_prefix}%"),
+                PnlRollup.close_day >= date(year, 1, 1),
+                PnlRollup.close_day < date(year + 1, 1, 1),
             )
             if account_number:
-                q = q.filter(PnlEvent.account_number == account_number)
-            q = q.group_by(func.substr(PnlEvent.closing_date, 1, 7))
-            rows = q.all()
+                q = q.filter(PnlRollup.account_number == account_number)
+            rows = q.group_by(PnlRollup.close_month).all()
+        totals = {month: (float(pnl), int(count)) for month, pnl, count in rows}
 
-        # Build full 12-month structure
+        # Full 12-month structure
         months = []
         for m in range(1, 13):
             month_key = f"{year}-{m:02d}"
+            pnl, trade_count = totals.get(month_key, (0.0, 0))
             months.append({
                 'month': month_key,
-                'pnl': 0.0,
-                'trade_count': 0,
+                'pnl': pnl,
+                'trade_count': trade_count,
             })
 
-        for row in rows:
-            month_key = row.month
-            for entry in months:
-                if entry['month'] == month_key:
-                    entry['pnl'] = float(row.pnl)
-                    entry['trade_count'] = int(row.trade_count)
-                    break
-
         return {"year": year, "months": months}
     except Exception as e:
         logger.error(f"Error fetching monthly performance: {str(e)}")
@@ -215,65 +224,64 @@ async def get_performance_report(
     db: DatabaseManager = Depends(get_db),
     user_id: str = Depends(get_current_user_id),
 ):
-    """Get performance report data from pnl_events.
+    """Get performance report data from pnl_rollups.
 
     Date params are ISO date strings (YYYY-MM-DD).
-    exit_from/exit_to filter on pnl_events.closing_date (the event date).
+    exit_from/exit_to filter on the closing day of the underlying pnl_events.
     """
     try:
+        day_range = {}
+        for name, value in (('exit_from', exit_from), ('exit_to', exit_to)):
+            if value:
+                day_range[name] = iso_day(value)
+                if day_range[name] is None:
+                    raise HTTPException(status_code=400, detail=f"Invalid {name} date: {value}")
+
         _ensure_pnl_events(db)
         strategy_list = [s.strip() for s in strategies.split(',') if s.strip()] if strategies else []
 
         with db.get_session() as session:
-            # Query pnl_events aggregated by group_id
+            # Realized P&L per group over the exit-date range, from pnl_rollups
             q = session.query(
-                PnlEvent.group_id,
-                func.sum(PnlEvent.realized_pnl).label('pnl'),
-            )
+                PnlRollup.group_id,
+                PnlRollup.strategy_label,
+                func.sum(PnlRollup.realized_pnl),
+            ).filter(PnlRollup.group_id.isnot(None))
 
             if account_number:
-                q = q.filter(PnlEvent.account_number == account_number)
-            if exit_from:
-                q = q.filter(PnlEvent.closing_date >= exit_from)
-            if exit_to:
-                q = q.filter(PnlEvent.closing_date <= exit_to + "T23:59:59")
-
-            q = q.group_by(PnlEvent.group_id)
-            pnl_rows = q.all()
-
-            # Build group_id -> pnl map
+                q = q.filter(PnlRollup.account_number == account_number)
+            if 'exit_from' in day_range:
+                q = q.filter(PnlRollup.close_day >= day_range['exit_from'])
+            if 'exit_to' in day_range:
+                q = q.filter(PnlRollup.close_day <= day_range['exit_to'])
+            if strategy_list:
+                label_match = PnlRollup.strategy_label.in_(strategy_list)
+                if 'Unknown' in strategy_list:
+                    label_match = label_match | PnlRollup.strategy_label.is_(None) | (PnlRollup.strategy_label == '')
+                q = q.filter(label_match)
+
+            groups = []
             pnl_map = {}
-            group_ids_with_events = set()
-            for group_id, pnl in pnl_rows:
-                if group_id is not None:
-                    pnl_map[group_id] = float(pnl)
-                    group_ids_with_events.add(group_id)
-
-            # Fetch strategy labels for these groups
-            group_labels = {}
-            if group_ids_with_events:
-                label_rows = session.query(
-                    PositionGroup.group_id,
-                    PositionGroup.strategy_label,
-                ).filter(
-                    PositionGroup.group_id.in_(list(group_ids_with_events)),
-                ).all()
-                group_labels = {gid: label for gid, label in label_rows}
-
-            # Calculate risk/reward per group
+            for gid, label, pnl in q.group_by(PnlRollup.group_id, PnlRollup.strategy_label).all():
+                pnl_map[gid] = float(pnl)
+                groups.append({'group_id': gid, 'strategy_label': label or 'Unknown'})
+
+            # Risk/reward stored on the groups by the pipeline; groups without
+            # values (rows that predate the columns) are computed in one batch
             group_risk_reward = {}
-            for gid in group_ids_with_events:
-                label = group_labels.get(gid)
-                max_risk, max_reward = calculate_max_risk_reward(session, gid, label)
-                group_risk_reward[gid] = (max_risk, max_reward)
-
-        # Apply strategy filter
-        groups = []
-        for gid in group_ids_with_events:
-            label = group_labels.get(gid) or 'Unknown'
-            if strategy_list and label not in strategy_list:
-                continue
-            groups.append({'group_id': gid, 'strategy_label': label})
+            gids = [g['group_id'] for g in groups]
+            for i in range(0, len(gids), RISK_REWARD_GROUP_CHUNK):
+                for gid, max_risk, max_reward in session.query(
+                    PositionGroup.group_id, PositionGroup.max_risk, PositionGroup.max_reward,
+                ).filter(PositionGroup.group_id.in_(gids[i:i + RISK_REWARD_GROUP_CHUNK])).all():
+                    if max_risk is not None or max_reward is not None:
+                        group_risk_reward[gid] = (max_risk, max_reward)
+            missing = {
+                g['group_id']: g['strategy_label'] for g in groups
+                if g['group_id'] not in group_risk_reward
+            }
+            if missing:
+                group_risk_reward.update(calculate_max_risk_reward_batch(session, missing))
 
         total_pnl = 0.0
         wins = 0
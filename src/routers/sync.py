@@ -15,10 +15,20 @@ from src.services.sync_service import (
     reconcile_positions_vs_chains,
 )
 from src.pipeline.orchestrator import reprocess
+from src.services.ingest_service import ingest_transactions
 
 router = APIRouter()
 
 
+def _day_start(days_back: int) -> datetime:
+    """Midnight ``days_back`` days ago.
+
+    Day-aligned so a retried sync asks for the same range and can pick up
+    an interrupted ingest's checkpoint.
+    """
+    return datetime.combine(date.today() - timedelta(days=days_back), datetime.min.time())
+
+
 def _is_processable_txn(t: dict) -> bool:
     """Return True if this raw transaction is one the pipeline will process.
 
@@ -74,23 +84,19 @@ async def sync_unified(tastytrade: TastytradeClient = Depends(get_tastytrade_cli
         active_accounts = {a['account_number'] for a in db.get_accounts()}
         logger.info(f"Active accounts for sync: {active_accounts}")
 
-        # Fetch transactions from active accounts
+        # Stream transactions from active accounts into raw_transactions,
+        # skipping ones the pipeline will subsequently ignore (cash
+        # movements, futures, crypto, etc.) so counts/reporting match what
+        # the user actually sees in positions/ledger.
         logger.info("Fetching transactions from active accounts...")
-        transactions = await tastytrade.get_transactions(days_back=days_back)
-        transactions = [t for t in transactions if t.get('account_number') in active_accounts]
-        logger.info(f"Fetched {len(transactions)} transactions")
-
-        # Filter out transactions that the pipeline will subsequently ignore
-        # (cash movements, futures, crypto, etc.) so counts/reporting match
-        # what the user actually sees in positions/ledger.
-        before_count = len(transactions)
-        transactions = [t for t in transactions if _is_processable_txn(t)]
-        skipped = before_count - len(transactions)
-        if skipped:
-            logger.info(f"Skipped {skipped} non-processable transactions (cash/futures/etc.)")
-
-        logger.info("Saving raw transactions...")
-        raw_saved, new_symbols = db.save_raw_transactions(transactions)
+        ingest = await ingest_transactions(
+            db, tastytrade,
+            [a['account_number'] for a in accounts if a['account_number'] in active_accounts],
+            _day_start(days_back),
+            keep=_is_processable_txn,
+            use_cursors=True,
+        )
+        raw_saved, new_symbols = ingest.saved, ingest.new_symbols
         logger.info(f"Saved {raw_saved} raw transactions")
 
         # Fetch account balances for active accounts
@@ -108,26 +114,13 @@ async def sync_unified(tastytrade: TastytradeClient = Depends(get_tastytrade_cli
         logger.info("Updated last sync timestamp")
 
         # Reprocess pipeline BEFORE saving positions
-        if raw_saved > 0:
-            affected_underlyings = set()
-            for txn in transactions:
-                underlying = txn.get('underlying_symbol', '')
-                if underlying:
-                    underlying = underlying.split()[0] if ' ' in underlying else underlying
-                    affected_underlyings.add(underlying)
-
-            use_incremental = raw_saved < 50 and len(affected_underlyings) <= 10
-
-            if use_incremental:
-                logger.info(f"Incremental reprocessing for {len(affected_underlyings)} underlyings: {affected_underlyings}")
-            else:
-                logger.info(f"Full reprocessing (raw_saved={raw_saved}, underlyings={len(affected_underlyings)})")
-                affected_underlyings = None
+        if ingest.partitions:
+            dirty = ingest.partitions
+            logger.info(f"Incremental reprocessing for {len(dirty)} partitions: {sorted(dirty)}")
 
             try:
-                raw_transactions = db.get_raw_transactions()
-                result = reprocess(db, lot_manager,
-                                   raw_transactions, affected_underlyings)
+                raw_transactions = list(db.iter_raw_transactions(partitions=dirty))
+                result = reprocess(db, lot_manager, raw_transactions, partitions=dirty)
                 logger.info(
                     f"Pipeline completed: {result.orders_assembled} orders, "
                     f"{result.groups_processed} groups"
@@ -151,18 +144,19 @@ async def sync_unified(tastytrade: TastytradeClient = Depends(get_tastytrade_cli
                 else:
                     logger.error(f"Failed to save positions for account {account_number}")
 
-        logger.info(f"Sync completed: {len(transactions)} transactions processed, {total_positions} positions updated")
+        logger.info(f"Sync completed: {ingest.fetched} transactions processed, {total_positions} positions updated")
 
         reconciliation = await reconcile_positions_vs_chains(db=db)
 
         return {
             "message": f"Sync completed: {raw_saved} new transactions processed",
-            "transactions_processed": len(transactions),
+            "transactions_processed": ingest.fetched,
             "new_transactions": raw_saved,
             "symbols": sorted(new_symbols),
             "positions_updated": total_positions,
             "last_sync": db.get_last_sync_timestamp().isoformat() if db.get_last_sync_timestamp() else None,
-            "reconciliation": reconciliation
+            "reconciliation": reconciliation,
+            "failed_accounts": tastytrade.failed_accounts(),
         }
     except Exception as e:
         logger.error(f"Sync error: {str(e)}", exc_info=True)
@@ -181,7 +175,7 @@ async def reprocess_pipeline(
     Useful for applying code changes to existing data.
     """
     try:
-        raw_transactions = db.get_raw_transactions()
+        raw_transactions = list(db.iter_raw_transactions())
         if not raw_transactions:
             return {"message": "No raw transactions to process", "groups_processed": 0}
 
@@ -284,13 +278,12 @@ async def initial_sync(
 
         logger.info(f"Fetching transactions (last {days_label} days) for active accounts...")
         FALLBACK_DAYS_BACK = 730
-        transactions = await tastytrade.get_transactions(start_date=sync_start) if sync_start else await tastytrade.get_transactions(days_back=FALLBACK_DAYS_BACK)
-        transactions = [t for t in transactions if t.get('account_number') in active_accounts]
-        logger.info(f"Fetched {len(transactions)} transactions (filtered to active accounts)")
-
-        logger.info("Saving raw transactions...")
-        raw_saved, _ = db.save_raw_transactions(transactions)
-        logger.info(f"Saved {raw_saved} raw transactions")
+        ingest = await ingest_transactions(
+            db, tastytrade,
+            [a['account_number'] for a in accounts if a['account_number'] in active_accounts],
+            sync_start or _day_start(FALLBACK_DAYS_BACK),
+        )
+        logger.info(f"Saved {ingest.saved} raw transactions")
 
         logger.info("Fetching current positions from active accounts...")
         all_positions = await tastytrade.get_positions()
@@ -322,7 +315,7 @@ async def initial_sync(
         db.mark_initial_sync_completed()
 
         logger.info("Running full pipeline on initial sync data...")
-        raw_transactions = db.get_raw_transactions()
+        raw_transactions = list(db.iter_raw_transactions())
         pipeline_result = reprocess(db, lot_manager, raw_transactions)
         logger.info(
             f"INITIAL SYNC completed: {pipeline_result.orders_assembled} orders, "
@@ -334,8 +327,9 @@ async def initial_sync(
             "orders_assembled": pipeline_result.orders_assembled,
             "groups_processed": pipeline_result.groups_processed,
             "positions_updated": total_positions,
-            "transactions_processed": len(transactions),
-            "last_sync": db.get_last_sync_timestamp().isoformat() if db.get_last_sync_timestamp() else None
+            "transactions_processed": ingest.fetched,
+            "last_sync": db.get_last_sync_timestamp().isoformat() if db.get_last_sync_timestamp() else None,
+            "failed_accounts": tastytrade.failed_accounts(),
         }
     except Exception as e:
         logger.error(f"Initial sync error: {str(e)}", exc_info=True)
@@ -363,26 +357,18 @@ async def sync_account(
         account_info = db.get_account(account_number)
         opened_at = account_info.get('opened_at') if account_info else None
         if opened_at:
-            start = datetime.fromisoformat(opened_at)
-            days_back = (datetime.now() - start).days + 1
+            days_back = (datetime.now() - datetime.fromisoformat(opened_at)).days + 1
             logger.info(f"Account-scoped sync for {account_number} (opened_at={opened_at}, {days_back} days)")
         else:
             days_back = FALLBACK_DAYS_BACK
             logger.info(f"Account-scoped sync for {account_number} (no opened_at, {days_back} days)")
 
-        # Fetch transactions for this account only
-        transactions = await tastytrade.get_transactions(
-            days_back=days_back, account_number=account_number,
+        # Stream transactions for this account only
+        ingest = await ingest_transactions(
+            db, tastytrade, [account_number], _day_start(days_back),
+            keep=_is_processable_txn,
         )
-        logger.info(f"Fetched {len(transactions)} transactions for account {account_number}")
-
-        before_count = len(transactions)
-        transactions = [t for t in transactions if _is_processable_txn(t)]
-        skipped = before_count - len(transactions)
-        if skipped:
-            logger.info(f"Skipped {skipped} non-processable transactions (cash/futures/etc.)")
-
-        raw_saved, new_symbols = db.save_raw_transactions(transactions)
+        raw_saved, new_symbols = ingest.saved, ingest.new_symbols
         logger.info(f"Saved {raw_saved} new transactions")
 
         # Fetch balances for this account
@@ -392,8 +378,8 @@ async def sync_account(
                 db.save_account_balance(balance)
 
         # Run account-scoped pipeline
-        if raw_saved > 0:
-            raw_transactions = db.get_raw_transactions()
+        if raw_saved > 0 or ingest.partitions:
+            raw_transactions = list(db.iter_raw_transactions(account_number=account_number))
             result = reprocess(db, lot_manager, raw_transactions, account_number=account_number)
             logger.info(
                 f"Account pipeline completed: {result.orders_assembled} orders, "
@@ -417,6 +403,7 @@ async def sync_account(
             "positions_updated": total_positions,
             "orders_assembled": result.orders_assembled if result else 0,
             "groups_processed": result.groups_processed if result else 0,
+            "failed_accounts": tastytrade.failed_accounts(),
         }
     except Exception as e:
         logger.error(f"Account sync error for {account_number}: {e}", exc_info=True)
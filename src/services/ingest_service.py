@@ -0,0 +1,211 @@
+"""Ingest service — streams transaction history from Tastytrade into raw_transactions.
+
+Each account's history is fetched a page at a time, oldest first, and
+every page is persisted as soon as it arrives: fetchers push pages onto a
+bounded queue and a single writer drains it into save_raw_transactions.
+Memory stays at a few pages however long the history is, and rows start
+landing while later pages are still in flight.
+
+After each persisted page the writer checkpoints the account's watermark
+(newest executed_at written so far) in sync_metadata.  If the ingest is
+interrupted, the next ingest over the same range resumes from the
+watermark instead of refetching from the start; the overlap at the
+watermark itself is absorbed by the raw_transactions upsert.
+
+When an account finishes, its sync cursor (executed_at and id of the
+newest transaction seen) is advanced in sync_metadata.  Incremental syncs
+pass ``use_cursors=True`` to start each account at its cursor minus
+SYNC_CURSOR_OVERLAP instead of a days_back window, so an account with no
+new activity costs a single short page.
+"""
+
+import asyncio
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from loguru import logger
+
+from src.api.tastytrade_client import ACCOUNT_FETCH_CONCURRENCY, TastytradeClient
+from src.database.db_manager import DatabaseManager
+from src.pipeline.partitions import Partition, saved_partitions
+
+# Pages buffered between the fetchers and the writer
+INGEST_QUEUE_PAGES = 8
+
+# Refetched before each cursor, for transactions posted after the sync
+# that carry a slightly earlier executed_at
+SYNC_CURSOR_OVERLAP = timedelta(hours=1)
+
+_CHECKPOINT_KEY = "ingest_checkpoint:{}"
+_CURSOR_KEY = "sync_cursor:{}"
+_DONE = object()
+
+
+@dataclass
+class IngestResult:
+    fetched: int = 0                 # transactions kept after filtering
+    saved: int = 0                   # newly inserted rows
+    new_symbols: Set[str] = field(default_factory=set)
+    partitions: Set[Partition] = field(default_factory=set)
+    failed_accounts: Dict[str, str] = field(default_factory=dict)
+
+
+def _aware(dt: datetime) -> datetime:
+    """Comparable datetime; naive values are taken as local time."""
+    return dt if dt.tzinfo else dt.astimezone()
+
+
+def get_sync_cursor(db: DatabaseManager, account_number: str) -> Optional[Dict]:
+    """{"executed_at", "transaction_id"} of the newest transaction synced for an account."""
+    raw = db.get_sync_metadata(_CURSOR_KEY.format(account_number))
+    return json.loads(raw) if raw else None
+
+
+def clear_sync_state(db: DatabaseManager, account_number: str) -> None:
+    """Forget an account's cursor and any unfinished checkpoint."""
+    db.delete_sync_metadata(_CURSOR_KEY.format(account_number))
+    db.delete_sync_metadata(_CHECKPOINT_KEY.format(account_number))
+
+
+def _advance_cursor(db: DatabaseManager, account_number: str, checkpoint: Dict) -> None:
+    if not checkpoint["through"]:
+        return
+    cursor = get_sync_cursor(db, account_number)
+    if cursor and _aware(datetime.fromisoformat(cursor["executed_at"])) >= _aware(datetime.fromisoformat(checkpoint["through"])):
+        return
+    db.set_sync_metadata(_CURSOR_KEY.format(account_number), json.dumps({
+        "executed_at": checkpoint["through"],
+        "transaction_id": checkpoint["through_id"],
+    }))
+
+
+def _load_checkpoint(db: DatabaseManager, account_number: str, start: datetime) -> Optional[Dict]:
+    """The account's unfinished checkpoint, if it covers ``start``.
+
+    A checkpoint from an ingest that began later than ``start`` is ignored:
+    the range before its own start was never fetched.
+    """
+    raw = db.get_sync_metadata(_CHECKPOINT_KEY.format(account_number))
+    if not raw:
+        return None
+    try:
+        checkpoint = json.loads(raw)
+        if _aware(datetime.fromisoformat(checkpoint["start"])) <= _aware(start):
+            return checkpoint
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable ingest checkpoint for {account_number}: {e}")
+    return None
+
+
+async def ingest_transactions(
+    db: DatabaseManager,
+    tastytrade: TastytradeClient,
+    account_numbers: Iterable[str],
+    start: datetime,
+    *,
+    keep: Callable[[Dict], bool] = None,
+    use_cursors: bool = False,
+) -> IngestResult:
+    """Fetch and persist history since ``start`` for each account.
+
+    With ``use_cursors``, accounts that have a sync cursor start from it
+    (less SYNC_CURSOR_OVERLAP) and ``start`` only applies to the rest.
+    ``keep`` filters which fetched transactions are saved.  Accounts are
+    fetched concurrently (up to ACCOUNT_FETCH_CONCURRENCY); one account
+    failing is reported in ``failed_accounts`` and leaves its checkpoint
+    in place for the next run, without stopping the others.
+
+    ``partitions`` covers everything saved by this run plus anything an
+    interrupted earlier run saved but never got to reprocess.
+    """
+    account_numbers = list(account_numbers)
+    result = IngestResult()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=INGEST_QUEUE_PAGES)
+    semaphore = asyncio.Semaphore(ACCOUNT_FETCH_CONCURRENCY)
+
+    checkpoints: Dict[str, Dict] = {}
+    since: Dict[str, datetime] = {}
+    written: Set[str] = set()
+    for account_number in account_numbers:
+        account_start = start
+        cursor = get_sync_cursor(db, account_number) if use_cursors else None
+        if cursor:
+            account_start = datetime.fromisoformat(cursor["executed_at"]) - SYNC_CURSOR_OVERLAP
+        checkpoint = _load_checkpoint(db, account_number, account_start)
+        if checkpoint is not None and checkpoint["through"]:
+            logger.info(f"Resuming ingest for {account_number} from {checkpoint['through']}")
+            since[account_number] = datetime.fromisoformat(checkpoint["through"])
+            written.add(account_number)
+        else:
+            # Seeded with the cursor so pages that only repeat the overlap
+            # don't count as progress
+            checkpoint = {
+                "start": account_start.isoformat(),
+                "through": cursor["executed_at"] if cursor else None,
+                "through_id": cursor["transaction_id"] if cursor else None,
+                "partitions": [],
+            }
+            since[account_number] = account_start
+        checkpoints[account_number] = checkpoint
+        result.partitions.update(tuple(p) for p in checkpoint["partitions"])
+
+    async def fetch(account_number: str):
+        try:
+            async with semaphore:
+                async for page in tastytrade.iter_transaction_pages(account_number, since[account_number]):
+                    await queue.put((account_number, page))
+        except Exception as e:
+            logger.error(f"Failed to get transactions from account {account_number}: {e}")
+            result.failed_accounts[account_number] = str(e) or type(e).__name__
+        await queue.put((account_number, _DONE))
+
+    async def write():
+        remaining = len(account_numbers)
+        while remaining:
+            account_number, page = await queue.get()
+            key = _CHECKPOINT_KEY.format(account_number)
+            checkpoint = checkpoints[account_number]
+
+            if page is _DONE:
+                remaining -= 1
+                if account_number not in result.failed_accounts and account_number in written:
+                    await asyncio.to_thread(_advance_cursor, db, account_number, checkpoint)
+                    await asyncio.to_thread(db.delete_sync_metadata, key)
+                continue
+
+            rows = [t for t in page if keep(t)] if keep else page
+            saved, new_symbols = await asyncio.to_thread(db.save_raw_transactions, rows)
+            result.fetched += len(rows)
+            result.saved += saved
+            result.new_symbols |= new_symbols
+            if saved:
+                dirty = saved_partitions(rows, new_symbols)
+                result.partitions |= dirty
+                checkpoint["partitions"] = sorted(set(map(tuple, checkpoint["partitions"])) | dirty)
+
+            newest = max((t for t in page if t.get("executed_at")), key=lambda t: t["executed_at"], default=None)
+            if newest is not None and (checkpoint["through"] is None or newest["executed_at"] > checkpoint["through"]):
+                checkpoint["through"] = newest["executed_at"]
+                checkpoint["through_id"] = newest["id"]
+            elif not saved:
+                continue  # nothing new (e.g. only the cursor overlap); no checkpoint to write
+            await asyncio.to_thread(db.set_sync_metadata, key, json.dumps(checkpoint))
+            written.add(account_number)
+
+    fetchers = [asyncio.create_task(fetch(a)) for a in account_numbers]
+    try:
+        await write()
+    finally:
+        # Only still running if the writer failed; don't leave them blocked on the queue
+        for task in fetchers:
+            task.cancel()
+        await asyncio.gather(*fetchers, return_exceptions=True)
+
+    tastytrade.account_errors["transactions"] = dict(result.failed_accounts)
+    logger.info(
+        f"Ingested {result.fetched} transactions from {len(account_numbers)} accounts "
+        f"({result.saved} new)"
+    )
+    return result
@@ -178,13 +178,16 @@ def process_equity_transactions(account_number: Optional[str] = None, *, db: Dat
     return (0, netted)
 
 
-def net_opposing_equity_lots(*, db: DatabaseManager = None, lot_manager: LotManager = None) -> int:
+def net_opposing_equity_lots(*, db: DatabaseManager = None, lot_manager: LotManager = None,
+                             partitions: Optional[set] = None) -> int:
     """Close opposing equity lots (positive vs negative) for the same account+symbol.
 
     When a call assignment creates a derived lot with negative quantity and there are
     existing long lots (from ACAT, buys, or put assignments), they should net to zero.
     Uses FIFO matching: negative lots close against the oldest positive lots first.
 
+    If partitions is set, only those (account_number, underlying) pairs are netted.
+
     Returns:
         Number of lot sides closed during netting.
     """
@@ -194,14 +197,20 @@ def net_opposing_equity_lots(*, db: DatabaseManager = None, lot_manager: LotMana
 
     # Find (account, symbol) pairs that have BOTH positive and negative open equity lots
     with db.get_session() as session:
-        nettable = session.query(
+        nettable_q = session.query(
             PositionLotModel.account_number,
             PositionLotModel.symbol,
         ).filter(
             PositionLotModel.instrument_type == 'EQUITY',
             PositionLotModel.remaining_quantity != 0,
             PositionLotModel.status != 'CLOSED',
-        ).group_by(
+        )
+        if partitions is not None:
+            from src.pipeline.partitions import partition_clause
+            nettable_q = nettable_q.filter(partition_clause(
+                PositionLotModel.account_number, PositionLotModel.underlying, partitions,
+            ))
+        nettable = nettable_q.group_by(
             PositionLotModel.account_number,
             PositionLotModel.symbol,
         ).having(
@@ -1,8 +1,22 @@
-"""Report service — risk/reward calculations for performance reports."""
+"""Report service — risk/reward calculations for performance reports.
+
+Max risk/reward is a function of a group's lots and strategy label only.
+The pipeline computes it when it labels groups and stores it on
+position_groups.max_risk / max_reward; the batched calculator covers
+label overrides, lot moves and groups that predate the columns.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
 
 from loguru import logger
 
-from src.database.models import PositionGroupLot, PositionLot as PositionLotModel
+from src.database.models import PositionGroup, PositionGroupLot, PositionLot as PositionLotModel
+
+# Group ids per lots query in calculate_max_risk_reward_batch
+RISK_REWARD_GROUP_CHUNK = 500
+
+RiskReward = Tuple[Optional[float], Optional[float]]
 
 
 def calculate_max_risk_reward(session, group_id: str, strategy_type: str) -> tuple:
@@ -10,21 +24,65 @@ def calculate_max_risk_reward(session, group_id: str, strategy_type: str) -> tup
     Calculate max risk and max reward for a group based on its opening lots.
     Returns (max_risk, max_reward) as positive numbers, or (None, None) if cannot calculate.
     """
-    lot_rows = (
-        session.query(PositionLotModel)
-        .join(PositionGroupLot,
-              PositionLotModel.transaction_id == PositionGroupLot.transaction_id)
-        .filter(PositionGroupLot.group_id == group_id)
-        .all()
+    return calculate_max_risk_reward_batch(session, {group_id: strategy_type})[group_id]
+
+
+def calculate_max_risk_reward_batch(
+    session, labels_by_group: Dict[str, Optional[str]],
+) -> Dict[str, RiskReward]:
+    """(max_risk, max_reward) for each group in ``labels_by_group`` (group_id -> label).
+
+    Lots for all groups are loaded with one query per
+    RISK_REWARD_GROUP_CHUNK groups instead of one per group.
+    """
+    group_ids = list(labels_by_group)
+    lots_by_group = defaultdict(list)
+    for i in range(0, len(group_ids), RISK_REWARD_GROUP_CHUNK):
+        rows = (
+            session.query(PositionGroupLot.group_id, PositionLotModel)
+            .join(PositionGroupLot,
+                  PositionLotModel.transaction_id == PositionGroupLot.transaction_id)
+            .filter(PositionGroupLot.group_id.in_(group_ids[i:i + RISK_REWARD_GROUP_CHUNK]))
+            .order_by(PositionLotModel.entry_date, PositionLotModel.id)
+            .all()
+        )
+        for gid, lot in rows:
+            lots_by_group[gid].append(lot)
+    return {
+        gid: risk_reward_from_lots(lots_by_group.get(gid, []), labels_by_group[gid], group_id=gid)
+        for gid in group_ids
+    }
+
+
+def refresh_group_risk_reward(session, group_ids: Iterable[str]) -> int:
+    """Recompute and store max_risk/max_reward for ``group_ids``.
+
+    For edits made outside the pipeline (label overrides, moved lots).
+    Returns the number of groups updated.
+    """
+    groups = session.query(PositionGroup).filter(
+        PositionGroup.group_id.in_(list(group_ids)),
+    ).all()
+    results = calculate_max_risk_reward_batch(
+        session, {g.group_id: g.strategy_label for g in groups},
     )
+    for g in groups:
+        g.max_risk, g.max_reward = results[g.group_id]
+    return len(groups)
 
-    if not lot_rows:
+
+def risk_reward_from_lots(lots, strategy_type: Optional[str], group_id: str = None) -> RiskReward:
+    """(max_risk, max_reward) for a group's lots under ``strategy_type``.
+
+    ``lots`` may be PositionLot rows or Lot dataclasses, in entry order.
+    """
+    if not lots:
         return None, None
 
     # Separate by instrument type
     options = []
     stocks = []
-    for lot in lot_rows:
+    for lot in lots:
         inst = (lot.instrument_type or '').upper()
         if inst in ('EQUITY', 'STOCK'):
             stocks.append(lot)
@@ -1,6 +1,6 @@
 """Sync service — position enrichment, background sync, reconciliation."""
 
-from datetime import datetime, date as _date
+from datetime import datetime, timedelta, date as _date
 from typing import Dict, List, Any, Optional
 
 from loguru import logger
@@ -19,7 +19,10 @@ from src.dependencies import (
     lot_manager as _default_lot_manager,
     AUTH_ENABLED,
 )
+from src.pipeline.open_snapshots import refresh_open_snapshots
 from src.services import ledger_service
+from src.services.ingest_service import ingest_transactions
+from src.utils.option_symbols import canonical_symbol
 
 
 def calculate_position_opening_dates(positions: List[Dict[str, Any]], account_number: str, *, db: DatabaseManager = None) -> List[Dict[str, Any]]:
@@ -186,20 +189,6 @@ async def sync_unified_internal(user_id: str = None, *, db: DatabaseManager = No
         logger.error("Auto-sync: Not connected to Tastytrade")
         return
 
-    # Check last sync timestamp to determine date range
-    last_sync = db.get_last_sync_timestamp()
-
-    if last_sync:
-        # Calculate days back from last sync + 1 day buffer
-        days_back = (datetime.now() - last_sync).days + 1
-        days_back = max(days_back, 1)  # Minimum 1 day
-        days_back = min(days_back, 90)  # Maximum 90 days for safety
-        logger.info(f"Auto-sync: last sync {last_sync.strftime('%Y-%m-%d %H:%M')}, fetching {days_back} days")
-    else:
-        # No previous sync, fetch last 365 days for auto-sync
-        days_back = 365
-        logger.info(f"Auto-sync: first sync detected, fetching {days_back} days")
-
     # Save all accounts to database
     logger.info("Auto-sync: Saving account information...")
     accounts = tastytrade.get_all_accounts()
@@ -268,11 +257,13 @@ async def background_incremental_sync(user_id: str = None, *, db: DatabaseManage
             return
 
         try:
-            transactions = await tastytrade.get_transactions(days_back=days_back)
-            logger.info(f"Background sync: fetched {len(transactions)} transactions")
-
-            raw_saved, _ = db.save_raw_transactions(transactions)
-            logger.info(f"Background sync: saved {raw_saved} raw transactions")
+            ingest = await ingest_transactions(
+                db, tastytrade,
+                [a['account_number'] for a in tastytrade.get_all_accounts()],
+                datetime.combine(_date.today() - timedelta(days=days_back), datetime.min.time()),
+                use_cursors=True,
+            )
+            logger.info(f"Background sync: fetched {ingest.fetched} transactions, saved {ingest.saved}")
 
             all_positions = await tastytrade.get_positions()
             total_positions = 0
@@ -285,13 +276,19 @@ async def background_incremental_sync(user_id: str = None, *, db: DatabaseManage
 
             logger.info(f"Background sync: saved {total_positions} positions")
 
-            from src.pipeline.orchestrator import reprocess
-            raw_transactions = db.get_raw_transactions()
-            result = reprocess(db, lot_manager, raw_transactions)
-            logger.info(f"Background sync: reprocessed {result.groups_processed} groups")
+            if ingest.partitions:
+                from src.pipeline.orchestrator import reprocess
+                dirty = ingest.partitions
+                raw_transactions = list(db.iter_raw_transactions(partitions=dirty))
+                result = reprocess(db, lot_manager, raw_transactions, partitions=dirty)
+                logger.info(f"Background sync: reprocessed {result.groups_processed} groups in {len(dirty)} partitions")
 
             db.update_last_sync_timestamp()
-            logger.info("Background sync: completed successfully")
+            failed = tastytrade.failed_accounts()
+            if failed:
+                logger.warning(f"Background sync: completed with failed accounts: {failed}")
+            else:
+                logger.info("Background sync: completed successfully")
 
         except Exception as e:
             logger.error(f"Background sync: error during processing: {e}")
@@ -316,7 +313,7 @@ async def reconcile_positions_vs_chains(*, db: DatabaseManager = None):
         tt_positions = db.get_open_positions()
         tt_by_key = {}
         for pos in tt_positions:
-            key = (pos.get('account_number', ''), (pos.get('symbol') or '').strip())
+            key = (pos.get('account_number', ''), canonical_symbol(pos.get('symbol')))
             tt_by_key[key] = pos
 
         # 2. Get open legs from position_lots — options and equity (single query)
@@ -340,16 +337,17 @@ async def reconcile_positions_vs_chains(*, db: DatabaseManager = None):
                 PositionLotModel.symbol,
             ).all()
             for row in rows:
-                acct = row[0]
-                symbol = (row[1] or '').strip()
-                net_qty = row[3]
-                if net_qty != 0:
-                    key = (acct, symbol)
-                    lot_legs_by_key[key] = {
-                        'quantity': net_qty,
-                        'group_id': row[4],
-                        'underlying': row[2],
-                    }
+                # Keyed on the parsed contract, so padding differences
+                # between the positions API and stored lots still match
+                key = (row[0], canonical_symbol(row[1]))
+                leg = lot_legs_by_key.setdefault(key, {
+                    'symbol': (row[1] or '').strip(),
+                    'quantity': 0,
+                    'group_id': row[4],
+                    'underlying': row[2],
+                })
+                leg['quantity'] += row[3]
+            lot_legs_by_key = {k: v for k, v in lot_legs_by_key.items() if v['quantity'] != 0}
 
         # 3. Reconcile
         matched = 0
@@ -361,9 +359,12 @@ async def reconcile_positions_vs_chains(*, db: DatabaseManager = None):
         all_lot_keys = set(lot_legs_by_key.keys())
         all_tt_keys = set(tt_by_key.keys())
 
+        # Keys are canonical for matching; responses carry the symbol as
+        # the positions API (or the stored lot) wrote it
         for key in all_tt_keys:
-            acct, symbol = key
+            acct = key[0]
             tt_pos = tt_by_key[key]
+            symbol = (tt_pos.get('symbol') or '').strip()
             instrument = tt_pos.get('instrument_type', '').upper()
             if 'OPTION' not in instrument and 'EQUITY' not in instrument:
                 continue
@@ -397,10 +398,10 @@ async def reconcile_positions_vs_chains(*, db: DatabaseManager = None):
 
         # Check lot legs that TT doesn't have (stale)
         for key in all_lot_keys - all_tt_keys:
-            acct, symbol = key
+            acct = key[0]
             lot_data = lot_legs_by_key.get(key, {})
             stale.append({
-                'symbol': symbol,
+                'symbol': lot_data.get('symbol', key[1]),
                 'account': acct,
                 'chain_quantity': lot_data.get('quantity', 0),
                 'chain_id': lot_data.get('group_id', ''),
@@ -506,6 +507,7 @@ async def reconcile_positions_vs_chains(*, db: DatabaseManager = None):
                 logger.info(f"Auto-closed ghost group {gid} ({underlying}/{acct})")
 
         if auto_closed:
+            refresh_open_snapshots(db, _default_lot_manager, auto_closed)
             stale = [s for s in stale if s.get('chain_id') not in auto_closed]
 
         total = matched + len(quantity_mismatch) + len(unlinked) + len(stale)
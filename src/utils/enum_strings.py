@@ -0,0 +1,24 @@
+"""
+Normalization of Tastytrade SDK enum-ish strings.
+
+The SDK reports actions and transaction/instrument types in several
+spellings ("Sell to Open", "OrderAction.SELL_TO_OPEN", "Equity Option");
+everything downstream matches on the uppercase underscore form.
+"""
+
+from functools import lru_cache
+
+# A sync or reprocess only ever sees a handful of distinct values
+ENUM_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=ENUM_CACHE_SIZE)
+def normalize_enum(value: str) -> str:
+    """"Sell to Open" / "OrderAction.SELL_TO_OPEN" -> "SELL_TO_OPEN".
+
+    Cached, so each distinct value is normalized once and equal results
+    share one string.
+    """
+    if value.startswith('OrderAction.'):
+        value = value[len('OrderAction.'):]
+    return value.upper().replace(' ', '_')
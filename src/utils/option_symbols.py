@@ -0,0 +1,90 @@
+"""
+OCC option symbol parsing.
+
+Tastytrade reports equity options in OCC form: the root padded to six
+characters, then YYMMDD, C/P and the strike x 1000 in eight digits:
+
+    "AAPL  250117C00150000"  ->  AAPL, 2025-01-17, Call, 150.0
+
+Every reprocess sees the same few thousand symbols again, so parses are
+cached: equal symbols return the same immutable OptionContract.
+"""
+
+import sys
+from datetime import date
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+# Distinct option symbols kept parsed; a large multi-year history has a few thousand
+OPTION_SYMBOL_CACHE_SIZE = 16384
+
+
+class OptionContract(NamedTuple):
+    """Fields of an OCC option symbol. expiration/strike are None if unreadable."""
+    root: str
+    expiration: Optional[date]
+    right: str                  # the C/P character as written
+    strike: Optional[float]
+
+    @property
+    def option_type(self) -> str:
+        """"Call" or "Put" (anything but C reads as a put, as lots always have)."""
+        return 'Call' if self.right == 'C' else 'Put'
+
+    @property
+    def occ_symbol(self) -> str:
+        """Canonical OCC spelling (root padded to six characters)."""
+        expiration = self.expiration.strftime('%y%m%d') if self.expiration else '??????'
+        strike = f"{round(self.strike * 1000):08d}" if self.strike is not None else '????????'
+        return f"{self.root:<6}{expiration}{self.right}{strike}"
+
+
+def _parse_expiration(yymmdd: str) -> Optional[date]:
+    if not yymmdd.isdigit():
+        return None
+    try:
+        return date(2000 + int(yymmdd[:2]), int(yymmdd[2:4]), int(yymmdd[4:6]))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=OPTION_SYMBOL_CACHE_SIZE)
+def parse_option_symbol(symbol: str) -> Optional[OptionContract]:
+    """Parse an OCC option symbol, or None if it isn't shaped like one.
+
+    Only the shape is checked (root, then a code of at least 8
+    characters); callers decide from instrument_type whether a symbol
+    should be an option at all.
+    """
+    parts = symbol.split()
+    if len(parts) < 2 or len(parts[1]) < 8:
+        return None
+    code = parts[1]
+    try:
+        strike = float(code[7:]) / 1000
+    except ValueError:
+        strike = None
+    return OptionContract(
+        root=sys.intern(parts[0]),
+        expiration=_parse_expiration(code[:6]),
+        right=code[6],
+        strike=strike,
+    )
+
+
+def is_option_symbol(symbol: str) -> bool:
+    """True for well-formed OCC option symbols (readable date, C or P)."""
+    contract = parse_option_symbol(symbol)
+    return (
+        contract is not None
+        and contract.right in ('C', 'P')
+        and contract.expiration is not None
+        and contract.strike is not None
+    )
+
+
+def canonical_symbol(symbol: str) -> str:
+    """Comparison key for a position symbol: canonical OCC form for
+    options, otherwise the symbol with surrounding whitespace removed."""
+    symbol = (symbol or '').strip()
+    return parse_option_symbol(symbol).occ_symbol if is_option_symbol(symbol) else symbol
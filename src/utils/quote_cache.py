@@ -0,0 +1,273 @@
+"""
+Shared quote cache for OptionLedger.
+
+One cache for every TastytradeClient, worker process and websocket:
+quotes fetched anywhere are stored once with a TTL and published to
+subscribers, so other sockets and workers reuse the fetch instead of
+making their own (or round-tripping through the quote_cache table).
+
+Backed by Redis when REDIS_URL is set and reachable; otherwise falls back
+to an in-process store with the same interface (single worker only).
+Async callers use get_async/put_async, which keep Redis round trips off
+the event loop.
+"""
+
+import asyncio
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+
+# Quotes younger than this are served without refetching
+QUOTE_FRESH_SECONDS = 30
+# Quotes are kept this long for cache-only readers (get_cached_quotes)
+QUOTE_RETENTION_SECONDS = 300
+
+_KEY_PREFIX = "quote:"
+_CHANNEL = "quotes"
+_SUBSCRIBER_QUEUE_SIZE = 100
+
+# (cached_at epoch seconds, quote dict)
+Entry = Tuple[float, Dict]
+
+
+class _MemoryBackend:
+    """In-process store; pub/sub reaches subscribers in this process only."""
+
+    # Calls are dict operations, cheap enough to run on the event loop
+    blocking = False
+
+    def __init__(self):
+        self._entries: Dict[str, Entry] = {}
+        self._subscribers: set = set()
+
+    def get_many(self, symbols: Optional[List[str]]) -> Dict[str, Entry]:
+        now = time.time()
+        keys = self._entries.keys() if symbols is None else symbols
+        found = {}
+        for symbol in list(keys):
+            entry = self._entries.get(symbol)
+            if entry is None:
+                continue
+            if now - entry[0] >= QUOTE_RETENTION_SECONDS:
+                del self._entries[symbol]
+                continue
+            # Copies, so callers can't mutate what other readers see
+            found[symbol] = (entry[0], dict(entry[1]))
+        return found
+
+    def set_many(self, entries: Dict[str, Entry]) -> None:
+        for symbol, (cached_at, quote) in entries.items():
+            self._entries[symbol] = (cached_at, dict(quote))
+
+    def delete(self, symbols: Iterable[str]) -> None:
+        for symbol in symbols:
+            self._entries.pop(symbol, None)
+
+    def publish(self, quotes: Dict[str, Dict]) -> None:
+        for sub in list(self._subscribers):
+            sub.deliver(quotes)
+
+    def subscribe(self) -> "QuoteSubscription":
+        sub = _MemorySubscription(self)
+        self._subscribers.add(sub)
+        return sub
+
+
+class _RedisBackend:
+    """Redis store (one key per symbol with TTL) plus a pub/sub channel."""
+
+    # Calls are network round trips (up to socket_timeout each)
+    blocking = True
+
+    def __init__(self, url: str, client):
+        self._url = url
+        self._client = client
+
+    def get_many(self, symbols: Optional[List[str]]) -> Dict[str, Entry]:
+        if symbols is None:
+            keys = list(self._client.scan_iter(match=f"{_KEY_PREFIX}*", count=500))
+        else:
+            keys = [f"{_KEY_PREFIX}{s}" for s in symbols]
+        if not keys:
+            return {}
+        found = {}
+        for key, raw in zip(keys, self._client.mget(keys)):
+            if raw is None:
+                continue
+            key = key.decode() if isinstance(key, bytes) else key
+            cached_at, quote = json.loads(raw)
+            found[key[len(_KEY_PREFIX):]] = (cached_at, quote)
+        return found
+
+    def set_many(self, entries: Dict[str, Entry]) -> None:
+        pipe = self._client.pipeline(transaction=False)
+        for symbol, entry in entries.items():
+            pipe.setex(f"{_KEY_PREFIX}{symbol}", QUOTE_RETENTION_SECONDS, json.dumps(entry))
+        pipe.execute()
+
+    def delete(self, symbols: Iterable[str]) -> None:
+        keys = [f"{_KEY_PREFIX}{s}" for s in symbols]
+        if keys:
+            self._client.delete(*keys)
+
+    def publish(self, quotes: Dict[str, Dict]) -> None:
+        self._client.publish(_CHANNEL, json.dumps(quotes))
+
+    def subscribe(self) -> "QuoteSubscription":
+        return _RedisSubscription(self._url)
+
+
+class QuoteSubscription(ABC):
+    """Stream of quote batches published to the cache."""
+
+    @abstractmethod
+    async def next_batch(self, timeout: float) -> Optional[Dict[str, Dict]]:
+        """Next published batch, or None if nothing arrived within timeout."""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Stop receiving batches and release the connection."""
+
+
+class _MemorySubscription(QuoteSubscription):
+    def __init__(self, backend: _MemoryBackend):
+        self._backend = backend
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=_SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, quotes: Dict[str, Dict]) -> None:
+        # Publishers may run outside the subscriber's event loop thread
+        self._loop.call_soon_threadsafe(self._put, quotes)
+
+    def _put(self, quotes: Dict[str, Dict]) -> None:
+        try:
+            self._queue.put_nowait(quotes)
+        except asyncio.QueueFull:
+            pass  # slow consumer; it will catch up on the next batch
+
+    async def next_batch(self, timeout: float) -> Optional[Dict[str, Dict]]:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self) -> None:
+        self._backend._subscribers.discard(self)
+
+
+class _RedisSubscription(QuoteSubscription):
+    def __init__(self, url: str):
+        import redis.asyncio as aioredis
+        self._client = aioredis.Redis.from_url(url)
+        self._pubsub = self._client.pubsub()
+        self._subscribed = False
+
+    async def next_batch(self, timeout: float) -> Optional[Dict[str, Dict]]:
+        if not self._subscribed:
+            await self._pubsub.subscribe(_CHANNEL)
+            self._subscribed = True
+        message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message["data"])
+
+    async def close(self) -> None:
+        try:
+            await self._pubsub.aclose()
+            await self._client.aclose()
+        except Exception as e:
+            logger.debug(f"Error closing quote subscription: {e}")
+
+
+class QuoteCache:
+    """TTL'd quote store with pub/sub fan-out.
+
+    Backend errors are logged and treated as cache misses so a Redis
+    outage degrades to refetching rather than failing quote requests.
+    """
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    @classmethod
+    def from_env(cls) -> "QuoteCache":
+        """Use Redis at REDIS_URL when available, else the in-process store."""
+        url = os.getenv("REDIS_URL")
+        if url:
+            try:
+                import redis
+                client = redis.Redis.from_url(url, socket_timeout=2)
+                client.ping()
+                logger.info("Quote cache using Redis")
+                return cls(_RedisBackend(url, client))
+            except Exception as e:
+                logger.warning(f"Redis unavailable for quote cache ({e}); using in-process cache")
+        return cls(_MemoryBackend())
+
+    def get(self, symbols: Optional[List[str]] = None,
+            max_age_seconds: int = QUOTE_FRESH_SECONDS) -> Dict[str, Dict]:
+        """Cached quotes no older than max_age_seconds. None for all symbols."""
+        try:
+            entries = self._backend.get_many(symbols)
+        except Exception as e:
+            logger.error(f"Quote cache read failed: {e}")
+            return {}
+        cutoff = time.time() - max_age_seconds
+        return {
+            symbol: quote for symbol, (cached_at, quote) in entries.items()
+            if cached_at >= cutoff
+        }
+
+    def put(self, quotes: Dict[str, Dict]) -> None:
+        """Store quotes and publish them to subscribers."""
+        quotes = {s: q for s, q in quotes.items() if q}
+        if not quotes:
+            return
+        now = time.time()
+        try:
+            self._backend.set_many({s: (now, q) for s, q in quotes.items()})
+            self._backend.publish(quotes)
+        except Exception as e:
+            logger.error(f"Quote cache write failed: {e}")
+
+    async def get_async(self, symbols: Optional[List[str]] = None,
+                        max_age_seconds: int = QUOTE_FRESH_SECONDS) -> Dict[str, Dict]:
+        """get() for coroutines; a blocking backend runs in a worker thread."""
+        if self._backend.blocking:
+            return await asyncio.to_thread(self.get, symbols, max_age_seconds)
+        return self.get(symbols, max_age_seconds)
+
+    async def put_async(self, quotes: Dict[str, Dict]) -> None:
+        """put() for coroutines; a blocking backend runs in a worker thread."""
+        if self._backend.blocking:
+            await asyncio.to_thread(self.put, quotes)
+        else:
+            self.put(quotes)
+
+    def invalidate(self, symbols: Iterable[str]) -> None:
+        try:
+            self._backend.delete(symbols)
+        except Exception as e:
+            logger.error(f"Quote cache invalidate failed: {e}")
+
+    def subscribe(self) -> QuoteSubscription:
+        """Subscribe to quote batches stored by any client or worker."""
+        return self._backend.subscribe()
+
+
+_quote_cache: Optional[QuoteCache] = None
+
+
+def get_quote_cache() -> QuoteCache:
+    """Process-wide QuoteCache, created on first use."""
+    global _quote_cache
+    if _quote_cache is None:
+        _quote_cache = QuoteCache.from_env()
+    return _quote_cache
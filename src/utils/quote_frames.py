@@ -0,0 +1,98 @@
+"""
+Wire encoding for /ws/quotes frames.
+
+The default ("full") format sends every quote as a complete dict, which
+is what existing clients expect. Clients can opt in to the compact
+format in their subscribe message:
+
+    {"subscribe": ["AAPL", ...], "format": "compact", "encoding": "msgpack"}
+
+Compact mode acknowledges with a symbol table:
+
+    {"type": "symbols", "symbols": ["AAPL", ...], "format": "compact", "encoding": "msgpack"}
+
+and then sends only the fields that changed since the last frame, keyed
+by the symbol's index in that table:
+
+    {"type": "delta", "ts": "...", "data": [[0, {"bid": 150.1, "mark": 150.15}], ...]}
+
+Alias fields (price, changePercent, ivPercentile) are dropped; clients
+derive them from mark, change_percent and iv_percentile. With
+"encoding": "msgpack" frames are sent as binary msgpack; any other
+encoding is JSON (the ack reports the encoding in use).
+Control frames (the symbol-table ack and pongs) are always JSON text.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import msgpack
+
+# Duplicate keys carried in full quotes for frontend compatibility
+ALIAS_FIELDS = ('price', 'changePercent', 'ivPercentile')
+
+_MISSING = object()
+
+
+class QuoteFrameEncoder:
+    """Per-socket encoder; tracks what the client has already been sent."""
+
+    def __init__(self, compact: bool = False, encoding: str = "json"):
+        self.compact = compact
+        self.encoding = "msgpack" if encoding == "msgpack" else "json"
+        self._index: Dict[str, int] = {}
+        self._sent: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def from_subscribe(cls, message: Dict[str, Any]) -> "QuoteFrameEncoder":
+        """Build an encoder from the options in a subscribe message."""
+        return cls(
+            compact=message.get("format") == "compact",
+            encoding=message.get("encoding", "json"),
+        )
+
+    def set_symbols(self, symbols: List[str]) -> Optional[Dict[str, Any]]:
+        """Reset for a new subscription; returns the symbol-table ack in compact mode."""
+        self._index = {symbol: i for i, symbol in enumerate(symbols)}
+        self._sent = {}
+        if not self.compact:
+            return None
+        return {
+            "type": "symbols",
+            "symbols": list(symbols),
+            "format": "compact",
+            "encoding": self.encoding,
+        }
+
+    def quotes_frame(self, quotes: Dict[str, Dict[str, Any]],
+                     timestamp: bool = True) -> Optional[Dict[str, Any]]:
+        """Frame for a batch of quotes, or None if nothing changed (compact only)."""
+        if not self.compact:
+            frame = {"type": "quotes", "data": quotes}
+            if timestamp:
+                frame["timestamp"] = datetime.now().isoformat()
+            return frame
+
+        data = []
+        for symbol, quote in quotes.items():
+            index = self._index.get(symbol)
+            if index is None:
+                continue
+            sent = self._sent.setdefault(symbol, {})
+            changed = {
+                k: v for k, v in quote.items()
+                if k not in ALIAS_FIELDS and k != 'symbol' and sent.get(k, _MISSING) != v
+            }
+            if changed:
+                sent.update(changed)
+                data.append([index, changed])
+        if not data:
+            return None
+        return {"type": "delta", "ts": datetime.now().isoformat(), "data": data}
+
+    async def send(self, websocket, frame: Dict[str, Any]) -> None:
+        """Send a data frame in the negotiated encoding."""
+        if self.encoding == "msgpack":
+            await websocket.send_bytes(msgpack.packb(frame, use_bin_type=True))
+        else:
+            await websocket.send_json(frame)
@@ -0,0 +1,258 @@
+"""Deterministic synthetic portfolio — Tastytrade-shaped raw transactions
+at any size, for benchmarks and volume tests.
+
+Positions are opened on random weekdays across ``years`` of history in
+``accounts`` × ``underlyings`` partitions, each running one strategy from
+``strategy_mix``:
+
+  short_put     STO put
+  covered_call  BTO 100 shares per contract, STO call against them
+  put_spread    STO put / BTO put one strike width lower
+  iron_condor   short put spread + short call spread
+
+Every expiration cycle the position is rolled (``roll_rate``: BTC + STO
+at the next monthly expiration in one order), assigned
+(``assignment_rate``, single short legs only — assigned spreads and
+condors expire instead), bought back early, or left to expire. Assigned
+puts deliver shares that are sold a week later; assigned covered calls
+deliver the shares away.
+
+The history runs ``years`` from START; positions still running at the
+end are left open there. The same arguments always produce the same
+list: all randomness comes from one ``random.Random(seed)``. Positions
+are generated until there are ``count`` transactions and the oldest
+``count`` are returned.
+"""
+
+import random
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Mapping, Optional
+
+from tests.conftest import (
+    make_assignment_transaction,
+    make_expiration_transaction,
+    make_option_transaction,
+    make_stock_transaction,
+)
+
+
+STRATEGY_MIX = {
+    "short_put": 0.4,
+    "covered_call": 0.2,
+    "put_spread": 0.25,
+    "iron_condor": 0.15,
+}
+
+START = date(2022, 1, 3)
+
+# Rolls per position before it is forced to close out
+MAX_ROLLS = 8
+
+_ACTION_SUB_TYPES = {
+    "SELL_TO_OPEN": "Sell to Open",
+    "BUY_TO_OPEN": "Buy to Open",
+    "SELL_TO_CLOSE": "Sell to Close",
+    "BUY_TO_CLOSE": "Buy to Close",
+}
+_CLOSING = {"SELL_TO_OPEN": "BUY_TO_CLOSE", "BUY_TO_OPEN": "SELL_TO_CLOSE"}
+
+
+def _third_friday(year: int, month: int) -> date:
+    first = date(year, month, 1)
+    return first + timedelta(days=(4 - first.weekday()) % 7 + 14)
+
+
+def _monthly_after(day: date, min_days: int) -> date:
+    """First monthly expiration at least ``min_days`` after ``day``."""
+    target = day + timedelta(days=min_days)
+    exp = _third_friday(target.year, target.month)
+    if exp < target:
+        month = target.month % 12 + 1
+        exp = _third_friday(target.year + (month == 1), month)
+    return exp
+
+
+def _weekday(day: date) -> date:
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+
+def _stamp(day: date, minute: int) -> str:
+    """ISO timestamp ``minute`` minutes into the US session (14:30 UTC)."""
+    at = datetime.combine(day, time(14, 30)) + timedelta(minutes=minute)
+    return at.isoformat() + "+00:00"
+
+
+def _ticker(i: int) -> str:
+    return "SY" + chr(65 + i // 26 % 26) + chr(65 + i % 26)
+
+
+class _Builder:
+    """Appends one position's transactions with sequential ids."""
+
+    def __init__(self, rng: random.Random, account: str, underlying: str, spot: float):
+        self.rng = rng
+        self.account = account
+        self.underlying = underlying
+        self.spot = spot
+        self.rows: List[Dict] = []
+
+    def option(self, n, order_id, action, option_type, strike, exp, qty, price, at):
+        symbol = f"{self.underlying:<6}{exp:%y%m%d}{option_type[0]}{int(strike * 1000):08d}"
+        self.rows.append(make_option_transaction(
+            id=f"syn-{n:07d}-{len(self.rows):02d}", account_number=self.account,
+            order_id=order_id, symbol=symbol, underlying_symbol=self.underlying,
+            action=action, quantity=qty, price=price, executed_at=at,
+            transaction_sub_type=_ACTION_SUB_TYPES[action],
+            description=f"{_ACTION_SUB_TYPES[action]} {qty} {symbol}",
+            option_type=option_type, strike=strike, expiration=exp.isoformat(),
+        ))
+        return symbol
+
+    def stock(self, n, order_id, action, qty, price, at, sub_type=None):
+        self.rows.append(make_stock_transaction(
+            id=f"syn-{n:07d}-{len(self.rows):02d}", account_number=self.account,
+            order_id=order_id, symbol=self.underlying, underlying_symbol=self.underlying,
+            action=action, quantity=qty, price=price, executed_at=at,
+            transaction_sub_type=sub_type or _ACTION_SUB_TYPES[action],
+            description=f"{_ACTION_SUB_TYPES[action]} {qty} {self.underlying}",
+        ))
+
+    def removal(self, n, make, symbol, qty, at):
+        self.rows.append(make(
+            id=f"syn-{n:07d}-{len(self.rows):02d}", account_number=self.account,
+            symbol=symbol, underlying_symbol=self.underlying, quantity=qty,
+            executed_at=at,
+        ))
+
+    def premium(self, low=0.4, high=4.0) -> float:
+        return round(self.rng.uniform(low, high), 2)
+
+
+def _legs(strategy: str, spot: float, width: float):
+    """(action, option_type, strike) per leg, short legs first."""
+    put = round(spot * 0.92 / width) * width
+    call = round(spot * 1.08 / width) * width
+    if strategy in ("short_put", "covered_call"):
+        return [("SELL_TO_OPEN", "Call" if strategy == "covered_call" else "Put",
+                 call if strategy == "covered_call" else put)]
+    if strategy == "put_spread":
+        return [("SELL_TO_OPEN", "Put", put), ("BUY_TO_OPEN", "Put", put - width)]
+    return [
+        ("SELL_TO_OPEN", "Put", put), ("SELL_TO_OPEN", "Call", call),
+        ("BUY_TO_OPEN", "Put", put - width), ("BUY_TO_OPEN", "Call", call + width),
+    ]
+
+
+def _position(b: _Builder, n: int, strategy: str, opened: date,
+              roll_rate: float, assignment_rate: float) -> None:
+    rng = b.rng
+    qty = rng.choice((1, 1, 1, 2, 2, 3, 5, 10))
+    width = 1.0 if b.spot < 50 else 5.0
+    day = opened
+    exp = _monthly_after(day, 25)
+    legs = _legs(strategy, b.spot, width)
+    minute = rng.randrange(0, 380)
+
+    if strategy == "covered_call":
+        b.stock(n, f"SORD-{n:07d}-s", "BUY_TO_OPEN", qty * 100, round(b.spot, 2), _stamp(day, minute))
+
+    order = f"SORD-{n:07d}-0"
+    symbols = [b.option(n, order, action, otype, strike, exp, qty, b.premium(), _stamp(day, minute))
+               for action, otype, strike in legs]
+
+    for generation in range(MAX_ROLLS + 1):
+        draw = rng.random()
+        roll_day = _weekday(exp - timedelta(days=rng.randrange(1, 6)))
+        if draw < roll_rate and generation < MAX_ROLLS and roll_day > day:
+            # Roll: close every leg and reopen one cycle out, in one order
+            day, minute = roll_day, rng.randrange(0, 380)
+            order = f"SORD-{n:07d}-{generation + 1}"
+            new_exp = _monthly_after(exp, 20)
+            shift = rng.choice((-width, 0.0, 0.0, width))
+            for action, otype, strike in legs:
+                b.option(n, order, _CLOSING[action], otype, strike, exp, qty,
+                         b.premium(0.05, 2.0), _stamp(day, minute))
+            legs = [(action, otype, strike + shift) for action, otype, strike in legs]
+            exp = new_exp
+            symbols = [b.option(n, order, action, otype, strike, exp, qty, b.premium(), _stamp(day, minute))
+                       for action, otype, strike in legs]
+            continue
+
+        if draw < roll_rate + assignment_rate and len(legs) == 1:
+            _, otype, strike = legs[0]
+            at = _stamp(exp, 390)
+            b.removal(n, make_assignment_transaction, symbols[0], qty, at)
+            if otype == "Put":
+                b.stock(n, None, "BUY_TO_OPEN", qty * 100, strike, at, sub_type="Assignment")
+                sell_day = _weekday(exp + timedelta(days=7))
+                b.stock(n, f"SORD-{n:07d}-x", "SELL_TO_CLOSE", qty * 100,
+                        round(strike * rng.uniform(0.9, 1.05), 2), _stamp(sell_day, minute))
+            else:
+                b.stock(n, None, "SELL_TO_CLOSE", qty * 100, strike, at, sub_type="Assignment")
+            return
+
+        if rng.random() < 0.6 and roll_day > day:
+            # Bought back early
+            order = f"SORD-{n:07d}-c"
+            at = _stamp(roll_day, rng.randrange(0, 380))
+            for action, otype, strike in legs:
+                b.option(n, order, _CLOSING[action], otype, strike, exp, qty, b.premium(0.05, 1.0), at)
+            close_day = roll_day
+        else:
+            for symbol in symbols:
+                b.removal(n, make_expiration_transaction, symbol, qty, _stamp(exp, 390))
+            close_day = _weekday(exp + timedelta(days=3))
+
+        if strategy == "covered_call":
+            b.stock(n, f"SORD-{n:07d}-x", "SELL_TO_CLOSE", qty * 100,
+                    round(b.spot * rng.uniform(0.9, 1.1), 2), _stamp(close_day, minute))
+        return
+
+
+def transactions(
+    count: int = 1000,
+    *,
+    years: float = 2.0,
+    accounts: int = 3,
+    underlyings: int = 25,
+    strategy_mix: Optional[Mapping[str, float]] = None,
+    roll_rate: float = 0.3,
+    assignment_rate: float = 0.05,
+    seed: int = 0,
+) -> List[Dict]:
+    """``count`` raw transaction dicts, oldest first.
+
+    ``strategy_mix`` maps strategy names (see STRATEGY_MIX) to relative
+    weights. ``roll_rate`` and ``assignment_rate`` are per-expiration-cycle
+    probabilities.
+    """
+    mix = dict(strategy_mix or STRATEGY_MIX)
+    unknown = set(mix) - set(STRATEGY_MIX)
+    if unknown:
+        raise ValueError(f"Unknown strategies in mix: {sorted(unknown)}")
+    if roll_rate + assignment_rate > 1:
+        raise ValueError("roll_rate + assignment_rate must not exceed 1")
+
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    account_numbers = [f"SYN{i:04d}" for i in range(accounts)]
+    spots = {_ticker(i): round(rng.uniform(15, 450), 2) for i in range(underlyings)}
+    tickers = list(spots)
+    span_days = max(int(years * 365), 1)
+    cutoff = _stamp(START + timedelta(days=span_days), 0)
+
+    rows: List[Dict] = []
+    n = 0
+    while len(rows) < count:
+        underlying = rng.choice(tickers)
+        b = _Builder(rng, rng.choice(account_numbers), underlying, spots[underlying])
+        opened = _weekday(START + timedelta(days=rng.randrange(span_days)))
+        strategy = rng.choices(names, weights)[0]
+        _position(b, n, strategy, opened, roll_rate, assignment_rate)
+        rows.extend(r for r in b.rows if r["executed_at"] < cutoff)
+        n += 1
+
+    rows.sort(key=lambda r: (r["executed_at"], r["id"]))
+    return rows[:count]
@@ -0,0 +1,241 @@
+"""
+Query-plan regression suite: seed several tenants, run the hot read
+paths and EXPLAIN every SELECT they issue.
+
+The tenant filter (tenant.py) adds ``WHERE user_id = ?`` to every ORM
+query, so each hot query should be an index search that starts at the
+tenant, never a full scan of a shared table.
+
+Runs on SQLite always, and on PostgreSQL when TEST_POSTGRES_URL points
+at a scratch database (its tables are dropped). PostgreSQL plans are
+taken with enable_seqscan off: a tiny table is cheapest to seq-scan, so
+what's asserted is that a usable index exists.
+"""
+
+import asyncio
+import os
+import re
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from src.database import engine as sa_engine
+from src.database.db_manager import DatabaseManager
+from src.database.models import Base, PositionGroup, PositionLot, User
+from src.database.tenant import DEFAULT_USER_ID, _current_user_id
+from src.models.lot_manager import LotManager
+from src.pipeline.group_manager import GroupPersister
+from src.pipeline.orchestrator import reprocess
+from src.routers.ledger import get_ledger
+from src.routers.reports import (
+    get_dashboard_data,
+    get_monthly_performance,
+    get_performance_report,
+)
+from tests.fixtures import covered_call_4_roll
+
+
+TENANTS = [
+    DEFAULT_USER_ID,
+    "aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa",
+    "bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb",
+]
+ACCOUNT = "ACCT-COV-CALL"
+UNDERLYING = "ZTEST"
+
+# Shared tenant-scoped tables a hot query must never scan in full
+HOT_TABLES = {
+    "raw_transactions", "position_lots", "lot_closings", "position_groups",
+    "position_group_lots", "pnl_events", "pnl_rollups", "group_ancestry",
+    "chain_lot_attributions", "roll_chain_summaries", "open_position_snapshots",
+}
+_FULL_SCAN = {
+    "sqlite": re.compile(r"^SCAN (\w+)"),
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+}
+
+
+def _backends():
+    backends = ["sqlite"]
+    if os.getenv("TEST_POSTGRES_URL"):
+        backends.append("postgresql")
+    return backends
+
+
+@pytest.fixture(params=_backends())
+def plan_db(request, tmp_path):
+    """A database holding the same roll history for each of TENANTS."""
+    if request.param == "sqlite":
+        db = DatabaseManager(db_url=f"sqlite:///{tmp_path / 'plans.db'}")
+    else:
+        db = DatabaseManager(db_url=os.environ["TEST_POSTGRES_URL"])
+        sa_engine.init_engine(db.db_url)
+        Base.metadata.drop_all(sa_engine._engine)
+    db.initialize_database()
+
+    with db.get_session() as session:
+        for uid in TENANTS[1:]:
+            session.add(User(id=uid, display_name=uid[:8], is_active=True))
+    lot_manager = LotManager(db)
+    for uid in TENANTS:
+        token = _current_user_id.set(uid)
+        try:
+            reprocess(db, lot_manager, covered_call_4_roll.transactions())
+        finally:
+            _current_user_id.reset(token)
+
+    yield db, lot_manager
+    if request.param == "postgresql":
+        Base.metadata.drop_all(sa_engine._engine)
+
+
+@contextmanager
+def _captured_selects():
+    """Collect (statement, parameters) of every SELECT run inside the block."""
+    captured = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    engine = sa_engine._engine
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+
+def _plans(captured):
+    """Plan text of each captured SELECT, one string per statement."""
+    engine = sa_engine._engine
+    dialect = engine.dialect.name
+    plans = []
+    with engine.connect() as conn:
+        if dialect == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+            prefix = "EXPLAIN "
+        else:
+            prefix = "EXPLAIN QUERY PLAN "
+        for statement, parameters in captured:
+            rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+            plans.append((statement, "\n".join(str(row[-1]) for row in rows)))
+        conn.rollback()
+    return dialect, plans
+
+
+def _run_and_explain(operation):
+    with _captured_selects() as captured:
+        operation()
+    assert captured, "operation issued no SELECT"
+    return _plans(captured)
+
+
+def _assert_no_full_scans(dialect, plans):
+    pattern = _FULL_SCAN[dialect]
+    for statement, plan in plans:
+        for line in plan.splitlines():
+            match = pattern.search(line.strip())
+            assert not (match and match.group(1) in HOT_TABLES), (
+                f"full scan of {match.group(1)}:\n{statement}\n{plan}"
+            )
+
+
+def _assert_uses_index(dialect, plans, *indexes):
+    """Some plan searches one of ``indexes`` (checked on SQLite only,
+    where the planner's choice among usable indexes is predictable)."""
+    if dialect == "sqlite":
+        assert any(index in plan for _, plan in plans for index in indexes), (
+            f"none of {indexes} used:\n" + "\n\n".join(plan for _, plan in plans)
+        )
+
+
+def _group_ids(db, limit=3):
+    with db.get_session() as session:
+        return [gid for (gid,) in session.query(PositionGroup.group_id).limit(limit)]
+
+
+def _chain_id(db):
+    with db.get_session() as session:
+        return session.query(PositionLot.chain_id).filter(PositionLot.chain_id.isnot(None)).first()[0]
+
+
+def _symbol(db):
+    with db.get_session() as session:
+        return session.query(PositionLot.symbol).first()[0]
+
+
+class TestLotManager:
+    def test_open_lots_by_symbol(self, plan_db):
+        db, lot_manager = plan_db
+        symbol = _symbol(db)
+        dialect, plans = _run_and_explain(lambda: lot_manager.get_open_lots(ACCOUNT, symbol=symbol))
+        _assert_no_full_scans(dialect, plans)
+        _assert_uses_index(dialect, plans, "idx_lots_user_account_symbol")
+
+    def test_open_lots_by_underlying(self, plan_db):
+        db, lot_manager = plan_db
+        dialect, plans = _run_and_explain(lambda: lot_manager.get_open_lots(ACCOUNT, underlying=UNDERLYING))
+        _assert_no_full_scans(dialect, plans)
+        _assert_uses_index(dialect, plans, "idx_lots_user_account_underlying")
+
+    def test_lots_for_chain(self, plan_db):
+        db, lot_manager = plan_db
+        chain_id = _chain_id(db)
+        dialect, plans = _run_and_explain(lambda: lot_manager.get_lots_for_chain(chain_id))
+        _assert_no_full_scans(dialect, plans)
+        _assert_uses_index(dialect, plans, "idx_lots_user_chain")
+
+    def test_lots_for_groups(self, plan_db):
+        db, lot_manager = plan_db
+        group_ids = _group_ids(db)
+        dialect, plans = _run_and_explain(lambda: lot_manager.get_lots_for_groups_batch(group_ids))
+        _assert_no_full_scans(dialect, plans)
+        _assert_uses_index(dialect, plans, "idx_group_lots_user_group")
+
+
+class TestGroupPersister:
+    def test_partition_pass(self, plan_db):
+        db, lot_manager = plan_db
+        persister = GroupPersister(db, lot_manager)
+        dialect, plans = _run_and_explain(
+            lambda: persister.process_groups(partitions={(ACCOUNT, UNDERLYING)}),
+        )
+        _assert_no_full_scans(dialect, plans)
+        _assert_uses_index(dialect, plans, "idx_lots_user_account_underlying")
+        _assert_uses_index(dialect, plans, "idx_position_groups_user_account_underlying")
+
+
+class TestRouters:
+    def test_ledger(self, plan_db):
+        db, lot_manager = plan_db
+        dialect, plans = _run_and_explain(lambda: asyncio.run(get_ledger(
+            account_number=ACCOUNT, underlying=UNDERLYING,
+            db=db, lot_manager=lot_manager, user_id=DEFAULT_USER_ID,
+        )))
+        _assert_no_full_scans(dialect, plans)
+        _assert_uses_index(dialect, plans, "idx_position_groups_user_account_underlying")
+
+    def test_monthly_performance(self, plan_db):
+        db, _ = plan_db
+        dialect, plans = _run_and_explain(lambda: asyncio.run(get_monthly_performance(
+            account_number=ACCOUNT, year=2025, db=db, user_id=DEFAULT_USER_ID,
+        )))
+        _assert_no_full_scans(dialect, plans)
+        _assert_uses_index(
+            dialect, plans, "idx_pnl_rollups_user_account_day", "idx_pnl_rollups_user_day",
+        )
+
+    def test_performance_report_and_dashboard(self, plan_db):
+        db, _ = plan_db
+
+        def run():
+            asyncio.run(get_performance_report(
+                exit_from="2025-01-01", exit_to="2025-12-31", db=db, user_id=DEFAULT_USER_ID,
+            ))
+            asyncio.run(get_dashboard_data(db=db, user_id=DEFAULT_USER_ID))
+
+        dialect, plans = _run_and_explain(run)
+        _assert_no_full_scans(dialect, plans)
+        _assert_uses_index(dialect, plans, "idx_pnl_rollups_user_day")
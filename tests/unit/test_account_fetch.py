@@ -0,0 +1,57 @@
+"""
+Tests for concurrent per-account fetching in TastytradeClient.
+
+Source: src/api/tastytrade_client.py (_for_each_account, failed_accounts)
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.api.tastytrade_client import TastytradeClient
+
+
+def _accounts(*numbers):
+    return [SimpleNamespace(account_number=n) for n in numbers]
+
+
+class TestForEachAccount:
+    def test_runs_concurrently_up_to_limit(self):
+        """No more than ACCOUNT_FETCH_CONCURRENCY accounts should be in flight, and results keep account order."""
+        client = TastytradeClient()
+        in_flight = 0
+        peak = 0
+
+        async def fetch(account):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return account.account_number.lower()
+
+        with patch("src.api.tastytrade_client.ACCOUNT_FETCH_CONCURRENCY", 2):
+            results = asyncio.run(client._for_each_account("balances", _accounts("A", "B", "C", "D"), fetch))
+
+        assert [r for _, r in results] == ["a", "b", "c", "d"]
+        assert peak == 2
+
+    def test_failures_and_timeouts_reported_per_account(self):
+        """A failing or slow account is dropped from the results and reported, without affecting the others."""
+        client = TastytradeClient()
+
+        async def fetch(account):
+            if account.account_number == "BAD":
+                raise RuntimeError("HTTP 500")
+            if account.account_number == "SLOW":
+                await asyncio.sleep(1)
+            return []
+
+        with patch("src.api.tastytrade_client.ACCOUNT_FETCH_TIMEOUT", 0.05):
+            results = asyncio.run(client._for_each_account("transactions", _accounts("OK", "BAD", "SLOW"), fetch))
+
+        assert [a.account_number for a, _ in results] == ["OK"]
+        failed = client.failed_accounts()
+        assert failed["BAD"] == {"transactions": "HTTP 500"}
+        assert "timed out" in failed["SLOW"]["transactions"]
+        assert "OK" not in failed
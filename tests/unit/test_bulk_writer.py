@@ -0,0 +1,82 @@
+"""
+Tests for the bulk writer helpers in the engine module.
+
+Source: src/database/engine.py (reserve_ids, bulk_insert, _copy_buffer)
+"""
+
+import sqlite3
+
+import pytest
+
+from src.database.engine import _copy_buffer, bulk_insert, reserve_ids
+from src.database.models import PositionLot
+from src.database.tenant import DEFAULT_USER_ID
+from tests.conftest import make_option_transaction
+
+
+def _lot_row(lot_id, txn_id):
+    return {
+        "id": lot_id,
+        "user_id": DEFAULT_USER_ID,
+        "transaction_id": txn_id,
+        "account_number": "ACCT1",
+        "symbol": "AAPL",
+        "quantity": 100,
+        "entry_price": 150.0,
+        "entry_date": "2025-03-01T10:00:00+00:00",
+        "remaining_quantity": 100,
+    }
+
+
+class TestReserveIds:
+    def test_sqlite_ids_continue_after_existing_rows(self, db, lot_manager):
+        """Reserved ids should start after the highest existing primary key."""
+        existing = lot_manager.create_lot(
+            make_option_transaction(id="tx-1"), chain_id="chain-1",
+        )
+        with db.get_session() as session:
+            assert reserve_ids(session, PositionLot, 3) == [existing + 1, existing + 2, existing + 3]
+            assert reserve_ids(session, PositionLot, 0) == []
+
+    def test_sqlite_reservation_holds_the_write_lock(self, db, tmp_path):
+        """Another writer must not be able to insert between reserving ids and the bulk insert."""
+        other = sqlite3.connect(str(tmp_path / "test.db"), timeout=0)
+        try:
+            with db.get_session() as session:
+                reserve_ids(session, PositionLot, 1)
+                with pytest.raises(sqlite3.OperationalError, match="locked"):
+                    other.execute("INSERT INTO tags (name) VALUES ('x')")
+            other.execute("INSERT INTO tags (name) VALUES ('x')")  # released on commit
+            other.commit()
+        finally:
+            other.close()
+
+
+class TestBulkInsert:
+    def test_rows_written_with_reserved_ids(self, db, lot_manager):
+        """bulk_insert should write every row, keeping the pre-assigned ids."""
+        with db.get_session() as session:
+            ids = reserve_ids(session, PositionLot, 2)
+            written = bulk_insert(session, PositionLot, [
+                _lot_row(ids[0], "tx-a"), _lot_row(ids[1], "tx-b"),
+            ])
+        assert written == 2
+
+        lot = lot_manager.get_lot_by_id(ids[1])
+        assert lot.transaction_id == "tx-b"
+        assert lot.status == "OPEN"  # column default still applied
+
+    def test_empty_batch_is_a_noop(self, db):
+        """An empty batch should write nothing and not touch the database."""
+        with db.get_session() as session:
+            assert bulk_insert(session, PositionLot, []) == 0
+
+
+class TestCopyBuffer:
+    def test_null_empty_string_and_quoting(self):
+        """NULL must be an unquoted empty field, while empty strings and embedded quotes stay quoted."""
+        buf = _copy_buffer(
+            [{"a": None, "b": "", "c": 'say "hi"', "d": 2.5, "e": True}],
+            ["a", "b", "c", "d", "e"],
+        )
+        assert buf.read() == ',"","say ""hi""",2.5,t\n'
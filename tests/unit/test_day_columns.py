@@ -0,0 +1,121 @@
+"""Unit tests for the typed day columns derived from ISO timestamp strings."""
+
+import asyncio
+from datetime import date, datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, update
+
+from src.database.models import (
+    LotClosing,
+    PnlEvent,
+    PositionLot,
+    RawTransaction,
+    iso_day,
+)
+from src.database.tenant import DEFAULT_USER_ID
+from src.pipeline.orchestrator import reprocess
+from src.routers.reports import get_performance_report
+from tests.conftest import make_option_transaction
+
+
+def _round_trip():
+    common = dict(
+        symbol="AAPL  250620P00150000", underlying_symbol="AAPL",
+        option_type="Put", strike=150.0, expiration="2025-06-20",
+    )
+    return [
+        make_option_transaction(
+            id="tx-o", order_id="ORD-o", action="SELL_TO_OPEN", price=2.5,
+            executed_at="2025-01-10T23:30:00+00:00", **common,
+        ),
+        make_option_transaction(
+            id="tx-c", order_id="ORD-c", action="BUY_TO_CLOSE", price=1.0,
+            executed_at="2025-01-20T15:00:00+00:00", **common,
+        ),
+    ]
+
+
+class TestIsoDay:
+    def test_values(self):
+        assert iso_day("2025-01-10T23:30:00+00:00") == date(2025, 1, 10)
+        assert iso_day("2025-01-10 09:00:00") == date(2025, 1, 10)
+        assert iso_day(datetime(2025, 1, 10, 23, 30)) == date(2025, 1, 10)
+        assert iso_day(date(2025, 1, 10)) == date(2025, 1, 10)
+        assert iso_day("") is None
+        assert iso_day(None) is None
+        assert iso_day("not a date") is None
+
+
+class TestDerivedColumns:
+    def test_pipeline_rows_carry_days(self, db, lot_manager):
+        """Raw transactions (multi-row upsert), lots and closings (bulk_insert) and pnl_events all get their day."""
+        db.save_raw_transactions(_round_trip())
+        reprocess(db, lot_manager, _round_trip())
+
+        with db.get_session() as session:
+            assert {r.id: r.executed_day for r in session.query(RawTransaction)} == {
+                "tx-o": date(2025, 1, 10), "tx-c": date(2025, 1, 20),
+            }
+            assert [l.entry_day for l in session.query(PositionLot)] == [date(2025, 1, 10)]
+            assert [c.closing_day for c in session.query(LotClosing)] == [date(2025, 1, 20)]
+            assert [e.closing_day for e in session.query(PnlEvent)] == [date(2025, 1, 20)]
+
+    def test_orm_insert_uses_default(self, db):
+        with db.get_session() as session:
+            session.add(PositionLot(
+                transaction_id="t1", account_number="ACCT1", symbol="AAPL",
+                quantity=100, entry_price=150.0, entry_date="2025-03-04T14:00:00+00:00",
+                remaining_quantity=100,
+            ))
+        with db.get_session() as session:
+            assert session.query(PositionLot.entry_day).scalar() == date(2025, 3, 4)
+
+
+class TestSourceUpdates:
+    def _day(self, db):
+        with db.get_session() as session:
+            return session.query(RawTransaction.executed_day).filter(RawTransaction.id == "tx-o").scalar()
+
+    def test_orm_attribute_set(self, db):
+        db.save_raw_transactions(_round_trip())
+        with db.get_session() as session:
+            session.query(RawTransaction).filter(RawTransaction.id == "tx-o").one().executed_at = "2025-02-03T15:00:00+00:00"
+        assert self._day(db) == date(2025, 2, 3)
+
+    def test_update_statements(self, db):
+        """Bulk updates of the source string carry the day with them; unrelated updates leave it alone."""
+        db.save_raw_transactions(_round_trip())
+        with db.get_session() as session:
+            session.query(RawTransaction).filter(RawTransaction.id == "tx-o").update(
+                {"executed_at": "2025-02-03T15:00:00+00:00"},
+            )
+        assert self._day(db) == date(2025, 2, 3)
+
+        with db.get_session() as session:
+            session.execute(update(RawTransaction).where(RawTransaction.id == "tx-o").values(
+                executed_at=func.replace(RawTransaction.executed_at, "2025-02", "2025-04"),
+            ))
+        assert self._day(db) == date(2025, 4, 3)
+
+        with db.get_session() as session:
+            session.execute(update(RawTransaction).where(RawTransaction.id == "tx-o"), {
+                "executed_at": "2025-05-06T15:00:00+00:00",
+            })
+            session.query(RawTransaction).filter(RawTransaction.id == "tx-o").update({"description": "edited"})
+        assert self._day(db) == date(2025, 5, 6)
+
+
+class TestDayRanges:
+    def test_raw_transaction_end_date_includes_whole_day(self, db):
+        db.save_raw_transactions(_round_trip())
+        rows = db.get_raw_transactions(start_date="2025-01-10", end_date="2025-01-10")
+        assert [r["id"] for r in rows] == ["tx-o"]
+
+    def test_report_rejects_bad_dates(self, db):
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(get_performance_report(
+                exit_from="2025-13-01", db=db, user_id=DEFAULT_USER_ID,
+            ))
+        assert exc.value.status_code == 400
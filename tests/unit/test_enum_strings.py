@@ -0,0 +1,15 @@
+"""Unit tests for the shared Tastytrade enum-string normalizer."""
+
+from src.utils.enum_strings import normalize_enum
+
+
+class TestNormalizeEnum:
+    def test_spellings_agree(self):
+        assert normalize_enum("Sell to Open") == "SELL_TO_OPEN"
+        assert normalize_enum("OrderAction.SELL_TO_OPEN") == "SELL_TO_OPEN"
+        assert normalize_enum("Equity Option") == "EQUITY_OPTION"
+        assert normalize_enum("") == ""
+
+    def test_cached_result_is_shared(self):
+        """Equal inputs return the same string object, so records don't each hold a copy."""
+        assert normalize_enum("Buy to Close") is normalize_enum("Buy to Close")
@@ -0,0 +1,151 @@
+"""Unit tests for group_ancestry — the closure table over
+position_groups.rolled_from_group_id behind single-read chain lookups.
+"""
+
+import asyncio
+
+from src.database.models import GroupAncestry, PositionGroup
+from src.database.tenant import DEFAULT_USER_ID
+from src.pipeline.group_ancestry import (
+    build_closure,
+    chain_ancestors,
+    chain_roots,
+    ensure_group_ancestry,
+    refresh_group_ancestry,
+    roll_sources,
+    sync_group_ancestry,
+)
+from src.pipeline.orchestrator import reprocess
+from src.routers.ledger import get_group_roll_chain
+from tests.fixtures import covered_call_4_roll
+
+
+def _seed_groups(db, links, *, underlying="AAPL"):
+    """Create groups from {group_id: rolled_from_group_id}."""
+    with db.get_session() as session:
+        for gid, parent in links.items():
+            session.add(PositionGroup(
+                group_id=gid, account_number="ACCT", underlying=underlying,
+                status="CLOSED", rolled_from_group_id=parent,
+            ))
+
+
+def _sync(db, partitions=None):
+    with db.get_session() as session:
+        return sync_group_ancestry(session, DEFAULT_USER_ID, partitions=partitions)
+
+
+def _rows(db):
+    with db.get_session() as session:
+        return {
+            (r.ancestor_group_id, r.descendant_group_id): (r.depth, r.root_group_id)
+            for r in session.query(GroupAncestry).all()
+        }
+
+
+class TestBuildClosure:
+    def test_chain_with_branch(self):
+        closure = build_closure({"G1": None, "G2": "G1", "G3": "G2", "B": "G1"})
+        assert closure[("G3", "G3")] == (0, "G1")
+        assert closure[("G2", "G3")] == (1, "G1")
+        assert closure[("G1", "G3")] == (2, "G1")
+        assert closure[("G1", "B")] == (1, "G1")
+        assert ("G2", "B") not in closure
+        assert len(closure) == 4 + 1 + 2 + 1  # self rows, G2<-G1, G3<-G2<-G1, B<-G1
+
+    def test_missing_parent_ends_the_chain(self):
+        """A link to a group that no longer exists leaves the child as its own root."""
+        closure = build_closure({"G2": "DELETED", "G3": "G2"})
+        assert closure[("G2", "G3")] == (1, "G2")
+        assert ("DELETED", "G2") not in closure
+
+    def test_cycle_terminates(self):
+        closure = build_closure({"A": "B", "B": "A"})
+        assert closure[("B", "A")] == (1, "B")
+        assert closure[("A", "B")] == (1, "A")
+
+
+class TestSyncGroupAncestry:
+    def test_resync_writes_only_changes(self, db):
+        """Re-syncing unchanged links writes nothing; relinking a group moves its whole subtree to the new root."""
+        _seed_groups(db, {"G1": None, "G2": "G1", "G3": "G2", "X": None})
+        assert _sync(db) == 4 + 3
+        assert _sync(db) == 0
+
+        with db.get_session() as session:
+            session.query(PositionGroup).filter(PositionGroup.group_id == "G2").update(
+                {"rolled_from_group_id": "X"},
+            )
+        _sync(db, partitions={("ACCT", "AAPL")})
+
+        rows = _rows(db)
+        assert rows[("X", "G3")] == (2, "X")
+        assert rows[("G2", "G2")] == (0, "X")
+        assert ("G1", "G3") not in rows
+        assert rows[("G1", "G1")] == (0, "G1")
+
+    def test_partition_scope_leaves_other_partitions(self, db):
+        _seed_groups(db, {"A1": None, "A2": "A1"}, underlying="AAPL")
+        _seed_groups(db, {"M1": None, "M2": "M1"}, underlying="MSFT")
+        _sync(db)
+        with db.get_session() as session:
+            session.query(PositionGroup).filter(PositionGroup.group_id == "M2").update(
+                {"rolled_from_group_id": None},
+            )
+        # Only AAPL is re-derived, so MSFT keeps its (now stale) link row
+        assert _sync(db, partitions={("ACCT", "AAPL")}) == 0
+        assert ("M1", "M2") in _rows(db)
+
+    def test_empty_table_is_built_whole(self, db):
+        """A partition-scoped sync on a database that predates the table builds every partition."""
+        _seed_groups(db, {"A1": None, "A2": "A1"}, underlying="AAPL")
+        _seed_groups(db, {"M1": None, "M2": "M1"}, underlying="MSFT")
+        _sync(db, partitions={("ACCT", "AAPL")})
+        assert ("M1", "M2") in _rows(db)
+
+    def test_refresh_after_delete(self, db):
+        _seed_groups(db, {"G1": None, "G2": "G1", "G3": "G2"})
+        _sync(db)
+        with db.get_session() as session:
+            session.query(PositionGroup).filter(PositionGroup.group_id == "G1").delete()
+        refresh_group_ancestry(db, ["G1"])
+
+        rows = _rows(db)
+        assert not any("G1" in pair for pair in rows)
+        assert rows[("G2", "G3")] == (1, "G2")
+
+    def test_ensure_builds_once(self, db):
+        _seed_groups(db, {"G1": None, "G2": "G1"})
+        assert ensure_group_ancestry(db) == 3
+        assert ensure_group_ancestry(db) == 0
+
+
+class TestLookups:
+    def test_ancestors_roots_and_sources(self, db):
+        _seed_groups(db, {"G1": None, "G2": "G1", "G3": "G2", "S": None})
+        _sync(db)
+        with db.get_session() as session:
+            assert chain_ancestors(session, ["G3", "S", "NEW"]) == {
+                "G3": ["G3", "G2", "G1"], "S": ["S"], "NEW": ["NEW"],
+            }
+            assert chain_roots(session, ["G3", "G1", "NEW"]) == {
+                "G3": "G1", "G1": "G1", "NEW": "NEW",
+            }
+            assert roll_sources(session, ["G1", "G2", "G3", "S"]) == {"G1", "G2"}
+
+
+class TestPipeline:
+    def test_reprocess_maintains_ancestry(self, db, lot_manager):
+        """The 4-roll ladder's open leaf reaches all five generations in one read, and the roll-chain modal walks the same chain from a midpoint."""
+        reprocess(db, lot_manager, covered_call_4_roll.transactions())
+
+        with db.get_session() as session:
+            groups = session.query(PositionGroup).order_by(PositionGroup.opening_date).all()
+            ordered = [g.group_id for g in groups]
+            assert chain_ancestors(session, [ordered[-1]])[ordered[-1]] == ordered[::-1]
+
+        chain = asyncio.run(get_group_roll_chain(
+            ordered[2], db=db, lot_manager=lot_manager, user_id=DEFAULT_USER_ID,
+        ))
+        assert chain["root_group_id"] == ordered[0]
+        assert [c["group_id"] for c in chain["chain"]] == ordered
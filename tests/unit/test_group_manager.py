@@ -657,3 +657,62 @@ class TestGroupPersister:
                 "child lot's new group must have rolled_from_group_id pointing "
                 "at the parent lot's group"
             )
+
+    def _count_statements(self, persister):
+        """Run process_groups and return how many SQL statements it issued."""
+        from sqlalchemy import event
+        from src.database.engine import get_engine
+
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = get_engine()
+        event.listen(engine, "before_cursor_execute", _record)
+        try:
+            persister.process_groups()
+        finally:
+            event.remove(engine, "before_cursor_execute", _record)
+        return len(statements)
+
+    def test_query_count_independent_of_group_count(self, db, lot_manager):
+        """Dates, link counts and cleanup are set-based, so a re-run over
+        many groups issues no more statements than a re-run over a few."""
+        from src.database.models import PositionGroup
+
+        def _seed(underlyings):
+            with db.get_session() as session:
+                for i, undl in enumerate(underlyings):
+                    lot = self._insert_lot(
+                        session, transaction_id=f"tx-{undl}-closed",
+                        symbol=f"{undl:<6}260321C00170000", underlying=undl,
+                        remaining_quantity=0, status="CLOSED",
+                    )
+                    self._insert_closing(session, lot.id,
+                                         closing_date=f"2026-02-{10 + i:02d}T10:00:00")
+                    self._insert_lot(
+                        session, transaction_id=f"tx-{undl}-open",
+                        symbol=f"{undl:<6}260417P00150000", underlying=undl,
+                        option_type="Put", strike=150.0, expiration="2026-04-17",
+                        entry_date="2026-03-01T10:00:00",
+                    )
+
+        persister = GroupPersister(db, lot_manager)
+
+        _seed(["AAA", "BBB"])
+        persister.process_groups()
+        small = self._count_statements(persister)
+
+        _seed([f"U{i:02d}" for i in range(12)])
+        persister.process_groups()
+        large = self._count_statements(persister)
+
+        assert large == small
+
+        with db.get_session() as session:
+            open_groups = session.query(PositionGroup).filter(
+                PositionGroup.status == "OPEN",
+            ).all()
+            assert len(open_groups) == 14
+            assert all(g.last_activity_date is not None for g in open_groups)
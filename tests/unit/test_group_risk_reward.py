@@ -0,0 +1,105 @@
+"""Unit tests for max risk / max reward stored on position_groups by the
+pipeline and recomputed in batches for edits outside it.
+"""
+
+import asyncio
+
+from src.database.models import PositionGroup
+from src.database.tenant import DEFAULT_USER_ID
+from src.pipeline.orchestrator import reprocess
+from src.routers.ledger import update_ledger_group
+from src.routers.reports import get_performance_report
+from src.schemas import LedgerGroupUpdate
+from src.services.report_service import (
+    calculate_max_risk_reward,
+    calculate_max_risk_reward_batch,
+)
+from tests.conftest import make_option_transaction
+
+
+def _short_put(n, *, underlying, strike, open_price, close_price):
+    symbol = f"{underlying:<6}250620P{int(strike * 1000):08d}"
+    common = dict(
+        account_number="ACCT1", symbol=symbol, underlying_symbol=underlying,
+        option_type="Put", strike=strike, expiration="2025-06-20",
+    )
+    return [
+        make_option_transaction(
+            id=f"tx-{n}-o", order_id=f"ORD-{n}-o", action="SELL_TO_OPEN",
+            price=open_price, executed_at="2025-01-10T15:00:00+00:00", **common,
+        ),
+        make_option_transaction(
+            id=f"tx-{n}-c", order_id=f"ORD-{n}-c", action="BUY_TO_CLOSE",
+            price=close_price, executed_at="2025-01-20T15:00:00+00:00", **common,
+        ),
+    ]
+
+
+def _history():
+    return (
+        _short_put(1, underlying="AAPL", strike=150, open_price=2.5, close_price=1.0)
+        + _short_put(2, underlying="MSFT", strike=400, open_price=2.0, close_price=0.5)
+    )
+
+
+def _stored(db):
+    with db.get_session() as session:
+        return {
+            g.underlying: (g.group_id, g.strategy_label, g.max_risk, g.max_reward)
+            for g in session.query(PositionGroup).all()
+        }
+
+
+class TestPipeline:
+    def test_reprocess_stores_risk_reward(self, db, lot_manager):
+        reprocess(db, lot_manager, _history())
+
+        stored = _stored(db)
+        gid, label, max_risk, max_reward = stored["AAPL"]
+        assert (max_risk, max_reward) == (14750.0, 250.0)
+        with db.get_session() as session:
+            for gid, label, max_risk, max_reward in stored.values():
+                assert calculate_max_risk_reward(session, gid, label) == (max_risk, max_reward)
+
+
+class TestBatch:
+    def test_batch_matches_per_group(self, db, lot_manager):
+        reprocess(db, lot_manager, _history())
+        labels = {gid: label for gid, label, _, _ in _stored(db).values()}
+        labels["NO-LOTS"] = "Short Put"
+
+        with db.get_session() as session:
+            batch = calculate_max_risk_reward_batch(session, labels)
+            assert batch["NO-LOTS"] == (None, None)
+            for gid, label in labels.items():
+                assert batch[gid] == calculate_max_risk_reward(session, gid, label)
+
+    def test_label_override_recomputes(self, db, lot_manager):
+        reprocess(db, lot_manager, _history())
+        gid = _stored(db)["AAPL"][0]
+
+        asyncio.run(update_ledger_group(
+            gid, LedgerGroupUpdate(strategy_label="Long Put"),
+            db=db, lot_manager=lot_manager, user_id=DEFAULT_USER_ID,
+        ))
+        assert _stored(db)["AAPL"][2:] == (250.0, None)
+
+
+class TestPerformanceReport:
+    def test_report_reads_stored_values(self, db, lot_manager):
+        reprocess(db, lot_manager, _history())
+        with db.get_session() as session:
+            session.query(PositionGroup).filter_by(underlying="AAPL").update(
+                {"max_risk": 1000.0, "max_reward": 100.0},
+            )
+        report = asyncio.run(get_performance_report(db=db, user_id=DEFAULT_USER_ID))
+        assert report["summary"]["avgMaxRisk"] == (1000.0 + 39800.0) / 2
+
+    def test_groups_without_values_are_computed(self, db, lot_manager):
+        """Rows from before the columns existed fall back to the batched calculator."""
+        reprocess(db, lot_manager, _history())
+        with db.get_session() as session:
+            session.query(PositionGroup).update({"max_risk": None, "max_reward": None})
+        report = asyncio.run(get_performance_report(db=db, user_id=DEFAULT_USER_ID))
+        assert report["summary"]["avgMaxRisk"] == (14750.0 + 39800.0) / 2
+        assert report["summary"]["avgMaxReward"] == (250.0 + 200.0) / 2
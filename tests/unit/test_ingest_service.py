@@ -0,0 +1,143 @@
+"""
+Tests for streaming transaction ingestion.
+
+Source: src/services/ingest_service.py (ingest_transactions)
+"""
+
+import asyncio
+import json
+from datetime import datetime
+
+from src.services.ingest_service import (
+    SYNC_CURSOR_OVERLAP,
+    clear_sync_state,
+    get_sync_cursor,
+    ingest_transactions,
+)
+from tests.conftest import make_option_transaction, make_stock_transaction
+
+START = datetime(2025, 1, 1)
+
+
+def _txn(i, day, **kwargs):
+    return make_option_transaction(
+        id=f"tx-{i}", order_id=f"ORD-{i}",
+        executed_at=f"2025-03-{day:02d}T10:00:00+00:00", **kwargs,
+    )
+
+
+class FakeClient:
+    """Serves fixed pages per account; optionally fails after N pages."""
+
+    def __init__(self, pages, fail_after=None):
+        self.pages = pages
+        self.fail_after = fail_after or {}
+        self.since = {}
+        self.account_errors = {}
+
+    async def iter_transaction_pages(self, account_number, start_at):
+        self.since[account_number] = start_at
+        served = 0
+        for page in self.pages[account_number]:
+            if all(t["executed_at"] < start_at.isoformat() for t in page):
+                continue
+            if served == self.fail_after.get(account_number):
+                raise ConnectionError("connection reset")
+            served += 1
+            yield page
+
+
+def _checkpoint(db, account):
+    raw = db.get_sync_metadata(f"ingest_checkpoint:{account}")
+    return json.loads(raw) if raw else None
+
+
+class TestIngestTransactions:
+    def test_pages_persisted_with_dirty_partitions(self, db):
+        """Every page should be saved, with new rows mapped to their partitions and no checkpoint left behind."""
+        client = FakeClient({"ACCT1": [[_txn(1, 1), _txn(2, 2)], [_txn(3, 3, underlying_symbol="MSFT", symbol="MSFT  250321C00300000")]]})
+
+        result = asyncio.run(ingest_transactions(db, client, ["ACCT1"], START))
+
+        assert (result.fetched, result.saved) == (3, 3)
+        assert result.partitions == {("ACCT1", "AAPL"), ("ACCT1", "MSFT")}
+        assert _checkpoint(db, "ACCT1") is None
+
+    def test_keep_filters_rows_before_saving(self, db):
+        cash = make_stock_transaction(id="tx-cash", symbol=None, executed_at="2025-03-01T09:00:00+00:00")
+        client = FakeClient({"ACCT1": [[cash, _txn(1, 1)]]})
+
+        result = asyncio.run(ingest_transactions(
+            db, client, ["ACCT1"], START, keep=lambda t: bool(t.get("symbol")),
+        ))
+        assert result.saved == 1
+
+    def test_interrupted_ingest_resumes_from_watermark(self, db):
+        """A failed account keeps its checkpoint; the next run starts at the watermark and still reprocesses what the failed run saved."""
+        pages = {
+            "ACCT1": [[_txn(1, 1)], [_txn(2, 5)], [_txn(3, 9)]],
+            "ACCT2": [[_txn(4, 2, account_number="ACCT2")]],
+        }
+        first = asyncio.run(ingest_transactions(
+            db, FakeClient(pages, fail_after={"ACCT1": 2}), ["ACCT1", "ACCT2"], START,
+        ))
+        assert first.failed_accounts == {"ACCT1": "connection reset"}
+        assert first.saved == 3
+        assert _checkpoint(db, "ACCT1")["through"] == "2025-03-05T10:00:00+00:00"
+        assert _checkpoint(db, "ACCT2") is None
+
+        client = FakeClient(pages)
+        second = asyncio.run(ingest_transactions(db, client, ["ACCT1"], START))
+        assert client.since["ACCT1"] == datetime.fromisoformat("2025-03-05T10:00:00+00:00")
+        assert second.saved == 1  # tx-3; tx-2 at the watermark is a duplicate
+        assert ("ACCT1", "AAPL") in second.partitions
+        assert _checkpoint(db, "ACCT1") is None
+
+    def test_checkpoint_ignored_for_earlier_range(self, db):
+        """A checkpoint from a run that started later than the requested range must not skip the uncovered history."""
+        db.set_sync_metadata("ingest_checkpoint:ACCT1", json.dumps({
+            "start": "2025-03-01T00:00:00", "through": "2025-03-05T10:00:00+00:00", "partitions": [],
+        }))
+        client = FakeClient({"ACCT1": [[_txn(1, 1)]]})
+        asyncio.run(ingest_transactions(db, client, ["ACCT1"], START))
+        assert client.since["ACCT1"] == START
+
+
+class TestSyncCursors:
+    def test_completed_ingest_advances_cursor(self, db):
+        """Finishing an account records its newest transaction as the cursor."""
+        client = FakeClient({"ACCT1": [[_txn(1, 1), _txn(2, 4)]]})
+        asyncio.run(ingest_transactions(db, client, ["ACCT1"], START))
+
+        assert get_sync_cursor(db, "ACCT1") == {
+            "executed_at": "2025-03-04T10:00:00+00:00", "transaction_id": "tx-2",
+        }
+
+    def test_incremental_starts_at_cursor_with_overlap(self, db):
+        """With cursors, the fetch starts just before the cursor rather than at the days_back window."""
+        pages = {"ACCT1": [[_txn(1, 1), _txn(2, 4)]]}
+        asyncio.run(ingest_transactions(db, FakeClient(pages), ["ACCT1"], START))
+
+        pages["ACCT1"].append([_txn(3, 6)])
+        client = FakeClient(pages)
+        result = asyncio.run(ingest_transactions(db, client, ["ACCT1"], START, use_cursors=True))
+
+        cursor_at = datetime.fromisoformat("2025-03-04T10:00:00+00:00")
+        assert client.since["ACCT1"] == cursor_at - SYNC_CURSOR_OVERLAP
+        assert result.saved == 1
+        assert get_sync_cursor(db, "ACCT1")["transaction_id"] == "tx-3"
+
+    def test_unchanged_account_writes_nothing(self, db):
+        """An account with no activity past its cursor saves no rows and leaves no checkpoint."""
+        pages = {"ACCT1": [[_txn(1, 1), _txn(2, 4)]]}
+        asyncio.run(ingest_transactions(db, FakeClient(pages), ["ACCT1"], START))
+
+        result = asyncio.run(ingest_transactions(db, FakeClient(pages), ["ACCT1"], START, use_cursors=True))
+        assert (result.saved, result.partitions) == (0, set())
+        assert _checkpoint(db, "ACCT1") is None
+        assert get_sync_cursor(db, "ACCT1")["transaction_id"] == "tx-2"
+
+    def test_clear_sync_state(self, db):
+        asyncio.run(ingest_transactions(db, FakeClient({"ACCT1": [[_txn(1, 1)]]}), ["ACCT1"], START))
+        clear_sync_state(db, "ACCT1")
+        assert get_sync_cursor(db, "ACCT1") is None
@@ -0,0 +1,213 @@
+"""
+Tests for LotBook — the in-memory lot state behind position_ledger.
+
+Source: src/pipeline/lot_book.py
+"""
+
+from datetime import datetime
+
+from src.database.models import LotClosing, PositionLot
+from src.pipeline.lot_book import LotBook
+from src.pipeline.order_assembler import preprocess_transactions
+from tests.conftest import make_option_transaction, make_stock_transaction
+
+SYM = "AAPL  250321C00170000"
+
+
+def _open(book, id, action="BUY_TO_OPEN", quantity=1, price=2.00,
+          executed_at="2025-03-01T10:00:00+00:00", chain_id="chain-1"):
+    tx = make_option_transaction(
+        id=id, action=action, quantity=quantity, price=price,
+        symbol=SYM, executed_at=executed_at,
+    )
+    return book.create_lot(tx, chain_id=chain_id)
+
+
+class TestLotBookFifo:
+    def test_closes_oldest_entry_date_first(self):
+        """A later-created lot with an earlier entry date should be closed first, matching ORDER BY entry_date."""
+        book = LotBook()
+        late = _open(book, "tx-late", executed_at="2025-03-05T10:00:00+00:00")
+        early = _open(book, "tx-early", executed_at="2025-03-01T10:00:00+00:00")
+
+        _, affected = book.close_lot_fifo(
+            account_number="ACCT1", symbol=SYM, quantity_to_close=1,
+            closing_price=3.00, closing_order_id="close-1",
+            closing_transaction_id="tx-close", closing_date=datetime(2025, 3, 10),
+        )
+
+        assert affected == [early]
+        assert [lot.id for lot in book.get_open_lots("ACCT1", SYM)] == [late]
+
+    def test_partial_close_and_direction_filter(self):
+        """close_long=False should skip long lots and leave a partially closed short lot open."""
+        book = LotBook()
+        _open(book, "tx-long", action="BUY_TO_OPEN", quantity=2)
+        short_id = _open(book, "tx-short", action="SELL_TO_OPEN", quantity=3, price=1.50,
+                         executed_at="2025-03-02T10:00:00+00:00")
+
+        pnl, affected = book.close_lot_fifo(
+            account_number="ACCT1", symbol=SYM, quantity_to_close=2,
+            closing_price=0.50, closing_order_id="close-1",
+            closing_transaction_id="tx-close", closing_date=datetime(2025, 3, 10),
+            close_long=False,
+        )
+
+        assert affected == [short_id]
+        assert pnl == 200.0  # (1.50 - 0.50) * 2 * 100
+        short = next(l for l in book.get_open_lots("ACCT1", SYM) if l.id == short_id)
+        assert short.remaining_quantity == -1
+        assert short.status == "PARTIAL"
+
+    def test_open_lots_without_symbol_match_lot_manager(self, db, lot_manager):
+        """Without a symbol every open lot in the account comes back in entry order, as LotManager.get_open_lots returns them."""
+        other = "AAPL  250321P00160000"
+        txs = [
+            make_option_transaction(id="tx-a", symbol=SYM, executed_at="2025-03-03T10:00:00+00:00"),
+            make_option_transaction(id="tx-b", symbol=other, option_type="Put", strike=160.0,
+                                    executed_at="2025-03-01T10:00:00+00:00"),
+            make_option_transaction(id="tx-c", symbol=SYM, executed_at="2025-03-02T10:00:00+00:00"),
+        ]
+        book = LotBook()
+        for tx, chain in zip(txs, ("chain-1", "chain-2", "chain-1")):
+            book.create_lot(tx, chain_id=chain)
+            lot_manager.create_lot(tx, chain_id=chain)
+
+        def ids(lots):
+            return [lot.transaction_id for lot in lots]
+
+        assert ids(book.get_open_lots("ACCT1")) == ids(lot_manager.get_open_lots("ACCT1")) == ["tx-b", "tx-c", "tx-a"]
+        assert ids(book.get_open_lots("ACCT1", chain_id="chain-1")) == ["tx-c", "tx-a"]
+        assert ids(book.get_open_lots("ACCT1", underlying="MSFT")) == []
+        assert book.get_open_lots("ACCT2") == []
+
+
+class TestLotBookOpenLot:
+    def test_matches_create_lot_from_raw_dict(self):
+        """Booking an assembled Transaction should store exactly what create_lot derives from the raw dict."""
+        raws = [
+            make_option_transaction(id="tx-opt", action="SELL_TO_OPEN", quantity=2, symbol=SYM),
+            make_stock_transaction(id="tx-stk", action="BUY_TO_OPEN", quantity=100),
+        ]
+        transactions = {tx.id: tx for tx in preprocess_transactions(raws)[0]}
+
+        for raw in raws:
+            from_dict, from_tx = LotBook(), LotBook()
+            from_dict.create_lot(raw, chain_id="c", leg_index=1, opening_order_id="o")
+            from_tx.open_lot(transactions[raw["id"]], chain_id="c", leg_index=1, opening_order_id="o")
+            [a] = from_dict.get_open_lots("ACCT1", raw["symbol"])
+            [b] = from_tx.get_open_lots("ACCT1", raw["symbol"])
+            assert a.column_values() == b.column_values()
+
+
+class TestLotBookDerived:
+    def test_assignment_lookup_and_derived_link(self):
+        """A derived stock lot should use the option strike as entry price and link the assignment closing."""
+        book = LotBook()
+        option_id = _open(book, "tx-sto", action="SELL_TO_OPEN", quantity=1)
+        book.close_lot_fifo(
+            account_number="ACCT1", symbol=SYM, quantity_to_close=1,
+            closing_price=0.0, closing_order_id="assign-1",
+            closing_transaction_id="tx-assign", closing_date=datetime(2025, 3, 21),
+            closing_type="ASSIGNMENT", close_long=False,
+        )
+
+        lot, closing = book.find_unlinked_closing("ACCT1", SYM, "ASSIGNMENT")
+        assert lot.id == option_id
+
+        stock = make_stock_transaction(
+            id="tx-stock", action="SELL_TO_OPEN", quantity=100, price=171.0,
+            executed_at="2025-03-21T16:00:00+00:00",
+        )
+        derived_id = book.create_derived_lot(
+            source_lot_id=option_id, stock_transaction=stock,
+            derivation_type="ASSIGNMENT", chain_id="chain-1", override_quantity=-100,
+        )
+
+        assert closing.resulting_lot_id == derived_id
+        assert book.find_unlinked_closing("ACCT1", SYM, "ASSIGNMENT") is None
+        derived = book.get_open_lots("ACCT1", "AAPL")[0]
+        assert derived.entry_price == 170.0
+        assert derived.quantity == -100
+
+
+class TestLotBookFlush:
+    def test_flush_writes_rows_with_real_ids(self, db):
+        """flush() should insert lots and closings, translating provisional ids into the stored foreign keys."""
+        book = LotBook()
+        option_id = _open(book, "tx-sto", action="SELL_TO_OPEN", quantity=1)
+        book.close_lot_fifo(
+            account_number="ACCT1", symbol=SYM, quantity_to_close=1,
+            closing_price=0.0, closing_order_id="assign-1",
+            closing_transaction_id="tx-assign", closing_date=datetime(2025, 3, 21),
+            closing_type="ASSIGNMENT", close_long=False,
+        )
+        stock = make_stock_transaction(id="tx-stock", action="SELL_TO_OPEN", quantity=100)
+        book.create_derived_lot(
+            source_lot_id=option_id, stock_transaction=stock,
+            derivation_type="ASSIGNMENT", chain_id="chain-1", override_quantity=-100,
+        )
+
+        assert book.flush(db) == (2, 1)
+
+        with db.get_session() as session:
+            option = session.query(PositionLot).filter_by(transaction_id="tx-sto").one()
+            derived = session.query(PositionLot).filter_by(transaction_id="tx-stock").one()
+            closing = session.query(LotClosing).one()
+            assert option.status == "CLOSED"
+            assert derived.derived_from_lot_id == option.id
+            assert closing.lot_id == option.id
+            assert closing.resulting_lot_id == derived.id
+
+    def test_seeded_lot_is_updated_in_place(self, db, lot_manager):
+        """Lots already in the database should be closed by the book and updated rather than re-inserted."""
+        tx = make_option_transaction(id="tx-existing", action="BUY_TO_OPEN", quantity=2, symbol=SYM)
+        existing_id = lot_manager.create_lot(tx, chain_id="chain-1")
+
+        book = LotBook()
+        assert book.seed_open_lots(db, {("ACCT1", SYM)}) == 1
+        _, affected = book.close_lot_fifo(
+            account_number="ACCT1", symbol=SYM, quantity_to_close=2,
+            closing_price=3.00, closing_order_id="close-1",
+            closing_transaction_id="tx-close", closing_date=datetime(2025, 3, 10),
+        )
+        assert affected == [existing_id]
+        assert book.flush(db) == (0, 1)
+
+        lot = lot_manager.get_lot_by_id(existing_id)
+        assert lot.status == "CLOSED"
+        assert lot.remaining_quantity == 0
+        assert lot_manager.get_lot_closings(existing_id)[0].realized_pnl == 100.0
+
+
+class TestLotBookAbsorb:
+    def test_absorbed_ids_shift_and_links_follow(self, db):
+        """Merging a worker's book should renumber its provisional ids and keep closing/derived links pointing at the right lots."""
+        first = LotBook()
+        _open(first, "tx-a")
+
+        second = LotBook()
+        option_id = _open(second, "tx-sto", action="SELL_TO_OPEN", quantity=1,
+                          chain_id="chain-2")
+        second.close_lot_fifo(
+            account_number="ACCT1", symbol=SYM, quantity_to_close=1,
+            closing_price=0.0, closing_order_id="assign-1",
+            closing_transaction_id="tx-assign", closing_date=datetime(2025, 3, 21),
+            closing_type="ASSIGNMENT", close_long=False,
+        )
+        stock = make_stock_transaction(id="tx-stock", action="SELL_TO_OPEN", quantity=100)
+        second.create_derived_lot(
+            source_lot_id=option_id, stock_transaction=stock,
+            derivation_type="ASSIGNMENT", chain_id="chain-2", override_quantity=-100,
+        )
+
+        first.absorb(second)
+        assert _open(first, "tx-b") == -4  # ids continue after the absorbed lots
+        assert first.flush(db) == (4, 1)
+
+        with db.get_session() as session:
+            option = session.query(PositionLot).filter_by(transaction_id="tx-sto").one()
+            derived = session.query(PositionLot).filter_by(transaction_id="tx-stock").one()
+            closing = session.query(LotClosing).one()
+            assert derived.derived_from_lot_id == option.id
+            assert (closing.lot_id, closing.resulting_lot_id) == (option.id, derived.id)
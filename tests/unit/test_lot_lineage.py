@@ -13,6 +13,7 @@ Two pure functions are tested:
   AND the source group is fully closed.
 """
 
+import random
 import uuid
 
 from src.database.models import (
@@ -26,6 +27,7 @@ from dataclasses import dataclass
 from typing import Optional
 
 from src.pipeline.lot_lineage import (
+    _pair_bucket,
     build_chain_attribution,
     derive_rolled_from_group_id,
     detect_lot_lineage,
@@ -485,6 +487,47 @@ class TestDeriveRolledFromGroupId:
             assert tgt_after.rolled_from_group_id is None
 
 
+# ---------------------------------------------------------------------------
+# _pair_bucket — matcher equivalence with the cross-product definition
+# ---------------------------------------------------------------------------
+
+def _cross_product_pairs(closes, opens):
+    """Reference pairing: sort every candidate pair, take free ones greedily."""
+    candidates = sorted(
+        (abs(cs - os_), ci, oi, cid, oid)
+        for ci, (cs, cid) in enumerate(closes)
+        for oi, (os_, oid) in enumerate(opens)
+        if cid != oid
+    )
+    close_used, open_used, pairs = set(), set(), []
+    for _d, ci, oi, cid, oid in candidates:
+        if ci in close_used or oi in open_used:
+            continue
+        close_used.add(ci)
+        open_used.add(oi)
+        pairs.append((cid, oid))
+    return pairs
+
+
+class TestPairBucket:
+    def test_matches_cross_product_pairing(self):
+        """Random buckets with repeated strikes, same-day open-and-close lots and doubly-closed lots pair exactly as the full sorted cross product does."""
+        rng = random.Random(284)
+        for _ in range(500):
+            strikes = [rng.choice([95.0, 97.5, 100.0, 102.5, 105.0, 110.0]) for _ in range(40)]
+            opens = [(strikes[i], 1000 + i) for i in range(rng.randint(0, 12))]
+            closes = [(rng.choice(strikes), rng.randint(1, 15)) for _ in range(rng.randint(0, 12))]
+            # Some lots opened and closed the same day, some closed twice
+            closes += [(s, oid) for s, oid in opens if rng.random() < 0.2]
+            closes += closes[:rng.randint(0, 2)]
+            rng.shuffle(closes)
+            assert sorted(_pair_bucket(closes, opens)) == sorted(_cross_product_pairs(closes, opens))
+
+    def test_never_self_pairs(self):
+        assert _pair_bucket([(100.0, 7)], [(100.0, 7)]) == []
+        assert _pair_bucket([(100.0, 7)], [(100.0, 7), (120.0, 8)]) == [(7, 8)]
+
+
 # ---------------------------------------------------------------------------
 # build_chain_attribution — pure unit tests with stub objects
 # ---------------------------------------------------------------------------
@@ -0,0 +1,152 @@
+"""Unit tests for open_position_snapshots — the materialized payload behind
+/api/open-chains.
+"""
+
+import json
+from datetime import date, datetime
+
+from src.database.models import OpenPositionSnapshot, PositionGroup
+from src.models.lot_manager import Lot
+from src.pipeline.open_snapshots import (
+    build_group_snapshot,
+    populate_open_snapshots,
+    refresh_open_snapshots,
+    visible_chain,
+)
+from src.pipeline.orchestrator import reprocess
+from tests.conftest import make_option_transaction
+
+
+def _lot(id, *, symbol, quantity, strike, expiration, entry_price=2.0):
+    return Lot(
+        id=id, transaction_id=f"tx-{id}", account_number="ACCT1",
+        symbol=symbol, underlying="AAPL", instrument_type="EQUITY_OPTION",
+        option_type="Call", strike=strike, expiration=expiration,
+        quantity=quantity, entry_price=entry_price,
+        entry_date=datetime(2026, 1, 5, 10, 0), remaining_quantity=quantity,
+        original_quantity=abs(quantity), chain_id=None, leg_index=0,
+        opening_order_id=None, derived_from_lot_id=None,
+        derivation_type=None, status="OPEN",
+    )
+
+
+def _group(gid="G1"):
+    return {
+        "group_id": gid, "account_number": "ACCT1", "underlying": "AAPL",
+        "strategy_label": "Short Call", "opening_date": "2026-01-05",
+        "status": "OPEN",
+    }
+
+
+def _snapshots(db):
+    with db.get_session() as session:
+        return {
+            row.group_id: json.loads(row.snapshot)
+            for row in session.query(OpenPositionSnapshot).all()
+        }
+
+
+class TestBuildGroupSnapshot:
+    def test_same_leg_lots_are_consolidated(self):
+        """Two open lots on the same contract should appear as one leg whose quantity and cost basis are the sums, with a blended opening price."""
+        exp = date(2026, 3, 20)
+        lots = [
+            _lot(1, symbol="AAPL  260320C00200000", quantity=-1, strike=200.0,
+                 expiration=exp, entry_price=2.0),
+            _lot(2, symbol="AAPL  260320C00200000", quantity=-1, strike=200.0,
+                 expiration=exp, entry_price=3.0),
+        ]
+        snap = build_group_snapshot(_group(), lots, {}, None)
+
+        assert len(snap["open_legs"]) == 1
+        leg = snap["open_legs"][0]
+        assert leg["quantity"] == 2
+        assert leg["cost_basis"] == 500.0
+        assert leg["opening_price"] == 2.5
+        assert snap["cost_basis_total"] == 500.0
+        assert json.loads(json.dumps(snap)) == snap
+
+
+class TestVisibleChain:
+    def test_expired_legs_hidden_at_read_time(self):
+        """A leg that expires after the snapshot was built should drop out of the response, and a group with nothing left open should disappear."""
+        lots = [_lot(1, symbol="AAPL  260320C00200000", quantity=-1,
+                     strike=200.0, expiration=date(2026, 3, 20))]
+        snap = build_group_snapshot(_group(), lots, {}, None)
+
+        assert visible_chain(snap, today=date(2026, 3, 20))["open_legs"]
+        assert visible_chain(snap, today=date(2026, 3, 21)) is None
+
+    def test_shares_label_when_only_equity_remains(self):
+        """Once every option leg has expired, a group still holding shares should be labelled 'Shares'."""
+        snap = {
+            "strategy_type": "Covered Call",
+            "open_legs": [{"expiration": "2026-03-20"}],
+            "equity_legs": [{"quantity": 100}],
+        }
+        chain = visible_chain(snap, today=date(2026, 4, 1))
+        assert chain["strategy_type"] == "Shares"
+        assert chain["open_legs"] == []
+        assert snap["open_legs"]  # stored snapshot left untouched
+
+
+class TestPopulateOpenSnapshots:
+    def _roll(self):
+        return [
+            make_option_transaction(
+                id="tx-open", order_id="ORD-OPEN", action="SELL_TO_OPEN",
+                symbol="AAPL  250321C00170000", strike=170.0,
+                expiration="2025-03-21", price=2.50,
+                executed_at="2025-03-01T10:00:00+00:00",
+            ),
+            make_option_transaction(
+                id="tx-btc", order_id="ORD-ROLL", action="BUY_TO_CLOSE",
+                symbol="AAPL  250321C00170000", strike=170.0,
+                expiration="2025-03-21", price=1.00,
+                executed_at="2025-03-15T10:00:00+00:00",
+            ),
+            make_option_transaction(
+                id="tx-sto", order_id="ORD-ROLL", action="SELL_TO_OPEN",
+                symbol="AAPL  250418C00175000", strike=175.0,
+                expiration="2025-04-18", price=3.00,
+                executed_at="2025-03-15T10:00:00+00:00",
+            ),
+        ]
+
+    def test_pipeline_snapshots_open_groups_with_roll_chain(self, db, lot_manager):
+        """Reprocessing should leave one snapshot per open group, carrying its open leg and the roll chain it continues, with cumulative realized P&L summed over the whole chain."""
+        reprocess(db, lot_manager, self._roll())
+
+        snaps = _snapshots(db)
+        assert len(snaps) == 1
+        snap = next(iter(snaps.values()))
+        assert [l["symbol"] for l in snap["open_legs"]] == ["AAPL  250418C00175000"]
+        assert snap["roll_chain"]["chain_length"] == 2
+        assert snap["roll_chain"]["cumulative_realized_pnl"] == 150.0
+
+    def test_partition_rebuild_leaves_other_partitions(self, db, lot_manager):
+        """Rebuilding one partition's snapshots must not drop or rewrite another partition's rows."""
+        msft = make_option_transaction(
+            id="tx-msft", order_id="ORD-MSFT", action="SELL_TO_OPEN",
+            underlying_symbol="MSFT", symbol="MSFT  250321C00300000",
+            strike=300.0, executed_at="2025-03-01T10:00:00+00:00",
+        )
+        reprocess(db, lot_manager, self._roll() + [msft])
+        before = _snapshots(db)
+        assert len(before) == 2
+
+        populate_open_snapshots(db, lot_manager, partitions={("ACCT1", "AAPL")})
+        assert _snapshots(db) == before
+
+    def test_refresh_after_label_override(self, db, lot_manager):
+        """A user label change made outside the pipeline should show up after refreshing that group's snapshot."""
+        reprocess(db, lot_manager, self._roll())
+        gid = next(iter(_snapshots(db)))
+
+        with db.get_session() as session:
+            session.query(PositionGroup).filter(
+                PositionGroup.group_id == gid,
+            ).update({"strategy_label": "My Label"})
+
+        refresh_open_snapshots(db, lot_manager, [gid])
+        assert _snapshots(db)[gid]["strategy_type"] == "My Label"
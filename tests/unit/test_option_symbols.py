@@ -0,0 +1,47 @@
+"""Unit tests for the shared OCC option symbol parser."""
+
+from datetime import date
+
+from src.utils.option_symbols import (
+    canonical_symbol,
+    is_option_symbol,
+    parse_option_symbol,
+)
+
+
+class TestParseOptionSymbol:
+    def test_parses_fields(self):
+        contract = parse_option_symbol("AAPL  250117C00150000")
+        assert contract.root == "AAPL"
+        assert contract.expiration == date(2025, 1, 17)
+        assert contract.option_type == "Call"
+        assert contract.strike == 150.0
+
+    def test_cached_record_is_shared(self):
+        """Parsing the same symbol twice returns the same immutable record."""
+        assert parse_option_symbol("SPY   250321P00550500") is parse_option_symbol("SPY   250321P00550500")
+        assert parse_option_symbol("SPY   250321P00550500").strike == 550.5
+
+    def test_not_option_shaped(self):
+        assert parse_option_symbol("AAPL") is None
+        assert parse_option_symbol("BRK B") is None
+
+    def test_unreadable_parts_are_none(self):
+        """A bad date or strike leaves that field None instead of raising."""
+        contract = parse_option_symbol("AAPL  251399C0015000X")
+        assert contract.expiration is None
+        assert contract.strike is None
+        assert not is_option_symbol("AAPL  251399C0015000X")
+
+
+class TestClassification:
+    def test_single_space_root_is_an_option(self):
+        """Five-character roots leave a single space of padding; they are still options."""
+        assert is_option_symbol("GOOGL 250117C00150000")
+        assert not is_option_symbol("/ESH5")
+
+    def test_canonical_symbol_pads_root(self):
+        assert canonical_symbol("GOOGL 250117C00150000") == "GOOGL 250117C00150000"
+        assert canonical_symbol("F 250117C00012000") == "F     250117C00012000"
+        assert canonical_symbol(" AAPL ") == "AAPL"
+        assert canonical_symbol(None) == ""
@@ -12,6 +12,7 @@ from src.pipeline.group_manager import GroupPersister
 from src.pipeline.order_assembler import assemble_orders
 from src.database.models import (
     PositionLot, PositionGroup, PositionGroupLot, LotClosing,
+    PnlEvent, RollChainSummary,
 )
 from tests.conftest import (
     make_option_transaction,
@@ -146,6 +147,37 @@ def _snapshot_groups(db_manager):
         return result
 
 
+def _snapshot_derived(db_manager):
+    """Snapshot every derived artifact keyed by transaction ids, so runs
+    that assign different primary keys or group UUIDs still compare equal."""
+    with db_manager.get_session() as session:
+        lots = session.query(PositionLot).all()
+        txn_by_lot = {l.id: l.transaction_id for l in lots}
+        lot_rows = sorted(
+            (l.transaction_id, l.remaining_quantity, l.status, txn_by_lot.get(l.parent_lot_id))
+            for l in lots
+        )
+        closing_rows = sorted(
+            (txn_by_lot[c.lot_id], c.closing_type, c.quantity_closed, c.realized_pnl)
+            for c in session.query(LotClosing).all()
+        )
+        pnl_rows = sorted(
+            (e.symbol, e.closing_type, e.realized_pnl)
+            for e in session.query(PnlEvent).all()
+        )
+        chain_rows = sorted(
+            (s.underlying, s.chain_length)
+            for s in session.query(RollChainSummary).all()
+        )
+    return {
+        "lots": lot_rows,
+        "closings": closing_rows,
+        "groups": _snapshot_groups(db_manager),
+        "pnl_events": pnl_rows,
+        "roll_chains": chain_rows,
+    }
+
+
 # =====================================================================
 # Full pipeline tests
 # =====================================================================
@@ -327,7 +359,7 @@ class TestIncrementalReprocess:
     """Tests for affected_underlyings partial reprocessing."""
 
     def test_incremental_reprocess(self, db, lot_manager):
-        """Reprocessing only one underlying after a full run should still report the correct number of orders assembled."""
+        """Reprocessing only one underlying should assemble only that partition's orders and leave the others alone."""
         txs_aapl = [
             make_option_transaction(
                 id="tx-aapl", order_id="ORD-AAPL", action="SELL_TO_OPEN",
@@ -349,6 +381,8 @@ class TestIncrementalReprocess:
         # Full process first
         result_full = reprocess(db, lot_manager, all_txs)
         assert result_full.orders_assembled == 2
+        with db.get_session() as session:
+            msft_lot_id = session.query(PositionLot.id).filter_by(transaction_id="tx-msft").scalar()
 
         # Incremental: only reprocess AAPL
         result_incr = reprocess(
@@ -356,8 +390,38 @@ class TestIncrementalReprocess:
             all_txs,
             affected_underlyings={"AAPL"},
         )
-        # Only AAPL transactions processed in stage 3, but assembly sees all
-        assert result_incr.orders_assembled == 2  # assembly is stateless, sees all txs
+        # Only the dirty (ACCT1, AAPL) partition is assembled and rebuilt
+        assert result_incr.orders_assembled == 1
+
+        with db.get_session() as session:
+            msft = session.query(PositionLot).filter_by(transaction_id="tx-msft").one()
+            assert msft.id == msft_lot_id  # untouched, not re-inserted
+
+
+    def test_partition_reprocess_matches_full_rebuild(self, db, lot_manager):
+        """An incremental run over the dirty partition should leave lots, groups, P&L events and roll chains exactly as a full rebuild would."""
+        opens, roll = _build_simple_roll(
+            sym_old="AAPL  250321C00170000", sym_new="AAPL  250418C00175000",
+            strike_old=170.0, strike_new=175.0,
+            exp_old="2025-03-21", exp_new="2025-04-18",
+        )
+        msft = [
+            make_option_transaction(
+                id="tx-msft", order_id="ORD-MSFT", action="SELL_TO_OPEN",
+                quantity=1, price=3.00, underlying_symbol="MSFT",
+                symbol="MSFT 250321C00300000",
+                executed_at="2025-03-01T10:00:00+00:00",
+            ),
+        ]
+        reprocess(db, lot_manager, opens + msft)
+
+        # New AAPL activity arrives — only (ACCT1, AAPL) is dirty
+        reprocess(db, lot_manager, opens + roll + msft, affected_underlyings={"AAPL"})
+        incremental = _snapshot_derived(db)
+
+        reprocess(db, lot_manager, opens + roll + msft)
+        assert incremental == _snapshot_derived(db)
+        assert incremental["roll_chains"] == [("AAPL", 2)]
 
 
 # =====================================================================
@@ -0,0 +1,60 @@
+"""
+Tests for the process-pool execution of pipeline Stages 2–3.
+
+Source: src/pipeline/parallel.py, orchestrator.reprocess(workers=...)
+"""
+
+from src.database.models import LotClosing, PositionGroup, PositionLot
+from src.pipeline import parallel
+from src.pipeline.orchestrator import reprocess
+from tests.conftest import make_option_transaction
+
+
+def _portfolio():
+    txs = []
+    for i, underlying in enumerate(["AAPL", "MSFT", "IREN"]):
+        symbol = f"{underlying:<6}250321C00050000"
+        txs.append(make_option_transaction(
+            id=f"tx-open-{i}", order_id=f"ORD-OPEN-{i}", action="SELL_TO_OPEN",
+            quantity=2, price=2.50, symbol=symbol, underlying_symbol=underlying,
+            executed_at="2025-03-01T10:00:00+00:00",
+        ))
+        txs.append(make_option_transaction(
+            id=f"tx-close-{i}", order_id=f"ORD-CLOSE-{i}", action="BUY_TO_CLOSE",
+            quantity=1, price=1.00, symbol=symbol, underlying_symbol=underlying,
+            executed_at="2025-03-10T10:00:00+00:00",
+        ))
+    return txs
+
+
+def _snapshot(db):
+    with db.get_session() as session:
+        lots = session.query(PositionLot).all()
+        txn_by_lot = {l.id: l.transaction_id for l in lots}
+        return (
+            sorted((l.transaction_id, l.remaining_quantity, l.status) for l in lots),
+            sorted((txn_by_lot[c.lot_id], c.quantity_closed, c.realized_pnl)
+                   for c in session.query(LotClosing).all()),
+            sorted((g.underlying, g.status, g.strategy_label)
+                   for g in session.query(PositionGroup).all()),
+        )
+
+
+class TestParallelReprocess:
+    def test_small_runs_stay_serial(self):
+        """The pool should only be used with more than one worker and enough partitions."""
+        assert not parallel.use_parallel(0, 100)
+        assert not parallel.use_parallel(4, parallel.PARALLEL_MIN_PARTITIONS - 1)
+        assert parallel.use_parallel(4, parallel.PARALLEL_MIN_PARTITIONS)
+
+    def test_parallel_matches_serial(self, db, lot_manager, monkeypatch):
+        """Booking partitions in worker processes should persist the same lots, closings and groups as the serial pass."""
+        monkeypatch.setattr(parallel, "PARALLEL_MIN_PARTITIONS", 1)
+        txs = _portfolio()
+
+        result_parallel = reprocess(db, lot_manager, txs, workers=2)
+        parallel_state = _snapshot(db)
+
+        result_serial = reprocess(db, lot_manager, txs, workers=0)
+        assert result_parallel == result_serial
+        assert parallel_state == _snapshot(db)
@@ -0,0 +1,52 @@
+"""
+Tests for dirty-partition helpers used by incremental reprocessing.
+
+Source: src/pipeline/partitions.py, LotManager.clear_all_lots(partitions=...)
+"""
+
+from src.database.models import PositionLot
+from src.pipeline.partitions import filter_transactions, partition_of, saved_partitions
+from tests.conftest import make_option_transaction, make_stock_transaction
+
+
+class TestPartitionOf:
+    def test_symbol_change_open_leg_moves_to_new_ticker(self):
+        """Symbol-change open legs carry the old underlying_symbol but belong to the new ticker's partition."""
+        close_leg = make_option_transaction(
+            id="tx-sc-close", action="BUY_TO_CLOSE", symbol="OLD   250321C00010000",
+            underlying_symbol="OLD", transaction_sub_type="SYMBOL_CHANGE",
+        )
+        open_leg = make_option_transaction(
+            id="tx-sc-open", action="SELL_TO_OPEN", symbol="NEW   250321C00010000",
+            underlying_symbol="OLD", transaction_sub_type="SYMBOL_CHANGE",
+        )
+        assert partition_of(close_leg) == ("ACCT1", "OLD")
+        assert partition_of(open_leg) == ("ACCT1", "NEW")
+
+    def test_saved_partitions_and_filter(self):
+        """Only partitions whose underlying was newly saved are dirty, and filtering keeps just their transactions."""
+        aapl = make_option_transaction(id="tx-aapl")
+        msft = make_stock_transaction(id="tx-msft", symbol="MSFT", underlying_symbol="MSFT",
+                                      account_number="ACCT2")
+        dirty = saved_partitions([aapl, msft], {"AAPL"})
+        assert dirty == {("ACCT1", "AAPL")}
+        assert filter_transactions([aapl, msft], dirty) == [aapl]
+
+
+class TestClearPartitions:
+    def test_only_dirty_partitions_are_cleared(self, db, lot_manager):
+        """clear_all_lots(partitions=...) should leave other accounts and underlyings alone."""
+        lot_manager.create_lot(make_option_transaction(id="tx-a1"), chain_id="c1")
+        lot_manager.create_lot(
+            make_option_transaction(id="tx-a2", account_number="ACCT2"), chain_id="c2",
+        )
+        lot_manager.create_lot(
+            make_stock_transaction(id="tx-m1", symbol="MSFT", underlying_symbol="MSFT"),
+            chain_id="c3",
+        )
+
+        lot_manager.clear_all_lots(partitions={("ACCT1", "AAPL")})
+
+        with db.get_session() as session:
+            remaining = {r[0] for r in session.query(PositionLot.transaction_id).all()}
+        assert remaining == {"tx-a2", "tx-m1"}
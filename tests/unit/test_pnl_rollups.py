@@ -0,0 +1,136 @@
+"""Unit tests for pnl_rollups — pnl_events pre-aggregated per
+(account, underlying, close day, group) behind the report endpoints.
+"""
+
+import asyncio
+from collections import defaultdict
+
+from src.database.models import PnlEvent, PnlRollup, PositionGroup
+from src.database.tenant import DEFAULT_USER_ID
+from src.pipeline.orchestrator import reprocess
+from src.pipeline.pnl_events import populate_pnl_events
+from src.routers.ledger import update_ledger_group
+from src.routers.reports import (
+    get_dashboard_data,
+    get_monthly_performance,
+    get_performance_report,
+)
+from src.schemas import LedgerGroupUpdate
+from tests.conftest import make_option_transaction
+
+
+def _round_trip(n, *, account, underlying, opened, closed, open_price, close_price, strike):
+    exp = "2025-06-20"
+    symbol = f"{underlying:<6}250620P{int(strike * 1000):08d}"
+    common = dict(
+        account_number=account, symbol=symbol, underlying_symbol=underlying,
+        option_type="Put", strike=strike, expiration=exp,
+    )
+    return [
+        make_option_transaction(
+            id=f"tx-{n}-o", order_id=f"ORD-{n}-o", action="SELL_TO_OPEN",
+            price=open_price, executed_at=f"{opened}T15:00:00+00:00", **common,
+        ),
+        make_option_transaction(
+            id=f"tx-{n}-c", order_id=f"ORD-{n}-c", action="BUY_TO_CLOSE",
+            price=close_price, executed_at=f"{closed}T15:00:00+00:00", **common,
+        ),
+    ]
+
+
+def _history():
+    return (
+        _round_trip(1, account="ACCT1", underlying="AAPL", opened="2025-01-10",
+                    closed="2025-01-20", open_price=2.5, close_price=1.0, strike=150)
+        + _round_trip(2, account="ACCT1", underlying="AAPL", opened="2025-02-03",
+                      closed="2025-02-10", open_price=1.0, close_price=3.0, strike=140)
+        + _round_trip(3, account="ACCT2", underlying="MSFT", opened="2025-02-05",
+                      closed="2025-03-01", open_price=2.0, close_price=0.5, strike=400)
+    )
+
+
+def _events_by_group(db):
+    with db.get_session() as session:
+        totals = defaultdict(float)
+        for gid, pnl in session.query(PnlEvent.group_id, PnlEvent.realized_pnl).all():
+            totals[gid] += pnl
+        return dict(totals)
+
+
+class TestRollupMaintenance:
+    def test_rollups_match_events(self, db, lot_manager):
+        reprocess(db, lot_manager, _history())
+
+        with db.get_session() as session:
+            rows = session.query(PnlRollup).all()
+            by_group = defaultdict(float)
+            for r in rows:
+                by_group[r.group_id] += r.realized_pnl
+                assert r.close_month == r.close_day.isoformat()[:7]
+            assert sum(r.event_count for r in rows) == session.query(PnlEvent).count()
+        assert dict(by_group) == _events_by_group(db)
+
+    def test_partition_rebuild_leaves_other_partitions(self, db, lot_manager):
+        reprocess(db, lot_manager, _history())
+        with db.get_session() as session:
+            msft_ids = {r.id for r in session.query(PnlRollup).filter_by(underlying="MSFT")}
+
+        populate_pnl_events(db, partitions={("ACCT1", "AAPL")})
+
+        with db.get_session() as session:
+            assert {r.id for r in session.query(PnlRollup).filter_by(underlying="MSFT")} == msft_ids
+            assert session.query(PnlRollup).filter_by(underlying="AAPL").count() == 2
+
+    def test_missing_rollups_are_rebuilt_on_read(self, db, lot_manager):
+        reprocess(db, lot_manager, _history())
+        with db.get_session() as session:
+            session.query(PnlRollup).delete()
+
+        monthly = asyncio.run(get_monthly_performance(year=2025, db=db, user_id=DEFAULT_USER_ID))
+        assert monthly["months"][0]["pnl"] == 150.0
+
+
+class TestReportEndpoints:
+    def test_monthly(self, db, lot_manager):
+        reprocess(db, lot_manager, _history())
+        monthly = asyncio.run(get_monthly_performance(year=2025, db=db, user_id=DEFAULT_USER_ID))
+        by_month = {m["month"]: (m["pnl"], m["trade_count"]) for m in monthly["months"]}
+        assert by_month["2025-01"] == (150.0, 1)
+        assert by_month["2025-02"] == (-200.0, 1)
+        assert by_month["2025-03"] == (150.0, 1)
+        assert by_month["2025-04"] == (0.0, 0)
+
+        acct2 = asyncio.run(get_monthly_performance(
+            account_number="ACCT2", year=2025, db=db, user_id=DEFAULT_USER_ID,
+        ))
+        assert sum(m["pnl"] for m in acct2["months"]) == 150.0
+
+    def test_dashboard(self, db, lot_manager):
+        reprocess(db, lot_manager, _history())
+        data = asyncio.run(get_dashboard_data(db=db, user_id=DEFAULT_USER_ID))
+        summary = data["summary"]
+        assert summary["realized_pnl"] == sum(_events_by_group(db).values()) == 100.0
+        assert summary["closed_trades"] == summary["total_trades"] == 3
+        assert round(summary["win_rate"], 2) == 66.67
+
+    def test_performance_report_date_range_and_label(self, db, lot_manager):
+        reprocess(db, lot_manager, _history())
+        report = asyncio.run(get_performance_report(
+            exit_from="2025-02-01", exit_to="2025-02-28", db=db, user_id=DEFAULT_USER_ID,
+        ))
+        assert report["summary"]["totalTrades"] == 1
+        assert report["summary"]["totalPnl"] == -200.0
+
+        # A label override reaches the rollups the strategy filter reads
+        with db.get_session() as session:
+            gid = session.query(PositionGroup.group_id).filter_by(underlying="MSFT").scalar()
+        asyncio.run(update_ledger_group(
+            gid, LedgerGroupUpdate(strategy_label="Wheel"),
+            db=db, lot_manager=lot_manager, user_id=DEFAULT_USER_ID,
+        ))
+        report = asyncio.run(get_performance_report(
+            strategies="Wheel", db=db, user_id=DEFAULT_USER_ID,
+        ))
+        assert report["summary"]["totalTrades"] == 1
+        assert report["breakdown"][0]["strategy"] == "Wheel"
+        assert report["summary"]["totalPnl"] == 150.0
@@ -0,0 +1,43 @@
+"""Unit tests for reconcile_positions_vs_chains — broker positions
+matched against open position_lots legs."""
+
+import asyncio
+
+from src.database.models import PositionGroupLot
+from src.services.sync_service import reconcile_positions_vs_chains
+from tests.conftest import make_option_transaction
+
+
+def _position(symbol, quantity, direction="Short", underlying="F"):
+    return {
+        "symbol": symbol, "underlying_symbol": underlying, "instrument_type": "Equity Option",
+        "quantity": quantity, "quantity_direction": direction,
+    }
+
+
+def _grouped_lot(db, lot_manager, group_id, **tx):
+    transaction = make_option_transaction(**tx)
+    lot_manager.create_lot(transaction, chain_id=group_id)
+    with db.get_session() as session:
+        session.add(PositionGroupLot(group_id=group_id, transaction_id=transaction["id"]))
+
+
+class TestSymbols:
+    def test_matches_on_canonical_form_and_reports_broker_symbols(self, db, lot_manager):
+        """Padding differences still match, but the response carries each side's own symbol."""
+        # One group, so the stale leg is reported rather than auto-closed
+        _grouped_lot(db, lot_manager, "G-1", id="tx-f", symbol="F     250117C00012000",
+                     underlying_symbol="F", quantity=2)
+        _grouped_lot(db, lot_manager, "G-1", id="tx-s", symbol="F     250117P00010000",
+                     underlying_symbol="F", quantity=1)
+        db.save_positions([
+            _position("F 250117C00012000", 3),
+            _position("GOOGL 250117C00150000", 1, underlying="GOOGL"),
+        ], "ACCT1")
+
+        summary = asyncio.run(reconcile_positions_vs_chains(db=db))
+
+        assert [m["symbol"] for m in summary["quantity_mismatch"]] == ["F 250117C00012000"]
+        assert summary["quantity_mismatch"][0]["chain_quantity"] == -2
+        assert [u["symbol"] for u in summary["unlinked"]] == ["GOOGL 250117C00150000"]
+        assert [s["symbol"] for s in summary["stale"]] == ["F     250117P00010000"]
@@ -0,0 +1,134 @@
+"""Unit tests for the shared quote cache (in-process backend)."""
+
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from src.utils.quote_cache import (
+    QUOTE_RETENTION_SECONDS,
+    QuoteCache,
+    QuoteSubscription,
+    _MemoryBackend,
+)
+
+
+@pytest.fixture
+def cache():
+    return QuoteCache(_MemoryBackend())
+
+
+def _quote(mark):
+    return {"mark": mark, "price": mark, "bid": mark - 0.05, "ask": mark + 0.05}
+
+
+class TestGetPut:
+    def test_round_trip_respects_max_age(self, cache):
+        """A stored quote is returned while younger than max_age and skipped once it is older."""
+        with patch("src.utils.quote_cache.time.time", return_value=1000.0):
+            cache.put({"AAPL": _quote(150.0)})
+        with patch("src.utils.quote_cache.time.time", return_value=1020.0):
+            assert cache.get(["AAPL"], max_age_seconds=30)["AAPL"]["mark"] == 150.0
+            assert cache.get(["AAPL"], max_age_seconds=10) == {}
+
+    def test_entries_expire_after_retention(self, cache):
+        """Quotes past the retention window are dropped even for generous max_age readers."""
+        with patch("src.utils.quote_cache.time.time", return_value=1000.0):
+            cache.put({"AAPL": _quote(150.0)})
+        with patch("src.utils.quote_cache.time.time", return_value=1000.0 + QUOTE_RETENTION_SECONDS):
+            assert cache.get(None, max_age_seconds=10 ** 6) == {}
+
+    def test_readers_get_copies(self, cache):
+        """Mutating a returned quote (e.g. camelCase conversion in a router) must not leak into other readers."""
+        cache.put({"AAPL": _quote(150.0)})
+        cache.get(["AAPL"])["AAPL"]["changePercent"] = 1.0
+        assert "changePercent" not in cache.get(["AAPL"])["AAPL"]
+
+    def test_empty_quotes_not_stored(self, cache):
+        """Symbols with no quote data should not be cached."""
+        cache.put({"AAPL": {}, "MSFT": _quote(300.0)})
+        assert set(cache.get(None)) == {"MSFT"}
+
+    def test_invalidate(self, cache):
+        """Invalidated symbols are refetched; others stay cached."""
+        cache.put({"AAPL": _quote(150.0), "MSFT": _quote(300.0)})
+        cache.invalidate(["AAPL"])
+        assert set(cache.get(["AAPL", "MSFT"])) == {"MSFT"}
+
+
+class _BlockingBackend(_MemoryBackend):
+    """Memory backend flagged as blocking, recording the calling threads."""
+
+    blocking = True
+
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def get_many(self, symbols):
+        self.threads.add(threading.get_ident())
+        return super().get_many(symbols)
+
+    def set_many(self, entries):
+        self.threads.add(threading.get_ident())
+        super().set_many(entries)
+
+
+class TestAsync:
+    def test_blocking_backend_runs_off_the_event_loop(self):
+        """Async reads and writes against a network backend must not run on the loop thread."""
+        backend = _BlockingBackend()
+        cache = QuoteCache(backend)
+
+        async def scenario():
+            await cache.put_async({"AAPL": _quote(150.0)})
+            return threading.get_ident(), await cache.get_async(["AAPL"])
+
+        loop_thread, quotes = asyncio.run(scenario())
+        assert quotes["AAPL"]["mark"] == 150.0
+        assert backend.threads and loop_thread not in backend.threads
+
+    def test_cached_quotes_route_reads_off_the_event_loop(self, db):
+        """GET /api/quotes serves cache hits without a blocking read on the loop thread."""
+        from src.routers.quotes import get_market_quotes
+
+        backend = _BlockingBackend()
+        cache = QuoteCache(backend)
+        cache.put({"AAPL": _quote(150.0)})
+        backend.threads.clear()
+
+        async def scenario():
+            quotes = await get_market_quotes(symbols="AAPL", db=db, connection_manager=None, user_id=None)
+            return threading.get_ident(), quotes
+
+        with patch("src.utils.quote_cache.get_quote_cache", return_value=cache):
+            loop_thread, quotes = asyncio.run(scenario())
+        assert quotes["AAPL"]["price"] == 150.0
+        assert backend.threads and loop_thread not in backend.threads
+
+    def test_subscription_interface_is_abstract(self):
+        with pytest.raises(TypeError):
+            QuoteSubscription()
+
+
+class TestSubscribe:
+    def test_put_fans_out_to_subscribers(self, cache):
+        """Every subscriber receives the batch stored by a put; closed subscribers stop receiving."""
+        async def scenario():
+            first = cache.subscribe()
+            second = cache.subscribe()
+            cache.put({"AAPL": _quote(150.0)})
+            a = await first.next_batch(timeout=1)
+            b = await second.next_batch(timeout=1)
+            await second.close()
+            cache.put({"MSFT": _quote(300.0)})
+            c = await first.next_batch(timeout=1)
+            d = await second.next_batch(timeout=0.05)
+            await first.close()
+            return a, b, c, d
+
+        a, b, c, d = asyncio.run(scenario())
+        assert set(a) == set(b) == {"AAPL"}
+        assert set(c) == {"MSFT"}
+        assert d is None
@@ -0,0 +1,78 @@
+"""Unit tests for /ws/quotes frame encoding."""
+
+import asyncio
+from unittest.mock import AsyncMock
+
+from src.utils.quote_frames import QuoteFrameEncoder
+
+
+def _quote(mark, **extra):
+    return {"symbol": "AAPL", "mark": mark, "price": mark, "bid": mark - 0.1,
+            "change_percent": 1.5, "changePercent": 1.5, **extra}
+
+
+class TestFullFormat:
+    def test_default_is_unchanged_full_quotes(self):
+        """Clients that don't opt in keep receiving complete quote dicts."""
+        encoder = QuoteFrameEncoder.from_subscribe({"subscribe": ["AAPL"]})
+        assert encoder.set_symbols(["AAPL"]) is None
+
+        quotes = {"AAPL": _quote(150.0)}
+        frame = encoder.quotes_frame(quotes)
+        assert frame["type"] == "quotes"
+        assert frame["data"] == quotes
+        assert "timestamp" in frame
+
+
+class TestCompactFormat:
+    def _encoder(self, symbols=("AAPL", "MSFT")):
+        encoder = QuoteFrameEncoder.from_subscribe({"format": "compact"})
+        ack = encoder.set_symbols(list(symbols))
+        return encoder, ack
+
+    def test_ack_carries_symbol_table(self):
+        """The subscribe ack lists symbols in index order."""
+        _, ack = self._encoder()
+        assert ack["type"] == "symbols"
+        assert ack["symbols"] == ["AAPL", "MSFT"]
+        assert ack["encoding"] == "json"
+
+    def test_first_frame_is_full_then_only_changed_fields(self):
+        """The first frame carries every non-alias field; later frames carry just the fields that moved."""
+        encoder, _ = self._encoder()
+        first = encoder.quotes_frame({"AAPL": _quote(150.0)})
+        assert first["type"] == "delta"
+        assert first["data"] == [[0, {"mark": 150.0, "bid": 149.9, "change_percent": 1.5}]]
+
+        second = encoder.quotes_frame({"AAPL": _quote(150.5)})
+        assert second["data"] == [[0, {"mark": 150.5, "bid": 150.4}]]
+
+    def test_unchanged_batch_produces_no_frame(self):
+        encoder, _ = self._encoder()
+        encoder.quotes_frame({"AAPL": _quote(150.0)})
+        assert encoder.quotes_frame({"AAPL": _quote(150.0)}) is None
+
+    def test_resubscribe_resets_sent_state(self):
+        """A new subscribe renumbers symbols and resends full quotes."""
+        encoder, _ = self._encoder()
+        encoder.quotes_frame({"AAPL": _quote(150.0)})
+        encoder.set_symbols(["MSFT", "AAPL"])
+        frame = encoder.quotes_frame({"AAPL": _quote(150.0)})
+        assert frame["data"][0][0] == 1
+        assert "change_percent" in frame["data"][0][1]
+
+    def test_unsubscribed_symbols_skipped(self):
+        encoder, _ = self._encoder(symbols=["MSFT"])
+        assert encoder.quotes_frame({"AAPL": _quote(150.0)}) is None
+
+
+class TestEncoding:
+    def test_unknown_encoding_is_json(self):
+        """An encoding other than msgpack is reported and sent as JSON."""
+        encoder = QuoteFrameEncoder.from_subscribe({"format": "compact", "encoding": "cbor"})
+        assert encoder.set_symbols(["AAPL"])["encoding"] == "json"
+
+        websocket = AsyncMock()
+        asyncio.run(encoder.send(websocket, {"type": "delta"}))
+        websocket.send_json.assert_awaited_once()
+        websocket.send_bytes.assert_not_called()
@@ -0,0 +1,134 @@
+"""Unit tests for the shared DXLink quote streaming hub.
+
+The DXLink connection itself is not opened; events are applied and
+flushed directly to exercise the reference counting and delta fan-out.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from src.api.quote_stream import QuoteStreamHub
+from src.utils.quote_cache import QuoteCache, _MemoryBackend
+
+
+@pytest.fixture
+def hub():
+    cache = QuoteCache(_MemoryBackend())
+    with patch("src.api.quote_stream.get_quote_cache", return_value=cache), \
+            patch.object(QuoteStreamHub, "_ensure_running"):
+        yield QuoteStreamHub(client=None)
+
+
+def _quote(bid, ask):
+    return SimpleNamespace(bid_price=bid, ask_price=ask)
+
+
+class TestReferenceCounting:
+    def test_symbols_shared_across_sockets(self, hub):
+        """A symbol stays subscribed upstream until the last socket that wants it lets go."""
+        async def scenario():
+            a, b = hub.subscribe(), hub.subscribe()
+            await a.set_symbols(["AAPL", "MSFT"])
+            await b.set_symbols(["AAPL"])
+            counts = dict(hub._refcounts)
+            await a.close()
+            after_a = dict(hub._refcounts)
+            await b.set_symbols([])
+            return counts, after_a, dict(hub._refcounts)
+
+        counts, after_a, after_b = asyncio.run(scenario())
+        assert counts == {"AAPL": 2, "MSFT": 1}
+        assert after_a == {"AAPL": 1}
+        assert after_b == {}
+
+
+class TestDeltas:
+    def test_each_socket_gets_only_its_changed_symbols(self, hub):
+        """A flush should push a changed symbol to the sockets subscribed to it and nothing to the others."""
+        async def scenario():
+            a, b = hub.subscribe(), hub.subscribe()
+            await a.set_symbols(["AAPL"])
+            await b.set_symbols(["MSFT"])
+            hub._apply_quote("AAPL", _quote(150.0, 150.2))
+            hub._flush()
+            return await a.next_batch(timeout=0.1), await b.next_batch(timeout=0.01)
+
+        batch_a, batch_b = asyncio.run(scenario())
+        assert batch_a["AAPL"]["mark"] == pytest.approx(150.1)
+        assert batch_b is None
+
+    def test_unchanged_quote_not_pushed(self, hub):
+        """Repeating the same bid/ask should not produce another delta."""
+        async def scenario():
+            sub = hub.subscribe()
+            await sub.set_symbols(["AAPL"])
+            hub._apply_quote("AAPL", _quote(150.0, 150.2))
+            hub._flush()
+            await sub.next_batch(timeout=0.1)
+            hub._apply_quote("AAPL", _quote(150.0, 150.2))
+            hub._flush()
+            return await sub.next_batch(timeout=0.01)
+
+        assert asyncio.run(scenario()) is None
+
+    def test_slow_consumer_gets_latest_value(self, hub):
+        """Deltas for the same symbol coalesce until read, so the socket sees the most recent quote once."""
+        async def scenario():
+            sub = hub.subscribe()
+            await sub.set_symbols(["AAPL"])
+            for bid in (150.0, 151.0, 152.0):
+                hub._apply_quote("AAPL", _quote(bid, bid))
+                hub._flush()
+            return await sub.next_batch(timeout=0.1)
+
+        batch = asyncio.run(scenario())
+        assert batch["AAPL"]["mark"] == 152.0
+
+    def test_change_computed_from_seeded_prev_close(self, hub):
+        """Streamed marks should carry change/changePercent relative to the prev_close from the last REST quote."""
+        async def scenario():
+            from src.api import quote_stream
+            quote_stream.get_quote_cache().put({"AAPL": {"symbol": "AAPL", "prev_close": 100.0, "ivr": 42.0}})
+            sub = hub.subscribe()
+            await sub.set_symbols(["AAPL"])
+            hub._apply_quote("AAPL", _quote(101.0, 101.0))
+            hub._flush()
+            return await sub.next_batch(timeout=0.1)
+
+        quote = asyncio.run(scenario())["AAPL"]
+        assert quote["change"] == pytest.approx(1.0)
+        assert quote["changePercent"] == pytest.approx(1.0)
+        assert quote["ivr"] == 42.0
+
+
+class TestLatest:
+    def test_only_symbols_with_streamed_events(self, hub):
+        """Cache-seeded and placeholder quotes are not reported as live until an event arrives."""
+        async def scenario():
+            from src.api import quote_stream
+            quote_stream.get_quote_cache().put({"AAPL": {"symbol": "AAPL", "mark": 99.0}})
+            sub = hub.subscribe()
+            await sub.set_symbols(["AAPL", "MSFT"])
+            hub._streamer = object()
+            before = hub.latest(["AAPL", "MSFT"])
+            hub._apply_quote("AAPL", _quote(101.0, 101.0))
+            return before, hub.latest(["AAPL", "MSFT"])
+
+        before, after = asyncio.run(scenario())
+        assert before == {}
+        assert list(after) == ["AAPL"] and after["AAPL"]["mark"] == 101.0
+
+    def test_dropped_symbol_is_no_longer_live(self, hub):
+        async def scenario():
+            sub = hub.subscribe()
+            await sub.set_symbols(["AAPL"])
+            hub._streamer = object()
+            hub._apply_quote("AAPL", _quote(101.0, 101.0))
+            await sub.set_symbols([])
+            await sub.set_symbols(["AAPL"])
+            return hub.latest(["AAPL"])
+
+        assert asyncio.run(scenario()) == {}
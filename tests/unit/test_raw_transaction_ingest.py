@@ -0,0 +1,107 @@
+"""
+Tests for batched raw transaction ingest.
+
+Source: src/database/db_manager.py (save_raw_transactions, iter_raw_transactions)
+"""
+
+import sqlite3
+from unittest.mock import patch
+
+from sqlalchemy import event
+
+from src.database import engine as sa_engine
+from src.database.db_manager import RAW_TXN_CHUNK_SIZE, SQLITE_MAX_VARIABLES
+from src.database.models import RawTransaction
+from tests.conftest import make_option_transaction
+
+
+def _txn(i, **kwargs):
+    return make_option_transaction(id=f"tx-{i}", order_id=f"ORD-{i}", **kwargs)
+
+
+class TestSaveRawTransactions:
+    def test_counts_only_new_rows_and_symbols(self, db):
+        """Re-saving a batch should insert only the unseen transactions and report only their underlyings."""
+        db.save_raw_transactions([_txn(1), _txn(2)])
+
+        saved, symbols = db.save_raw_transactions([
+            _txn(2),
+            _txn(3, underlying_symbol="MSFT", symbol="MSFT  250321C00300000"),
+        ])
+        assert saved == 1
+        assert symbols == {"MSFT"}
+
+    def test_normalizes_sdk_enum_formats(self, db):
+        """Title Case and OrderAction.* variants are stored in uppercase underscore form."""
+        db.save_raw_transactions([_txn(
+            1, action="OrderAction.SELL_TO_OPEN", instrument_type="Equity Option",
+            transaction_type="Trade", transaction_sub_type="Sell to Open",
+        )])
+        with db.get_session() as session:
+            row = session.query(RawTransaction).one()
+            assert (row.action, row.instrument_type, row.transaction_sub_type) == (
+                "SELL_TO_OPEN", "EQUITY_OPTION", "SELL_TO_OPEN",
+            )
+
+    def test_duplicate_ids_in_one_batch_saved_once(self, db):
+        saved, _ = db.save_raw_transactions([_txn(1), _txn(1)])
+        assert saved == 1
+
+    def test_bad_row_skipped_without_losing_its_chunk(self, db):
+        """A row that violates a constraint is dropped; every other row in the same and later chunks still lands."""
+        batch = [_txn(i) for i in range(10)]
+        batch[4]["account_number"] = None  # NOT NULL violation
+
+        with patch("src.database.db_manager.RAW_TXN_CHUNK_SIZE", 4):
+            saved, _ = db.save_raw_transactions(batch)
+
+        assert saved == 9
+        with db.get_session() as session:
+            ids = {row.id for row in session.query(RawTransaction).all()}
+        assert "tx-4" not in ids
+        assert len(ids) == 9
+
+    def test_full_chunk_fits_one_statement(self, db):
+        """A chunk of RAW_TXN_CHUNK_SIZE rows stays under SQLite's bind-parameter limit."""
+        def default_limit(dbapi_conn, *_):
+            # Some builds raise the limit; hold them to the stock default
+            dbapi_conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, SQLITE_MAX_VARIABLES)
+
+        engine = sa_engine.get_engine()
+        event.listen(engine, "checkout", default_limit)
+        try:
+            with patch.object(db, "_upsert_raw_chunk", wraps=db._upsert_raw_chunk) as upsert:
+                saved, _ = db.save_raw_transactions([_txn(i) for i in range(RAW_TXN_CHUNK_SIZE)])
+        finally:
+            event.remove(engine, "checkout", default_limit)
+        assert saved == RAW_TXN_CHUNK_SIZE
+        assert upsert.call_count == 1  # no bisecting after a failed insert
+
+
+class TestIterRawTransactions:
+    def test_rows_read_like_to_dict(self, db):
+        """Streamed rows expose the same values through get() and [] as get_raw_transactions dicts."""
+        db.save_raw_transactions([_txn(1), _txn(2)])
+
+        dicts = {d["id"]: d for d in db.get_raw_transactions()}
+        rows = list(db.iter_raw_transactions())
+        assert {r["id"] for r in rows} == set(dicts)
+        for row in rows:
+            assert all(row.get(k) == dicts[row["id"]][k] for k in row.keys())
+        assert rows[0].get("row_id", "missing") == "missing"
+
+    def test_partitions_narrow_to_exact_pairs(self, db):
+        """Only rows in the requested (account, underlying) pairs are returned."""
+        db.save_raw_transactions([
+            _txn(1),
+            _txn(2, account_number="ACCT2"),
+            _txn(3, underlying_symbol="MSFT", symbol="MSFT  250321C00300000"),
+        ])
+        rows = list(db.iter_raw_transactions(partitions={("ACCT1", "AAPL")}))
+        assert [r["id"] for r in rows] == ["tx-1"]
+        assert list(db.iter_raw_transactions(partitions=set())) == []
+
+    def test_streams_across_fetch_batches(self, db):
+        db.save_raw_transactions([_txn(i) for i in range(7)])
+        with patch("src.database.db_manager.RAW_TXN_FETCH_SIZE", 3):
+            assert len(list(db.iter_raw_transactions())) == 7
@@ -5,17 +5,21 @@ OPT-282: when the rolled_from graph branches (spec §5.2), the rollup
 must emit one summary per leaf, not one per root.
 """
 
+import asyncio
 import uuid
 from collections import defaultdict
 
 from src.database.models import (
+    ChainLotAttribution,
     LotClosing,
     PositionGroup,
     PositionGroupLot,
     PositionLot,
     RollChainSummary,
 )
+from src.database.tenant import DEFAULT_USER_ID
 from src.pipeline.roll_chain_summary import populate_roll_chain_summaries
+from src.routers.ledger import get_group_roll_chain
 
 
 def _seed_group(session, *, account="ACCT", underlying="AAPL",
@@ -625,3 +629,52 @@ class TestRollupModalConsistency:
             f"is in 0 chains (its P&L is being lost) or a lot is in 2+ "
             f"chains (its P&L is being double-counted)."
         )
+
+
+class TestPersistedAttribution:
+    def _branching(self, db):
+        """A (2 closed lots) branches into B and C, one lot each."""
+        with db.get_session() as session:
+            a = _seed_group(
+                session, opening_date="2025-02-21T10:00:00+00:00",
+                closing_date="2025-03-14T10:00:00+00:00", status="CLOSED",
+            )
+            b = _seed_group(
+                session, opening_date="2025-03-14T10:00:00+00:00",
+                status="OPEN", rolled_from=a,
+            )
+            c = _seed_group(
+                session, opening_date="2025-03-14T11:00:00+00:00",
+                status="OPEN", rolled_from=a,
+            )
+            to_b = _seed_closed_lot(session, group_id=a, strike=100, realized_pnl=100.0)
+            to_c = _seed_closed_lot(session, group_id=a, strike=101, realized_pnl=40.0)
+            b_lot = _seed_open_child_lot(session, group_id=b, strike=110, parent_lot_id=to_b.id)
+            c_lot = _seed_open_child_lot(session, group_id=c, strike=120, parent_lot_id=to_c.id)
+            return a, b, c, {to_b.id: b, b_lot.id: b, to_c.id: c, c_lot.id: c}
+
+    def test_lot_home_chains_are_stored(self, db):
+        """Every attributed lot gets one row naming the leaf of its home chain; a rebuild replaces rather than duplicates them."""
+        _, _, _, expected = self._branching(db)
+        populate_roll_chain_summaries(db)
+        populate_roll_chain_summaries(db, partitions={("ACCT", "AAPL")})
+
+        with db.get_session() as session:
+            stored = {
+                r.lot_id: r.leaf_group_id
+                for r in session.query(ChainLotAttribution).all()
+            }
+            assert session.query(ChainLotAttribution).count() == len(expected)
+        assert stored == expected
+
+    def test_roll_chain_modal_reads_stored_attribution(self, db, lot_manager):
+        """The modal for one branch credits the shared source only with the lot that rolled into that branch."""
+        a, _, c, _ = self._branching(db)
+        populate_roll_chain_summaries(db)
+
+        chain = asyncio.run(get_group_roll_chain(
+            c, db=db, lot_manager=lot_manager, user_id=DEFAULT_USER_ID,
+        ))
+        assert [row["group_id"] for row in chain["chain"]] == [a, c]
+        assert chain["chain"][0]["realized_pnl"] == 40.0
+        assert chain["chain"][0]["lot_count"] == 1
@@ -573,3 +573,56 @@ class TestLotsToLegs:
         assert legs[0].instrument_type == "Equity"
         assert legs[0].direction == "long"
         assert legs[0].quantity == 100
+
+
+# ---------------------------------------------------------------------------
+# Recognition cache / large groups
+# ---------------------------------------------------------------------------
+
+class TestRecognitionCache:
+    def setup_method(self):
+        from src.pipeline.strategy_engine.recognizer import clear_cache
+        clear_cache()
+
+    def test_same_shape_shares_cache_entry(self):
+        """Iron condors at different strikes, expirations and sizes have the same canonical shape and should be recognized once."""
+        from src.pipeline.strategy_engine.recognizer import _cache
+
+        def condor(base, exp, qty):
+            return [
+                _opt("P", base - 10, "long", exp=exp, quantity=qty),
+                _opt("P", base - 5, "short", exp=exp, quantity=qty),
+                _opt("C", base + 5, "short", exp=exp, quantity=qty),
+                _opt("C", base + 10, "long", exp=exp, quantity=qty),
+            ]
+
+        a = recognize(condor(100, date(2026, 3, 21), 1))
+        b = recognize(list(reversed(condor(450, date(2026, 6, 19), 3))))
+        assert a.name == b.name == "Iron Condor"
+        assert len(_cache) == 1
+
+    def test_sub_strategy_indices_follow_caller_order(self):
+        """Partition indices should point at the caller's legs even when the cached shape was built from a different ordering."""
+        legs = [
+            _opt("P", 95, "short", exp=date(2026, 4, 17)),
+            _opt("C", 100, "long", exp=date(2026, 3, 21)),
+        ]
+        recognize(list(reversed(legs)))
+        r = recognize(legs)
+        parts = {name: indices for name, indices in r.sub_strategies}
+        assert parts["Short Put"] == frozenset({0})
+        assert parts["Long Call"] == frozenset({1})
+
+    def test_large_group_covers_every_leg(self):
+        """A 20-leg covered-call ladder should go through the budgeted solver and still account for every leg."""
+        legs = [_equity("long", 1900)] + [
+            _opt("C", 100 + i, "short", exp=date(2026, 1, 2 + i))
+            for i in range(19)
+        ]
+        r = recognize(legs)
+        assert r.leg_count == 20
+        covered = set()
+        for _, indices in r.sub_strategies:
+            assert not covered & indices
+            covered |= indices
+        assert covered == set(range(20))
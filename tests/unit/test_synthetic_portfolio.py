@@ -0,0 +1,75 @@
+"""Unit tests for the synthetic portfolio generator behind
+scripts/bench_pipeline.py, and the per-stage timings it reads.
+"""
+
+from collections import Counter
+
+import pytest
+
+from src.database.models import PositionGroup, PositionLot
+from src.pipeline.order_assembler import preprocess_transactions
+from src.pipeline.orchestrator import reprocess
+from tests.fixtures import synthetic_portfolio
+
+
+class TestGenerator:
+    def test_same_arguments_same_history(self):
+        assert synthetic_portfolio.transactions(500, seed=7) == synthetic_portfolio.transactions(500, seed=7)
+        assert synthetic_portfolio.transactions(500, seed=7) != synthetic_portfolio.transactions(500, seed=8)
+
+    def test_exact_count_in_time_order(self):
+        rows = synthetic_portfolio.transactions(1234)
+        assert len(rows) == 1234
+        assert [r["executed_at"] for r in rows] == sorted(r["executed_at"] for r in rows)
+        assert len({r["id"] for r in rows}) == 1234
+
+    def test_parameters_shape_the_history(self):
+        rows = synthetic_portfolio.transactions(
+            2000, accounts=2, underlyings=4, years=1,
+            strategy_mix={"short_put": 1}, roll_rate=0.5, assignment_rate=0.2,
+        )
+        assert len({r["account_number"] for r in rows}) == 2
+        assert len({r["underlying_symbol"] for r in rows}) == 4
+        assert max(r["executed_at"] for r in rows) < "2023-01-04"
+
+        sub_types = Counter(r["transaction_sub_type"] for r in rows)
+        assert sub_types["Assignment"] > 0 and sub_types["Expiration"] > 0
+        # Puts only: every opening option leg is a short put
+        assert {r["option_type"] for r in rows if r["action"] == "SELL_TO_OPEN"} == {"Put"}
+        # Rolls are one order closing and opening
+        actions_by_order = {}
+        for r in rows:
+            if r["order_id"]:
+                actions_by_order.setdefault(r["order_id"], set()).add(r["action"])
+        assert any(a == {"BUY_TO_CLOSE", "SELL_TO_OPEN"} for a in actions_by_order.values())
+
+    def test_rows_are_pipeline_shaped(self):
+        """Assignment shares are set aside as derived stock, as for a broker export."""
+        rows = synthetic_portfolio.transactions(1000, assignment_rate=0.3)
+        transactions, assignment_stock = preprocess_transactions(rows)
+        assert len(transactions) + len(assignment_stock) == len(rows)
+        assert assignment_stock and all(r["order_id"] is None for r in assignment_stock)
+
+    def test_rejects_bad_arguments(self):
+        with pytest.raises(ValueError):
+            synthetic_portfolio.transactions(10, strategy_mix={"strangle": 1})
+        with pytest.raises(ValueError):
+            synthetic_portfolio.transactions(10, roll_rate=0.8, assignment_rate=0.3)
+
+
+class TestPipelineRun:
+    def test_reprocess_records_stage_timings(self, db, lot_manager):
+        result = reprocess(db, lot_manager, synthetic_portfolio.transactions(1500), workers=0)
+
+        assert list(result.stage_seconds) == [
+            "partitions", "clear", "lots", "equity_netting", "lot_lineage", "groups",
+            "rolled_from", "pnl_events", "roll_chain_summaries", "open_snapshots",
+        ]
+        assert all(secs >= 0 for secs in result.stage_seconds.values())
+
+        # Closed history plus the positions still running at the end
+        with db.get_session() as session:
+            statuses = Counter(status for (status,) in session.query(PositionGroup.status))
+            assert statuses["CLOSED"] > 0 and statuses["OPEN"] > 0
+            assert session.query(PositionLot).filter(PositionLot.derivation_type == "ASSIGNMENT").count() > 0
+        assert result.open_snapshots == statuses["OPEN"] + statuses["ASSIGNED"]